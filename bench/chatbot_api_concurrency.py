@@ -0,0 +1,139 @@
+# chatbot_api_concurrency.py
+"""chatbot_api 동기(Flask) / 비동기(ASGI) 서빙 모드 동시성 비교 부하 테스트
+
+가짜 LLM 서버를 띄우고 두 서버를 각각 임시 DB 로 실행한 뒤, 같은 수의 동시 채팅 요청을 보내
+처리량과 지연시간 백분위수를 비교한다.
+
+실행:
+    python bench/chatbot_api_concurrency.py --concurrency 200 --requests 1000 --llm-latency 1.0
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_llm_server import FakeLLMServer
+from http_client import HttpClient, wait_for_port
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def start_server(mode, port, workers, llm_port, db_dir):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_PATH': os.path.join(db_dir, f'{mode}.db'),
+        'OPENAI_API_KEY': 'fake-key',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{llm_port}/v1',
+        'SECRET_KEY': 'bench-secret',
+        # 모든 클라이언트가 같은 사용자로 로그인하므로 요청 한도는 끔
+        'RATE_LIMIT_ENABLED': '0',
+    })
+    return subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'run_chatbot_api.py'),
+         '--mode', mode, '--port', str(port), '--workers', str(workers)],
+        env=env
+    )
+
+
+async def run_load(port, concurrency, total_requests, stream):
+    """동시 사용자 concurrency 명이 총 total_requests 개의 채팅 요청을 전송"""
+    latencies = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def virtual_user():
+        nonlocal errors
+        client = HttpClient('127.0.0.1', port)
+        await client.post('/api/dev/login', {'user_id': 1})
+        for _ in counter:
+            started = time.perf_counter()
+            try:
+                response = await client.post('/api/chat/send', {'pet_id': 1, 'message': '안녕!', 'stream': stream})
+                if response.status != 200:
+                    errors += 1
+                    continue
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(virtual_user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    return {
+        'requests': total_requests,
+        'ok': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+    }
+
+
+async def main_async(args):
+    llm = await FakeLLMServer(port=args.llm_port, latency=args.llm_latency, token_rate=args.token_rate).start()
+    results = {'config': vars(args), 'modes': {}}
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        for index, mode in enumerate(args.modes):
+            port = args.base_port + index
+            server = start_server(mode, port, args.workers, args.llm_port, db_dir)
+            try:
+                await wait_for_port('127.0.0.1', port)
+                await asyncio.sleep(0.5)
+                result = await run_load(port, args.concurrency, args.requests, args.stream)
+                result['llm_max_in_flight'] = llm.max_in_flight
+                llm.max_in_flight = 0
+                results['modes'][mode] = result
+                print(f'[{mode}] {json.dumps(result, ensure_ascii=False)}', flush=True)
+            finally:
+                server.terminate()
+                server.wait()
+
+    await llm.stop()
+
+    if 'sync' in results['modes'] and 'async' in results['modes']:
+        sync_rps = results['modes']['sync']['throughput_rps']
+        async_rps = results['modes']['async']['throughput_rps']
+        results['speedup'] = round(async_rps / sync_rps, 2) if sync_rps else None
+        print(f'처리량 비율 (async / sync): {results["speedup"]}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='chatbot_api 동기/비동기 서빙 동시성 비교')
+    parser.add_argument('--modes', nargs='+', default=['sync', 'async'], choices=['sync', 'async'])
+    parser.add_argument('--concurrency', type=int, default=200, help='동시 가상 사용자 수')
+    parser.add_argument('--requests', type=int, default=1000, help='총 요청 수')
+    parser.add_argument('--workers', type=int, default=16, help='sync 모드 워커 스레드 수')
+    parser.add_argument('--llm-latency', type=float, default=1.0, help='가짜 LLM 지연시간 (초)')
+    parser.add_argument('--token-rate', type=float, default=200.0, help='가짜 LLM 초당 토큰 수')
+    parser.add_argument('--stream', action='store_true', help='SSE 스트리밍 모드로 요청')
+    parser.add_argument('--llm-port', type=int, default=8800)
+    parser.add_argument('--base-port', type=int, default=5101)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+# fake_llm_server.py
+"""로컬 부하 테스트용 OpenAI 호환 가짜 LLM 서버
+
+/v1/chat/completions 요청에 대해 지정된 지연시간과 토큰 속도로 응답한다.
+stream=true 요청은 SSE 청크로 토큰을 보낸다. asyncio 로 구현되어 수천 개의 동시 요청을 처리할 수 있다.
+/v1/completions 는 prompt 목록(배치)을 받아 프롬프트마다 choice 를 돌려준다.
+
+slots 를 지정하면 GPU 하나짜리 추론 서버처럼 동시에 slots 개의 요청(배치 하나도 요청 하나)만 처리하고
+나머지는 기다리게 한다. 배치의 처리 시간은 프롬프트 하나가 늘 때마다 batch_cost 비율만큼 늘어난다.
+
+실행:
+    python bench/fake_llm_server.py --port 8800 --latency 1.0 --token-rate 50
+    OPENAI_BASE_URL=http://127.0.0.1:8800/v1 OPENAI_API_KEY=fake python app.py
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import time
+import uuid
+
+DEFAULT_REPLY = '멍멍! 주인님 왔어? 오늘도 같이 산책 가자! 꼬리가 저절로 흔들려 🐾'
+
+
+class FakeLLMServer:
+    """OpenAI 채팅 완성 API 를 흉내 내는 asyncio HTTP 서버"""
+
+    def __init__(self, host='127.0.0.1', port=8800, latency=1.0, token_rate=50.0,
+                 fail_rate=0.0, reply=DEFAULT_REPLY, slow_rate=0.0, slow_latency=5.0, slots=0, batch_cost=0.1):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.token_rate = token_rate
+        self.fail_rate = fail_rate
+        self.reply = reply
+        # 꼬리 지연 재현용: slow_rate 비율의 요청은 latency 대신 slow_latency 만큼 지연
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        # 추론 서버 동시 처리 슬롯 (0 이면 제한 없음)
+        self.slots = slots
+        self.batch_cost = batch_cost
+        self._slot_semaphore = None
+        self.batches = 0
+        self.batched_prompts = 0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._server = None
+
+    def _tokens(self):
+        # 한글 응답을 2글자 단위의 '토큰'으로 나눔
+        return [self.reply[i:i + 2] for i in range(0, len(self.reply), 2)]
+
+    async def _read_request(self, reader):
+        head = await reader.readuntil(b'\r\n\r\n')
+        lines = head.decode('latin-1').split('\r\n')
+        method, path, _ = lines[0].split(' ', 2)
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                key, value = line.split(':', 1)
+                headers[key.strip().lower()] = value.strip()
+        length = int(headers.get('content-length', '0'))
+        body = await reader.readexactly(length) if length else b''
+        return method, path, headers, body
+
+    @staticmethod
+    def _response(status, body, content_type='application/json', keep_alive=True):
+        reason = {200: 'OK', 404: 'Not Found', 500: 'Internal Server Error', 503: 'Service Unavailable'}[status]
+        head = (
+            f'HTTP/1.1 {status} {reason}\r\n'
+            f'Content-Type: {content_type}\r\n'
+            f'Content-Length: {len(body)}\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        )
+        return head.encode('latin-1') + body
+
+    def _completion(self, model, content):
+        return {
+            'id': f'chatcmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': 'stop'
+            }],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(self._tokens()), 'total_tokens': 0}
+        }
+
+    def _text_completion(self, model, count):
+        return {
+            'id': f'cmpl-{uuid.uuid4().hex[:12]}',
+            'object': 'text_completion',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': index, 'text': self.reply, 'finish_reason': 'stop', 'logprobs': None}
+                        for index in range(count)],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': len(self._tokens()) * count, 'total_tokens': 0}
+        }
+
+    def _slot(self):
+        """추론 슬롯 (slots 가 0 이면 제한 없는 컨텍스트)"""
+        if not self.slots:
+            return contextlib.nullcontext()
+        if self._slot_semaphore is None:
+            self._slot_semaphore = asyncio.Semaphore(self.slots)
+        return self._slot_semaphore
+
+    async def _handle_text_completion(self, writer, payload, keep_alive):
+        """배치 프롬프트 완성: 프롬프트 수만큼 처리 시간이 batch_cost 비율로 늘어남"""
+        model = payload.get('model', 'fake-model')
+        prompts = payload.get('prompt', '')
+        count = len(prompts) if isinstance(prompts, list) else 1
+        token_delay = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+        duration = (self.latency + token_delay * len(self._tokens())) * (1 + self.batch_cost * (count - 1))
+
+        async with self._slot():
+            self.batches += 1
+            self.batched_prompts += count
+            await asyncio.sleep(duration)
+
+        if random.random() < self.fail_rate:
+            body = json.dumps({'error': {'message': 'fake upstream failure', 'type': 'server_error'}}).encode()
+            writer.write(self._response(503, body, keep_alive=keep_alive))
+            return
+        body = json.dumps(self._text_completion(model, count), ensure_ascii=False).encode('utf-8')
+        writer.write(self._response(200, body, keep_alive=keep_alive))
+
+    def _chunk(self, chunk_id, model, delta, finish_reason=None):
+        return {
+            'id': chunk_id,
+            'object': 'chat.completion.chunk',
+            'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+
+    async def _handle_completion(self, writer, payload, keep_alive):
+        model = payload.get('model', 'fake-model')
+        tokens = self._tokens()
+        token_delay = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+
+        async with self._slot():
+            await asyncio.sleep(self.slow_latency if random.random() < self.slow_rate else self.latency)
+            if not payload.get('stream') and self.slots:
+                # 슬롯 제한이 있으면 생성 시간 동안에도 슬롯을 점유
+                await asyncio.sleep(token_delay * len(tokens))
+                token_delay = 0.0
+
+        if random.random() < self.fail_rate:
+            body = json.dumps({'error': {'message': 'fake upstream failure', 'type': 'server_error'}}).encode()
+            writer.write(self._response(503, body, keep_alive=keep_alive))
+            return
+
+        if not payload.get('stream'):
+            await asyncio.sleep(token_delay * len(tokens))
+            body = json.dumps(self._completion(model, self.reply), ensure_ascii=False).encode('utf-8')
+            writer.write(self._response(200, body, keep_alive=keep_alive))
+            return
+
+        # 스트리밍: chunked 전송 인코딩으로 SSE 청크 전송
+        writer.write((
+            'HTTP/1.1 200 OK\r\n'
+            'Content-Type: text/event-stream\r\n'
+            'Transfer-Encoding: chunked\r\n'
+            f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+        ).encode('latin-1'))
+
+        def send(data):
+            frame = f'data: {data}\n\n'.encode('utf-8')
+            writer.write(f'{len(frame):x}\r\n'.encode('latin-1') + frame + b'\r\n')
+
+        chunk_id = f'chatcmpl-{uuid.uuid4().hex[:12]}'
+        send(json.dumps(self._chunk(chunk_id, model, {'role': 'assistant', 'content': ''}), ensure_ascii=False))
+        for token in tokens:
+            await asyncio.sleep(token_delay)
+            send(json.dumps(self._chunk(chunk_id, model, {'content': token}), ensure_ascii=False))
+            await writer.drain()
+        send(json.dumps(self._chunk(chunk_id, model, {}, 'stop')))
+        send('[DONE]')
+        writer.write(b'0\r\n\r\n')
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    method, path, headers, body = await self._read_request(reader)
+                except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionError):
+                    break
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                self.requests += 1
+
+                if method == 'POST' and path.rstrip('/').endswith('/completions'):
+                    self.in_flight += 1
+                    self.max_in_flight = max(self.max_in_flight, self.in_flight)
+                    handler = (self._handle_completion if path.rstrip('/').endswith('/chat/completions')
+                               else self._handle_text_completion)
+                    try:
+                        await handler(writer, json.loads(body or b'{}'), keep_alive)
+                    finally:
+                        self.in_flight -= 1
+                elif method == 'GET' and path.rstrip('/').endswith('/stats'):
+                    stats = {'requests': self.requests, 'in_flight': self.in_flight,
+                             'max_in_flight': self.max_in_flight, 'batches': self.batches,
+                             'batched_prompts': self.batched_prompts}
+                    writer.write(self._response(200, json.dumps(stats).encode(), keep_alive=keep_alive))
+                else:
+                    writer.write(self._response(404, b'{"error": "not found"}', keep_alive=keep_alive))
+
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            # 클라이언트가 스트리밍 도중 연결을 끊음 (게이트웨이 취소, 헤지에서 진 요청 등)
+            pass
+        finally:
+            writer.close()
+
+    async def start(self):
+        """서버 시작 (백그라운드로 요청 처리)"""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=4096)
+        return self
+
+    async def stop(self):
+        """서버 종료"""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f'가짜 LLM 서버: http://{self.host}:{self.port}/v1 '
+              f'(지연 {self.latency}s, {self.token_rate} tokens/s, 실패율 {self.fail_rate})')
+        async with self._server:
+            await self._server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OpenAI 호환 가짜 LLM 서버')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--latency', type=float, default=1.0, help='첫 토큰까지 지연시간 (초)')
+    parser.add_argument('--token-rate', type=float, default=50.0, help='초당 토큰 수')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='503 응답 비율 (0~1)')
+    parser.add_argument('--slow-rate', type=float, default=0.0, help='느린 응답 비율 (0~1)')
+    parser.add_argument('--slow-latency', type=float, default=5.0, help='느린 응답의 지연시간 (초)')
+    parser.add_argument('--slots', type=int, default=0, help='동시 처리 슬롯 수 (0 = 제한 없음)')
+    parser.add_argument('--batch-cost', type=float, default=0.1, help='배치 프롬프트 하나당 늘어나는 처리 시간 비율')
+    args = parser.parse_args()
+
+    server = FakeLLMServer(args.host, args.port, args.latency, args.token_rate, args.fail_rate,
+                           slow_rate=args.slow_rate, slow_latency=args.slow_latency,
+                           slots=args.slots, batch_cost=args.batch_cost)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# http_client.py
+"""부하 테스트용 최소 asyncio HTTP/1.1 클라이언트 (외부 의존성 없음)"""
+import asyncio
+import json
+from http.cookies import SimpleCookie
+
+
+class HttpResponse:
+    def __init__(self, status, headers, body):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body or b'{}')
+
+    def text(self):
+        return self.body.decode('utf-8', errors='replace')
+
+
+class HttpClient:
+    """쿠키를 유지하는 단순 비동기 HTTP 클라이언트 (요청마다 새 연결)"""
+
+    def __init__(self, host, port, timeout=120.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.cookies = {}
+
+    async def request(self, method, path, payload=None, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b''
+        lines = [
+            f'{method} {path} HTTP/1.1',
+            f'Host: {self.host}:{self.port}',
+            'Connection: close',
+            f'Content-Length: {len(body)}',
+        ]
+        if payload is not None:
+            lines.append('Content-Type: application/json')
+        if self.cookies:
+            lines.append('Cookie: ' + '; '.join(f'{k}={v}' for k, v in self.cookies.items()))
+        for key, value in (headers or {}).items():
+            lines.append(f'{key}: {value}')
+
+        return await asyncio.wait_for(self._send(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body),
+                                      self.timeout)
+
+    async def _send(self, raw):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            writer.write(raw)
+            await writer.drain()
+            head = await reader.readuntil(b'\r\n\r\n')
+            status_line, *header_lines = head.decode('latin-1').split('\r\n')
+            status = int(status_line.split(' ')[1])
+            headers = {}
+            for line in header_lines:
+                if ':' in line:
+                    key, value = line.split(':', 1)
+                    key = key.strip().lower()
+                    if key == 'set-cookie':
+                        cookie = SimpleCookie()
+                        cookie.load(value.strip())
+                        for name, morsel in cookie.items():
+                            self.cookies[name] = morsel.value
+                    headers[key] = value.strip()
+
+            if headers.get('transfer-encoding', '').lower() == 'chunked':
+                body = await self._read_chunked(reader)
+            elif 'content-length' in headers:
+                body = await reader.readexactly(int(headers['content-length']))
+            else:
+                body = await reader.read()
+            return HttpResponse(status, headers, body)
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_chunked(reader):
+        body = bytearray()
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.strip().split(b';')[0] or b'0', 16)
+            if size == 0:
+                await reader.readline()
+                return bytes(body)
+            body += await reader.readexactly(size)
+            await reader.readline()
+
+    async def get(self, path, **kwargs):
+        return await self.request('GET', path, **kwargs)
+
+    async def post(self, path, payload=None, **kwargs):
+        return await self.request('POST', path, payload, **kwargs)
+
+
+async def wait_for_port(host, port, timeout=30.0):
+    """서버가 연결을 받을 때까지 대기"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+            writer.close()
+            return
+        except OSError:
+            if loop.time() > deadline:
+                raise TimeoutError(f'{host}:{port} 서버가 응답하지 않습니다')
+            await asyncio.sleep(0.1)
@@ -0,0 +1,137 @@
+# llm_batching.py
+"""LLM 요청 마이크로 배칭 효과 측정
+
+가짜 LLM 서버를 동시 처리 슬롯이 제한된 추론 서버(GPU)처럼 띄우고, 같은 동시 부하를
+    unbatched      요청마다 /v1/chat/completions 호출
+    batch=N/Wms    shared/llm_batcher.py 로 최대 N 개, 최대 W ms 동안 모아 /v1/completions 로 한 번에 호출
+로 보내 처리량과 지연시간 백분위수, 평균 배치 크기를 비교한다.
+가짜 서버는 배치 하나를 요청 하나처럼 슬롯 하나로 처리하고, 프롬프트가 하나 늘 때마다 처리 시간이
+batch_cost 비율만큼 늘어난다.
+
+실행:
+    python bench/llm_batching.py
+    python bench/llm_batching.py --slots 1 --concurrency 128 --configs 8:5 16:10 32:20 --output batching.json
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import OpenAI
+
+from chatbot_api_concurrency import percentile
+from llm_gateway_resilience import start_fake_server
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from llm_batcher import BatchDispatcher, completions_backend  # noqa: E402
+
+MESSAGES = [
+    {'role': 'system', 'content': '너는 반려견 초코야. 주인을 누나라고 부르고 반말로 대답해.'},
+    {'role': 'user', 'content': '안녕!'},
+]
+
+
+def parse_config(value):
+    """'16:10' → (max_batch_size=16, max_wait_ms=10)"""
+    size, _, wait_ms = value.partition(':')
+    return int(size), float(wait_ms or 0)
+
+
+def run_config(server, client, config, requests, concurrency, max_in_flight, timeout):
+    batcher = None
+    if config is None:
+        def one_call():
+            response = client.chat.completions.create(model='fake-model', messages=MESSAGES, timeout=timeout)
+            return response.choices[0].message.content
+    else:
+        max_batch_size, max_wait_ms = config
+        batcher = BatchDispatcher(completions_backend(client, {'model': 'fake-model'}),
+                                  max_batch_size=max_batch_size, max_wait=max_wait_ms / 1000,
+                                  max_in_flight=max_in_flight, name='bench')
+
+        def one_call():
+            return batcher.submit(MESSAGES, timeout)
+
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed_call(_):
+        nonlocal errors
+        started = time.perf_counter()
+        try:
+            one_call()
+        except Exception:
+            with lock:
+                errors += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - started)
+
+    server_batches, server_requests = server.batches, server.requests
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed_call, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    result = {
+        'requests': requests,
+        'ok': len(ordered),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+        'upstream_calls': server.requests - server_requests,
+        'upstream_batches': server.batches - server_batches,
+    }
+    if batcher is not None:
+        stats = batcher.stats()
+        result['batcher'] = {key: stats[key] for key in (
+            'batches', 'avg_batch_size', 'largest_batch', 'avg_queue_wait_ms', 'expired', 'failed_batches'
+        )}
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM 요청 마이크로 배칭 처리량 / 지연시간 비교')
+    parser.add_argument('--configs', nargs='+', default=['4:5', '8:10', '16:10', '32:20'],
+                        help='비교할 배칭 설정 (최대 배치 크기:최대 대기 ms)')
+    parser.add_argument('--requests', type=int, default=640, help='설정별 요청 수')
+    parser.add_argument('--concurrency', type=int, default=64, help='동시 요청 수')
+    parser.add_argument('--slots', type=int, default=2, help='가짜 추론 서버 동시 처리 슬롯 수')
+    parser.add_argument('--llm-latency', type=float, default=0.1, help='가짜 추론 서버의 한 번 처리 시간 (초)')
+    parser.add_argument('--batch-cost', type=float, default=0.05, help='배치 프롬프트 하나당 늘어나는 처리 시간 비율')
+    parser.add_argument('--max-in-flight', type=int, default=4, help='동시에 보낼 배치 수')
+    parser.add_argument('--timeout', type=float, default=60.0, help='요청별 대기 한도 (초)')
+    parser.add_argument('--llm-port', type=int, default=8831)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    server = start_fake_server(args.llm_port)
+    server.latency, server.slots, server.batch_cost = args.llm_latency, args.slots, args.batch_cost
+    client = OpenAI(api_key='fake-key', base_url=f'http://127.0.0.1:{args.llm_port}/v1', max_retries=0)
+
+    results = {'config': vars(args), 'runs': {}}
+    runs = [('unbatched', None)] + [
+        (f'batch={size}/{wait_ms:g}ms', (size, wait_ms)) for size, wait_ms in map(parse_config, args.configs)
+    ]
+    for name, config in runs:
+        result = run_config(server, client, config, args.requests, args.concurrency, args.max_in_flight,
+                            args.timeout)
+        results['runs'][name] = result
+        print(f'[{name}] {json.dumps(result, ensure_ascii=False)}', flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# llm_gateway_resilience.py
+"""LLM 게이트웨이 장애 시나리오 검증
+
+가짜 LLM 서버의 지연시간/실패율을 바꿔 가며 OpenAI SDK 호출을 shared/llm_gateway.py 로 감싸 보내고,
+시나리오별 성공률, 폴백 비율, 지연시간 백분위수와 게이트웨이 통계를 보고한다.
+
+시나리오:
+    healthy     정상 업스트림
+    flaky       30% 가 503 → 지터 재시도로 대부분 성공
+    slow        업스트림 지연 > 마감시간 → 마감시간 안에 폴백
+    outage      100% 503 → 서킷 브레이커가 열려 이후 호출은 즉시 폴백
+    tail        5% 가 느린 응답 → 헤지 요청 유무에 따른 p99 비교
+
+실행:
+    python bench/llm_gateway_resilience.py
+    python bench/llm_gateway_resilience.py --scenarios tail --requests 400 --output gateway.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from openai import OpenAI
+
+from chatbot_api_concurrency import percentile
+from fake_llm_server import FakeLLMServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from llm_gateway import LLMGateway, CircuitBreaker  # noqa: E402
+
+# 시나리오별 (가짜 서버 설정, 게이트웨이 설정)
+SCENARIOS = {
+    'healthy': ({'latency': 0.05}, {}),
+    'flaky': ({'latency': 0.05, 'fail_rate': 0.3}, {'max_retries': 3}),
+    'slow': ({'latency': 3.0}, {'deadline': 1.0}),
+    'outage': ({'latency': 0.05, 'fail_rate': 1.0}, {'max_retries': 1}),
+    'tail': ({'latency': 0.05, 'slow_rate': 0.05, 'slow_latency': 1.0}, {}),
+    'tail_hedged': ({'latency': 0.05, 'slow_rate': 0.05, 'slow_latency': 1.0},
+                    {'hedge_percentile': 90, 'hedge_min_samples': 20}),
+}
+
+
+def start_fake_server(port):
+    """가짜 LLM 서버를 별도 스레드의 이벤트 루프에서 실행"""
+    server = FakeLLMServer(port=port, token_rate=0)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(server.start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return server
+
+
+def run_scenario(server, llm_port, name, requests, concurrency):
+    server_config, gateway_config = SCENARIOS[name]
+    server.latency, server.fail_rate, server.slow_rate = 1.0, 0.0, 0.0
+    for key, value in server_config.items():
+        setattr(server, key, value)
+
+    gateway_config = dict(gateway_config)
+    gateway_config.setdefault('deadline', 5.0)
+    # 헤지 요청도 동시 호출 한도 안에서만 나가므로 동시 호출 수의 두 배까지 허용
+    gateway = LLMGateway(name, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=30),
+                         max_concurrency=concurrency * 2, **gateway_config)
+    client = OpenAI(api_key='fake-key', base_url=f'http://127.0.0.1:{llm_port}/v1', max_retries=0)
+
+    latencies = []
+    outcomes = {'ok': 0, 'fallback': 0}
+    lock = threading.Lock()
+
+    def one_call(_):
+        started = time.perf_counter()
+        try:
+            gateway.call(lambda timeout: client.chat.completions.create(
+                model='fake-model', messages=[{'role': 'user', 'content': '안녕'}], timeout=timeout
+            ))
+            outcome = 'ok'
+        except Exception:
+            outcome = 'fallback'
+        with lock:
+            outcomes[outcome] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one_call, range(requests)))
+    elapsed = time.perf_counter() - started
+
+    ordered = sorted(latencies)
+    stats = gateway.stats()
+    return {
+        'requests': requests,
+        'ok': outcomes['ok'],
+        'fallback': outcomes['fallback'],
+        'elapsed_s': round(elapsed, 3),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+        'max_ms': round(ordered[-1] * 1000, 1) if ordered else 0.0,
+        'gateway': {key: stats[key] for key in (
+            'retries', 'hedges', 'hedge_wins', 'short_circuited', 'rejected', 'deadline_exceeded', 'breaker'
+        )},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='LLM 게이트웨이 장애 시나리오 검증')
+    parser.add_argument('--scenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='시나리오별 요청 수')
+    parser.add_argument('--concurrency', type=int, default=8, help='동시 호출 수')
+    parser.add_argument('--llm-port', type=int, default=8801)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    server = start_fake_server(args.llm_port)
+    results = {'config': vars(args), 'scenarios': {}}
+    for name in args.scenarios:
+        result = run_scenario(server, args.llm_port, name, args.requests, args.concurrency)
+        results['scenarios'][name] = result
+        print(f'[{name}] {json.dumps(result, ensure_ascii=False)}', flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+# load_suite.py
+"""재현 가능한 채팅 백엔드 부하 테스트 모음
+
+가짜 LLM 서버(지연시간 / 토큰 속도 지정)를 띄우고
+    chatbot_api  seed_database.py 로 만든 DB 의 복사본으로 서버를 실행하고, 고정 도착률로
+                 반려동물 목록 / 세션 목록 / 대화 기록 / 채팅(일반, 스트리밍) 요청을 섞어 보냄
+    chat         run_workers.py 로 채팅 서버를 실행하고, Socket.IO 클라이언트들이 고정 도착률로 메시지 전송
+을 차례로 측정한다. 요청 순서(엔드포인트, 사용자)는 --seed 로 미리 정해지고, 지연시간은 예정된 전송
+시각부터 재므로 서버가 밀려도 측정이 함께 느려지지 않는다(coordinated omission 방지).
+엔드포인트별 처리량과 p50/p95/p99 를 JSON 으로 저장하고, --baseline 으로 이전 결과와 비교해
+회귀가 있으면 종료 코드 1 을 돌려준다.
+
+chat 대상은 python-socketio 클라이언트와 chat 앱 의존성(langchain 등)이 필요하다.
+
+실행:
+    python bench/load_suite.py --output results/$(git rev-parse --short HEAD).json
+    python bench/load_suite.py --targets chatbot_api --rate 100 --duration 60 --baseline results/base.json
+    python bench/load_suite.py --current results/new.json --baseline results/base.json   # 비교만
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from chatbot_api_concurrency import percentile, start_server
+from http_client import HttpClient, wait_for_port
+from llm_gateway_resilience import start_fake_server
+from seed_database import add_seed_arguments, ensure_database, seed_config
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 엔드포인트별 기본 요청 비율
+DEFAULT_MIX = {
+    'GET /api/pets': 15,
+    'GET /api/chat/sessions': 10,
+    'GET /api/chat/history': 35,
+    'POST /api/chat/send': 30,
+    'POST /api/chat/send (stream)': 10,
+}
+CHAT_MESSAGES = ['안녕!', '밥 먹었어?', '오늘 산책 갈까?', '뭐 하고 있었어?', '간식 줄까?', '오늘 회사에서 힘들었어']
+# 비교 시 이보다 작은 지연시간 차이(ms)는 잡음으로 보고 무시
+REGRESSION_MIN_DELTA_MS = 5.0
+
+
+class EndpointStats:
+    """엔드포인트별 지연시간 / 오류 기록"""
+
+    def __init__(self):
+        self._latencies = {}
+        self._errors = Counter()
+        self._statuses = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        ok = status == 200
+        with self._lock:
+            self._latencies.setdefault(endpoint, [])
+            self._statuses.setdefault(endpoint, Counter())[str(status)] += 1
+            if ok:
+                self._latencies[endpoint].append(seconds)
+            else:
+                self._errors[endpoint] += 1
+
+    def summary(self, elapsed):
+        result = {}
+        with self._lock:
+            endpoints = sorted(set(self._latencies) | set(self._errors))
+            for endpoint in endpoints:
+                ordered = sorted(self._latencies.get(endpoint, ()))
+                errors = self._errors[endpoint]
+                result[endpoint] = {
+                    'requests': len(ordered) + errors,
+                    'ok': len(ordered),
+                    'errors': errors,
+                    'statuses': dict(self._statuses.get(endpoint, {})),
+                    'throughput_rps': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+                    'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+                    'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+                    'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+                    'max_ms': round(ordered[-1] * 1000, 1) if ordered else 0.0,
+                }
+        return result
+
+
+def parse_mix(values):
+    """['GET /api/pets=20', ...] → {엔드포인트: 비율}"""
+    if not values:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for value in values:
+        endpoint, _, weight = value.rpartition('=')
+        if endpoint not in DEFAULT_MIX:
+            raise SystemExit(f'알 수 없는 엔드포인트입니다: {endpoint} (가능: {", ".join(DEFAULT_MIX)})')
+        mix[endpoint] = float(weight)
+    return mix
+
+
+def build_plan(rng, mix, users, count):
+    """요청 순서 [(엔드포인트, 가상 사용자 번호)] 를 시드로 미리 결정"""
+    endpoints = list(mix)
+    weights = [mix[endpoint] for endpoint in endpoints]
+    return [(endpoint, rng.randrange(users)) for endpoint in rng.choices(endpoints, weights, k=count)]
+
+
+def parse_phase_metrics(text):
+    """/metrics 의 단계별 히스토그램에서 경로별 평균 단계 시간(ms) 추출"""
+    sums, counts = {}, {}
+    pattern = re.compile(r'^\w+_request_phase_seconds_(sum|count)\{(.*)\} (\S+)$')
+    for line in text.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        kind, labels, value = match.groups()
+        labels = dict(re.findall(r'(\w+)="((?:[^"\\]|\\.)*)"', labels))
+        key = (labels.get('route'), labels.get('phase'))
+        (sums if kind == 'sum' else counts)[key] = float(value)
+    phases = {}
+    for (route, phase), total in sums.items():
+        count = counts.get((route, phase))
+        if count:
+            phases.setdefault(route, {})[phase] = round(total / count * 1000, 3)
+    return phases
+
+
+async def open_loop(rate, plan, fire, max_outstanding):
+    """plan 의 요청을 초당 rate 개의 고정 간격으로 시작 (동시 진행 한도를 넘으면 버림)"""
+    loop = asyncio.get_running_loop()
+    interval = 1.0 / rate
+    started = loop.time()
+    tasks = set()
+    dropped = 0
+    for index, step in enumerate(plan):
+        scheduled = started + index * interval
+        delay = scheduled - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_outstanding:
+            dropped += 1
+            continue
+        task = asyncio.create_task(fire(step, scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    if tasks:
+        await asyncio.gather(*tasks)
+    return loop.time() - started, dropped
+
+
+async def run_chatbot_api_load(args, port, rng):
+    # 가상 사용자: 시드로 고른 사용자로 로그인하고 반려동물 목록을 받아 둠
+    user_ids = rng.sample(range(1, args.users + 1), min(args.virtual_users, args.users))
+    semaphore = asyncio.Semaphore(32)
+
+    async def setup(user_id):
+        async with semaphore:
+            client = HttpClient('127.0.0.1', port, timeout=args.timeout)
+            await client.post('/api/dev/login', {'user_id': user_id})
+            pets = (await client.get('/api/pets')).json().get('pets', [])
+            return client, [pet['id'] for pet in pets]
+
+    clients = [entry for entry in await asyncio.gather(*(setup(user_id) for user_id in user_ids)) if entry[1]]
+    if not clients:
+        raise RuntimeError('반려동물이 있는 가상 사용자를 만들지 못했습니다')
+    loop = asyncio.get_running_loop()
+
+    def make_fire(stats):
+        async def fire(step, scheduled):
+            endpoint, user_index = step
+            client, pet_ids = clients[user_index % len(clients)]
+            pet_id = pet_ids[user_index % len(pet_ids)]
+            try:
+                if endpoint == 'GET /api/pets':
+                    response = await client.get('/api/pets')
+                elif endpoint == 'GET /api/chat/sessions':
+                    response = await client.get('/api/chat/sessions')
+                elif endpoint == 'GET /api/chat/history':
+                    response = await client.get(f'/api/chat/history/{pet_id}?limit={args.history_limit}')
+                else:
+                    response = await client.post('/api/chat/send', {
+                        'pet_id': pet_id,
+                        'message': CHAT_MESSAGES[user_index % len(CHAT_MESSAGES)],
+                        'stream': endpoint.endswith('(stream)'),
+                    })
+                status = response.status
+            except Exception:
+                status = 'error'
+            stats.record(endpoint, loop.time() - scheduled, status)
+        return fire
+
+    mix = parse_mix(args.mix)
+    if args.warmup > 0:
+        warmup_plan = build_plan(random.Random(args.seed + 1), mix, len(clients), int(args.rate * args.warmup))
+        await open_loop(args.rate, warmup_plan, make_fire(EndpointStats()), args.max_outstanding)
+
+    stats = EndpointStats()
+    plan = build_plan(rng, mix, len(clients), int(args.rate * args.duration))
+    elapsed, dropped = await open_loop(args.rate, plan, make_fire(stats), args.max_outstanding)
+    metrics = await HttpClient('127.0.0.1', port).get('/metrics')
+    return {
+        'virtual_users': len(clients),
+        'target_rps': args.rate,
+        'scheduled': len(plan),
+        'dropped': dropped,
+        'elapsed_s': round(elapsed, 3),
+        'endpoints': stats.summary(elapsed),
+        'server_phases_ms': parse_phase_metrics(metrics.text()) if metrics.status == 200 else {},
+    }
+
+
+def bench_chatbot_api(args, llm_port, database_path):
+    with tempfile.TemporaryDirectory() as db_dir:
+        # 서버가 쓰는 DB 는 매번 시드 DB 의 복사본 (실행마다 같은 초기 상태)
+        shutil.copyfile(database_path, os.path.join(db_dir, f'{args.mode}.db'))
+        server = start_server(args.mode, args.port, args.workers, llm_port, db_dir)
+        try:
+            asyncio.run(wait_for_port('127.0.0.1', args.port, timeout=60))
+            return asyncio.run(run_chatbot_api_load(args, args.port, random.Random(args.seed)))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def bench_chat(args, llm_port):
+    from socketio_scaleout import VirtualUser, start_workers
+
+    stats = EndpointStats()
+    connect_stats = EndpointStats()
+    with tempfile.TemporaryDirectory() as db_dir:
+        server = start_workers(args.chat_workers, args.chat_port, args.broker_port, llm_port, db_dir,
+                               subprocess.DEVNULL)
+        try:
+            for index in range(args.chat_workers):
+                asyncio.run(wait_for_port('127.0.0.1', args.chat_port + index, timeout=60))
+            users = [VirtualUser(args.chat_port + (index + 1) % args.chat_workers,
+                                 args.chat_port + index % args.chat_workers)
+                     for index in range(args.socket_clients)]
+
+            def connect(user):
+                started = time.perf_counter()
+                try:
+                    user.connect()
+                except Exception:
+                    connect_stats.record('socketio:connect', 0.0, 'error')
+                    return
+                connect_stats.record('socketio:connect', time.perf_counter() - started, 200)
+
+            connect_started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=min(len(users), 64)) as executor:
+                list(executor.map(connect, users))
+            connect_elapsed = time.perf_counter() - connect_started
+            connected = [user for user in users if user.client.connected]
+            if not connected:
+                raise RuntimeError('Socket.IO 클라이언트가 연결되지 못했습니다')
+
+            # 한 사용자에게 예정된 메시지는 앞 메시지의 응답을 받은 뒤 보냄 (대기 시간도 지연시간에 포함)
+            locks = [threading.Lock() for _ in connected]
+            rng = random.Random(args.seed)
+            count = int(args.socket_rate * args.duration)
+            plan = [rng.randrange(len(connected)) for _ in range(count)]
+
+            def send(user_index, scheduled):
+                with locks[user_index]:
+                    try:
+                        connected[user_index].send(CHAT_MESSAGES[user_index % len(CHAT_MESSAGES)], args.timeout)
+                        status = 200
+                    except Exception:
+                        status = 'error'
+                stats.record('socketio:send_message', time.perf_counter() - scheduled, status)
+
+            interval = 1.0 / args.socket_rate
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(connected) * 2) as executor:
+                for index, user_index in enumerate(plan):
+                    scheduled = started + index * interval
+                    delay = scheduled - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+                    executor.submit(send, user_index, scheduled)
+            elapsed = time.perf_counter() - started
+
+            metrics = asyncio.run(HttpClient('127.0.0.1', args.chat_port).get('/metrics'))
+            with ThreadPoolExecutor(max_workers=min(len(users), 64)) as executor:
+                list(executor.map(VirtualUser.close, users))
+        finally:
+            server.terminate()
+            server.wait()
+
+    endpoints = connect_stats.summary(connect_elapsed)
+    endpoints.update(stats.summary(elapsed))
+    return {
+        'workers': args.chat_workers,
+        'socket_clients': len(connected),
+        'target_rps': args.socket_rate,
+        'scheduled': len(plan),
+        'elapsed_s': round(elapsed, 3),
+        'endpoints': endpoints,
+        'server_phases_ms': parse_phase_metrics(metrics.text()) if metrics.status == 200 else {},
+    }
+
+
+def environment_info():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=BENCH_DIR, capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare_results(baseline, current, tolerance):
+    """엔드포인트별 p95/p99/처리량/오류 비교 후 회귀 목록 반환"""
+    regressions = []
+    for target, result in current.get('results', {}).items():
+        base_endpoints = baseline.get('results', {}).get(target, {}).get('endpoints', {})
+        for endpoint, now in result.get('endpoints', {}).items():
+            before = base_endpoints.get(endpoint)
+            if not before:
+                continue
+            name = f'{target} {endpoint}'
+            for key in ('p95_ms', 'p99_ms'):
+                if now[key] > before[key] * (1 + tolerance) and now[key] - before[key] > REGRESSION_MIN_DELTA_MS:
+                    regressions.append(f'{name}: {key} {before[key]} → {now[key]}')
+            if now['throughput_rps'] < before['throughput_rps'] * (1 - tolerance):
+                regressions.append(f'{name}: throughput_rps {before["throughput_rps"]} → {now["throughput_rps"]}')
+            before_rate = before['errors'] / before['requests'] if before['requests'] else 0.0
+            now_rate = now['errors'] / now['requests'] if now['requests'] else 0.0
+            if now_rate > before_rate + 0.01:
+                regressions.append(f'{name}: error_rate {before_rate:.3f} → {now_rate:.3f}')
+    return regressions
+
+
+def report_comparison(baseline_path, current, tolerance):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare_results(baseline, current, tolerance)
+    base_commit = baseline.get('meta', {}).get('git_commit')
+    print(f'기준 결과와 비교: {baseline_path} (commit {base_commit}, 허용 {tolerance:.0%})')
+    for line in regressions:
+        print(f'  회귀: {line}')
+    if not regressions:
+        print('  회귀 없음')
+    return 1 if regressions else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='chatbot_api / chat 재현 가능한 부하 테스트')
+    parser.add_argument('--targets', nargs='+', default=['chatbot_api', 'chat'], choices=['chatbot_api', 'chat'])
+    parser.add_argument('--duration', type=float, default=30.0, help='측정 시간 (초)')
+    parser.add_argument('--warmup', type=float, default=5.0, help='측정 전 예열 시간 (초, chatbot_api)')
+    parser.add_argument('--rate', type=float, default=50.0, help='chatbot_api 초당 요청 수 (고정 도착률)')
+    parser.add_argument('--mix', nargs='+', help='엔드포인트 비율 (예: "GET /api/pets=20")')
+    parser.add_argument('--virtual-users', type=int, default=200, help='chatbot_api 가상 사용자 수')
+    parser.add_argument('--history-limit', type=int, default=50, help='대화 기록 조회 페이지 크기')
+    parser.add_argument('--max-outstanding', type=int, default=2000, help='동시 진행 요청 한도 (넘으면 버림)')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync', help='chatbot_api 서빙 모드')
+    parser.add_argument('--workers', type=int, default=16, help='chatbot_api sync 모드 워커 스레드 수')
+    parser.add_argument('--socket-rate', type=float, default=10.0, help='chat 초당 메시지 수 (고정 도착률)')
+    parser.add_argument('--socket-clients', type=int, default=50, help='chat Socket.IO 클라이언트 수')
+    parser.add_argument('--chat-workers', type=int, default=1, help='chat 워커 프로세스 수')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='가짜 LLM 첫 토큰까지 지연시간 (초)')
+    parser.add_argument('--token-rate', type=float, default=100.0, help='가짜 LLM 초당 토큰 수')
+    parser.add_argument('--timeout', type=float, default=60.0, help='요청별 대기 한도 (초)')
+    parser.add_argument('--database', help='시드 DB 경로 (기본: 임시 디렉터리의 bench-seed-*.db, 설정이 같으면 재사용)')
+    parser.add_argument('--port', type=int, default=5401)
+    parser.add_argument('--chat-port', type=int, default=5451)
+    parser.add_argument('--broker-port', type=int, default=6392)
+    parser.add_argument('--llm-port', type=int, default=8851)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    parser.add_argument('--baseline', help='비교할 이전 결과 JSON (회귀가 있으면 종료 코드 1)')
+    parser.add_argument('--current', help='측정 없이 이 결과 JSON 을 --baseline 과 비교')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='회귀로 보지 않을 변화 비율')
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    if args.current:
+        if not args.baseline:
+            parser.error('--current 는 --baseline 과 함께 사용합니다')
+        with open(args.current, encoding='utf-8') as f:
+            sys.exit(report_comparison(args.baseline, json.load(f), args.tolerance))
+
+    results = {'meta': environment_info(), 'config': vars(args), 'results': {}}
+    fake_llm = start_fake_server(args.llm_port)
+    fake_llm.latency, fake_llm.token_rate = args.llm_latency, args.token_rate
+
+    if 'chatbot_api' in args.targets:
+        config = seed_config(args)
+        database_path = args.database or os.path.join(
+            tempfile.gettempdir(), f'bench-seed-{config["users"]}-{config["messages_per_session"]}-{config["seed"]}.db'
+        )
+        print(f'시드 DB 준비: {database_path}', flush=True)
+        results['database'] = ensure_database(database_path, config)
+        print(f'시드 DB: {json.dumps(results["database"]["counts"])}', flush=True)
+        results['results']['chatbot_api'] = bench_chatbot_api(args, args.llm_port, database_path)
+
+    if 'chat' in args.targets:
+        results['results']['chat'] = bench_chat(args, args.llm_port)
+
+    for target, result in results['results'].items():
+        for endpoint, summary in result['endpoints'].items():
+            print(f'[{target}] {endpoint}: {json.dumps(summary, ensure_ascii=False)}', flush=True)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+    if args.baseline:
+        sys.exit(report_comparison(args.baseline, results, args.tolerance))
+
+
+if __name__ == '__main__':
+    main()
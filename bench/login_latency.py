@@ -0,0 +1,157 @@
+# login_latency.py
+"""동시 로그인 부하에서 로그인 / 일반 API 지연시간 측정
+
+사용자 여러 명을 가입시킨 뒤, 로그인 요청을 계속 보내는 가상 사용자와 가벼운 API(GET /api/pets)를
+호출하는 가상 사용자를 동시에 돌려 각 요청의 p50/p95/p99 를 측정한다.
+CREDENTIAL_HASHER_WORKERS 값을 바꿔 가며(0 = 요청 스레드에서 직접 해시) 비교할 수 있다.
+
+실행:
+    python bench/login_latency.py --hasher-workers 0 2 --login-users 32 --api-users 16 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from chatbot_api_concurrency import percentile
+from http_client import HttpClient, wait_for_port
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = 'bench-password'
+
+
+def start_server(mode, port, workers, hasher_workers, iterations, db_dir):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_PATH': os.path.join(db_dir, f'{mode}-{hasher_workers}.db'),
+        'SECRET_KEY': 'bench-secret',
+        'CREDENTIAL_HASHER_WORKERS': str(hasher_workers),
+        'PASSWORD_HASH_ITERATIONS': str(iterations),
+        # 모든 요청이 같은 IP 에서 오므로 요청 한도는 끔
+        'RATE_LIMIT_ENABLED': '0',
+    })
+    env.pop('OPENAI_API_KEY', None)
+    return subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'run_chatbot_api.py'),
+         '--mode', mode, '--port', str(port), '--workers', str(workers)],
+        env=env
+    )
+
+
+def summarize(latencies, errors, rejected=0):
+    ordered = sorted(latencies)
+    return {
+        'ok': len(ordered),
+        'errors': errors,
+        'rejected_503': rejected,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+    }
+
+
+async def signup_users(port, count):
+    client = HttpClient('127.0.0.1', port)
+    for index in range(count):
+        response = await client.post('/api/auth/signup', {
+            'username': f'bench{index}', 'email': f'bench{index}@example.com', 'password': PASSWORD
+        })
+        if response.status not in (201, 409):
+            raise RuntimeError(f'회원가입 실패: {response.status} {response.text()}')
+
+
+async def run_load(port, login_users, api_users, duration):
+    """duration 초 동안 로그인 / 일반 API 요청을 동시에 전송"""
+    deadline = time.perf_counter() + duration
+    login_latencies, api_latencies = [], []
+    counts = {'login_errors': 0, 'login_rejected': 0, 'api_errors': 0}
+
+    async def login_user(index):
+        client = HttpClient('127.0.0.1', port)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.post('/api/auth/login', {'username': f'bench{index}', 'password': PASSWORD})
+            except Exception:
+                counts['login_errors'] += 1
+                continue
+            if response.status == 503:
+                counts['login_rejected'] += 1
+                await asyncio.sleep(float(response.headers.get('retry-after', '1')))
+            elif response.status != 200:
+                counts['login_errors'] += 1
+            else:
+                login_latencies.append(time.perf_counter() - started)
+
+    async def api_user():
+        client = HttpClient('127.0.0.1', port)
+        await client.post('/api/dev/login', {'user_id': 1})
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                response = await client.get('/api/pets')
+            except Exception:
+                counts['api_errors'] += 1
+                continue
+            if response.status != 200:
+                counts['api_errors'] += 1
+            else:
+                api_latencies.append(time.perf_counter() - started)
+            await asyncio.sleep(0.05)
+
+    await asyncio.gather(
+        *(login_user(i) for i in range(login_users)),
+        *(api_user() for _ in range(api_users))
+    )
+    return {
+        'login': summarize(login_latencies, counts['login_errors'], counts['login_rejected']),
+        'api_pets': summarize(api_latencies, counts['api_errors']),
+    }
+
+
+async def main_async(args):
+    results = {'config': vars(args), 'runs': {}}
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        for index, hasher_workers in enumerate(args.hasher_workers):
+            port = args.base_port + index
+            server = start_server(args.mode, port, args.workers, hasher_workers, args.iterations, db_dir)
+            try:
+                await wait_for_port('127.0.0.1', port)
+                await signup_users(port, args.login_users)
+                result = await run_load(port, args.login_users, args.api_users, args.duration)
+                name = f'hasher_workers={hasher_workers}'
+                results['runs'][name] = result
+                print(f'[{name}] {json.dumps(result, ensure_ascii=False)}', flush=True)
+            finally:
+                server.terminate()
+                server.wait()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='동시 로그인 부하에서 로그인 / 일반 API 지연시간 측정')
+    parser.add_argument('--mode', choices=['sync', 'async'], default='sync')
+    parser.add_argument('--hasher-workers', type=int, nargs='+', default=[0, 2],
+                        help='비교할 CREDENTIAL_HASHER_WORKERS 값 (0 = 요청 스레드에서 해시)')
+    parser.add_argument('--iterations', type=int, default=100000, help='PBKDF2 반복 횟수')
+    parser.add_argument('--login-users', type=int, default=32, help='로그인 가상 사용자 수')
+    parser.add_argument('--api-users', type=int, default=16, help='일반 API 가상 사용자 수')
+    parser.add_argument('--duration', type=float, default=10.0, help='측정 시간 (초)')
+    parser.add_argument('--workers', type=int, default=16, help='sync 모드 워커 스레드 수')
+    parser.add_argument('--base-port', type=int, default=5201)
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
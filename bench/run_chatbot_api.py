@@ -0,0 +1,90 @@
+# run_chatbot_api.py
+"""부하 테스트용 chatbot_api 서버 실행기
+
+sync 모드는 고정된 수의 워커 스레드를 가진 WSGI 서버(gunicorn gthread 와 유사)로,
+async 모드는 hypercorn 위의 asgi_app 으로 실행한다.
+
+실행:
+    python bench/run_chatbot_api.py --mode sync --workers 16 --port 5001
+    python bench/run_chatbot_api.py --mode async --port 5002
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+CHATBOT_API_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'chatbot_api')
+
+
+def run_sync(port, workers):
+    from werkzeug.serving import BaseWSGIServer
+    import app as chatbot_app
+
+    class PooledWSGIServer(BaseWSGIServer):
+        """고정 크기 스레드 풀로 요청을 처리하는 WSGI 서버"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+
+        def process_request(self, request, client_address):
+            self.executor.submit(self._process, request, client_address)
+
+        def _process(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    chatbot_app.init_db()
+    chatbot_app.seed_sample_data()
+    server = PooledWSGIServer('127.0.0.1', port, chatbot_app.app)
+    server.request_queue_size = 4096
+    print(f'sync 서버 시작: 127.0.0.1:{port} (워커 {workers}개)', flush=True)
+    server.serve_forever()
+
+
+def run_async(port):
+    from hypercorn.config import Config
+    from hypercorn.asyncio import serve
+    import app as chatbot_app
+    import asgi_app
+
+    chatbot_app.init_db()
+    chatbot_app.seed_sample_data()
+    config = Config()
+    config.bind = [f'127.0.0.1:{port}']
+    config.backlog = 4096
+    config.accesslog = None
+    print(f'async 서버 시작: 127.0.0.1:{port}', flush=True)
+    asyncio.run(serve(asgi_app.app, config))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='부하 테스트용 chatbot_api 서버 실행')
+    parser.add_argument('--mode', choices=['sync', 'async'], required=True)
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--workers', type=int, default=16, help='sync 모드 워커 스레드 수')
+    args = parser.parse_args()
+
+    os.chdir(CHATBOT_API_DIR)
+    sys.path.insert(0, CHATBOT_API_DIR)
+
+    # terminate() 로 종료될 때도 비밀번호 해시 워커 프로세스를 정리하도록 정상 종료 처리
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        if args.mode == 'sync':
+            run_sync(args.port, args.workers)
+        else:
+            run_async(args.port)
+    finally:
+        from credentials import hasher
+        hasher.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+# seed_database.py
+"""벤치마크용 chatbot_api SQLite DB 생성 (재현 가능한 시드 데이터)
+
+사용자 / 반려동물 / 채팅 세션 / 채팅 메시지를 같은 --seed 로 항상 같은 내용이 되도록 생성한다.
+스키마와 마이그레이션은 chatbot_api 의 init_db() 로 만들고, 데이터는 sqlite3 로 한꺼번에 넣는다.
+모든 사용자의 비밀번호는 --password 이며(아이디 bench_user_{id}), 생성 설정은 `<DB 경로>.json` 에 함께 저장해
+같은 설정으로 다시 실행하면 기존 파일을 그대로 쓴다.
+
+실행:
+    python bench/seed_database.py --output /tmp/bench.db                      # 기본: 약 200만 메시지
+    python bench/seed_database.py --output /tmp/small.db --users 500 --messages-per-session 40
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CHATBOT_API_DIR = os.path.join(BENCH_DIR, '..', 'chatbot_api')
+
+DEFAULT_PASSWORD = 'bench-password'
+BASE_TIME = datetime(2025, 1, 1)
+INSERT_BATCH = 20000
+
+SPECIES = {
+    '강아지': ['말티즈', '푸들', '포메라니안', '시바견', '웰시코기', '골든 리트리버', '진돗개', '비글'],
+    '고양이': ['코리안 숏헤어', '러시안 블루', '스코티시 폴드', '먼치킨', '페르시안', '벵갈고양이'],
+    '햄스터': ['골든햄스터', '드워프햄스터', '로보로브스키햄스터'],
+    '앵무새': ['사랑앵무', '모란앵무', '왕관앵무'],
+}
+PET_NAMES = ['초코', '콩이', '보리', '두부', '코코', '나비', '호두', '밤이', '까미', '루이', '하루', '모카']
+PERSONALITIES = ['활발하고 친근함', '도도하지만 애정많음', '겁이 많음', '장난기 많음', '느긋함']
+SPEAKING_STYLES = ['귀엽고 애교있게', '츤데레', '반말', '존댓말', '천진난만하게']
+USER_CALLS = ['주인님', '집사', '누나', '형', '엄마', '아빠']
+
+USER_MESSAGES = [
+    '안녕!', '밥 먹었어?', '오늘 산책 갈까?', '뭐 하고 있었어?', '보고 싶었어', '사랑해',
+    '오늘 회사에서 힘들었어', '간식 줄까?', '잘 잤어?', '주말에 같이 공원 가자', '목욕할 시간이야',
+    '새 장난감 사 왔어', '비가 와서 산책은 내일 하자', '병원 가는 날이야 조금만 참자',
+]
+BOT_MESSAGES = [
+    '멍멍! 왔어? 오늘도 같이 놀자! 🐾', '배고파~ 간식 주면 안 돼?', '꼬리가 저절로 흔들려!',
+    '흥, 늦게 왔잖아. 그래도 반가워.', '산책 최고야! 빨리 나가자!', '졸려... 옆에 누워도 돼?',
+    '목욕은 싫어! 숨어야지!', '우와 새 장난감이다! 같이 놀아줘!', '오늘 하루 고생했어, 내가 위로해 줄게.',
+]
+
+
+def seed_config(args):
+    return {
+        'users': args.users,
+        'max_pets_per_user': args.max_pets_per_user,
+        'messages_per_session': args.messages_per_session,
+        'seed': args.seed,
+        'password': args.password,
+    }
+
+
+def init_schema(path):
+    """chatbot_api 의 init_db() 로 스키마와 마이그레이션 적용"""
+    env = dict(os.environ, DATABASE_PATH=os.path.abspath(path), OPENAI_API_KEY='fake-key')
+    subprocess.run([sys.executable, '-c', 'import app; app.init_db()'], cwd=CHATBOT_API_DIR, env=env, check=True)
+
+
+def password_hash(password):
+    sys.path.insert(0, CHATBOT_API_DIR)
+    from credentials import hash_password
+    return hash_password(password)
+
+
+def generate(path, config):
+    rng = random.Random(config['seed'])
+    init_schema(path)
+    hashed = password_hash(config['password'])
+
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA synchronous = OFF')
+    counts = {'users': 0, 'pets': 0, 'chat_sessions': 0, 'chat_messages': 0}
+    message_id = 0
+    session_id = 0
+    pet_id = 0
+    pending = []
+
+    def flush():
+        conn.executemany(
+            'INSERT INTO chat_messages (id, session_id, sender, content, timestamp) VALUES (?, ?, ?, ?, ?)',
+            pending
+        )
+        counts['chat_messages'] += len(pending)
+        pending.clear()
+
+    with conn:
+        for user_id in range(1, config['users'] + 1):
+            created = BASE_TIME + timedelta(minutes=user_id)
+            conn.execute(
+                'INSERT INTO users (id, username, email, password_hash, nickname, created_at) VALUES (?, ?, ?, ?, ?, ?)',
+                (user_id, f'bench_user_{user_id}', f'bench_user_{user_id}@example.com', hashed,
+                 f'사용자{user_id}', created.isoformat(' '))
+            )
+            counts['users'] += 1
+
+            for _ in range(rng.randint(1, config['max_pets_per_user'])):
+                pet_id += 1
+                species = rng.choice(list(SPECIES))
+                conn.execute(
+                    'INSERT INTO pets (id, user_id, name, species, breed, personality, speaking_style, user_call, '
+                    'likes, dislikes, etc_info, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (pet_id, user_id, rng.choice(PET_NAMES), species, rng.choice(SPECIES[species]),
+                     rng.choice(PERSONALITIES), rng.choice(SPEAKING_STYLES), rng.choice(USER_CALLS),
+                     '산책, 간식', '목욕', '', created.isoformat(' '))
+                )
+                counts['pets'] += 1
+
+                session_id += 1
+                conn.execute('INSERT INTO chat_sessions (id, user_id, pet_id, created_at) VALUES (?, ?, ?, ?)',
+                             (session_id, user_id, pet_id, created.isoformat(' ')))
+                counts['chat_sessions'] += 1
+
+                # 세션마다 메시지 수를 조금씩 다르게 (평균 messages_per_session)
+                sent_at = created
+                total = max(2, int(rng.gauss(config['messages_per_session'], config['messages_per_session'] / 4)))
+                for index in range(total):
+                    message_id += 1
+                    sent_at += timedelta(seconds=rng.randint(5, 600))
+                    if index % 2 == 0:
+                        sender, content = 'user', rng.choice(USER_MESSAGES)
+                    else:
+                        sender, content = 'bot', rng.choice(BOT_MESSAGES)
+                    pending.append((message_id, session_id, sender, content, sent_at.isoformat(' ')))
+                if len(pending) >= INSERT_BATCH:
+                    flush()
+        if pending:
+            flush()
+
+        # 세션 목록용 마지막 메시지 비정규화 (마이그레이션 3 과 같은 규칙)
+        conn.execute('''
+            UPDATE chat_sessions SET last_message_id = (
+                SELECT MAX(id) FROM chat_messages WHERE session_id = chat_sessions.id
+            )
+        ''')
+        conn.execute('''
+            UPDATE chat_sessions SET
+                last_message = (SELECT content FROM chat_messages WHERE id = chat_sessions.last_message_id),
+                last_message_time = (SELECT timestamp FROM chat_messages WHERE id = chat_sessions.last_message_id)
+            WHERE last_message_id IS NOT NULL
+        ''')
+    conn.execute('ANALYZE')
+    conn.close()
+    return counts
+
+
+def ensure_database(path, config, force=False):
+    """같은 설정으로 만든 DB 가 있으면 재사용, 없으면 생성 후 (설정, 행 수) 반환"""
+    meta_path = path + '.json'
+    if not force and os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('config') == config:
+            return meta
+
+    for suffix in ('', '-wal', '-shm', '.json'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    started = time.perf_counter()
+    counts = generate(path, config)
+    meta = {'config': config, 'counts': counts, 'generated_s': round(time.perf_counter() - started, 1)}
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def add_seed_arguments(parser):
+    parser.add_argument('--users', type=int, default=20000, help='사용자 수')
+    parser.add_argument('--max-pets-per-user', type=int, default=3, help='사용자별 반려동물 수 상한 (1~N 무작위)')
+    parser.add_argument('--messages-per-session', type=int, default=50, help='세션별 평균 메시지 수')
+    parser.add_argument('--seed', type=int, default=42, help='난수 시드')
+    parser.add_argument('--password', default=DEFAULT_PASSWORD, help='모든 사용자의 비밀번호')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='벤치마크용 chatbot_api DB 생성')
+    parser.add_argument('--output', required=True, help='생성할 SQLite 파일 경로')
+    parser.add_argument('--force', action='store_true', help='같은 설정의 DB 가 있어도 다시 생성')
+    add_seed_arguments(parser)
+    args = parser.parse_args()
+
+    meta = ensure_database(args.output, seed_config(args), args.force)
+    print(json.dumps(meta, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
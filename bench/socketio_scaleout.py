@@ -0,0 +1,216 @@
+# socketio_scaleout.py
+"""채팅 서버(Socket.IO) 워커 수에 따른 동시 접속 수 / 메시지 처리량 측정
+
+가짜 LLM 서버를 띄우고 chat/run_workers.py 로 워커 수를 바꿔 가며 채팅 서버를 실행한다.
+가상 사용자마다 반려동물을 만든 뒤 sticky session 로드 밸런서처럼 사용자 i 를 워커 i % N 에 고정해
+웹소켓으로 연결하고, 각자 메시지를 순서대로 보내 bot_response 까지의 지연시간과 전체 처리량을 측정한다.
+반려동물 생성(HTTP)은 일부러 다른 워커로 보내 워커 간 세션/대화 저장소 공유도 함께 확인한다.
+
+python-socketio 클라이언트와 chat 앱 의존성(langchain 등)이 필요하다:
+    pip install "python-socketio[client]" -r chat/requirements.txt
+
+실행:
+    python bench/socketio_scaleout.py --workers 1 2 4 --clients 200 --messages 5
+    SOCKETIO_MESSAGE_QUEUE=redis://127.0.0.1:6379/0 python bench/socketio_scaleout.py --workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import socketio
+
+from chatbot_api_concurrency import percentile
+from http_client import wait_for_port
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CHAT_DIR = os.path.join(BENCH_DIR, '..', 'chat')
+
+PET_FORM = {
+    'name': '초코', 'species': '강아지', 'breed': '푸들', 'age': '3', 'gender': '수컷', 'birthday': '',
+    'owner_call': '누나', 'speech_style': '반말', 'personality': '활발함', 'likes': '산책, 공놀이',
+    'dislikes': '목욕', 'habits': '', 'special_notes': '',
+}
+
+
+def start_workers(workers, base_port, broker_port, llm_port, db_dir, log_file):
+    env = dict(os.environ)
+    env.update({
+        'OPENAI_API_KEY': 'fake-key',
+        'OPENAI_BASE_URL': f'http://127.0.0.1:{llm_port}/v1',
+        'OPENAI_API_BASE': f'http://127.0.0.1:{llm_port}/v1',
+        'FLASK_SECRET_KEY': 'bench-secret',
+        'PYTHONUNBUFFERED': '1',
+        'CHAT_DB_PATH': os.path.join(db_dir, f'chat-{workers}.db'),
+        # 대기열이 아니라 소켓 계층을 측정하도록 생성 워커/대기열은 넉넉하게
+        'GENERATION_WORKERS': '32',
+        'GENERATION_MAX_QUEUE': '10000',
+        'RATE_LIMIT_ENABLED': '0',
+    })
+    return subprocess.Popen(
+        [sys.executable, os.path.join(CHAT_DIR, 'run_workers.py'), '--workers', str(workers),
+         '--base-port', str(base_port), '--broker-port', str(broker_port)],
+        env=env, stdout=log_file, stderr=log_file
+    )
+
+
+class VirtualUser:
+    """반려동물 하나와 대화하는 웹소켓 클라이언트"""
+
+    def __init__(self, http_port, socket_port):
+        self.http_url = f'http://127.0.0.1:{http_port}'
+        self.socket_url = f'http://127.0.0.1:{socket_port}'
+        self.client = socketio.Client(reconnection=False)
+        self.response = threading.Event()
+        self.chunks = 0
+        self.client.on('bot_response_chunk', self._on_chunk)
+        self.client.on('bot_response', self._on_response)
+        self.client.on('error', self._on_response)
+
+    def _on_chunk(self, data):
+        self.chunks += 1
+
+    def _on_response(self, data):
+        self.response.set()
+
+    def connect(self):
+        session = requests.Session()
+        response = session.post(self.http_url + '/create_pet', data=PET_FORM, timeout=30)
+        response.raise_for_status()
+        cookie = '; '.join(f'{key}={value}' for key, value in session.cookies.items())
+        self.client.connect(self.socket_url, headers={'Cookie': cookie}, transports=['websocket'],
+                            wait_timeout=30)
+
+    def send(self, message, timeout):
+        self.response.clear()
+        self.client.emit('send_message', {'message': message})
+        if not self.response.wait(timeout):
+            raise TimeoutError('bot_response 를 받지 못했습니다')
+
+    def close(self):
+        if self.client.connected:
+            self.client.disconnect()
+
+
+def run_load(workers, base_port, clients, messages, timeout):
+    """clients 명을 연결한 뒤 각자 messages 개의 메시지를 보냄"""
+    users = [VirtualUser(base_port + (index + 1) % workers, base_port + index % workers)
+             for index in range(clients)]
+    connect_latencies = []
+    connect_errors = 0
+
+    def connect(user):
+        nonlocal connect_errors
+        started = time.perf_counter()
+        try:
+            user.connect()
+        except Exception:
+            connect_errors += 1
+            return False
+        connect_latencies.append(time.perf_counter() - started)
+        return True
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(clients, 64)) as executor:
+        connected = [user for user, ok in zip(users, executor.map(connect, users)) if ok]
+    connect_elapsed = time.perf_counter() - started
+
+    latencies = []
+    errors = 0
+
+    def converse(user):
+        nonlocal errors
+        for index in range(messages):
+            sent = time.perf_counter()
+            try:
+                user.send(f'안녕! {index}', timeout)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - sent)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(len(connected), 1)) as executor:
+        list(executor.map(converse, connected))
+    elapsed = time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=min(clients, 64)) as executor:
+        list(executor.map(VirtualUser.close, users))
+
+    ordered = sorted(latencies)
+    connect_ordered = sorted(connect_latencies)
+    return {
+        'connected': len(connected),
+        'connect_errors': connect_errors,
+        'connect_s': round(connect_elapsed, 3),
+        'connect_p99_ms': round(percentile(connect_ordered, 99) * 1000, 1),
+        'responses': len(ordered),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'responses_per_s': round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+        'chunks_per_s': round(sum(user.chunks for user in connected) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 1),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 1),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO 워커 수에 따른 동시 접속 / 처리량 측정')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='비교할 워커 프로세스 수')
+    parser.add_argument('--clients', type=int, default=200, help='동시 접속 가상 사용자 수')
+    parser.add_argument('--messages', type=int, default=5, help='사용자별 메시지 수')
+    parser.add_argument('--llm-latency', type=float, default=0.2, help='가짜 LLM 첫 토큰까지 지연시간 (초)')
+    parser.add_argument('--token-rate', type=float, default=100, help='가짜 LLM 초당 토큰 수')
+    parser.add_argument('--timeout', type=float, default=60.0, help='응답 대기 한도 (초)')
+    parser.add_argument('--base-port', type=int, default=5301)
+    parser.add_argument('--broker-port', type=int, default=6391)
+    parser.add_argument('--llm-port', type=int, default=8821)
+    parser.add_argument('--server-log', help='채팅 서버 출력 저장 경로 (기본: 버림)')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    llm_server = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, 'fake_llm_server.py'), '--port', str(args.llm_port),
+         '--latency', str(args.llm_latency), '--token-rate', str(args.token_rate)],
+        stdout=subprocess.DEVNULL
+    )
+    log_file = open(args.server_log, 'a') if args.server_log else subprocess.DEVNULL
+    results = {'config': vars(args), 'runs': {}}
+    try:
+        asyncio.run(wait_for_port('127.0.0.1', args.llm_port))
+        with tempfile.TemporaryDirectory() as db_dir:
+            for workers in args.workers:
+                server = start_workers(workers, args.base_port, args.broker_port, args.llm_port, db_dir,
+                                       log_file)
+                try:
+                    for index in range(workers):
+                        asyncio.run(wait_for_port('127.0.0.1', args.base_port + index))
+                    result = run_load(workers, args.base_port, args.clients, args.messages, args.timeout)
+                    name = f'workers={workers}'
+                    results['runs'][name] = result
+                    print(f'[{name}] {json.dumps(result, ensure_ascii=False)}', flush=True)
+                finally:
+                    server.terminate()
+                    server.wait()
+    finally:
+        llm_server.terminate()
+        llm_server.wait()
+        if args.server_log:
+            log_file.close()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+# startup_time.py
+"""앱 모듈 콜드 스타트 시간 / 워커당 메모리(RSS) 측정
+
+대상 앱 모듈을 새 인터프리터에서 `python -X importtime` 으로 import 해
+    ready_ms         인터프리터 시작부터 앱 모듈 import 가 끝날 때까지 (요청을 받을 수 있게 되는 워커 부팅 시간)
+    import_ms        그 중 앱 모듈 import 시간
+    rss_mb           import 직후 RSS (요청을 받기 전 워커 하나의 메모리)
+    provider_ms      LLM 클라이언트(LazyProvider) 초기화 시간, provider_rss_mb 는 그 뒤 RSS
+    top_imports      -X importtime 기준 누적 import 시간이 큰 최상위 패키지
+를 --repeat 번 재고 중앙값을 보고한다. LLM_PRELOAD=lazy 는 SDK import 가 첫 호출로 미뤄진 상태,
+eager 는 import 시 바로 초기화하는 상태(이전 동작과 같음)이다.
+
+DB 는 임시 디렉터리에 만들고 OPENAI_API_KEY 가 없으면 가짜 키를 넣으므로 외부 서비스가 필요 없다.
+chat 대상은 chat 앱 의존성(langchain 등)이 필요하며 --chat-python 으로 다른 인터프리터를 지정할 수 있다.
+
+실행:
+    python bench/startup_time.py
+    python bench/startup_time.py --targets chatbot_api chat --preload lazy eager --repeat 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+# 대상 이름: (실행 디렉터리, 모듈, LazyProvider 속성)
+TARGETS = {
+    'chatbot_api': ('chatbot_api', 'app', 'client'),
+    'chatbot_api_asgi': ('chatbot_api', 'asgi_app', 'async_client'),
+    'chat': ('chat', 'app', 'llm'),
+}
+
+PROVIDER_MARKER = '-- startup_time: provider --'
+
+# 자식 프로세스에서 실행하는 측정 코드 (결과는 stdout 마지막 줄의 JSON)
+CHILD_SCRIPT = '''
+import importlib, json, os, sys, time
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+started = time.perf_counter()
+module = importlib.import_module(sys.argv[1])
+result = {'import_ms': (time.perf_counter() - started) * 1000, 'rss_mb': rss_mb()}
+provider = getattr(module, sys.argv[2], None)
+if provider is not None:
+    sys.stderr.write(%r + '\\n')
+    sys.stderr.flush()
+    started = time.perf_counter()
+    provider.get()
+    result.update({'provider_ms': (time.perf_counter() - started) * 1000, 'provider_rss_mb': rss_mb()})
+print(json.dumps(result))
+''' % PROVIDER_MARKER
+
+
+def parse_importtime(stderr):
+    """-X importtime 출력에서 앱 모듈 import 중 최상위 패키지별 누적 import 시간(µs) 합계"""
+    totals = defaultdict(int)
+    for line in stderr.splitlines():
+        if line.strip() == PROVIDER_MARKER:
+            # 이후는 측정용 클라이언트 초기화
+            break
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # 들여쓰기 없는 줄이 최상위 import (하위 import 시간은 누적값에 포함됨)
+        if name.startswith('  '):
+            continue
+        totals[name.strip().split('.')[0]] += int(cumulative)
+    return totals
+
+
+def run_once(target, preload, python, env):
+    directory, module, attribute = TARGETS[target]
+    env = dict(env, LLM_PRELOAD=preload)
+    started = time.perf_counter()
+    proc = subprocess.run([python, '-X', 'importtime', '-c', CHILD_SCRIPT, module, attribute],
+                          cwd=os.path.join(ROOT_DIR, directory), env=env, capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - started) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f'{target} 실행 실패:\n{proc.stderr[-2000:]}')
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    # 측정용으로 마지막에 클라이언트를 초기화한 시간은 부팅 시간에서 뺌
+    result['ready_ms'] = wall_ms - result.get('provider_ms', 0.0)
+    return result, parse_importtime(proc.stderr)
+
+
+def measure(target, preload, python, env, repeat, top):
+    runs = []
+    import_times = defaultdict(list)
+    for _ in range(repeat):
+        result, totals = run_once(target, preload, python, env)
+        runs.append(result)
+        for package, micros in totals.items():
+            import_times[package].append(micros)
+
+    summary = {'runs': repeat}
+    for key in ('ready_ms', 'import_ms', 'rss_mb', 'provider_ms', 'provider_rss_mb'):
+        values = [run[key] for run in runs if key in run]
+        if values:
+            summary[key] = round(statistics.median(values), 1)
+    heaviest = sorted(import_times.items(), key=lambda item: -statistics.median(item[1]))[:top]
+    summary['top_imports'] = {package: round(statistics.median(values) / 1000, 1) for package, values in heaviest}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='앱 모듈 콜드 스타트 시간 / 워커당 RSS 측정 (-X importtime)')
+    parser.add_argument('--targets', nargs='+', choices=list(TARGETS), default=['chatbot_api', 'chatbot_api_asgi'])
+    parser.add_argument('--preload', nargs='+', choices=['lazy', 'eager'], default=['lazy', 'eager'],
+                        help='비교할 LLM_PRELOAD 값')
+    parser.add_argument('--repeat', type=int, default=5, help='설정마다 반복 횟수 (중앙값 보고)')
+    parser.add_argument('--top', type=int, default=8, help='보고할 무거운 최상위 패키지 수')
+    parser.add_argument('--chat-python', default=sys.executable, help='chat 대상을 실행할 Python')
+    parser.add_argument('--output', help='결과 JSON 저장 경로')
+    args = parser.parse_args()
+
+    results = {'config': vars(args), 'runs': {}}
+    with tempfile.TemporaryDirectory() as db_dir:
+        env = dict(os.environ)
+        env.setdefault('OPENAI_API_KEY', 'bench-key')
+        env.update({
+            'DATABASE_PATH': os.path.join(db_dir, 'chatbot_api.db'),
+            'CHAT_DB_PATH': os.path.join(db_dir, 'chat.db'),
+        })
+        for target in args.targets:
+            python = args.chat_python if target == 'chat' else sys.executable
+            for preload in args.preload:
+                name = f'{target} LLM_PRELOAD={preload}'
+                result = measure(target, preload, python, env, args.repeat, args.top)
+                results['runs'][name] = result
+                print(f'[{name}] {json.dumps(result, ensure_ascii=False)}', flush=True)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'결과 저장: {args.output}')
+
+
+if __name__ == '__main__':
+    main()
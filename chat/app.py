@@ -1,32 +1,110 @@
-from flask import Flask, render_template, request, session, redirect, url_for, jsonify
+from flask import Flask, Response, render_template, request, session, redirect, url_for, jsonify
 from flask_socketio import SocketIO, emit, join_room, leave_room
-from langchain_openai import ChatOpenAI
-from langchain.schema import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 import os
+import sys
 import json
-import threading
+import logging
 import time
+import uuid
+
+from generation_queue import GenerationScheduler, QueueFullError
+from history_store import ChatHistoryStore
+from socket_broker import SimpleBrokerManager
+from catalog import Catalog, CATALOG_SEARCH_LIMIT
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.environ.get('FLASK_SECRET_KEY', 'your-secret-key-here')
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+
+# 여러 워커 프로세스로 실행할 때 이벤트를 주고받을 메시지 큐
+# (redis://... 또는 내장 브로커 simple://host:port, 비어 있으면 단일 프로세스)
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE', '')
+socketio_options = {}
+if SOCKETIO_MESSAGE_QUEUE.startswith('simple://'):
+    socketio_options['client_manager'] = SimpleBrokerManager(SOCKETIO_MESSAGE_QUEUE)
+elif SOCKETIO_MESSAGE_QUEUE:
+    socketio_options['message_queue'] = SOCKETIO_MESSAGE_QUEUE
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading', **socketio_options)
 
 load_dotenv()
 
-# OpenAI API 키 설정
-openai_api_key = os.environ.get('OPENAI_API_KEY')
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY 환경변수가 설정되지 않았습니다.")
-
-# LangChain ChatOpenAI 모델 초기화
-llm = ChatOpenAI(
-    api_key=openai_api_key,
-    model="gpt-4o-mini",
-    temperature=0.8,
-    max_tokens=500
+# chatbot_api 와 함께 쓰는 LLM 호출 게이트웨이 (저장소 루트의 shared 디렉터리)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+from llm_gateway import LLMGateway
+from lazy_provider import LazyProvider
+from response_cache import ResponseCache
+from rate_limit import RateLimiter, RateLimitExceeded
+from request_timing import (
+    MetricsRegistry, RequestTimer, SlowRequestProfiler, instrument_flask, phase, record_phase,
+    PROMETHEUS_CONTENT_TYPE
 )
 
+def create_llm():
+    # 키가 없어도 서버는 뜨고 (정적 페이지, 카탈로그, 지표), LLM 을 처음 쓸 때 오류를 냄
+    openai_api_key = os.environ.get('OPENAI_API_KEY')
+    if not openai_api_key:
+        raise ValueError("OPENAI_API_KEY 환경변수가 설정되지 않았습니다.")
+    # langchain 은 import 가 무거워 처음 쓸 때 읽음 (lazy_provider.py 참고)
+    from langchain_openai import ChatOpenAI
+    return ChatOpenAI(
+        api_key=openai_api_key,
+        model="gpt-4o-mini",
+        temperature=0.8,
+        max_tokens=500,
+        max_retries=0
+    )
+
+# LangChain ChatOpenAI 모델 (재시도는 llm_gateway 가 마감시간 안에서 처리, 생성은 LLM_PRELOAD 시점까지 미룸)
+llm = LazyProvider('langchain_openai', create_llm)
+
+llm_gateway = LLMGateway('chat')
+
+# 반복되는 짧은 인사말 응답 캐시 (RESPONSE_CACHE_ENABLED=1 일 때만 사용)
+response_cache = ResponseCache()
+
+# 서버 측 대화 저장소 (쿠키 세션에는 chat_id 만 저장, 오래된 대화는 서버 시작 후 주기적으로 삭제)
+history_store = ChatHistoryStore()
+
+# 응답 생성 워커 풀 (메시지마다 스레드를 만들지 않고 사용자별로 공정하게 처리)
+generation_scheduler = GenerationScheduler()
+
+# HTTP 경로 / 소켓 이벤트의 단계별 지연시간 히스토그램 (GET /metrics) 과 느린 요청 프로파일러
+metrics_registry = MetricsRegistry()
+slow_request_profiler = SlowRequestProfiler()
+instrument_flask(app, metrics_registry, 'chat', slow_request_profiler)
+metrics_registry.register_collector('llm_gateway', llm_gateway.stats)
+metrics_registry.register_collector('llm_provider', llm.stats)
+metrics_registry.register_collector('generation_queue', generation_scheduler.stats)
+metrics_registry.register_collector('response_cache', response_cache.stats)
+metrics_registry.register_collector('history_store', history_store.stats)
+metrics_registry.register_collector('profiler', slow_request_profiler.stats)
+
+# 대화 / IP / 서버 전체 요청 한도 (여러 워커로 실행할 때는 RATE_LIMIT_BACKEND=sqlite 로 한도를 공유)
+rate_limiter = RateLimiter('chat', metrics_registry)
+metrics_registry.register_collector('rate_limit', rate_limiter.stats)
+RATE_LIMIT_EXEMPT_ENDPOINTS = {'index', 'chat', 'static', 'catalog_asset', 'prometheus_metrics'}
+
+@app.before_request
+def apply_rate_limit():
+    """가벼운 HTTP 요청의 한도 검사 (메시지 전송은 send_message 이벤트에서 llm 예산으로 검사)"""
+    if request.endpoint is None or request.endpoint in RATE_LIMIT_EXEMPT_ENDPOINTS:
+        return None
+    try:
+        rate_limiter.acquire('api', session.get('chat_id'), request.remote_addr)
+    except RateLimitExceeded as e:
+        response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    return None
+
+def fallback_reply(pet_info):
+    """LLM 을 쓸 수 없을 때 보내는 반려동물 말투의 폴백 응답"""
+    return f"{pet_info['owner_call']}, 앗 잠깐 멍해졌어! 다시 말해줄래? 🐾"
+
 # 동물 종류별 품종 데이터
 ANIMALS_DATA = {
     "개": {
@@ -65,6 +143,14 @@ SPEECH_STYLES = [
     "장난스러운 말투", "차분한 말투", "활발한 말투"
 ]
 
+# 품종 / 성격 / 말투 카탈로그는 시작 시 한 번 직렬화한 정적 자산으로 제공 (내용 해시가 버전)
+catalog = Catalog(ANIMALS_DATA, PERSONALITY_TRAITS, SPEECH_STYLES, os.path.getmtime(__file__))
+metrics_registry.register_collector('catalog', catalog.stats)
+
+# 버전이 들어간 자산 URL 은 내용이 바뀌면 같이 바뀌므로 오래 캐시
+CATALOG_ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+CATALOG_SEARCH_MAX_LIMIT = 50
+
 def create_system_prompt(pet_info):
     """반려동물 정보를 바탕으로 시스템 프롬프트 생성"""
     return f"""
@@ -92,16 +178,55 @@ def create_system_prompt(pet_info):
 
 @app.route('/')
 def index():
-    return render_template('index.html', 
-                         animals_data=ANIMALS_DATA,
-                         personality_traits=PERSONALITY_TRAITS,
-                         speech_styles=SPEECH_STYLES)
+    # 종류 / 품종 / 성격 / 말투 선택지는 페이지에 넣지 않고 캐시되는 카탈로그 자산으로 받아 그림
+    return render_template('index.html', catalog_url=url_for('catalog_asset', version=catalog.version))
+
+def catalog_response(cache_control):
+    """미리 만든 카탈로그 본문 응답 (gzip 협상, ETag / Last-Modified 조건부 요청 처리)"""
+    compressed = request.accept_encodings['gzip'] > 0
+    response = Response(catalog.gzip_body if compressed else catalog.body,
+                        content_type='application/json; charset=utf-8')
+    if compressed:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = cache_control
+    response.set_etag(f'{catalog.version}-gzip' if compressed else catalog.version)
+    response.last_modified = catalog.last_modified
+    response.make_conditional(request)
+    catalog.record_asset_request(response.status_code == 304)
+    return response
+
+@app.route('/catalog/<version>.json')
+def catalog_asset(version):
+    """버전이 들어간 카탈로그 자산 (이전 버전 URL 은 현재 버전으로 이동)"""
+    if version != catalog.version:
+        return redirect(url_for('catalog_asset', version=catalog.version))
+    return catalog_response(CATALOG_ASSET_CACHE_CONTROL)
+
+@app.route('/api/catalog')
+def catalog_latest():
+    """현재 카탈로그 (매번 ETag 로 재검증)"""
+    return catalog_response('no-cache')
+
+@app.route('/api/breeds')
+def search_breeds():
+    """품종 자동완성 검색 (?q=접두사&species=종류&limit=개수)"""
+    try:
+        limit = min(int(request.args.get('limit', CATALOG_SEARCH_LIMIT)), CATALOG_SEARCH_MAX_LIMIT)
+    except ValueError:
+        return jsonify({'error': 'limit 는 정수여야 합니다'}), 400
+    query = request.args.get('q', '')
+    results = catalog.search(query, request.args.get('species') or None, max(limit, 0))
+    response = jsonify({'query': query, 'version': catalog.version, 'results': results})
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
 
 @app.route('/chat')
 def chat():
-    if 'pet_info' not in session:
+    pet_info = history_store.get_pet_info(session.get('chat_id'))
+    if not pet_info:
         return redirect(url_for('index'))
-    return render_template('chat.html', pet_info=session['pet_info'])
+    return render_template('chat.html', pet_info=pet_info)
 
 @app.route('/create_pet', methods=['POST'])
 def create_pet():
@@ -121,43 +246,169 @@ def create_pet():
         'special_notes': request.form['special_notes']
     }
     
-    session['pet_info'] = pet_info
-    session['chat_history'] = []
+    # 이전 버전에서 쿠키에 저장하던 데이터 정리
+    session.pop('pet_info', None)
+    session.pop('chat_history', None)
+    session['chat_id'] = history_store.create_chat(pet_info)
     
     return jsonify({'success': True, 'redirect': '/chat'})
 
-def generate_ai_response(user_message, pet_info, chat_history, room_id):
-    """AI 응답을 생성하고 소켓으로 전송하는 함수"""
+@app.route('/api/llm/stats')
+def llm_stats():
+    """LLM 게이트웨이 통계 (재시도, 헤지, 서킷 브레이커 상태)"""
+    return jsonify(llm_gateway.stats())
+
+@app.route('/api/queue/stats')
+def queue_stats():
+    """응답 생성 대기열 게이지 (대기열 깊이, 진행 중인 생성 수)"""
+    return jsonify(generation_scheduler.stats())
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """응답 캐시 통계 (적중률, 항목 수)"""
+    return jsonify(response_cache.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus 형식 지표 (HTTP 경로 / 소켓 이벤트별 단계 지연시간, 대기열/캐시/게이트웨이 통계)"""
+    return Response(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+def open_llm_stream(messages, timeout):
+    """LangChain 스트림을 열고 첫 청크까지 받아 둠
+
+    llm.stream() 은 첫 청크를 요청할 때 HTTP 요청을 보내므로, 연결 오류와 첫 토큰 지연을
+    게이트웨이의 재시도/마감시간 안에서 처리하도록 여기서 첫 청크를 미리 받는다.
+    """
+    iterator = llm.stream(messages, timeout=timeout)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return iter(())
+
+    def chunks():
+        try:
+            yield first
+            yield from iterator
+        finally:
+            iterator.close()
+    return chunks()
+
+def generate_ai_response(user_message, pet_info, chat_history, room_id, job=None):
+    """AI 응답을 토큰 단위로 소켓에 전송하고 완성된(또는 중단된) 응답을 반환
+
+    토큰마다 bot_response_chunk 를 보내고, 끝나면 전체 내용을 담은 bot_response 로 확정한다.
+    stop_generation 이나 연결 종료로 작업이 취소되면 그때까지의 내용으로 확정한다.
+    """
     try:
-        # 시스템 프롬프트 생성
-        system_prompt = create_system_prompt(pet_info)
+        with phase('prompt_build'):
+            # 시스템 프롬프트 생성
+            system_prompt = create_system_prompt(pet_info)
+            message_id = uuid.uuid4().hex[:12]
+            
+            # 짧은 인사말은 캐시된 응답 후보로 바로 확정
+            context = [text for chat in chat_history for text in (chat['user'], chat['bot'])]
+            cached = response_cache.get(system_prompt, user_message, context)
+        if cached is not None:
+            if job is not None and job.cancelled:
+                return None
+            with phase('serialize'):
+                socketio.emit('bot_response', {
+                    'message_id': message_id,
+                    'message': cached,
+                    'pet_name': pet_info['name'],
+                    'timestamp': time.time(),
+                    'cached': True
+                }, room=room_id)
+            return cached
         
-        # 메시지 구성
-        messages = [SystemMessage(content=system_prompt)]
+        with phase('prompt_build'):
+            from langchain.schema import SystemMessage, HumanMessage
+            
+            # 메시지 구성
+            messages = [SystemMessage(content=system_prompt)]
+            
+            # 이전 대화 기록 추가 (최근 10개만)
+            for chat in chat_history[-10:]:
+                messages.append(HumanMessage(content=chat['user']))
+                messages.append(HumanMessage(content=f"[{pet_info['name']}의 답변]: {chat['bot']}"))
+            
+            # 현재 사용자 메시지 추가
+            messages.append(HumanMessage(content=user_message))
         
-        # 이전 대화 기록 추가 (최근 10개만)
-        for chat in chat_history[-10:]:
-            messages.append(HumanMessage(content=chat['user']))
-            messages.append(HumanMessage(content=f"[{pet_info['name']}의 답변]: {chat['bot']}"))
+        # AI 모델에 스트리밍 요청 (게이트웨이가 스트림 열기를 마감시간 안에서 재시도, 장애 시 즉시 실패)
+        started = time.monotonic()
+        first_token_at = None
+        chunks = []
+        stopped = False
+        try:
+            # 제너레이터라 실제 요청은 첫 청크를 읽을 때 나가므로 대기 시간은 소비하는 쪽에서 잰다
+            stream = llm_gateway.stream(lambda timeout: open_llm_stream(messages, timeout))
+            try:
+                # 스트림 열기와 청크 사이 대기 시간만 LLM 대기로 기록 (소켓 전송 시간은 제외)
+                waiting_since = time.perf_counter()
+                for chunk in stream:
+                    record_phase('llm_wait', time.perf_counter() - waiting_since)
+                    if job is not None and job.cancelled:
+                        stopped = True
+                        break
+                    delta = chunk.content
+                    if delta:
+                        if first_token_at is None:
+                            first_token_at = time.monotonic()
+                        chunks.append(delta)
+                        with phase('serialize'):
+                            socketio.emit('bot_response_chunk', {
+                                'message_id': message_id,
+                                'delta': delta,
+                                'pet_name': pet_info['name']
+                            }, room=room_id)
+                    waiting_since = time.perf_counter()
+            finally:
+                # 중단 시 업스트림 연결도 닫는다
+                stream.close()
+        except Exception as e:
+            logging.exception(f'LLM 응답 오류 (message={message_id}): {e}')
+            if job is not None and job.cancelled:
+                return None
+            # 폴백 응답으로 확정 (클라이언트는 같은 message_id 의 부분 응답을 교체)
+            with phase('serialize'):
+                socketio.emit('bot_response', {
+                    'message_id': message_id,
+                    'message': fallback_reply(pet_info),
+                    'pet_name': pet_info['name'],
+                    'timestamp': time.time(),
+                    'fallback': True
+                }, room=room_id)
+            return None
         
-        # 현재 사용자 메시지 추가
-        messages.append(HumanMessage(content=user_message))
+        bot_response = ''.join(chunks).strip()
+        finished = time.monotonic()
         
-        # AI 모델에 요청
-        response = llm.invoke(messages)
-        bot_response = response.content
+        # 메시지별 첫 토큰까지 시간(TTFT)과 초당 토큰 수 기록
+        if first_token_at is not None:
+            generation_time = finished - first_token_at
+            tokens_per_sec = len(chunks) / generation_time if generation_time > 0 else 0.0
+            logging.info(f'[stream] message={message_id} ttft={(first_token_at - started) * 1000:.0f}ms '
+                         f'tokens={len(chunks)} tokens/s={tokens_per_sec:.1f} stopped={stopped}')
         
-        # 응답을 소켓으로 전송
-        socketio.emit('bot_response', {
-            'message': bot_response,
-            'pet_name': pet_info['name'],
-            'timestamp': time.time()
-        }, room=room_id)
+        # 끝까지 받은 응답만 캐시 후보로 저장
+        if not stopped:
+            response_cache.put(system_prompt, user_message, bot_response, context)
+        
+        # 응답 확정
+        with phase('serialize'):
+            socketio.emit('bot_response', {
+                'message_id': message_id,
+                'message': bot_response,
+                'pet_name': pet_info['name'],
+                'timestamp': time.time(),
+                'stopped': stopped
+            }, room=room_id)
         
-        return bot_response
+        return bot_response or None
         
     except Exception as e:
-        print(f"Error: {e}")
+        logging.exception(f'응답 생성 오류 (room={room_id}): {e}')
         socketio.emit('error', {
             'message': '응답 생성 중 오류가 발생했습니다.'
         }, room=room_id)
@@ -166,7 +417,9 @@ def generate_ai_response(user_message, pet_info, chat_history, room_id):
 @socketio.on('send_message')
 def handle_send_message(data):
     """사용자 메시지 처리"""
-    if 'pet_info' not in session:
+    chat_id = session.get('chat_id')
+    pet_info = history_store.get_pet_info(chat_id)
+    if not pet_info:
         emit('error', {'message': '반려동물 정보가 없습니다.'})
         return
     
@@ -175,8 +428,12 @@ def handle_send_message(data):
         emit('error', {'message': '메시지가 비어있습니다.'})
         return
     
-    pet_info = session['pet_info'].copy()  # 세션 데이터 복사
-    chat_history = session.get('chat_history', []).copy()  # 세션 데이터 복사
+    try:
+        rate_limiter.acquire('llm', chat_id, request.remote_addr)
+    except RateLimitExceeded as e:
+        emit('error', {'message': str(e), 'retry_after': e.retry_after})
+        return
+    
     room_id = request.sid
     
     # 사용자 메시지 즉시 브로드캐스트
@@ -185,40 +442,43 @@ def handle_send_message(data):
         'timestamp': time.time()
     })
     
-    # 대화 기록에 사용자 메시지 저장
-    chat_entry = {'user': user_message, 'bot': ''}
-    chat_history.append(chat_entry)
-    session['chat_history'] = chat_history  # 즉시 세션 업데이트
-    
-    # 타이핑 상태 표시
-    emit('bot_typing', {'pet_name': pet_info['name']})
+    # 대기열 대기부터 응답 저장까지를 소켓 이벤트 하나로 계측
+    timer = RequestTimer(metrics_registry, 'chat', 'socketio:send_message', 'EVENT', slow_request_profiler)
     
-    # 별도 스레드에서 AI 응답 생성
-    def generate_response():
-        bot_response = generate_ai_response(user_message, pet_info, chat_history[:-1], room_id)
-        if bot_response:
-            # 대화 기록 업데이트 (socketio를 통해 업데이트 알림)
-            socketio.emit('update_chat_history', {
-                'user': user_message,
-                'bot': bot_response
-            }, room=room_id)
+    # 워커 풀에서 AI 응답 생성 (대화 기록은 작업 시작 시점의 최근 턴을 저장소에서 읽음)
+    def generate_response(job):
+        timer.activate()
+        timer.add('queue_wait', time.perf_counter() - timer.started)
+        bot_response = None
+        try:
+            with phase('db_read'):
+                chat_history = history_store.recent_turns(chat_id, limit=10)
+            bot_response = generate_ai_response(user_message, pet_info, chat_history, room_id, job)
+            if bot_response:
+                # 완성된 턴만 저장 (append-only)
+                with phase('db_write'):
+                    history_store.append_turn(chat_id, user_message, bot_response)
+        finally:
+            timer.finish('ok' if bot_response else 'no_reply')
     
-    thread = threading.Thread(target=generate_response)
-    thread.daemon = True
-    thread.start()
-
-@socketio.on('update_chat_history')  
-def handle_update_chat_history(data):
-    """대화 기록 업데이트 (메인 스레드에서 세션 접근)"""
-    chat_history = session.get('chat_history', [])
-    if chat_history and chat_history[-1]['user'] == data['user']:
-        chat_history[-1]['bot'] = data['bot']
-        session['chat_history'] = chat_history
+    try:
+        generation_scheduler.submit(
+            room_id,
+            generate_response,
+            # 대기 중에는 순번을, 생성을 시작하면 타이핑 상태를 표시
+            on_position=lambda position: socketio.emit('queue_position', {
+                'pet_name': pet_info['name'],
+                'position': position
+            }, room=room_id),
+            on_start=lambda: socketio.emit('bot_typing', {'pet_name': pet_info['name']}, room=room_id)
+        )
+    except QueueFullError as e:
+        emit('error', {'message': str(e)})
 
 @socketio.on('connect')
 def handle_connect():
     """클라이언트 연결 처리"""
-    if 'pet_info' not in session:
+    if not history_store.get_pet_info(session.get('chat_id')):
         return False  # 연결 거부
     
     join_room(request.sid)
@@ -227,15 +487,25 @@ def handle_connect():
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    """클라이언트 연결 해제 처리"""
+    """클라이언트 연결 해제 처리 (대기 중이거나 생성 중인 응답은 취소)"""
+    generation_scheduler.cancel(request.sid)
     leave_room(request.sid)
     print(f'Client {request.sid} disconnected')
 
+@socketio.on('stop_generation')
+def handle_stop_generation():
+    """진행 중인 응답 생성 중단 (그때까지 받은 내용으로 확정)"""
+    generation_scheduler.cancel_running(request.sid)
+
 @socketio.on('reset_chat')
 def handle_reset_chat():
     """채팅 기록 초기화"""
-    session['chat_history'] = []
+    history_store.reset(session.get('chat_id'))
     emit('chat_reset', {'message': '대화가 초기화되었습니다.'})
 
 if __name__ == '__main__':
-    socketio.run(app, debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    llm.start_preload()
+    history_store.start_purge()
+    # run_workers.py 로 여러 워커를 띄울 때는 PORT 와 FLASK_DEBUG=0 이 워커마다 지정됨
+    socketio.run(app, debug=os.environ.get('FLASK_DEBUG', '1') == '1', host='0.0.0.0',
+                 port=int(os.environ.get('PORT', '5000')), allow_unsafe_werkzeug=True)
\ No newline at end of file
@@ -0,0 +1,118 @@
+# catalog.py
+import bisect
+import gzip
+import hashlib
+import json
+import threading
+from email.utils import formatdate
+
+CATALOG_SEARCH_LIMIT = 10
+
+# 한글 음절 분해용 호환 자모 (사용자가 입력 중인 'ㄹ' 같은 낱자도 같은 기호가 되도록)
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+JUNGSEONG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+JONGSEONG = ['', 'ㄱ', 'ㄲ', 'ㄳ', 'ㄴ', 'ㄵ', 'ㄶ', 'ㄷ', 'ㄹ', 'ㄺ', 'ㄻ', 'ㄼ', 'ㄽ', 'ㄾ', 'ㄿ', 'ㅀ',
+             'ㅁ', 'ㅂ', 'ㅄ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ']
+
+
+def search_key(text):
+    """검색 키 정규화: 공백 제거, 소문자, 한글 음절을 자모로 분해
+
+    '골ㄷ' 처럼 조합 중인 입력도 '골든 리트리버' 의 접두사가 된다.
+    """
+    key = []
+    for ch in ''.join(text.split()).casefold():
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            key.append(CHOSEONG[code // 588])
+            key.append(JUNGSEONG[code % 588 // 28])
+            key.append(JONGSEONG[code % 28])
+        else:
+            key.append(ch)
+    return ''.join(key)
+
+
+def flatten_breeds(animals):
+    """{종류: [품종] 또는 {크기 분류: [품종]}} 를 품종 레코드 목록으로 펼침"""
+    breeds = []
+    for species, groups in animals.items():
+        if isinstance(groups, dict):
+            for group, names in groups.items():
+                breeds.extend({'breed': name, 'species': species, 'group': group} for name in names)
+        else:
+            breeds.extend({'breed': name, 'species': species, 'group': None} for name in groups)
+    return breeds
+
+
+class Catalog:
+    """품종 / 성격 / 말투 카탈로그 정적 자산과 품종 접두사 검색 색인
+
+    시작 시 한 번 JSON 으로 직렬화하고 gzip 본문까지 만들어 두며, 내용 해시를 버전(ETag)으로 쓴다.
+    페이지는 버전이 들어간 URL 로 자산을 받으므로 브라우저가 오래 캐시할 수 있고,
+    내용이 바뀌면 버전과 URL 이 함께 바뀐다.
+
+    품종 검색은 (검색 키, 품종 번호) 정렬 목록에서 이분 탐색으로 접두사 범위를 찾는다.
+    품종 이름 전체와 띄어쓰기 뒤의 단어('리트리버')를 모두 색인한다.
+    """
+
+    def __init__(self, animals, personality_traits, speech_styles, last_modified):
+        self.breeds = flatten_breeds(animals)
+        payload = {
+            'species': list(animals),
+            'animals': animals,
+            'personality_traits': personality_traits,
+            'speech_styles': speech_styles,
+        }
+        self.body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        self.version = hashlib.sha256(self.body).hexdigest()[:16]
+        # mtime 을 고정해 워커마다 같은 압축 본문이 나오도록 함
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.last_modified = int(last_modified)
+        self.last_modified_header = formatdate(self.last_modified, usegmt=True)
+
+        self._index = []  # (검색 키, 품종 번호, 이름 전체 여부)
+        for number, record in enumerate(self.breeds):
+            words = record['breed'].split()
+            for position in range(len(words)):
+                self._index.append((search_key(' '.join(words[position:])), number, position == 0))
+        self._index.sort()
+        self._keys = [entry[0] for entry in self._index]
+        self._lock = threading.Lock()
+        self._stats = {'searches': 0, 'asset_requests': 0, 'not_modified': 0}
+
+    def search(self, query, species=None, limit=CATALOG_SEARCH_LIMIT):
+        """품종 접두사 검색 (이름 앞부분 일치를 단어 일치보다 먼저, 같은 순위는 이름순)"""
+        with self._lock:
+            self._stats['searches'] += 1
+        prefix = search_key(query)
+        if not prefix:
+            return []
+
+        best = {}
+        start = bisect.bisect_left(self._keys, prefix)
+        for key, number, whole in self._index[start:]:
+            if not key.startswith(prefix):
+                break
+            if species and self.breeds[number]['species'] != species:
+                continue
+            best[number] = best.get(number, False) or whole
+        ranked = sorted(best, key=lambda number: (not best[number], self.breeds[number]['breed']))
+        return [self.breeds[number] for number in ranked[:limit]]
+
+    def record_asset_request(self, not_modified):
+        with self._lock:
+            self._stats['asset_requests'] += 1
+            if not_modified:
+                self._stats['not_modified'] += 1
+
+    def stats(self):
+        """자산 크기와 요청/검색 통계"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            'breeds': len(self.breeds),
+            'index_entries': len(self._index),
+            'bytes': len(self.body),
+            'gzip_bytes': len(self.gzip_body),
+        })
+        return stats
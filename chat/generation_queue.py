@@ -0,0 +1,200 @@
+# generation_queue.py
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+# AI 응답 생성 작업 큐 설정 (환경변수로 조정 가능)
+GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', '8'))
+GENERATION_MAX_QUEUE = int(os.getenv('GENERATION_MAX_QUEUE', '100'))
+GENERATION_MAX_PER_USER = int(os.getenv('GENERATION_MAX_PER_USER', '2'))
+
+
+class QueueFullError(Exception):
+    """대기열이 가득 차서 작업을 받을 수 없음"""
+
+
+class GenerationJob:
+    """대기열에 들어간 응답 생성 작업 하나"""
+
+    def __init__(self, user_key, func, on_position=None, on_start=None):
+        self.user_key = user_key
+        self.func = func
+        self.on_position = on_position
+        self.on_start = on_start
+        self.enqueued_at = time.monotonic()
+        self.position = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+
+class GenerationScheduler:
+    """사용자별 공정 분배를 하는 고정 크기 응답 생성 워커 풀
+
+    메시지마다 스레드를 만들지 않고 workers 개의 워커가 대기열에서 작업을 꺼내 처리한다.
+    사용자(소켓)별 FIFO 대기열을 라운드 로빈으로 돌아가며 꺼내므로 한 사용자가 메시지를
+    몰아 보내도 다른 사용자가 밀리지 않는다. 같은 사용자의 작업은 동시에 실행하지 않고 보낸 순서대로
+    하나씩 실행한다. 전체 대기열은 max_queue, 사용자별 대기+진행 작업은
+    max_per_user 로 제한해 넘치면 QueueFullError 를 던진다.
+
+    cancel() 은 대기 중인 작업을 제거하고 진행 중인 작업에 취소 표시를 한다. cancel_running() 은 진행 중인
+    작업에만 취소 표시를 한다. 작업 함수는 스트림 청크마다, 그리고 결과를 보내기 전에 job.cancelled 를 확인해야 한다.
+    """
+
+    def __init__(self, workers=GENERATION_WORKERS, max_queue=GENERATION_MAX_QUEUE,
+                 max_per_user=GENERATION_MAX_PER_USER):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.max_per_user = max_per_user
+        self._queues = OrderedDict()  # user_key -> deque[GenerationJob] (앞쪽이 다음 차례)
+        self._running = set()
+        self._depth = 0
+        self._cond = threading.Condition()
+        self._stats = {'submitted': 0, 'completed': 0, 'rejected': 0, 'cancelled': 0, 'failed': 0}
+        self._threads = []
+        for index in range(workers):
+            thread = threading.Thread(target=self._worker, name=f'generation-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, user_key, func, on_position=None, on_start=None):
+        """작업 추가 (func(job) 을 워커에서 실행, 대기열이 가득 차면 QueueFullError)
+
+        on_position(position) 은 대기 순번이 바뀔 때마다, on_start() 는 워커가 작업을 시작할 때 호출된다.
+        """
+        with self._cond:
+            user_queue = self._queues.get(user_key, ())
+            running = sum(1 for job in self._running if job.user_key == user_key)
+            if len(user_queue) + running >= self.max_per_user:
+                self._stats['rejected'] += 1
+                raise QueueFullError('이전 메시지에 대한 답변을 아직 준비하고 있어요. 조금만 기다려주세요.')
+            if self._depth >= self.max_queue:
+                self._stats['rejected'] += 1
+                raise QueueFullError('지금은 대화 요청이 많아요. 잠시 후 다시 시도해주세요.')
+
+            job = GenerationJob(user_key, func, on_position, on_start)
+            self._queues.setdefault(user_key, deque()).append(job)
+            self._depth += 1
+            self._stats['submitted'] += 1
+            changed = self._update_positions()
+            self._cond.notify()
+        self._notify_positions(changed)
+        return job
+
+    def cancel(self, user_key):
+        """사용자의 대기 중인 작업 제거 및 진행 중인 작업 취소 표시 (연결 종료 시)"""
+        with self._cond:
+            queued = self._queues.pop(user_key, ())
+            for job in queued:
+                job.cancel()
+            self._depth -= len(queued)
+            self._stats['cancelled'] += len(queued)
+            for job in self._running:
+                if job.user_key == user_key and not job.cancelled:
+                    job.cancel()
+                    self._stats['cancelled'] += 1
+            changed = self._update_positions() if queued else []
+        self._notify_positions(changed)
+
+    def cancel_running(self, user_key):
+        """사용자의 진행 중인 작업만 취소 표시 (대기 중인 작업은 유지, 취소한 수 반환)"""
+        with self._cond:
+            cancelled = 0
+            for job in self._running:
+                if job.user_key == user_key and not job.cancelled:
+                    job.cancel()
+                    cancelled += 1
+            self._stats['cancelled'] += cancelled
+        return cancelled
+
+    def _update_positions(self):
+        """라운드 로빈 순서대로 대기 순번(1부터)을 다시 매기고, 바뀐 작업 목록 반환"""
+        changed = []
+        queues = [list(queue) for queue in self._queues.values()]
+        position = 0
+        for round_index in range(max((len(queue) for queue in queues), default=0)):
+            for queue in queues:
+                if round_index < len(queue):
+                    position += 1
+                    job = queue[round_index]
+                    if job.position != position:
+                        job.position = position
+                        changed.append((job, position))
+        return changed
+
+    @staticmethod
+    def _notify_positions(changed):
+        for job, position in changed:
+            if job.on_position:
+                try:
+                    job.on_position(position)
+                except Exception as e:
+                    logging.error(f'대기 순번 알림 오류: {e}')
+
+    def _next_job(self):
+        """다음 차례 사용자의 가장 오래된 작업을 꺼내고, 그 사용자는 맨 뒤로 보냄
+
+        이미 진행 중인 작업이 있는 사용자는 건너뛰어 한 사용자의 작업은 하나씩 순서대로 실행된다.
+        꺼낼 작업이 없으면 None.
+        """
+        running_users = {job.user_key for job in self._running}
+        for user_key, queue in self._queues.items():
+            if user_key not in running_users:
+                break
+        else:
+            return None
+        job = queue.popleft()
+        if queue:
+            self._queues.move_to_end(user_key)
+        else:
+            del self._queues[user_key]
+        self._depth -= 1
+        return job
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._running.add(job)
+                changed = self._update_positions()
+            self._notify_positions(changed)
+
+            try:
+                if not job.cancelled:
+                    if job.on_start:
+                        job.on_start()
+                    job.func(job)
+            except Exception as e:
+                logging.exception(f'응답 생성 작업 오류: {e}')
+                with self._cond:
+                    self._stats['failed'] += 1
+            finally:
+                with self._cond:
+                    self._running.discard(job)
+                    self._stats['completed'] += 1
+                    # 이 사용자의 다음 작업을 기다리던 워커가 있으면 깨움
+                    self._cond.notify()
+
+    def stats(self):
+        """대기열 깊이, 진행 중인 생성 수 등 게이지/카운터 조회"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queue_depth'] = self._depth
+            stats['active_generations'] = len(self._running)
+            stats['waiting_users'] = len(self._queues)
+            oldest = min((queue[0].enqueued_at for queue in self._queues.values()), default=None)
+        stats['oldest_wait_s'] = round(time.monotonic() - oldest, 3) if oldest is not None else 0.0
+        stats['workers'] = self.workers
+        stats['max_queue'] = self.max_queue
+        stats['max_per_user'] = self.max_per_user
+        return stats
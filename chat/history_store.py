@@ -0,0 +1,237 @@
+# history_store.py
+import json
+import logging
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# 대화 기록 저장소 설정 (환경변수로 조정 가능)
+CHAT_DB_PATH = os.getenv('CHAT_DB_PATH', 'chat_history.db')
+CHAT_HISTORY_TTL_DAYS = int(os.getenv('CHAT_HISTORY_TTL_DAYS', '30'))
+CHAT_DB_POOL_SIZE = int(os.getenv('CHAT_DB_POOL_SIZE', '4'))
+CHAT_DB_POOL_TIMEOUT = float(os.getenv('CHAT_DB_POOL_TIMEOUT', '5'))
+# 오래된 대화 삭제 주기 (초, 0 이면 시작할 때 한 번만)
+CHAT_HISTORY_PURGE_INTERVAL = float(os.getenv('CHAT_HISTORY_PURGE_INTERVAL', '3600'))
+
+
+class ChatHistoryStore:
+    """세션 ID 별 반려동물 정보와 대화 기록을 보관하는 SQLite 저장소
+
+    쿠키에는 chat_id 만 두고, 대화는 턴마다 한 행씩 추가(append-only)한다. 프롬프트에는
+    최근 몇 턴만 필요하므로 (chat_id, id) 인덱스로 끝에서부터 읽어 대화 길이와 무관하게 비용이 일정하다.
+
+    연결은 pool_size 개까지만 만들어 재사용한다 (chatbot_api/database.py 의 ConnectionPool 과 같은 방식).
+    요청/워커 스레드가 늘어도 열린 연결 수는 늘지 않고, 모두 사용 중이면 timeout 초까지 기다린다.
+    close() 는 유휴 연결을 닫는다.
+    """
+
+    def __init__(self, path=CHAT_DB_PATH, pool_size=CHAT_DB_POOL_SIZE, timeout=CHAT_DB_POOL_TIMEOUT):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._purge_thread = None
+        self._purge_stop = threading.Event()
+        self._stats = {'created': 0, 'closed': 0, 'in_use': 0, 'timeouts': 0, 'purges': 0, 'purged_chats': 0,
+                       'purge_errors': 0}
+        self._init_schema()
+
+    def _create_connection(self):
+        conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _acquire(self):
+        """유휴 연결을 가져옴 (없으면 한도까지 생성, 넘으면 timeout 초 대기)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError('대화 저장소가 닫혔습니다')
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            can_create = self._stats['created'] - self._stats['closed'] < self.pool_size
+            if can_create:
+                self._stats['created'] += 1
+        if can_create:
+            try:
+                return self._create_connection()
+            except Exception:
+                with self._lock:
+                    self._stats['created'] -= 1
+                raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise sqlite3.OperationalError('대화 저장소 연결을 얻지 못했습니다 (풀 대기 시간 초과)')
+
+    def _release(self, conn):
+        """연결 반납 (열린 트랜잭션은 롤백, 닫힌 뒤면 연결도 닫음)"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logging.warning(f'대화 저장소 연결 롤백 실패, 연결을 폐기합니다: {e}')
+            self._discard(conn)
+            return
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._stats['closed'] += 1
+
+    @contextmanager
+    def _connection(self):
+        """with 문으로 쓰는 풀 연결 (블록이 끝나면 반납)"""
+        conn = self._acquire()
+        with self._lock:
+            self._stats['in_use'] += 1
+        try:
+            yield conn
+        finally:
+            with self._lock:
+                self._stats['in_use'] -= 1
+            self._release(conn)
+
+    def _init_schema(self):
+        with self._connection() as conn:
+            conn.executescript('''
+                CREATE TABLE IF NOT EXISTS chats (
+                    chat_id TEXT PRIMARY KEY,
+                    pet_info TEXT NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE TABLE IF NOT EXISTS chat_turns (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chat_id TEXT NOT NULL,
+                    user_message TEXT NOT NULL,
+                    bot_message TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_chat_turns_chat_id ON chat_turns (chat_id, id);
+                CREATE INDEX IF NOT EXISTS idx_chats_updated_at ON chats (updated_at);
+            ''')
+            conn.commit()
+
+    def create_chat(self, pet_info):
+        """새 대화 생성 후 chat_id 반환"""
+        chat_id = secrets.token_urlsafe(16)
+        with self._connection() as conn, conn:
+            conn.execute(
+                'INSERT INTO chats (chat_id, pet_info) VALUES (?, ?)',
+                (chat_id, json.dumps(pet_info, ensure_ascii=False))
+            )
+        return chat_id
+
+    def get_pet_info(self, chat_id):
+        """대화의 반려동물 정보 조회 (없으면 None)"""
+        if not chat_id:
+            return None
+        with self._connection() as conn:
+            row = conn.execute('SELECT pet_info FROM chats WHERE chat_id = ?', (chat_id,)).fetchone()
+        return json.loads(row['pet_info']) if row else None
+
+    def append_turn(self, chat_id, user_message, bot_message):
+        """완성된 대화 한 턴 추가"""
+        with self._connection() as conn, conn:
+            conn.execute(
+                'INSERT INTO chat_turns (chat_id, user_message, bot_message) VALUES (?, ?, ?)',
+                (chat_id, user_message, bot_message)
+            )
+            conn.execute('UPDATE chats SET updated_at = CURRENT_TIMESTAMP WHERE chat_id = ?', (chat_id,))
+
+    def recent_turns(self, chat_id, limit=10):
+        """최근 limit 개 턴을 시간순으로 조회 ([{'user': ..., 'bot': ...}, ...])"""
+        with self._connection() as conn:
+            rows = conn.execute(
+                'SELECT user_message, bot_message FROM chat_turns WHERE chat_id = ? ORDER BY id DESC LIMIT ?',
+                (chat_id, limit)
+            ).fetchall()
+        return [{'user': row['user_message'], 'bot': row['bot_message']} for row in reversed(rows)]
+
+    def reset(self, chat_id):
+        """대화 기록 초기화 (반려동물 정보는 유지)"""
+        with self._connection() as conn, conn:
+            conn.execute('DELETE FROM chat_turns WHERE chat_id = ?', (chat_id,))
+
+    def purge_inactive(self, days=CHAT_HISTORY_TTL_DAYS):
+        """days 일 동안 사용하지 않은 대화 삭제 (삭제한 대화 수 반환)"""
+        cutoff = f'-{int(days)} days'
+        with self._connection() as conn, conn:
+            conn.execute(
+                'DELETE FROM chat_turns WHERE chat_id IN '
+                '(SELECT chat_id FROM chats WHERE updated_at < datetime(\'now\', ?))',
+                (cutoff,)
+            )
+            cursor = conn.execute('DELETE FROM chats WHERE updated_at < datetime(\'now\', ?)', (cutoff,))
+        with self._lock:
+            self._stats['purges'] += 1
+            self._stats['purged_chats'] += cursor.rowcount
+        return cursor.rowcount
+
+    def start_purge(self, interval=CHAT_HISTORY_PURGE_INTERVAL, days=CHAT_HISTORY_TTL_DAYS):
+        """오래된 대화 삭제를 지금 한 번, 이후 interval 초마다 백그라운드 스레드에서 실행
+
+        interval 이 0 이하면 지금 한 번만 실행한다. 이미 실행 중이면 무시한다.
+        """
+        if interval <= 0:
+            self.purge_inactive(days)
+            return
+        with self._lock:
+            if self._purge_thread is not None and self._purge_thread.is_alive():
+                return
+            self._purge_stop.clear()
+            self._purge_thread = threading.Thread(target=self._purge_loop, args=(interval, days),
+                                                  name='chat-history-purge', daemon=True)
+        self._purge_thread.start()
+
+    def _purge_loop(self, interval, days):
+        while True:
+            try:
+                purged = self.purge_inactive(days)
+                if purged:
+                    logging.info(f'사용하지 않은 대화 {purged}개를 삭제했습니다')
+            except Exception as e:
+                logging.warning(f'오래된 대화 삭제 실패, 다음 주기에 다시 시도합니다: {e}')
+                with self._lock:
+                    self._stats['purge_errors'] += 1
+            if self._purge_stop.wait(interval):
+                return
+
+    def stop_purge(self):
+        self._purge_stop.set()
+
+    def stats(self):
+        """연결 풀 / 대화 삭제 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['open'] = stats['created'] - stats['closed']
+        stats['idle'] = self._idle.qsize()
+        stats['pool_size'] = self.pool_size
+        return stats
+
+    def close(self):
+        """삭제 스레드를 멈추고 유휴 연결을 닫음 (사용 중인 연결은 반납될 때 닫힘)"""
+        self.stop_purge()
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
@@ -0,0 +1,71 @@
+# run_workers.py
+"""채팅 서버를 여러 워커 프로세스로 실행
+
+워커마다 PORT 를 하나씩(base-port, base-port+1, ...) 할당해 app.py 를 실행하고, 모든 워커가 같은
+메시지 큐(SOCKETIO_MESSAGE_QUEUE)로 이벤트를 주고받게 한다. SOCKETIO_MESSAGE_QUEUE 가 없으면
+내장 브로커(socket_broker.py)를 이 프로세스 안에서 띄운다. 요청 한도 버킷은 RATE_LIMIT_BACKEND=sqlite
+(따로 지정하지 않았을 때)로 워커들이 공유한다. 앞단 로드 밸런서는 sticky session 으로
+워커 포트들에 분배해야 한다 (README 참고).
+
+실행:
+    python run_workers.py --workers 4 --base-port 5000
+    SOCKETIO_MESSAGE_QUEUE=redis://127.0.0.1:6379/0 python run_workers.py --workers 4
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from socket_broker import DEFAULT_BROKER_PORT, start_broker
+
+CHAT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='채팅 서버를 여러 워커 프로세스로 실행')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='워커 프로세스 수')
+    parser.add_argument('--base-port', type=int, default=5000, help='첫 번째 워커 포트')
+    parser.add_argument('--broker-port', type=int, default=DEFAULT_BROKER_PORT,
+                        help='SOCKETIO_MESSAGE_QUEUE 가 없을 때 띄울 내장 브로커 포트')
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env['FLASK_DEBUG'] = '0'
+    # 워커마다 따로 세지 않도록 요청 한도 버킷을 로컬 SQLite 파일로 공유
+    env.setdefault('RATE_LIMIT_BACKEND', 'sqlite')
+    broker = None
+    if not env.get('SOCKETIO_MESSAGE_QUEUE'):
+        broker = start_broker('127.0.0.1', args.broker_port)
+        env['SOCKETIO_MESSAGE_QUEUE'] = f'simple://127.0.0.1:{args.broker_port}'
+        print(f'내장 메시지 브로커 시작: {env["SOCKETIO_MESSAGE_QUEUE"]}', flush=True)
+
+    workers = []
+    for index in range(args.workers):
+        worker_env = dict(env, PORT=str(args.base_port + index))
+        workers.append(subprocess.Popen([sys.executable, os.path.join(CHAT_DIR, 'app.py')],
+                                        cwd=CHAT_DIR, env=worker_env))
+        print(f'워커 {index} 시작: 포트 {args.base_port + index}', flush=True)
+
+    # terminate() 로 종료될 때도 워커 프로세스를 정리하도록 정상 종료 처리
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        while all(worker.poll() is None for worker in workers):
+            time.sleep(0.5)
+        print('워커 프로세스가 종료되어 나머지 워커도 종료합니다.', flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+        for worker in workers:
+            worker.wait()
+        if broker is not None:
+            broker.shutdown()
+            broker.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+# socket_broker.py
+"""여러 Socket.IO 워커 프로세스가 이벤트를 주고받는 내장 메시지 브로커
+
+Redis 없이 로컬에서 멀티 프로세스 모드를 띄우거나 테스트할 때 쓰는 단순한 TCP 팬아웃 브로커와,
+python-socketio 의 PubSubManager 규약에 맞춘 클라이언트 매니저를 제공한다.
+메시지는 한 줄에 하나씩 JSON 으로 보내며, 브로커는 받은 줄을 구독 연결(첫 줄로 SUB 를 보낸 연결) 모두에게
+그대로 전달한다. 읽지 않는 구독자가 발행을 막지 않도록, 전송이 SUBSCRIBER_SEND_TIMEOUT 안에 끝나지 않는
+구독 연결은 끊는다 (클라이언트가 다시 연결한다).
+영속성/재전송이 없으므로 운영 환경에서는 Redis(`redis://...`) 를 사용한다.
+
+실행:
+    python socket_broker.py --port 6390
+"""
+import argparse
+import logging
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlparse
+
+from socketio import PubSubManager
+
+DEFAULT_BROKER_PORT = 6390
+SUBSCRIBE_LINE = b'SUB\n'
+SUBSCRIBER_SEND_TIMEOUT = 5.0
+
+
+def parse_broker_url(url):
+    """simple://host:port 형식의 주소를 (host, port) 로 변환"""
+    parsed = urlparse(url)
+    if parsed.scheme != 'simple':
+        raise ValueError(f'지원하지 않는 브로커 주소입니다: {url}')
+    return parsed.hostname or '127.0.0.1', parsed.port or DEFAULT_BROKER_PORT
+
+
+class SimpleBroker(socketserver.ThreadingTCPServer):
+    """발행 연결에서 받은 메시지를 모든 구독 연결에 전달하는 TCP 브로커"""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_BROKER_PORT):
+        self._clients = {}  # 구독 socket -> 전송 잠금
+        self._clients_lock = threading.Lock()
+        self.published = 0
+        super().__init__((host, port), _BrokerHandler)
+
+    def add_client(self, sock):
+        with self._clients_lock:
+            self._clients[sock] = threading.Lock()
+
+    def remove_client(self, sock):
+        with self._clients_lock:
+            self._clients.pop(sock, None)
+
+    def fan_out(self, line):
+        with self._clients_lock:
+            clients = list(self._clients.items())
+            self.published += 1
+        for sock, lock in clients:
+            try:
+                with lock:
+                    sock.sendall(line)
+            except OSError:
+                self.remove_client(sock)
+                sock.close()
+
+    def stats(self):
+        with self._clients_lock:
+            return {'clients': len(self._clients), 'published': self.published}
+
+
+class _BrokerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            first = self.rfile.readline()
+        except OSError:
+            return
+        if first != SUBSCRIBE_LINE:
+            # 발행 연결: 받은 줄을 그대로 전달
+            try:
+                line = first
+                while line:
+                    self.server.fan_out(line)
+                    line = self.rfile.readline()
+            except OSError:
+                pass
+            return
+
+        # 구독 연결: 전송에만 타임아웃을 두고 클라이언트가 닫을 때까지 대기
+        self.request.settimeout(SUBSCRIBER_SEND_TIMEOUT)
+        self.server.add_client(self.request)
+        try:
+            while True:
+                try:
+                    if not self.request.recv(1024):
+                        break
+                except socket.timeout:
+                    continue
+        except OSError:
+            pass
+        finally:
+            self.server.remove_client(self.request)
+
+
+def start_broker(host='127.0.0.1', port=DEFAULT_BROKER_PORT):
+    """백그라운드 스레드에서 브로커 실행 후 서버 객체 반환"""
+    broker = SimpleBroker(host, port)
+    threading.Thread(target=broker.serve_forever, name='socket-broker', daemon=True).start()
+    return broker
+
+
+class SimpleBrokerManager(PubSubManager):
+    """내장 브로커(simple://host:port)를 쓰는 Socket.IO 클라이언트 매니저
+
+    발행용/구독용 연결을 따로 두고, 연결이 끊기면 다시 연결한다. 같은 브로커에 연결된 다른 채널의
+    메시지는 무시한다.
+    """
+
+    name = 'simple'
+
+    def __init__(self, url=f'simple://127.0.0.1:{DEFAULT_BROKER_PORT}', channel='flask-socketio',
+                 write_only=False, logger=None, json=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger, json=json)
+        self.address = parse_broker_url(url)
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection(self.address, timeout=5)
+        sock.settimeout(None)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def _publish(self, data):
+        line = (self.json.dumps({'channel': self.channel, 'data': data}) + '\n').encode()
+        with self._publish_lock:
+            for attempt in range(2):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect()
+                    self._publisher.sendall(line)
+                    return
+                except OSError:
+                    if self._publisher is not None:
+                        self._publisher.close()
+                    self._publisher = None
+                    if attempt:
+                        raise
+
+    def _listen(self):
+        retry_delay = 0.1
+        while True:
+            try:
+                sock = self._connect()
+            except OSError as e:
+                self._get_logger().error(f'메시지 브로커 연결 실패, {retry_delay:.1f}초 후 재시도: {e}')
+                time.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, 5.0)
+                continue
+            retry_delay = 0.1
+            try:
+                sock.sendall(SUBSCRIBE_LINE)
+                with sock.makefile('rb') as stream:
+                    for line in stream:
+                        try:
+                            message = self.json.loads(line)
+                        except ValueError:
+                            continue
+                        if isinstance(message, dict) and message.get('channel') == self.channel:
+                            yield message.get('data')
+            except OSError as e:
+                self._get_logger().error(f'메시지 브로커 연결 끊김: {e}')
+            finally:
+                sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Socket.IO 워커용 내장 메시지 브로커')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_BROKER_PORT)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    broker = SimpleBroker(args.host, args.port)
+    print(f'메시지 브로커 시작: simple://{args.host}:{args.port}', flush=True)
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        broker.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -215,17 +215,22 @@ function addHelpTooltips() {
     });
 }
 
-// 성격 선택 개선
+// 성격 선택 개선 (성격 태그는 카탈로그를 받은 뒤 그려지므로 컨테이너에서 클릭을 받음)
 document.addEventListener('DOMContentLoaded', function() {
-    const personalityLabels = document.querySelectorAll('.personality-tags label');
-    personalityLabels.forEach(label => {
-        label.addEventListener('click', function() {
-            // 선택 효과 애니메이션
-            this.style.transform = 'scale(0.95)';
-            setTimeout(() => {
-                this.style.transform = 'scale(1)';
-            }, 100);
-        });
+    const personalityTags = document.querySelector('.personality-tags');
+    if (!personalityTags) {
+        return;
+    }
+    personalityTags.addEventListener('click', function(e) {
+        const label = e.target.closest('label');
+        if (!label) {
+            return;
+        }
+        // 선택 효과 애니메이션
+        label.style.transform = 'scale(0.95)';
+        setTimeout(() => {
+            label.style.transform = 'scale(1)';
+        }, 100);
     });
 });
 
@@ -1,21 +1,50 @@
 # app.py
-from flask import Flask, request, jsonify, session
+from flask import Flask, request, jsonify, session, Response, stream_with_context
 from flask_cors import CORS
 import sqlite3
 import json
-from openai import OpenAI
 from datetime import datetime
 import os
+import sys
 from functools import wraps
-import hashlib
 import secrets
 import asyncio
 import logging
+import time
 from dotenv import load_dotenv
 
 # .env 파일 로드
 load_dotenv()
 
+# chat 앱과 함께 쓰는 모듈 (저장소 루트의 shared 디렉터리)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'shared'))
+
+# 환경변수 로드 이후에 DB/게이트웨이 설정을 읽도록 여기서 import
+from database import pool
+from metrics import LatencyRecorder
+from persona_cache import PersonaCache
+from conversation_memory import ConversationMemory, fit_history, SUMMARY_MAX_TOKENS
+from chat_archive import ChatArchiver, load_archived_messages, CHAT_ARCHIVE_ENABLED
+from message_search import (
+    SearchIndexBackfill, parse_search_params, search_messages, SEARCH_BACKFILL_ENABLED
+)
+from session_store import SessionStore, insert_session, delete_session, fetch_pet_access
+from rate_limit import RateLimiter, RateLimitExceeded
+from credentials import hasher, hash_password, CredentialHasherBusy, DUMMY_PASSWORD_HASH
+from llm_gateway import LLMGateway
+from lazy_provider import LazyProvider
+from llm_batcher import create_batcher, LLM_BATCH_MODE
+from response_cache import ResponseCache
+from pet_transfer import (
+    detect_format, text_lines, iter_rows, normalize_row, export_header, serialize_rows,
+    TRANSFER_MIMETYPES, PET_EXPORT_FIELDS, BULK_IMPORT_CHUNK_SIZE, BULK_IMPORT_MAX_ROWS, BULK_IMPORT_MAX_ERRORS,
+    PET_EXPORT_BATCH_SIZE
+)
+from request_timing import (
+    MetricsRegistry, SlowRequestProfiler, instrument_flask, phase, record_phase, timed_stream,
+    PROMETHEUS_CONTENT_TYPE
+)
+
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', secrets.token_hex(32))
 CORS(app, supports_credentials=True)
@@ -23,10 +52,15 @@ CORS(app, supports_credentials=True)
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 
-# OpenAI 클라이언트 초기화
+def create_openai_client():
+    # openai 패키지는 import 가 무거워 처음 쓸 때 읽음 (lazy_provider.py 참고)
+    from openai import OpenAI
+    return OpenAI(api_key=openai_api_key, max_retries=0)
+
+# OpenAI 클라이언트 (재시도는 llm_gateway 가 마감시간 안에서 처리, 생성은 LLM_PRELOAD 시점까지 미룸)
 openai_api_key = os.getenv('OPENAI_API_KEY')
 if openai_api_key:
-    client = OpenAI(api_key=openai_api_key)
+    client = LazyProvider('openai', create_openai_client)
 else:
     logging.warning('OPENAI_API_KEY 환경변수가 설정되지 않았습니다. 더미 클라이언트를 사용합니다.')
     client = None
@@ -34,7 +68,7 @@ else:
 # 데이터베이스 초기화
 def init_db():
     """데이터베이스 초기화"""
-    conn = sqlite3.connect('pet_chatbot.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
     
     # 사용자 테이블
@@ -97,37 +131,257 @@ def init_db():
     ''')
     
     conn.commit()
+    
+    migrate_db(conn)
     conn.close()
 
+# 스키마 마이그레이션 (PRAGMA user_version 으로 적용 버전 관리)
+MIGRATIONS = [
+    # 1: 페르소나 캐시 무효화를 위한 프로필 버전
+    ['ALTER TABLE pets ADD COLUMN profile_version INTEGER NOT NULL DEFAULT 1'],
+    # 2: 세션별 누적 대화 요약 (summary_until_id 까지의 메시지를 요약)
+    [
+        'ALTER TABLE chat_sessions ADD COLUMN summary TEXT',
+        'ALTER TABLE chat_sessions ADD COLUMN summary_until_id INTEGER NOT NULL DEFAULT 0',
+    ],
+    # 3: 조회 경로 인덱스 및 세션 목록용 마지막 메시지 비정규화
+    [
+        'CREATE INDEX IF NOT EXISTS idx_chat_messages_session_id ON chat_messages (session_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_pet_time ON chat_sessions (user_id, pet_id, last_message_time)',
+        'CREATE INDEX IF NOT EXISTS idx_chat_sessions_user_time ON chat_sessions (user_id, last_message_time)',
+        'CREATE INDEX IF NOT EXISTS idx_pets_user_created ON pets (user_id, created_at)',
+        'ALTER TABLE chat_sessions ADD COLUMN last_message_id INTEGER',
+        'ALTER TABLE chat_sessions ADD COLUMN last_message TEXT',
+        '''UPDATE chat_sessions SET last_message_id = (
+               SELECT MAX(id) FROM chat_messages WHERE session_id = chat_sessions.id
+           )''',
+        '''UPDATE chat_sessions SET last_message = (
+               SELECT content FROM chat_messages WHERE id = chat_sessions.last_message_id
+           ) WHERE last_message_id IS NOT NULL''',
+    ],
+    # 4: 반려동물 내보내기 키셋 페이지네이션 (user_id, id 순서)
+    ['CREATE INDEX IF NOT EXISTS idx_pets_user_id ON pets (user_id, id)'],
+    # 5: 채팅 기록 전문 검색 색인 (FTS5 trigram, 기존 메시지는 message_search 백필이 나누어 색인)
+    #    트리거는 색인된 범위(id > until_id 또는 id <= indexed_upto)의 행만 갱신한다
+    [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS chat_messages_fts USING fts5(
+               content, content='chat_messages', content_rowid='id', tokenize='trigram'
+           )''',
+        '''CREATE TABLE IF NOT EXISTS chat_search_backfill (
+               id INTEGER PRIMARY KEY CHECK (id = 1),
+               until_id INTEGER NOT NULL,
+               indexed_upto INTEGER NOT NULL DEFAULT 0
+           )''',
+        'INSERT INTO chat_search_backfill (id, until_id) SELECT 1, COALESCE(MAX(id), 0) FROM chat_messages',
+        '''CREATE TRIGGER IF NOT EXISTS chat_messages_fts_insert AFTER INSERT ON chat_messages
+           WHEN new.id > (SELECT until_id FROM chat_search_backfill WHERE id = 1)
+             OR new.id <= (SELECT indexed_upto FROM chat_search_backfill WHERE id = 1)
+           BEGIN
+               INSERT INTO chat_messages_fts (rowid, content) VALUES (new.id, new.content);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS chat_messages_fts_delete AFTER DELETE ON chat_messages
+           WHEN old.id > (SELECT until_id FROM chat_search_backfill WHERE id = 1)
+             OR old.id <= (SELECT indexed_upto FROM chat_search_backfill WHERE id = 1)
+           BEGIN
+               INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+           END''',
+        '''CREATE TRIGGER IF NOT EXISTS chat_messages_fts_update AFTER UPDATE OF content ON chat_messages
+           WHEN old.id > (SELECT until_id FROM chat_search_backfill WHERE id = 1)
+             OR old.id <= (SELECT indexed_upto FROM chat_search_backfill WHERE id = 1)
+           BEGIN
+               INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+               INSERT INTO chat_messages_fts (rowid, content) VALUES (new.id, new.content);
+           END''',
+    ],
+    # 6: 오래된 메시지의 세션별 압축 보관 (archived_until_id 까지는 chat_message_archive 에 있음)
+    [
+        'ALTER TABLE chat_sessions ADD COLUMN archived_until_id INTEGER NOT NULL DEFAULT 0',
+        '''CREATE TABLE IF NOT EXISTS chat_message_archive (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               session_id INTEGER NOT NULL,
+               first_id INTEGER NOT NULL,
+               last_id INTEGER NOT NULL,
+               message_count INTEGER NOT NULL,
+               raw_bytes INTEGER NOT NULL,
+               data BLOB NOT NULL,
+               archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (session_id) REFERENCES chat_sessions (id)
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_chat_message_archive_session ON chat_message_archive (session_id, last_id)',
+    ],
+    # 7: 서버 측 로그인 세션 (id 는 쿠키에 넣은 토큰의 SHA-256)
+    [
+        '''CREATE TABLE IF NOT EXISTS user_sessions (
+               id TEXT PRIMARY KEY,
+               user_id INTEGER NOT NULL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               expires_at REAL NOT NULL,
+               FOREIGN KEY (user_id) REFERENCES users (id)
+           )''',
+        'CREATE INDEX IF NOT EXISTS idx_user_sessions_expires ON user_sessions (expires_at)',
+    ],
+    # 8: 보관한 메시지도 검색되도록 FTS 행을 남김
+    #    (보관한 id -> 세션, 보관으로 지우는 행은 색인 삭제 트리거가 건너뜀)
+    [
+        '''CREATE TABLE IF NOT EXISTS chat_archived_messages (
+               id INTEGER PRIMARY KEY,
+               session_id INTEGER NOT NULL
+           )''',
+        'DROP TRIGGER IF EXISTS chat_messages_fts_delete',
+        '''CREATE TRIGGER chat_messages_fts_delete AFTER DELETE ON chat_messages
+           WHEN (old.id > (SELECT until_id FROM chat_search_backfill WHERE id = 1)
+                 OR old.id <= (SELECT indexed_upto FROM chat_search_backfill WHERE id = 1))
+             AND NOT EXISTS (SELECT 1 FROM chat_archived_messages WHERE id = old.id)
+           BEGIN
+               INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) VALUES ('delete', old.id, old.content);
+           END''',
+    ],
+    # 9: 로그아웃 세대 번호 (다른 프로세스의 세션 캐시 무효화)
+    [
+        '''CREATE TABLE IF NOT EXISTS session_revocations (
+               id INTEGER PRIMARY KEY CHECK (id = 1),
+               generation INTEGER NOT NULL DEFAULT 0
+           )''',
+        'INSERT OR IGNORE INTO session_revocations (id) VALUES (1)',
+    ],
+]
+
+def migrate_db(conn):
+    """적용되지 않은 마이그레이션을 순서대로 실행"""
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, statements in enumerate(MIGRATIONS, start=1):
+        if version <= current:
+            continue
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        logging.info(f'데이터베이스 마이그레이션 {version} 적용 완료')
+
+# 서버 측 로그인 세션 (쿠키에는 토큰만, 확인 결과는 프로세스 안 LRU 캐시)
+session_store = SessionStore()
+
+def start_user_session(user_id):
+    """서버 측 세션을 만들고 쿠키 세션에 토큰 저장 (사용자가 없으면 False)"""
+    token, token_hash, expires_at = session_store.new_session(user_id)
+    if pool.run_in_transaction(insert_session, token_hash, user_id, expires_at) is None:
+        return False
+    session_store.remember_session(token_hash, user_id, expires_at)
+    session.clear()
+    session['sid'] = token
+    session['user_id'] = user_id
+    return True
+
+def end_user_session():
+    """서버 측 세션 삭제 후 쿠키 세션 비우기"""
+    token_hash = session_store.forget_session(session.get('sid'))
+    if token_hash:
+        pool.run_in_transaction(delete_session, token_hash)
+    session.clear()
+
 # 로그인 체크 데코레이터
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        # 서버 측 세션 도입 전에 발급된 쿠키 (서명된 user_id 만 있음) 는 sid 가 없으므로 다시 로그인해야 함
+        token = session.get('sid')
+        if token and session_store.revocation_check_due():
+            with pool.connection() as conn:
+                session_store.check_revocations(conn)
+        user_id = session_store.cached_user(token)
+        if user_id is None and token:
+            with pool.connection() as conn:
+                user_id = session_store.load_user(conn, token)
+        if user_id is None:
+            session.clear()
             return jsonify({'error': '로그인이 필요합니다'}), 401
+        if session.get('user_id') != user_id:
+            session['user_id'] = user_id
         return f(*args, **kwargs)
     return decorated_function
 
-# 비밀번호 해시 함수
-def hash_password(password):
-    """비밀번호를 안전하게 해시화"""
-    salt = secrets.token_hex(16)
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-    return salt + pwd_hash.hex()
-
-def verify_password(password, hashed):
-    """비밀번호 검증"""
-    salt = hashed[:32]
-    stored_hash = hashed[32:]
-    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), 100000)
-    return pwd_hash.hex() == stored_hash
+# 비밀번호 해시/검증은 credentials.hasher (전용 프로세스 풀) 에서 처리
 
 # 데이터베이스 연결 헬퍼
 def get_db_connection():
-    conn = sqlite3.connect('pet_chatbot.db')
-    conn.row_factory = sqlite3.Row
-    conn.execute('PRAGMA foreign_keys = ON')  # 외래키 제약조건 활성화
-    return conn
+    """연결 풀에서 연결을 가져옴 (close() 호출 시 풀에 반납)"""
+    return pool.acquire()
+
+# AI 응답 생성 실패 시 사용자에게 보여줄 폴백 응답
+FALLBACK_RESPONSE = "앗, 잠깐 멍해졌어! 다시 말해줄래? 🐾"
+
+# OpenAI 채팅 완성 요청 옵션
+CHAT_COMPLETION_OPTIONS = {
+    'model': 'gpt-3.5-turbo',
+    'max_tokens': 500,
+    'temperature': 0.8,
+    'presence_penalty': 0.6,
+    'frequency_penalty': 0.3
+}
+
+# 스트리밍 요청 옵션 (마지막 청크에 usage 포함)
+CHAT_STREAM_OPTIONS = dict(CHAT_COMPLETION_OPTIONS, stream=True, stream_options={'include_usage': True})
+
+# 반려동물별 페르소나(시스템 프롬프트) 캐시
+persona_cache = PersonaCache()
+
+# 스트리밍 응답 지표 (첫 토큰까지 시간, 전체 응답 시간)
+stream_metrics = {
+    'time_to_first_token': LatencyRecorder(),
+    'total': LatencyRecorder()
+}
+
+# LLM 호출 게이트웨이 (마감시간, 재시도, 헤지, 서킷 브레이커, 동시 호출 제한)
+llm_gateway = LLMGateway('chatbot_api')
+
+# 자체 호스팅 추론 서버용 요청 마이크로 배칭 (LLM_BATCH_MODE 를 지정했을 때만, 스트리밍 응답은 제외)
+llm_batcher = create_batcher(LLM_BATCH_MODE, client, CHAT_COMPLETION_OPTIONS, name='chatbot_api')
+
+# 반복되는 짧은 인사말 응답 캐시 (RESPONSE_CACHE_ENABLED=1 일 때만 사용)
+response_cache = ResponseCache()
+
+# 경로/단계별 지연시간 히스토그램 (GET /metrics) 과 느린 요청 프로파일러 (PROFILE_SLOW_REQUEST_MS)
+metrics_registry = MetricsRegistry()
+slow_request_profiler = SlowRequestProfiler()
+instrument_flask(app, metrics_registry, 'chatbot_api', slow_request_profiler)
+
+# 사용자 / IP / 서버 전체 요청 한도 (LLM 을 호출하는 요청과 가벼운 요청은 예산을 따로 씀)
+rate_limiter = RateLimiter('chatbot_api', metrics_registry)
+LLM_ENDPOINTS = {'send_chat_message'}
+RATE_LIMIT_EXEMPT_ENDPOINTS = {'index', 'static', 'prometheus_metrics'}
+
+def rate_limit_budget(endpoint):
+    """요청의 한도 예산 ('llm' / 'api', 한도 검사 대상이 아니면 None)"""
+    if endpoint is None or endpoint in RATE_LIMIT_EXEMPT_ENDPOINTS:
+        return None
+    return 'llm' if endpoint in LLM_ENDPOINTS else 'api'
+
+def rate_limited_response(e):
+    """요청 한도 초과 시 429 응답"""
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.status_code = 429
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
+@app.before_request
+def apply_rate_limit():
+    # 서명된 쿠키의 user_id 로 구분 (세션 유효성은 login_required 가 확인)
+    budget = rate_limit_budget(request.endpoint)
+    if budget is None:
+        return None
+    try:
+        rate_limiter.acquire(budget, session.get('user_id'), request.remote_addr)
+    except RateLimitExceeded as e:
+        return rate_limited_response(e)
+    return None
+
+class AIResponseError(Exception):
+    """AI 응답 생성 실패"""
 
 class PetPersonaGenerator:
     """반려동물 페르소나 생성 및 관리 클래스"""
@@ -183,48 +437,251 @@ class PetPersonaGenerator:
         return base_prompt
 
     @staticmethod
-    def generate_response(pet_info, user_message, conversation_history=None):
-        """AI를 이용해 반려동물 응답 생성"""
+    def build_messages(pet_info, user_message, conversation_history=None, system_prompt=None, summary=None):
+        """시스템 프롬프트, 대화 요약, 이전 대화, 현재 메시지로 API 요청 메시지 구성
+
+        system_prompt 를 넘기면 (페르소나 캐시) 프롬프트를 다시 만들지 않는다.
+        시스템 프롬프트가 항상 맨 앞에 같은 내용으로 오므로 LLM 제공자의 접두사 캐시도 적중한다.
+        """
         
-        try:
-            # OpenAI 클라이언트가 없으면 더미 응답 반환
-            if not client:
-                return f"안녕! 나는 {pet_info['name']}이야! OpenAI API 키가 설정되지 않아서 실제 AI 응답은 사용할 수 없지만, 대화는 가능해! 🐾"
-            
+        if system_prompt is None:
             system_prompt = PetPersonaGenerator.create_system_prompt(pet_info)
+        
+        messages = [
+            {"role": "system", "content": system_prompt}
+        ]
+        
+        # 예산을 넘어 요약된 예전 대화
+        if summary:
+            messages.append({"role": "system", "content": f"## 지금까지의 대화 요약\n{summary}"})
+        
+        # 이전 대화 기록 추가 (토큰 예산 안의 최근 메시지)
+        if conversation_history:
+            for msg in fit_history(conversation_history):
+                role = "user" if msg['sender'] == 'user' else "assistant"
+                messages.append({
+                    "role": role, 
+                    "content": msg['content']
+                })
+        
+        # 현재 사용자 메시지 추가
+        messages.append({"role": "user", "content": user_message})
+        return messages
+
+    @staticmethod
+    def dummy_response(pet_info):
+        """OpenAI 클라이언트가 없을 때 사용하는 더미 응답"""
+        return f"안녕! 나는 {pet_info['name']}이야! OpenAI API 키가 설정되지 않아서 실제 AI 응답은 사용할 수 없지만, 대화는 가능해! 🐾"
+
+    @staticmethod
+    def cache_context(conversation_history=None, summary=None):
+        """응답 캐시의 문맥 지문에 쓸 대화 내용 목록 (요약 + 최근 메시지)"""
+        context = [summary] if summary else []
+        context.extend(msg['content'] for msg in conversation_history or ())
+        return context
+
+    @staticmethod
+    def prepare_prompt(pet_info, user_message, conversation_history=None, system_prompt=None, summary=None):
+        """응답 캐시를 확인하고 API 요청 메시지 구성 (동기/비동기 서버 공용)
+
+        캐시에 적중하면 'cached' 에 응답이 들어 있고 'messages' 는 만들지 않는다.
+        반환한 dict 는 응답을 받은 뒤 cache_reply() 에 그대로 넘긴다.
+        """
+        
+        with phase('prompt_build'):
+            if system_prompt is None:
+                system_prompt = PetPersonaGenerator.create_system_prompt(pet_info)
             
-            messages = [
-                {"role": "system", "content": system_prompt}
-            ]
-            
-            # 이전 대화 기록 추가 (최근 10개만)
-            if conversation_history:
-                for msg in conversation_history[-10:]:
-                    role = "user" if msg['sender'] == 'user' else "assistant"
-                    messages.append({
-                        "role": role, 
-                        "content": msg['content']
-                    })
-            
-            # 현재 사용자 메시지 추가
-            messages.append({"role": "user", "content": user_message})
-            
-            # OpenAI API 호출 (새로운 버전)
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=messages,
-                max_tokens=500,
-                temperature=0.8,
-                presence_penalty=0.6,
-                frequency_penalty=0.3
+            # 짧은 인사말은 캐시된 응답 후보로 바로 응답
+            context = PetPersonaGenerator.cache_context(conversation_history, summary)
+            prompt = {
+                'system_prompt': system_prompt,
+                'context': context,
+                'cached': response_cache.get(system_prompt, user_message, context),
+                'messages': None
+            }
+            if prompt['cached'] is None:
+                prompt['messages'] = PetPersonaGenerator.build_messages(
+                    pet_info, user_message, conversation_history, system_prompt, summary
+                )
+        return prompt
+
+    @staticmethod
+    def cache_reply(prompt, user_message, content):
+        """끝까지 받은 응답을 캐시 후보로 저장"""
+        response_cache.put(prompt['system_prompt'], user_message, content, prompt['context'])
+
+    @staticmethod
+    def response_content(response):
+        """채팅 완성 응답에서 usage 를 기록하고 본문 반환"""
+        PetPersonaGenerator.record_usage(response.usage)
+        return response.choices[0].message.content.strip()
+
+    @staticmethod
+    def chunk_delta(chunk):
+        """스트리밍 청크의 본문 조각 (include_usage 의 마지막 usage 전용 청크는 기록만 하고 None)"""
+        if not chunk.choices:
+            PetPersonaGenerator.record_usage(getattr(chunk, 'usage', None))
+            return None
+        return chunk.choices[0].delta.content
+
+    @staticmethod
+    def record_usage(usage):
+        """응답 usage 의 프롬프트/캐시 적중 토큰 수 기록"""
+        if not usage:
+            return
+        details = getattr(usage, 'prompt_tokens_details', None)
+        persona_cache.record_prompt_usage(
+            getattr(usage, 'prompt_tokens', 0),
+            getattr(details, 'cached_tokens', 0) if details else 0
+        )
+
+    @staticmethod
+    def request_response(pet_info, user_message, conversation_history=None, system_prompt=None, summary=None):
+        """AI를 이용해 반려동물 응답 생성 (실패 시 AIResponseError 발생)"""
+        
+        # OpenAI 클라이언트가 없으면 더미 응답 반환
+        if not client:
+            return PetPersonaGenerator.dummy_response(pet_info)
+        
+        try:
+            prompt = PetPersonaGenerator.prepare_prompt(
+                pet_info, user_message, conversation_history, system_prompt, summary
             )
+            if prompt['cached'] is not None:
+                return prompt['cached']
             
-            return response.choices[0].message.content.strip()
+            if llm_batcher is not None:
+                # 동시에 들어온 요청과 묶어서 전송
+                with phase('llm_wait'):
+                    content = llm_gateway.call(lambda timeout: llm_batcher.submit(prompt['messages'], timeout))
+            else:
+                # OpenAI API 호출 (게이트웨이가 마감시간 안에서 재시도/헤지, 장애 시 즉시 실패)
+                with phase('llm_wait'):
+                    response = llm_gateway.call(lambda timeout: client.chat.completions.create(
+                        messages=prompt['messages'],
+                        timeout=timeout,
+                        **CHAT_COMPLETION_OPTIONS
+                    ))
+                content = PetPersonaGenerator.response_content(response)
             
         except Exception as e:
+            raise AIResponseError(str(e)) from e
+        
+        PetPersonaGenerator.cache_reply(prompt, user_message, content)
+        return content
+
+    @staticmethod
+    def stream_response(pet_info, user_message, conversation_history=None, system_prompt=None, summary=None):
+        """AI 응답을 토큰 단위로 생성하는 제너레이터 (실패 시 AIResponseError 발생)"""
+        
+        if not client:
+            yield PetPersonaGenerator.dummy_response(pet_info)
+            return
+        
+        # 짧은 인사말은 캐시된 응답 후보를 한 번에 전달
+        prompt = PetPersonaGenerator.prepare_prompt(
+            pet_info, user_message, conversation_history, system_prompt, summary
+        )
+        if prompt['cached'] is not None:
+            yield prompt['cached']
+            return
+        
+        # 스트림을 여는 단계만 재시도하고, 스트림이 끝날 때까지 동시 호출 슬롯을 점유
+        # (제너레이터라 실제 요청은 첫 청크를 읽을 때 나간다)
+        stream = llm_gateway.stream(lambda timeout: client.chat.completions.create(
+            messages=prompt['messages'],
+            timeout=timeout,
+            **CHAT_STREAM_OPTIONS
+        ))
+        
+        chunks = []
+        try:
+            waiting_since = time.perf_counter()
+            for chunk in stream:
+                # 스트림 열기와 청크 사이 대기 시간만 LLM 대기로 기록 (yield 이후 전송 시간은 제외)
+                record_phase('llm_wait', time.perf_counter() - waiting_since)
+                delta = PetPersonaGenerator.chunk_delta(chunk)
+                if delta:
+                    chunks.append(delta)
+                    yield delta
+                waiting_since = time.perf_counter()
+        except Exception as e:
+            raise AIResponseError(str(e)) from e
+        else:
+            # 끝까지 받은 응답만 캐시 후보로 저장
+            PetPersonaGenerator.cache_reply(prompt, user_message, ''.join(chunks).strip())
+        finally:
+            # 클라이언트 연결 종료 등으로 중단되면 업스트림 스트림도 닫는다
+            stream.close()
+
+    @staticmethod
+    def generate_response(pet_info, user_message, conversation_history=None):
+        """AI를 이용해 반려동물 응답 생성 (실패 시 폴백 응답 반환)"""
+        
+        try:
+            return PetPersonaGenerator.request_response(pet_info, user_message, conversation_history)
+        except AIResponseError as e:
             logging.error(f"AI 응답 생성 오류: {e}")
             # 폴백 응답
-            return f"앗, 잠깐 멍해졌어! 다시 말해줄래? 🐾"
+            return FALLBACK_RESPONSE
+
+    @staticmethod
+    def summarize_conversation(previous_summary, messages, pet_info):
+        """기존 요약에 오래된 대화를 합쳐 새 누적 요약 생성 (대화 메모리용)"""
+        
+        user_call = pet_info.get('user_call') or '주인님'
+        lines = []
+        for msg in messages:
+            speaker = user_call if msg['sender'] == 'user' else pet_info['name']
+            lines.append(f"{speaker}: {msg['content']}")
+        transcript = "\n".join(lines)
+        
+        if not client:
+            # AI 없이: 최근 내용 위주로 잘라서 이어붙임
+            combined = f"{previous_summary}\n{transcript}" if previous_summary else transcript
+            return combined[-SUMMARY_MAX_TOKENS * 2:]
+        
+        prompt = f"""다음은 '{pet_info['name']}'({pet_info['species']})와 {user_call}의 대화입니다.
+기존 요약과 새 대화를 합쳐, 앞으로의 대화에서 기억해야 할 사실(사건, 약속, 좋아하는 것, 감정 등)을
+한국어로 간결하게 요약하세요. 반려동물의 말투는 흉내 내지 말고 사실만 적으세요.
+
+## 기존 요약
+{previous_summary or '(없음)'}
+
+## 새 대화
+{transcript}
+"""
+        # 백그라운드 작업이므로 헤지 요청은 보내지 않음
+        response = llm_gateway.call(lambda timeout: client.chat.completions.create(
+            model=CHAT_COMPLETION_OPTIONS['model'],
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=SUMMARY_MAX_TOKENS,
+            temperature=0.2,
+            timeout=timeout
+        ), hedge=False)
+        return response.choices[0].message.content.strip()
+
+# 토큰 예산 기반 대화 메모리 (예산을 넘는 대화는 세션별 요약으로 누적)
+conversation_memory = ConversationMemory(pool, PetPersonaGenerator.summarize_conversation)
+
+# 마이그레이션 이전 메시지의 검색 색인 백필 (서버 시작 시 백그라운드로 실행)
+search_backfill = SearchIndexBackfill(pool)
+
+# 오래된 메시지 압축 보관 및 점진적 VACUUM (CHAT_ARCHIVE_ENABLED=1 일 때 주기 실행)
+chat_archiver = ChatArchiver(pool)
+
+def start_background_jobs():
+    """init_db() 이후 서버 시작 시 실행할 백그라운드 작업"""
+    if client:
+        client.start_preload()
+    purged = pool.run_in_transaction(session_store.purge_expired)
+    if purged:
+        logging.info(f'만료된 로그인 세션 {purged}개 삭제')
+    if SEARCH_BACKFILL_ENABLED:
+        search_backfill.start()
+    if CHAT_ARCHIVE_ENABLED:
+        chat_archiver.start()
 
 # 메인 페이지 라우트
 @app.route('/')
@@ -276,11 +733,22 @@ def index():
                 <h3>📚 사용 가능한 API 엔드포인트</h3>
                 <ul>
                     <li><code>POST /api/dev/login</code> - 개발용 로그인</li>
+                    <li><code>POST /api/auth/signup</code> - 회원가입</li>
+                    <li><code>POST /api/auth/login</code> - 로그인 (username 또는 email)</li>
+                    <li><code>POST /api/auth/logout</code> - 로그아웃 (서버 측 세션 삭제)</li>
+                    <li><code>GET /api/auth/stats</code> - 비밀번호 해시 실행기 통계</li>
                     <li><code>GET /api/pets</code> - 반려동물 목록 조회</li>
                     <li><code>POST /api/pets</code> - 반려동물 등록</li>
+                    <li><code>POST /api/pets/import?format=ndjson|csv</code> - 반려동물 대량 등록 (NDJSON / CSV 스트림, 행별 오류 보고)</li>
+                    <li><code>GET /api/pets/export?format=ndjson|csv</code> - 반려동물 스트리밍 내보내기</li>
                     <li><code>POST /api/chat/send</code> - 채팅 메시지 전송</li>
-                    <li><code>GET /api/chat/history/{pet_id}</code> - 채팅 기록 조회</li>
+                    <li><code>GET /api/chat/history/{pet_id}?before_id=&limit=&compact=1</code> - 채팅 기록 조회 (키셋 페이지네이션)</li>
                     <li><code>GET /api/chat/sessions</code> - 채팅 세션 목록</li>
+                    <li><code>GET /api/chat/search?q=&pet_id=&limit=&offset=</code> - 채팅 기록 전문 검색 (순위, 스니펫, 페이지네이션)</li>
+                    <li><code>GET /api/db/stats</code> - DB 연결 풀 / 메시지 보관(회수한 공간) 통계</li>
+                    <li><code>PUT /api/pets/{pet_id}</code> - 반려동물 정보 수정</li>
+                    <li><code>GET /api/chat/metrics</code> - 스트리밍 응답 지표 (TTFT), 캐시/대화 메모리 통계</li>
+                    <li><code>GET /metrics</code> - Prometheus 형식 지표 (경로/단계별 지연시간 히스토그램)</li>
                 </ul>
             </div>
         </div>
@@ -357,6 +825,130 @@ def index():
     </html>
     '''
 
+# 데이터 조회 헬퍼 (동기/비동기 서버 공용)
+
+def fetch_user_pets(conn, user_id):
+    """사용자의 반려동물 목록을 페르소나 정보와 함께 조회"""
+    
+    pets = conn.execute(
+        'SELECT * FROM pets WHERE user_id = ? ORDER BY created_at DESC',
+        (user_id,)
+    ).fetchall()
+    
+    pets_data = []
+    for pet in pets:
+        pet_dict = dict(pet)
+        # 페르소나 정보 구성
+        pet_dict['persona'] = {
+            'name': pet_dict['name'],
+            'species': pet_dict['species'],
+            'breed': pet_dict['breed'],
+            'personality': pet_dict['personality'],
+            'speaking_style': pet_dict['speaking_style'],
+            'user_call': pet_dict['user_call'],
+            'likes': pet_dict['likes'],
+            'dislikes': pet_dict['dislikes'],
+            'etc_info': pet_dict['etc_info']
+        }
+        pets_data.append(pet_dict)
+    
+    return pets_data
+
+HISTORY_PAGE_DEFAULT = int(os.getenv('HISTORY_PAGE_DEFAULT', '50'))
+HISTORY_PAGE_MAX = int(os.getenv('HISTORY_PAGE_MAX', '200'))
+HISTORY_FIELDS = ['id', 'sender', 'content', 'timestamp']
+SQLITE_MAX_ROWID = 2 ** 63 - 1
+
+def parse_history_params(args):
+    """대화 기록 페이지 파라미터(before_id, limit, compact) 파싱 (잘못된 값이면 ValueError)"""
+    before_id = args.get('before_id')
+    before_id = int(before_id) if before_id not in (None, '') else None
+    limit = int(args.get('limit') or HISTORY_PAGE_DEFAULT)
+    if limit < 1 or (before_id is not None and before_id < 1):
+        raise ValueError('before_id 와 limit 는 1 이상이어야 합니다')
+    compact = args.get('compact', '').lower() in ('1', 'true', 'yes')
+    return before_id, min(limit, HISTORY_PAGE_MAX), compact
+
+HISTORY_SESSION_SQL = '''
+    SELECT id, archived_until_id FROM chat_sessions
+    WHERE user_id = ? AND pet_id = ? ORDER BY last_message_time DESC LIMIT 1
+'''
+
+HISTORY_PAGE_SQL = '''
+    SELECT id, sender, content, timestamp FROM chat_messages
+    WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?
+'''
+
+def fetch_chat_history(conn, user_id, pet_id, before_id=None, limit=HISTORY_PAGE_DEFAULT, compact=False):
+    """특정 반려동물과의 최근 세션 메시지를 id 기준 키셋 페이지로 조회
+
+    before_id 보다 오래된 메시지 중 최근 limit 개를 시간순으로 반환한다. (session_id, id)
+    인덱스를 역방향으로 읽고 멈추므로 전체 기록 길이와 무관하게 비용이 일정하다.
+    compact 이면 메시지를 HISTORY_FIELDS 순서의 배열로 반환해 응답 크기를 줄인다.
+    """
+    
+    # 최근 세션 조회
+    session_row = conn.execute(HISTORY_SESSION_SQL, (user_id, pet_id)).fetchone()
+    
+    page = {'messages': [], 'has_more': False, 'next_before_id': None}
+    if compact:
+        page['fields'] = HISTORY_FIELDS
+    if not session_row:
+        return page
+    
+    # 메시지 조회 (id 는 삽입 순서이므로 시간순과 같음). 다음 페이지 존재 여부 확인용으로 1개 더 읽음
+    rows = conn.execute(
+        HISTORY_PAGE_SQL, (session_row['id'], before_id or SQLITE_MAX_ROWID, limit + 1)
+    ).fetchall()
+    
+    if len(rows) <= limit and session_row['archived_until_id']:
+        # 최근(hot) 메시지를 다 읽었으면 보관된 메시지로 이어서 채움
+        upper = rows[-1]['id'] if rows else (before_id or SQLITE_MAX_ROWID)
+        rows += load_archived_messages(conn, session_row['id'], upper, limit + 1 - len(rows))
+    
+    if len(rows) > limit:
+        rows = rows[:limit]
+        page['has_more'] = True
+    rows.reverse()
+    
+    if compact:
+        page['messages'] = [tuple(row[field] for field in HISTORY_FIELDS) for row in rows]
+    else:
+        page['messages'] = [dict(row) for row in rows]
+    if page['has_more']:
+        page['next_before_id'] = rows[0]['id']
+    
+    return page
+
+SESSIONS_LIST_SQL = '''
+    SELECT cs.pet_id, cs.last_message, cs.last_message_time, p.name as pet_name
+    FROM chat_sessions cs
+    JOIN pets p ON cs.pet_id = p.id
+    WHERE cs.user_id = ?
+    ORDER BY cs.last_message_time DESC
+    LIMIT 20
+'''
+
+def fetch_chat_sessions(conn, user_id):
+    """사용자의 채팅 세션 목록 조회
+
+    마지막 메시지는 chat_sessions 에 비정규화되어 있으므로 메시지 테이블을 읽지 않고
+    (user_id, last_message_time) 인덱스만으로 조회한다.
+    """
+    
+    sessions = conn.execute(SESSIONS_LIST_SQL, (user_id,)).fetchall()
+    
+    sessions_data = []
+    for s in sessions:
+        sessions_data.append({
+            'pet_id': s['pet_id'],
+            'pet_name': s['pet_name'],
+            'last_message': s['last_message'] or '대화를 시작해보세요',
+            'last_message_time': s['last_message_time']
+        })
+    
+    return sessions_data
+
 # API 엔드포인트들
 
 @app.route('/api/pets', methods=['GET'])
@@ -365,37 +957,74 @@ def get_user_pets():
     """사용자의 반려동물 목록 조회"""
     
     try:
-        conn = get_db_connection()
-        try:
-            pets = conn.execute(
-                'SELECT * FROM pets WHERE user_id = ? ORDER BY created_at DESC',
-                (session['user_id'],)
-            ).fetchall()
-        finally:
-            conn.close()
+        with phase('db_read'):
+            conn = get_db_connection()
+            try:
+                pets_data = fetch_user_pets(conn, session['user_id'])
+            finally:
+                conn.close()
         
-        pets_data = []
-        for pet in pets:
-            pet_dict = dict(pet)
-            # 페르소나 정보 구성
-            pet_dict['persona'] = {
-                'name': pet_dict['name'],
-                'species': pet_dict['species'],
-                'breed': pet_dict['breed'],
-                'personality': pet_dict['personality'],
-                'speaking_style': pet_dict['speaking_style'],
-                'user_call': pet_dict['user_call'],
-                'likes': pet_dict['likes'],
-                'dislikes': pet_dict['dislikes'],
-                'etc_info': pet_dict['etc_info']
-            }
-            pets_data.append(pet_dict)
-        
-        return jsonify({'pets': pets_data})
+        with phase('serialize'):
+            return jsonify({'pets': pets_data})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+# 반려동물 입력값 검증 및 저장 헬퍼
+
+PET_REQUIRED_FIELDS = ['name', 'species', 'personality', 'speaking_style', 'user_call']
+
+def validate_pet_data(data):
+    """반려동물 입력값 검증 (문제가 없으면 None, 있으면 오류 메시지 반환)"""
+    
+    # 필수 필드 검증
+    for field in PET_REQUIRED_FIELDS:
+        if not data.get(field) or not isinstance(data.get(field), str) or not data.get(field).strip():
+            return f'{field}는 필수 항목입니다'
+    
+    # 입력값 길이 제한
+    if len(data['name']) > 50 or len(data['species']) > 30:
+        return '입력값이 너무 깁니다'
+    
+    return None
+
+def pet_insert_params(user_id, data):
+    """검증된 입력값으로 pets INSERT 파라미터 구성"""
+    return (
+        user_id,
+        data['name'].strip(),
+        data['species'].strip(),
+        data.get('breed', '').strip(),
+        data['personality'].strip(),
+        data['speaking_style'].strip(),
+        data['user_call'].strip(),
+        data.get('likes', '').strip(),
+        data.get('dislikes', '').strip(),
+        data.get('etc_info', '').strip()
+    )
+
+PET_INSERT_SQL = '''
+    INSERT INTO pets (user_id, name, species, breed, personality, 
+                   speaking_style, user_call, likes, dislikes, etc_info)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+def insert_pet(conn, user_id, data):
+    """반려동물 한 마리 저장 후 id 반환"""
+    cursor = conn.execute(PET_INSERT_SQL, pet_insert_params(user_id, data))
+    return cursor.lastrowid
+
+def update_pet_profile(conn, user_id, pet_id, data):
+    """반려동물 프로필 수정 및 버전 증가 (수정된 행이 있으면 True)"""
+    params = pet_insert_params(user_id, data)
+    cursor = conn.execute('''
+        UPDATE pets SET name = ?, species = ?, breed = ?, personality = ?, speaking_style = ?,
+                        user_call = ?, likes = ?, dislikes = ?, etc_info = ?,
+                        profile_version = profile_version + 1
+        WHERE id = ? AND user_id = ?
+    ''', params[1:] + (pet_id, user_id))
+    return cursor.rowcount > 0
+
 @app.route('/api/pets', methods=['POST'])
 @login_required
 def add_pet():
@@ -404,167 +1033,447 @@ def add_pet():
     try:
         data = request.get_json()
         
-        # 필수 필드 검증
-        required_fields = ['name', 'species', 'personality', 'speaking_style', 'user_call']
-        for field in required_fields:
-            if not data.get(field) or not isinstance(data.get(field), str) or not data.get(field).strip():
-                return jsonify({'error': f'{field}는 필수 항목입니다'}), 400
-        
-        # 입력값 길이 제한
-        if len(data['name']) > 50 or len(data['species']) > 30:
-            return jsonify({'error': '입력값이 너무 깁니다'}), 400
+        error = validate_pet_data(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        conn = get_db_connection()
         try:
-            cursor = conn.cursor()
-            
-            cursor.execute('''
-                INSERT INTO pets (user_id, name, species, breed, personality, 
-                               speaking_style, user_call, likes, dislikes, etc_info)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                session['user_id'],
-                data['name'].strip(),
-                data['species'].strip(),
-                data.get('breed', '').strip(),
-                data['personality'].strip(),
-                data['speaking_style'].strip(),
-                data['user_call'].strip(),
-                data.get('likes', '').strip(),
-                data.get('dislikes', '').strip(),
-                data.get('etc_info', '').strip()
-            ))
-            
-            pet_id = cursor.lastrowid
-            conn.commit()
+            pet_id = pool.run_in_transaction(insert_pet, session['user_id'], data)
         except sqlite3.Error as e:
-            conn.rollback()
             logging.error(f'Pet 등록 오류: {e}')
             return jsonify({'error': '반려동물 등록에 실패했습니다'}), 500
-        finally:
-            conn.close()
         
+        persona_cache.invalidate(pet_id)
         return jsonify({'success': True, 'pet_id': pet_id})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/chat/send', methods=['POST'])
+@app.route('/api/pets/<int:pet_id>', methods=['PUT'])
 @login_required
-def send_chat_message():
-    """채팅 메시지 전송 및 AI 응답 생성"""
+def update_pet(pet_id):
+    """반려동물 정보 수정"""
     
     try:
         data = request.get_json()
-        user_message = data.get('message', '').strip()
-        pet_id = data.get('pet_id')
-        
-        if not user_message or not pet_id:
-            return jsonify({'error': '메시지와 반려동물 ID가 필요합니다'}), 400
         
-        # 메시지 길이 제한
-        if len(user_message) > 500:
-            return jsonify({'error': '메시지가 너무 깁니다 (최대 500자)'}), 400
+        error = validate_pet_data(data)
+        if error:
+            return jsonify({'error': error}), 400
         
-        # pet_id 정수 변환 및 검증
         try:
-            pet_id = int(pet_id)
-        except (ValueError, TypeError):
-            return jsonify({'error': '잘못된 반려동물 ID입니다'}), 400
+            updated = pool.run_in_transaction(update_pet_profile, session['user_id'], pet_id, data)
+        except sqlite3.Error as e:
+            logging.error(f'Pet 수정 오류: {e}')
+            return jsonify({'error': '반려동물 정보 수정에 실패했습니다'}), 500
         
-        conn = get_db_connection()
+        if not updated:
+            return jsonify({'error': '반려동물을 찾을 수 없습니다'}), 404
+        
+        persona_cache.invalidate(pet_id)
+        session_store.invalidate_pet(session['user_id'], pet_id)
+        return jsonify({'success': True, 'pet_id': pet_id})
         
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+# 반려동물 대량 가져오기/내보내기 (NDJSON / CSV 스트림)
+
+def insert_pet_chunk(conn, user_id, chunk):
+    """검증된 (줄 번호, 입력값) 묶음을 executemany 로 저장하고 실패한 [(줄 번호, 오류)] 반환
+
+    제약 조건 오류가 나면 세이브포인트로 묶음을 되돌리고 행별로 다시 저장해 실패한 행만 골라낸다.
+    (실패한 INSERT 문만 되돌려지므로 같은 트랜잭션 안에서 계속 진행할 수 있다)
+    """
+    conn.execute('SAVEPOINT pet_chunk')
+    try:
+        conn.executemany(PET_INSERT_SQL, [pet_insert_params(user_id, data) for _, data in chunk])
+        conn.execute('RELEASE pet_chunk')
+        return []
+    except sqlite3.IntegrityError:
+        conn.execute('ROLLBACK TO pet_chunk')
+        conn.execute('RELEASE pet_chunk')
+    
+    failures = []
+    for line, data in chunk:
         try:
-            # 반려동물 정보 조회
-            pet = conn.execute(
-                'SELECT * FROM pets WHERE id = ? AND user_id = ?',
-                (pet_id, session['user_id'])
-            ).fetchone()
-            
-            if not pet:
-                return jsonify({'error': '반려동물을 찾을 수 없습니다'}), 404
-            
-            # 세션 조회 또는 생성
-            session_row = conn.execute(
-                'SELECT id FROM chat_sessions WHERE user_id = ? AND pet_id = ? ORDER BY created_at DESC LIMIT 1',
-                (session['user_id'], pet_id)
-            ).fetchone()
-            
-            if session_row:
-                session_id = session_row['id']
-            else:
-                # 새 세션 생성
-                cursor = conn.cursor()
-                cursor.execute(
-                    'INSERT INTO chat_sessions (user_id, pet_id) VALUES (?, ?)',
-                    (session['user_id'], pet_id)
-                )
-                session_id = cursor.lastrowid
-            
-            # 이전 대화 기록 조회
-            conversation_history = conn.execute(
-                'SELECT * FROM chat_messages WHERE session_id = ? ORDER BY timestamp DESC LIMIT 20',
-                (session_id,)
-            ).fetchall()
-            
-            # 대화 기록을 리스트로 변환
-            history_list = []
-            for msg in reversed(conversation_history):
-                history_list.append({
-                    'sender': msg['sender'],
-                    'content': msg['content'],
-                    'timestamp': msg['timestamp']
-                })
-            
-            # 사용자 메시지 저장
-            cursor = conn.cursor()
-            cursor.execute(
-                'INSERT INTO chat_messages (session_id, sender, content) VALUES (?, ?, ?)',
-                (session_id, 'user', user_message)
+            conn.execute(PET_INSERT_SQL, pet_insert_params(user_id, data))
+        except sqlite3.IntegrityError as e:
+            failures.append((line, f'저장 실패: {e}'))
+    return failures
+
+def import_pet_rows(user_id, rows):
+    """(줄 번호, 입력 행, 파싱 오류) 를 검증해 청크 단위 트랜잭션으로 저장하고 결과 요약 반환
+
+    유효한 행은 BULK_IMPORT_CHUNK_SIZE 개씩 한 트랜잭션으로 저장하고, 실패한 행은 건너뛰며
+    줄 번호와 함께 보고한다 (최대 BULK_IMPORT_MAX_ERRORS 개). BULK_IMPORT_MAX_ROWS 를 넘는 행은
+    저장하지 않고 skipped 로만 센다.
+    """
+    result = {'imported': 0, 'failed': 0, 'skipped': 0, 'errors': []}
+    chunk = []
+    
+    def report(line, message):
+        result['failed'] += 1
+        if len(result['errors']) < BULK_IMPORT_MAX_ERRORS:
+            result['errors'].append({'line': line, 'error': message})
+    
+    def flush():
+        try:
+            with phase('db_write'):
+                failures = pool.run_in_transaction(insert_pet_chunk, user_id, chunk)
+        except sqlite3.Error as e:
+            logging.error(f'Pet 대량 등록 오류 (user={user_id}, {len(chunk)}건): {e}')
+            failures = [(line, '저장 실패') for line, _ in chunk]
+        result['imported'] += len(chunk) - len(failures)
+        for line, message in failures:
+            report(line, message)
+        chunk.clear()
+    
+    seen = 0
+    for line, row, error in rows:
+        seen += 1
+        if seen > BULK_IMPORT_MAX_ROWS:
+            result['skipped'] += 1
+            continue
+        if error is None:
+            data, error = normalize_row(row)
+        if error is None:
+            error = validate_pet_data(data)
+        if error:
+            report(line, error)
+            continue
+        chunk.append((line, data))
+        if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+    
+    result['errors_truncated'] = result['failed'] > len(result['errors'])
+    return result
+
+def import_pets_from_stream(user_id, binary_stream, fmt):
+    """요청 본문 바이트 스트림을 줄 단위로 읽으며 가져오기 (본문 전체를 메모리에 올리지 않음)"""
+    return import_pet_rows(user_id, iter_rows(text_lines(binary_stream), fmt))
+
+def bulk_import_response(result):
+    """가져오기 결과 응답 본문과 상태 코드 (저장된 행 없이 실패만 있으면 400)"""
+    status = 400 if result['failed'] and not result['imported'] else 200
+    return dict(result, success=status == 200), status
+
+PET_EXPORT_SQL = f'''
+    SELECT {', '.join(PET_EXPORT_FIELDS)} FROM pets
+    WHERE user_id = ? AND id > ?
+    ORDER BY id
+    LIMIT ?
+'''
+
+def fetch_pet_export_batch(conn, user_id, after_id, limit=PET_EXPORT_BATCH_SIZE):
+    """내보내기용 반려동물 행을 id 키셋 페이지네이션으로 조회"""
+    return conn.execute(PET_EXPORT_SQL, (user_id, after_id, limit)).fetchall()
+
+def iter_pet_export(user_id, fmt):
+    """반려동물을 배치 단위로 읽어 NDJSON / CSV 로 내보냄 (배치마다 연결을 빌렸다 반납)"""
+    header = export_header(fmt)
+    if header:
+        yield header
+    after_id = 0
+    while True:
+        conn = get_db_connection()
+        try:
+            rows = fetch_pet_export_batch(conn, user_id, after_id)
+        finally:
+            conn.close()
+        if not rows:
+            return
+        yield serialize_rows(rows, fmt)
+        if len(rows) < PET_EXPORT_BATCH_SIZE:
+            return
+        after_id = rows[-1]['id']
+
+@app.route('/api/pets/import', methods=['POST'])
+@login_required
+def import_pets():
+    """반려동물 대량 등록 (NDJSON / CSV 스트림, 행별 오류 보고)"""
+    
+    fmt = detect_format(request.content_type, request.args.get('format'))
+    if fmt is None:
+        return jsonify({'error': 'Content-Type 은 application/x-ndjson 또는 text/csv 여야 합니다'}), 415
+    
+    try:
+        result = import_pets_from_stream(session['user_id'], request.stream, fmt)
+    except Exception as e:
+        logging.error(f'Pet 대량 등록 오류: {e}')
+        return jsonify({'error': str(e)}), 500
+    
+    body, status = bulk_import_response(result)
+    with phase('serialize'):
+        return jsonify(body), status
+
+@app.route('/api/pets/export', methods=['GET'])
+@login_required
+def export_pets():
+    """반려동물 스트리밍 내보내기 (가져오기와 같은 형식)"""
+    
+    fmt = detect_format(None, request.args.get('format', 'ndjson'))
+    if fmt is None:
+        return jsonify({'error': 'format 은 ndjson 또는 csv 여야 합니다'}), 400
+    
+    return Response(
+        timed_stream(iter_pet_export(session['user_id'], fmt)),
+        mimetype=TRANSFER_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=pets.{fmt}'}
+    )
+
+def load_persona(conn, pet_id):
+    """반려동물 정보를 조회해 (pet_info, 시스템 프롬프트) 구성 (페르소나 캐시 미스 시)"""
+    
+    pet = conn.execute('SELECT * FROM pets WHERE id = ?', (pet_id,)).fetchone()
+    
+    # 반려동물 정보 구성
+    pet_info = {
+        'name': pet['name'],
+        'species': pet['species'],
+        'breed': pet['breed'],
+        'personality': pet['personality'],
+        'speaking_style': pet['speaking_style'],
+        'user_call': pet['user_call'],
+        'likes': pet['likes'],
+        'dislikes': pet['dislikes'],
+        'etc_info': pet['etc_info']
+    }
+    
+    return pet_info, PetPersonaGenerator.create_system_prompt(pet_info)
+
+def update_session_last_message(conn, session_id, message_id, content):
+    """세션 목록용 비정규화 컬럼(마지막 메시지/시간) 갱신"""
+    conn.execute(
+        'UPDATE chat_sessions SET last_message_time = CURRENT_TIMESTAMP, '
+        'last_message_id = ?, last_message = ? WHERE id = ?',
+        (message_id, content, session_id)
+    )
+
+def store_user_turn(conn, user_id, pet_id, user_message, access=None):
+    """반려동물/세션 확인 후 사용자 메시지 저장 (반려동물이 없으면 None)
+
+    access 는 session_store 에 캐시된 소유권 확인 결과이며, 없으면 DB 에서 확인한다.
+    응답 생성에 필요한 페르소나, 세션, 대화 문맥과 캐시에 넣을 확인 결과(access)를 dict 로 반환한다.
+    """
+    
+    with phase('db_read'):
+        # 소유권 확인, 프로필 버전과 최근 세션 조회 (페르소나는 캐시에서)
+        if access is None:
+            access = fetch_pet_access(conn, user_id, pet_id)
+            if access is None:
+                return None
+        
+        pet_info, system_prompt = persona_cache.get_or_load(
+            pet_id, access['profile_version'], lambda: load_persona(conn, pet_id)
+        )
+    
+    if access['chat_session_id']:
+        session_id = access['chat_session_id']
+    else:
+        # 새 세션 생성
+        with phase('db_write'):
+            cursor = conn.execute(
+                'INSERT INTO chat_sessions (user_id, pet_id) VALUES (?, ?)',
+                (user_id, pet_id)
             )
-            
-            # 반려동물 정보 구성
-            pet_info = {
-                'name': pet['name'],
-                'species': pet['species'],
-                'breed': pet['breed'],
-                'personality': pet['personality'],
-                'speaking_style': pet['speaking_style'],
-                'user_call': pet['user_call'],
-                'likes': pet['likes'],
-                'dislikes': pet['dislikes'],
-                'etc_info': pet['etc_info']
-            }
-            
-            # AI 응답 생성
-            ai_response = PetPersonaGenerator.generate_response(
-                pet_info, user_message, history_list
+        session_id = cursor.lastrowid
+    
+    # 토큰 예산 안의 최근 대화와 누적 요약 조회
+    with phase('db_read'):
+        summary, history_list, needs_summary = conversation_memory.load_context(conn, session_id)
+    
+    # 사용자 메시지 저장
+    with phase('db_write'):
+        cursor = conn.execute(
+            'INSERT INTO chat_messages (session_id, sender, content) VALUES (?, ?, ?)',
+            (session_id, 'user', user_message)
+        )
+        user_message_id = cursor.lastrowid
+        
+        update_session_last_message(conn, session_id, user_message_id, user_message)
+    
+    return {
+        'access': dict(access, chat_session_id=session_id),
+        'pet_info': pet_info,
+        'system_prompt': system_prompt,
+        'session_id': session_id,
+        'user_message_id': user_message_id,
+        'history': history_list,
+        'summary': summary,
+        'needs_summary': needs_summary
+    }
+
+def store_bot_turn(conn, session_id, content):
+    """AI 응답 저장 및 세션 마지막 메시지 시간 갱신 (저장된 메시지 id 반환)"""
+    
+    with phase('db_write'):
+        cursor = conn.execute(
+            'INSERT INTO chat_messages (session_id, sender, content) VALUES (?, ?, ?)',
+            (session_id, 'bot', content)
+        )
+        
+        # 세션 마지막 메시지 및 시간 업데이트
+        update_session_last_message(conn, session_id, cursor.lastrowid, content)
+    return cursor.lastrowid
+
+def sse_event(event, data):
+    """Server-Sent Events 형식의 메시지 생성"""
+    with phase('serialize'):
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# 채팅 턴 헬퍼 (동기/비동기 서버 공용, DB 저장과 LLM 호출만 각 서버가 수행)
+
+def parse_chat_message(data):
+    """메시지 전송 요청 본문에서 (user_message, pet_id) 파싱 (잘못된 값이면 ValueError)"""
+    data = data or {}
+    user_message = data.get('message', '')
+    pet_id = data.get('pet_id')
+    user_message = user_message.strip() if isinstance(user_message, str) else ''
+    
+    if not user_message or not pet_id:
+        raise ValueError('메시지와 반려동물 ID가 필요합니다')
+    
+    # 메시지 길이 제한
+    if len(user_message) > 500:
+        raise ValueError('메시지가 너무 깁니다 (최대 500자)')
+    
+    # pet_id 정수 변환 및 검증
+    try:
+        pet_id = int(pet_id)
+    except (ValueError, TypeError):
+        raise ValueError('잘못된 반려동물 ID입니다') from None
+    
+    return user_message, pet_id
+
+def fallback_reply(turn, error):
+    """AI 응답 실패 시 폴백 응답 (사용자 메시지는 이미 저장되어 있으므로 봇 응답은 기록하지 않는다)"""
+    logging.error(f'AI 응답 생성 오류 (session={turn["session_id"]}, message={turn["user_message_id"]}): {error}')
+    return {
+        'content': FALLBACK_RESPONSE,
+        'fallback': True,
+        'user_message_id': turn['user_message_id']
+    }
+
+def complete_turn(turn):
+    """AI 응답 저장 후 처리 (대화가 예산을 넘었으면 백그라운드 요약 예약)"""
+    if turn['needs_summary']:
+        conversation_memory.schedule_summary(turn['session_id'], turn['pet_info'])
+
+class ReplyStream:
+    """SSE 응답 하나의 진행 상태 (토큰 누적, 첫 토큰 시간 기록, 이벤트 생성)
+
+    두 서버의 stream_chat_reply 는 토큰을 받아 token() 으로 넘기고, 끝나면 content() 를 저장한 뒤
+    done() 을 보낸다. AI 오류는 fallback(), 저장 오류는 store_failed() 이벤트로 끝낸다.
+    """
+    
+    def __init__(self, turn):
+        self.turn = turn
+        self.started = time.monotonic()
+        self.first_token_at = None
+        self.chunks = []
+    
+    def token(self, delta):
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic()
+            stream_metrics['time_to_first_token'].observe(self.first_token_at - self.started)
+        self.chunks.append(delta)
+        return sse_event('token', {'delta': delta})
+    
+    def fallback(self, error):
+        return sse_event('done', fallback_reply(self.turn, error))
+    
+    def content(self):
+        """완성된 응답 (전체 응답 시간도 기록)"""
+        stream_metrics['total'].observe(time.monotonic() - self.started)
+        return ''.join(self.chunks).strip()
+    
+    def store_failed(self, error):
+        logging.error(f'AI 응답 저장 오류 (session={self.turn["session_id"]}): {error}')
+        return sse_event('error', {'error': '메시지 전송에 실패했습니다'})
+    
+    def done(self, ai_response):
+        complete_turn(self.turn)
+        ttft_ms = round((self.first_token_at - self.started) * 1000, 1) if self.first_token_at else None
+        logging.info(f'스트리밍 응답 완료 (session={self.turn["session_id"]}, ttft={ttft_ms}ms)')
+        return sse_event('done', {'content': ai_response, 'time_to_first_token_ms': ttft_ms})
+
+def stream_chat_reply(turn, user_message):
+    """AI 응답을 SSE 로 전달하고, 스트림 종료 후 완성된 응답을 저장"""
+    
+    reply = ReplyStream(turn)
+    try:
+        for delta in PetPersonaGenerator.stream_response(
+            turn['pet_info'], user_message, turn['history'], turn['system_prompt'], turn['summary']
+        ):
+            yield reply.token(delta)
+    except AIResponseError as e:
+        yield reply.fallback(e)
+        return
+    
+    ai_response = reply.content()
+    try:
+        pool.run_in_transaction(store_bot_turn, turn['session_id'], ai_response)
+    except sqlite3.Error as e:
+        yield reply.store_failed(e)
+        return
+    
+    yield reply.done(ai_response)
+
+@app.route('/api/chat/send', methods=['POST'])
+@login_required
+def send_chat_message():
+    """채팅 메시지 전송 및 AI 응답 생성 (stream: true 이면 SSE 로 토큰 전달)"""
+    
+    try:
+        data = request.get_json()
+        try:
+            user_message, pet_id = parse_chat_message(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # 1단계: 짧은 쓰기 트랜잭션 - 반려동물/세션 확인(캐시에 있으면 생략) 후 사용자 메시지 저장
+        user_id = session['user_id']
+        try:
+            turn = pool.run_in_transaction(
+                store_user_turn, user_id, pet_id, user_message, session_store.cached_pet_access(user_id, pet_id)
             )
-            
-            # AI 응답 저장
-            cursor.execute(
-                'INSERT INTO chat_messages (session_id, sender, content) VALUES (?, ?, ?)',
-                (session_id, 'bot', ai_response)
+        except sqlite3.Error as e:
+            logging.error(f'채팅 메시지 저장 오류: {e}')
+            return jsonify({'error': '메시지 전송에 실패했습니다'}), 500
+        
+        if turn is None:
+            return jsonify({'error': '반려동물을 찾을 수 없습니다'}), 404
+        session_store.remember_pet_access(user_id, pet_id, turn['access'])
+        
+        # 스트리밍 모드: 2~3단계를 스트림 제너레이터에서 처리
+        if data.get('stream'):
+            return Response(
+                stream_with_context(timed_stream(stream_chat_reply(turn, user_message))),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
             )
-            
-            # 세션 마지막 메시지 시간 업데이트
-            cursor.execute(
-                'UPDATE chat_sessions SET last_message_time = CURRENT_TIMESTAMP WHERE id = ?',
-                (session_id,)
+        
+        # 2단계: DB 연결 없이 AI 응답 생성
+        try:
+            ai_response = PetPersonaGenerator.request_response(
+                turn['pet_info'], user_message, turn['history'], turn['system_prompt'], turn['summary']
             )
-            
-            conn.commit()
-            return jsonify({'content': ai_response})
-            
+        except AIResponseError as e:
+            return jsonify(fallback_reply(turn, e))
+        
+        # 3단계: 짧은 쓰기 트랜잭션 - AI 응답 저장 및 세션 시간 갱신
+        try:
+            pool.run_in_transaction(store_bot_turn, turn['session_id'], ai_response)
         except sqlite3.Error as e:
-            conn.rollback()
-            logging.error(f'채팅 메시지 저장 오류: {e}')
+            logging.error(f'AI 응답 저장 오류 (session={turn["session_id"]}): {e}')
             return jsonify({'error': '메시지 전송에 실패했습니다'}), 500
-        except Exception as e:
-            logging.error(f'메시지 처리 오류: {e}')
-            return jsonify({'error': '서버 오류가 발생했습니다'}), 500
-        finally:
-            conn.close()
+        
+        complete_turn(turn)
+        with phase('serialize'):
+            return jsonify({'content': ai_response})
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -575,34 +1484,20 @@ def get_chat_history(pet_id):
     """특정 반려동물과의 최근 대화 기록 조회"""
     
     try:
-        conn = get_db_connection()
-        try:
-            # 최근 세션 조회
-            session_row = conn.execute(
-                'SELECT id FROM chat_sessions WHERE user_id = ? AND pet_id = ? ORDER BY last_message_time DESC LIMIT 1',
-                (session['user_id'], pet_id)
-            ).fetchone()
-            
-            if not session_row:
-                return jsonify({'messages': []})
-            
-            # 메시지 조회
-            messages = conn.execute(
-                'SELECT * FROM chat_messages WHERE session_id = ? ORDER BY timestamp ASC',
-                (session_row['id'],)
-            ).fetchall()
-        finally:
-            conn.close()
-        
-        messages_data = []
-        for msg in messages:
-            messages_data.append({
-                'content': msg['content'],
-                'sender': msg['sender'],
-                'timestamp': msg['timestamp']
-            })
+        before_id, limit, compact = parse_history_params(request.args)
+    except ValueError:
+        return jsonify({'error': 'before_id 와 limit 는 1 이상의 정수여야 합니다'}), 400
+    
+    try:
+        with phase('db_read'):
+            conn = get_db_connection()
+            try:
+                page = fetch_chat_history(conn, session['user_id'], pet_id, before_id, limit, compact)
+            finally:
+                conn.close()
         
-        return jsonify({'messages': messages_data})
+        with phase('serialize'):
+            return jsonify(page)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -613,33 +1508,39 @@ def get_chat_sessions():
     """사용자의 모든 채팅 세션 조회"""
     
     try:
-        conn = get_db_connection()
-        try:
-            sessions = conn.execute('''
-                SELECT cs.*, p.name as pet_name,
-                       cm.content as last_message
-                FROM chat_sessions cs
-                JOIN pets p ON cs.pet_id = p.id
-                LEFT JOIN chat_messages cm ON cm.session_id = cs.id
-                WHERE cs.user_id = ?
-                GROUP BY cs.id
-                HAVING cm.timestamp = MAX(cm.timestamp) OR cm.timestamp IS NULL
-                ORDER BY cs.last_message_time DESC
-                LIMIT 20
-            ''', (session['user_id'],)).fetchall()
-        finally:
-            conn.close()
+        with phase('db_read'):
+            conn = get_db_connection()
+            try:
+                sessions_data = fetch_chat_sessions(conn, session['user_id'])
+            finally:
+                conn.close()
         
-        sessions_data = []
-        for s in sessions:
-            sessions_data.append({
-                'pet_id': s['pet_id'],
-                'pet_name': s['pet_name'],
-                'last_message': s['last_message'] or '대화를 시작해보세요',
-                'last_message_time': s['last_message_time']
-            })
+        with phase('serialize'):
+            return jsonify({'sessions': sessions_data})
         
-        return jsonify({'sessions': sessions_data})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/chat/search', methods=['GET'])
+@login_required
+def search_chat_messages():
+    """채팅 기록 전문 검색 (사용자 범위, pet_id 로 반려동물 한정)"""
+    
+    try:
+        query, pet_id, limit, offset = parse_search_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        with phase('db_read'):
+            conn = get_db_connection()
+            try:
+                page = search_messages(conn, session['user_id'], query, pet_id, limit, offset)
+            finally:
+                conn.close()
+        
+        with phase('serialize'):
+            return jsonify(page)
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -653,20 +1554,178 @@ def save_conversation():
     # 이 엔드포인트는 추가적인 메타데이터 저장 등에 사용
     return jsonify({'success': True})
 
+def db_stats():
+    """데이터베이스 연결 풀 / 메시지 보관 통계 (동기/비동기 서버 공용)"""
+    return {'pool': pool.stats(), 'archive': chat_archiver.stats()}
+
+@app.route('/api/db/stats', methods=['GET'])
+def get_db_stats():
+    """데이터베이스 연결 풀 / 메시지 보관 통계 조회 (모니터링용)"""
+    return jsonify(db_stats())
+
+def chat_metrics():
+    """스트리밍 응답 지연시간 지표와 캐시/게이트웨이 통계 (동기/비동기 서버 공용)"""
+    metrics = {name: recorder.summary() for name, recorder in stream_metrics.items()}
+    metrics['persona_cache'] = persona_cache.stats()
+    metrics['conversation_memory'] = conversation_memory.stats()
+    metrics['llm_gateway'] = llm_gateway.stats()
+    metrics['response_cache'] = response_cache.stats()
+    metrics['rate_limit'] = rate_limiter.stats()
+    if llm_batcher is not None:
+        metrics['llm_batcher'] = llm_batcher.stats()
+    return metrics
+
+@app.route('/api/chat/metrics', methods=['GET'])
+def get_chat_metrics():
+    """스트리밍 응답 지연시간 지표 및 페르소나 캐시 통계 조회"""
+    return jsonify(chat_metrics())
+
+def register_metric_collectors(registry):
+    """기존 통계(stats())를 /metrics 의 gauge 로 내보내도록 등록"""
+    registry.register_collector('db_pool', pool.stats)
+    registry.register_collector('stream', lambda: {name: recorder.summary() for name, recorder in stream_metrics.items()})
+    registry.register_collector('persona_cache', persona_cache.stats)
+    registry.register_collector('conversation_memory', conversation_memory.stats)
+    registry.register_collector('llm_gateway', llm_gateway.stats)
+    if client:
+        registry.register_collector('llm_provider', client.stats)
+    registry.register_collector('response_cache', response_cache.stats)
+    registry.register_collector('credential_hasher', hasher.stats)
+    registry.register_collector('session_store', session_store.stats)
+    registry.register_collector('rate_limit', rate_limiter.stats)
+    registry.register_collector('profiler', slow_request_profiler.stats)
+    registry.register_collector('search_backfill', search_backfill.stats)
+    registry.register_collector('chat_archive', chat_archiver.stats)
+    if llm_batcher is not None:
+        registry.register_collector('llm_batcher', llm_batcher.stats)
+
+register_metric_collectors(metrics_registry)
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 형식 지표 (경로/단계별 지연시간 히스토그램, 캐시/게이트웨이/DB 풀 통계)"""
+    return Response(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+MIN_PASSWORD_LENGTH = 8
+
+def validate_signup_data(data):
+    """회원가입 데이터 검증 (오류 메시지 또는 None)"""
+    for field in ('username', 'email', 'password'):
+        if not isinstance(data.get(field), str) or not data[field].strip():
+            return f'{field}는 필수 항목입니다'
+    if '@' not in data['email']:
+        return '올바른 이메일 주소를 입력해주세요'
+    if len(data['password']) < MIN_PASSWORD_LENGTH:
+        return f'비밀번호는 {MIN_PASSWORD_LENGTH}자 이상이어야 합니다'
+    return None
+
+def insert_user(conn, data, password_hash):
+    """사용자 추가 (username/email 중복이면 None)"""
+    try:
+        cursor = conn.execute(
+            'INSERT INTO users (username, email, password_hash, nickname) VALUES (?, ?, ?, ?)',
+            (data['username'].strip(), data['email'].strip(), password_hash, data.get('nickname'))
+        )
+    except sqlite3.IntegrityError:
+        return None
+    return cursor.lastrowid
+
+def fetch_login_user(conn, login_id):
+    """username 또는 email 로 로그인 대상 사용자 조회"""
+    row = conn.execute(
+        'SELECT id, username, nickname, password_hash FROM users WHERE username = ? OR email = ?',
+        (login_id, login_id)
+    ).fetchone()
+    return dict(row) if row else None
+
+def store_rehashed_password(conn, user_id, old_hash, new_hash):
+    """로그인 시 재해시한 비밀번호 저장 (그 사이 비밀번호가 바뀌었으면 덮어쓰지 않음)"""
+    conn.execute(
+        'UPDATE users SET password_hash = ? WHERE id = ? AND password_hash = ?',
+        (new_hash, user_id, old_hash)
+    )
+
+def hasher_busy_response(e):
+    """해시 대기열 포화 시 503 응답"""
+    response = jsonify({'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.route('/api/auth/signup', methods=['POST'])
+def signup():
+    """회원가입"""
+    data = request.get_json(silent=True) or {}
+    error = validate_signup_data(data)
+    if error:
+        return jsonify({'error': error}), 400
+    
+    try:
+        password_hash = hasher.hash(data['password'])
+    except CredentialHasherBusy as e:
+        return hasher_busy_response(e)
+    
+    user_id = pool.run_in_transaction(insert_user, data, password_hash)
+    if user_id is None:
+        return jsonify({'error': '이미 사용 중인 아이디 또는 이메일입니다'}), 409
+    
+    start_user_session(user_id)
+    return jsonify({'success': True, 'user_id': user_id}), 201
+
+@app.route('/api/auth/login', methods=['POST'])
+def login():
+    """로그인 (username 또는 email)"""
+    data = request.get_json(silent=True) or {}
+    login_id = data.get('username') or data.get('email')
+    password = data.get('password')
+    if not isinstance(login_id, str) or not isinstance(password, str):
+        return jsonify({'error': '아이디와 비밀번호를 입력해주세요'}), 400
+    
+    conn = get_db_connection()
+    try:
+        user = fetch_login_user(conn, login_id)
+    finally:
+        conn.close()
+    
+    # 사용자가 없어도 같은 비용으로 검증해 응답 시간으로 존재 여부가 드러나지 않게 함
+    stored_hash = user['password_hash'] if user else DUMMY_PASSWORD_HASH
+    try:
+        ok, new_hash = hasher.verify(password, stored_hash)
+    except CredentialHasherBusy as e:
+        return hasher_busy_response(e)
+    
+    if not user or not ok:
+        return jsonify({'error': '아이디 또는 비밀번호가 올바르지 않습니다'}), 401
+    
+    if new_hash:
+        pool.run_in_transaction(store_rehashed_password, user['id'], stored_hash, new_hash)
+    
+    start_user_session(user['id'])
+    return jsonify({'success': True, 'user_id': user['id'], 'nickname': user['nickname']})
+
+@app.route('/api/auth/logout', methods=['POST'])
+def logout():
+    """로그아웃 (서버 측 세션도 삭제하므로 같은 쿠키로 다시 로그인되지 않음)"""
+    end_user_session()
+    return jsonify({'success': True})
+
+@app.route('/api/auth/stats', methods=['GET'])
+def get_auth_stats():
+    """비밀번호 해시 실행기 통계 조회"""
+    return jsonify(hasher.stats())
+
 # 임시 로그인 세션 설정 (개발용)
 @app.route('/api/dev/login', methods=['POST'])
 def dev_login():
     """개발용 임시 로그인"""
     data = request.get_json()
     user_id = data.get('user_id', 1)  # 기본값 1
-    session['user_id'] = user_id
+    if not start_user_session(user_id):
+        return jsonify({'error': '사용자를 찾을 수 없습니다'}), 404
     return jsonify({'success': True, 'user_id': user_id})
 
-if __name__ == '__main__':
-    # 데이터베이스 초기화
-    init_db()
-    
-    # 개발용 샘플 데이터 추가
+def seed_sample_data():
+    """개발용 샘플 데이터 추가"""
     conn = get_db_connection()
     cursor = conn.cursor()
     
@@ -698,6 +1757,14 @@ if __name__ == '__main__':
     
     conn.commit()
     conn.close()
+
+if __name__ == '__main__':
+    # 데이터베이스 초기화
+    init_db()
+    start_background_jobs()
+    
+    # 개발용 샘플 데이터 추가
+    seed_sample_data()
     
     print("반려동물 챗봇 서버가 시작됩니다...")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,592 @@
+# asgi_app.py
+"""비동기(ASGI) 서빙 모드
+
+app.py 와 동일한 API 계약을 asyncio 기반으로 제공한다. LLM 대기 중에는 스레드를 점유하지
+않으므로 단일 프로세스에서 많은 동시 대화를 처리할 수 있다.
+
+실행:
+    hypercorn asgi_app:app --bind 0.0.0.0:5000
+    또는 python asgi_app.py
+"""
+from quart import Quart, request, jsonify, session, Response
+from quart_cors import cors
+from functools import wraps
+import asyncio
+import contextvars
+import sqlite3
+import logging
+import re
+import time
+import os
+
+from app import (
+    init_db, start_background_jobs, seed_sample_data, fetch_user_pets, fetch_chat_history, fetch_chat_sessions,
+    parse_history_params, validate_signup_data, insert_user, fetch_login_user, store_rehashed_password,
+    validate_pet_data, insert_pet, update_pet_profile, persona_cache, session_store,
+    import_pets_from_stream, bulk_import_response, fetch_pet_export_batch, search_backfill, chat_archiver,
+    store_user_turn, store_bot_turn, parse_chat_message, fallback_reply, complete_turn, ReplyStream,
+    db_stats, chat_metrics, llm_gateway, llm_batcher, metrics_registry, slow_request_profiler,
+    rate_limiter, rate_limit_budget, PetPersonaGenerator, AIResponseError,
+    CHAT_COMPLETION_OPTIONS, CHAT_STREAM_OPTIONS
+)
+from app import app as flask_app, index as index_page
+from database import pool, AsyncConnectionPool
+from lazy_provider import LazyProvider
+from credentials import hasher, CredentialHasherBusy, DUMMY_PASSWORD_HASH
+from message_search import parse_search_params, search_messages
+from session_store import insert_session, delete_session
+from rate_limit import RateLimitExceeded
+from pet_transfer import (
+    detect_format, export_header, serialize_rows, QueueStream, TRANSFER_MIMETYPES, PET_EXPORT_BATCH_SIZE
+)
+from request_timing import instrument_quart, phase, record_phase, timed_async_stream, PROMETHEUS_CONTENT_TYPE
+
+app = Quart(__name__)
+# Flask 서버와 같은 비밀키를 사용해 세션 쿠키를 공유
+app.secret_key = flask_app.secret_key
+# Flask-CORS(supports_credentials) 와 같이 요청 Origin 을 그대로 허용
+app = cors(app, allow_credentials=True, allow_origin=os.getenv('CORS_ORIGIN') or re.compile(r'.*'))
+
+db = AsyncConnectionPool(pool)
+
+# Flask 서버와 같은 지표 저장소에 경로/단계별 지연시간 기록
+instrument_quart(app, metrics_registry, 'chatbot_api', slow_request_profiler)
+
+
+@app.before_request
+async def apply_rate_limit():
+    """Flask 서버와 같은 예산/한도로 요청 한도 검사 (RATE_LIMIT_BACKEND=sqlite 면 두 서버가 한도를 공유)"""
+    budget = rate_limit_budget(request.endpoint)
+    if budget is None:
+        return None
+    try:
+        await rate_limiter.acquire_async(budget, session.get('user_id'), request.remote_addr)
+    except RateLimitExceeded as e:
+        return jsonify({'error': str(e), 'retry_after': e.retry_after}), 429, {'Retry-After': str(e.retry_after)}
+    return None
+
+
+def create_async_openai_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(api_key=openai_api_key, max_retries=0)
+
+# 비동기 OpenAI 클라이언트 (OPENAI_BASE_URL 로 호환 서버 지정 가능)
+openai_api_key = os.getenv('OPENAI_API_KEY')
+# 재시도는 llm_gateway 가 마감시간 안에서 처리, 생성은 LLM_PRELOAD 시점까지 미룸
+async_client = LazyProvider('openai_async', create_async_openai_client) if openai_api_key else None
+if async_client:
+    metrics_registry.register_collector('llm_provider_async', async_client.stats)
+
+
+async def start_user_session(user_id):
+    """서버 측 세션을 만들고 쿠키 세션에 토큰 저장 (사용자가 없으면 False)"""
+    token, token_hash, expires_at = session_store.new_session(user_id)
+    if await db.run_in_transaction(insert_session, token_hash, user_id, expires_at) is None:
+        return False
+    session_store.remember_session(token_hash, user_id, expires_at)
+    session.clear()
+    session['sid'] = token
+    session['user_id'] = user_id
+    return True
+
+
+async def end_user_session():
+    """서버 측 세션 삭제 후 쿠키 세션 비우기"""
+    token_hash = session_store.forget_session(session.get('sid'))
+    if token_hash:
+        await db.run_in_transaction(delete_session, token_hash)
+    session.clear()
+
+
+def login_required(f):
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        # 서버 측 세션 도입 전에 발급된 쿠키 (user_id 만 있음) 는 다시 로그인해야 함
+        token = session.get('sid')
+        if token and session_store.revocation_check_due():
+            await db.run(session_store.check_revocations)
+        user_id = session_store.cached_user(token)
+        if user_id is None and token:
+            user_id = await db.run(session_store.load_user, token)
+        if user_id is None:
+            session.clear()
+            return jsonify({'error': '로그인이 필요합니다'}), 401
+        if session.get('user_id') != user_id:
+            session['user_id'] = user_id
+        return await f(*args, **kwargs)
+    return decorated_function
+
+
+async def request_response(pet_info, user_message, conversation_history=None, system_prompt=None, summary=None):
+    """비동기 AI 응답 생성 (실패 시 AIResponseError 발생)"""
+
+    if not async_client:
+        return PetPersonaGenerator.dummy_response(pet_info)
+
+    try:
+        prompt = PetPersonaGenerator.prepare_prompt(pet_info, user_message, conversation_history, system_prompt, summary)
+        if prompt['cached'] is not None:
+            return prompt['cached']
+
+        if llm_batcher is not None:
+            # 동기 서버와 같은 배치 디스패처로 묶어서 전송
+            with phase('llm_wait'):
+                content = await llm_gateway.call_async(
+                    lambda timeout: llm_batcher.submit_async(prompt['messages'], timeout)
+                )
+        else:
+            with phase('llm_wait'):
+                response = await llm_gateway.call_async(lambda timeout: async_client.chat.completions.create(
+                    messages=prompt['messages'],
+                    timeout=timeout,
+                    **CHAT_COMPLETION_OPTIONS
+                ))
+            content = PetPersonaGenerator.response_content(response)
+    except Exception as e:
+        raise AIResponseError(str(e)) from e
+
+    PetPersonaGenerator.cache_reply(prompt, user_message, content)
+    return content
+
+
+async def stream_response(pet_info, user_message, conversation_history=None, system_prompt=None, summary=None):
+    """비동기 토큰 스트리밍 제너레이터 (실패 시 AIResponseError 발생)"""
+
+    if not async_client:
+        yield PetPersonaGenerator.dummy_response(pet_info)
+        return
+
+    prompt = PetPersonaGenerator.prepare_prompt(pet_info, user_message, conversation_history, system_prompt, summary)
+    if prompt['cached'] is not None:
+        yield prompt['cached']
+        return
+
+    stream = llm_gateway.stream_async(lambda timeout: async_client.chat.completions.create(
+        messages=prompt['messages'],
+        timeout=timeout,
+        **CHAT_STREAM_OPTIONS
+    ))
+
+    chunks = []
+    try:
+        # 스트림 열기와 청크 사이 대기 시간을 LLM 대기로 기록
+        waiting_since = time.perf_counter()
+        async for chunk in stream:
+            record_phase('llm_wait', time.perf_counter() - waiting_since)
+            delta = PetPersonaGenerator.chunk_delta(chunk)
+            if delta:
+                chunks.append(delta)
+                yield delta
+            waiting_since = time.perf_counter()
+    except Exception as e:
+        raise AIResponseError(str(e)) from e
+    else:
+        PetPersonaGenerator.cache_reply(prompt, user_message, ''.join(chunks).strip())
+    finally:
+        await stream.aclose()
+
+
+async def stream_chat_reply(turn, user_message):
+    """AI 응답을 SSE 로 전달하고, 스트림 종료 후 완성된 응답을 저장"""
+
+    reply = ReplyStream(turn)
+    try:
+        async for delta in stream_response(
+            turn['pet_info'], user_message, turn['history'], turn['system_prompt'], turn['summary']
+        ):
+            yield reply.token(delta)
+    except AIResponseError as e:
+        yield reply.fallback(e)
+        return
+
+    ai_response = reply.content()
+    try:
+        await db.run_in_transaction(store_bot_turn, turn['session_id'], ai_response)
+    except sqlite3.Error as e:
+        yield reply.store_failed(e)
+        return
+
+    yield reply.done(ai_response)
+
+
+@app.before_serving
+async def startup():
+    """서버 시작 시 데이터베이스 초기화 및 백그라운드 작업 시작"""
+    init_db()
+    start_background_jobs()
+    if async_client:
+        async_client.start_preload()
+
+
+@app.after_serving
+async def shutdown():
+    """서버 종료 시 검색 색인 백필 / 메시지 보관 작업, DB 실행 스레드 및 비밀번호 해시 프로세스 정리"""
+    search_backfill.stop()
+    chat_archiver.stop()
+    db.close()
+    hasher.shutdown()
+
+
+@app.route('/')
+async def index():
+    """메인 페이지 (Flask 서버와 같은 API 테스트 페이지)"""
+    return index_page()
+
+
+@app.route('/api/pets', methods=['GET'])
+@login_required
+async def get_user_pets():
+    """사용자의 반려동물 목록 조회"""
+
+    try:
+        with phase('db_read'):
+            pets_data = await db.run(fetch_user_pets, session['user_id'])
+        with phase('serialize'):
+            return jsonify({'pets': pets_data})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/pets', methods=['POST'])
+@login_required
+async def add_pet():
+    """새 반려동물 등록"""
+
+    try:
+        data = await request.get_json()
+
+        error = validate_pet_data(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        try:
+            pet_id = await db.run_in_transaction(insert_pet, session['user_id'], data)
+        except sqlite3.Error as e:
+            logging.error(f'Pet 등록 오류: {e}')
+            return jsonify({'error': '반려동물 등록에 실패했습니다'}), 500
+
+        persona_cache.invalidate(pet_id)
+        return jsonify({'success': True, 'pet_id': pet_id})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/pets/<int:pet_id>', methods=['PUT'])
+@login_required
+async def update_pet(pet_id):
+    """반려동물 정보 수정"""
+
+    try:
+        data = await request.get_json()
+
+        error = validate_pet_data(data)
+        if error:
+            return jsonify({'error': error}), 400
+
+        try:
+            updated = await db.run_in_transaction(update_pet_profile, session['user_id'], pet_id, data)
+        except sqlite3.Error as e:
+            logging.error(f'Pet 수정 오류: {e}')
+            return jsonify({'error': '반려동물 정보 수정에 실패했습니다'}), 500
+
+        if not updated:
+            return jsonify({'error': '반려동물을 찾을 수 없습니다'}), 404
+
+        persona_cache.invalidate(pet_id)
+        session_store.invalidate_pet(session['user_id'], pet_id)
+        return jsonify({'success': True, 'pet_id': pet_id})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+def import_pets_from_queue(user_id, stream, fmt):
+    """작업 스레드에서 QueueStream 을 읽으며 가져오기 (끝나면 스트림을 닫아 남은 본문은 버림)"""
+    try:
+        return import_pets_from_stream(user_id, stream, fmt)
+    finally:
+        stream.close()
+
+
+@app.route('/api/pets/import', methods=['POST'])
+@login_required
+async def import_pets():
+    """반려동물 대량 등록 (NDJSON / CSV 스트림, 행별 오류 보고)"""
+
+    fmt = detect_format(request.content_type, request.args.get('format'))
+    if fmt is None:
+        return jsonify({'error': 'Content-Type 은 application/x-ndjson 또는 text/csv 여야 합니다'}), 415
+
+    # 파싱/검증/청크 저장은 작업 스레드에서 하고, 이벤트 루프는 본문 청크를 받아 넘기기만 한다
+    loop = asyncio.get_running_loop()
+    stream = QueueStream()
+    context = contextvars.copy_context()
+    worker = loop.run_in_executor(None, context.run, import_pets_from_queue, session['user_id'], stream, fmt)
+    try:
+        async for chunk in request.body:
+            if worker.done():
+                break
+            await loop.run_in_executor(None, stream.feed, chunk)
+    finally:
+        await loop.run_in_executor(None, stream.feed, None)
+
+    try:
+        result = await worker
+    except Exception as e:
+        logging.error(f'Pet 대량 등록 오류: {e}')
+        return jsonify({'error': str(e)}), 500
+
+    body, status = bulk_import_response(result)
+    with phase('serialize'):
+        return jsonify(body), status
+
+
+async def iter_pet_export(user_id, fmt):
+    """반려동물을 배치 단위로 읽어 NDJSON / CSV 로 내보냄"""
+    header = export_header(fmt)
+    if header:
+        yield header
+    after_id = 0
+    while True:
+        rows = await db.run(fetch_pet_export_batch, user_id, after_id)
+        if not rows:
+            return
+        yield serialize_rows(rows, fmt)
+        if len(rows) < PET_EXPORT_BATCH_SIZE:
+            return
+        after_id = rows[-1]['id']
+
+
+@app.route('/api/pets/export', methods=['GET'])
+@login_required
+async def export_pets():
+    """반려동물 스트리밍 내보내기 (가져오기와 같은 형식)"""
+
+    fmt = detect_format(None, request.args.get('format', 'ndjson'))
+    if fmt is None:
+        return jsonify({'error': 'format 은 ndjson 또는 csv 여야 합니다'}), 400
+
+    return Response(
+        timed_async_stream(iter_pet_export(session['user_id'], fmt)),
+        mimetype=TRANSFER_MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename=pets.{fmt}'}
+    )
+
+
+@app.route('/api/chat/send', methods=['POST'])
+@login_required
+async def send_chat_message():
+    """채팅 메시지 전송 및 AI 응답 생성 (stream: true 이면 SSE 로 토큰 전달)"""
+
+    try:
+        data = await request.get_json()
+        try:
+            user_message, pet_id = parse_chat_message(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        # 1단계: 짧은 쓰기 트랜잭션 - 반려동물/세션 확인(캐시에 있으면 생략) 후 사용자 메시지 저장
+        user_id = session['user_id']
+        try:
+            turn = await db.run_in_transaction(
+                store_user_turn, user_id, pet_id, user_message, session_store.cached_pet_access(user_id, pet_id)
+            )
+        except sqlite3.Error as e:
+            logging.error(f'채팅 메시지 저장 오류: {e}')
+            return jsonify({'error': '메시지 전송에 실패했습니다'}), 500
+
+        if turn is None:
+            return jsonify({'error': '반려동물을 찾을 수 없습니다'}), 404
+        session_store.remember_pet_access(user_id, pet_id, turn['access'])
+
+        if data.get('stream'):
+            return Response(
+                timed_async_stream(stream_chat_reply(turn, user_message)),
+                mimetype='text/event-stream',
+                headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+            )
+
+        # 2단계: 이벤트 루프에서 AI 응답 대기 (스레드/DB 연결 점유 없음)
+        try:
+            ai_response = await request_response(
+                turn['pet_info'], user_message, turn['history'], turn['system_prompt'], turn['summary']
+            )
+        except AIResponseError as e:
+            return jsonify(fallback_reply(turn, e))
+
+        # 3단계: 짧은 쓰기 트랜잭션 - AI 응답 저장 및 세션 시간 갱신
+        try:
+            await db.run_in_transaction(store_bot_turn, turn['session_id'], ai_response)
+        except sqlite3.Error as e:
+            logging.error(f'AI 응답 저장 오류 (session={turn["session_id"]}): {e}')
+            return jsonify({'error': '메시지 전송에 실패했습니다'}), 500
+
+        complete_turn(turn)
+        with phase('serialize'):
+            return jsonify({'content': ai_response})
+
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/chat/history/<int:pet_id>', methods=['GET'])
+@login_required
+async def get_chat_history(pet_id):
+    """특정 반려동물과의 최근 대화 기록 조회"""
+
+    try:
+        before_id, limit, compact = parse_history_params(request.args)
+    except ValueError:
+        return jsonify({'error': 'before_id 와 limit 는 1 이상의 정수여야 합니다'}), 400
+
+    try:
+        with phase('db_read'):
+            page = await db.run(fetch_chat_history, session['user_id'], pet_id, before_id, limit, compact)
+        with phase('serialize'):
+            return jsonify(page)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/chat/sessions', methods=['GET'])
+@login_required
+async def get_chat_sessions():
+    """사용자의 모든 채팅 세션 조회"""
+
+    try:
+        with phase('db_read'):
+            sessions_data = await db.run(fetch_chat_sessions, session['user_id'])
+        with phase('serialize'):
+            return jsonify({'sessions': sessions_data})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/chat/search', methods=['GET'])
+@login_required
+async def search_chat_messages():
+    """채팅 기록 전문 검색 (사용자 범위, pet_id 로 반려동물 한정)"""
+
+    try:
+        query, pet_id, limit, offset = parse_search_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with phase('db_read'):
+            page = await db.run(search_messages, session['user_id'], query, pet_id, limit, offset)
+        with phase('serialize'):
+            return jsonify(page)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/chat/save', methods=['POST'])
+@login_required
+async def save_conversation():
+    """대화 저장 (메시지 전송 시 자동으로 저장되므로 Flask 서버와 같이 성공만 응답)"""
+    return jsonify({'success': True})
+
+
+@app.route('/api/db/stats', methods=['GET'])
+async def get_db_stats():
+    """데이터베이스 연결 풀 / 메시지 보관 통계 조회 (모니터링용)"""
+    return jsonify(db_stats())
+
+
+@app.route('/api/chat/metrics', methods=['GET'])
+async def get_chat_metrics():
+    """스트리밍 응답 지연시간 지표 및 페르소나 캐시 통계 조회"""
+    return jsonify(chat_metrics())
+
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    """Prometheus 형식 지표 (경로/단계별 지연시간 히스토그램, 캐시/게이트웨이/DB 풀 통계)"""
+    return Response(metrics_registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def hasher_busy_response(e):
+    """해시 대기열 포화 시 503 응답"""
+    return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
+
+
+@app.route('/api/auth/signup', methods=['POST'])
+async def signup():
+    """회원가입"""
+    data = await request.get_json(silent=True) or {}
+    error = validate_signup_data(data)
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        password_hash = await hasher.hash_async(data['password'])
+    except CredentialHasherBusy as e:
+        return hasher_busy_response(e)
+
+    user_id = await db.run_in_transaction(insert_user, data, password_hash)
+    if user_id is None:
+        return jsonify({'error': '이미 사용 중인 아이디 또는 이메일입니다'}), 409
+
+    await start_user_session(user_id)
+    return jsonify({'success': True, 'user_id': user_id}), 201
+
+
+@app.route('/api/auth/login', methods=['POST'])
+async def login():
+    """로그인 (username 또는 email)"""
+    data = await request.get_json(silent=True) or {}
+    login_id = data.get('username') or data.get('email')
+    password = data.get('password')
+    if not isinstance(login_id, str) or not isinstance(password, str):
+        return jsonify({'error': '아이디와 비밀번호를 입력해주세요'}), 400
+
+    user = await db.run(fetch_login_user, login_id)
+
+    # 사용자가 없어도 같은 비용으로 검증해 응답 시간으로 존재 여부가 드러나지 않게 함
+    stored_hash = user['password_hash'] if user else DUMMY_PASSWORD_HASH
+    try:
+        ok, new_hash = await hasher.verify_async(password, stored_hash)
+    except CredentialHasherBusy as e:
+        return hasher_busy_response(e)
+
+    if not user or not ok:
+        return jsonify({'error': '아이디 또는 비밀번호가 올바르지 않습니다'}), 401
+
+    if new_hash:
+        await db.run_in_transaction(store_rehashed_password, user['id'], stored_hash, new_hash)
+
+    await start_user_session(user['id'])
+    return jsonify({'success': True, 'user_id': user['id'], 'nickname': user['nickname']})
+
+
+@app.route('/api/auth/logout', methods=['POST'])
+async def logout():
+    """로그아웃 (서버 측 세션도 삭제하므로 같은 쿠키로 다시 로그인되지 않음)"""
+    await end_user_session()
+    return jsonify({'success': True})
+
+
+@app.route('/api/auth/stats', methods=['GET'])
+async def get_auth_stats():
+    """비밀번호 해시 실행기 통계 조회"""
+    return jsonify(hasher.stats())
+
+
+@app.route('/api/dev/login', methods=['POST'])
+async def dev_login():
+    """개발용 임시 로그인"""
+    data = await request.get_json()
+    user_id = data.get('user_id', 1)  # 기본값 1
+    if not await start_user_session(user_id):
+        return jsonify({'error': '사용자를 찾을 수 없습니다'}), 404
+    return jsonify({'success': True, 'user_id': user_id})
+
+
+if __name__ == '__main__':
+    init_db()
+    seed_sample_data()
+
+    print("반려동물 챗봇 비동기 서버가 시작됩니다...")
+    app.run(host='0.0.0.0', port=int(os.getenv('PORT', '5000')))
@@ -0,0 +1,406 @@
+# chat_archive.py
+"""채팅 메시지 hot/cold 계층화와 DB 공간 회수
+
+오래된 메시지를 세션별로 묶어 zlib 압축 JSON 블롭(chat_message_archive)으로 옮기고 chat_messages 에서 지운다.
+chat_messages 와 그 인덱스가 최근 대화만큼만 남으므로 자주 읽는 페이지가 작아져 캐시에 머문다.
+보관된 메시지는 fetch_chat_history 가 최근 메시지를 다 읽은 뒤 이어서 블롭에서 읽어 준다.
+
+보관 대상은 세션별로 다음을 모두 만족하는 가장 오래된 메시지들이다.
+    - CHAT_ARCHIVE_AFTER_DAYS 보다 오래됨
+    - 세션의 최근 CHAT_ARCHIVE_KEEP_RECENT 개에 들지 않음 (프롬프트 대화 창)
+    - 대화 요약(summary_until_id)에 이미 반영됨 (CHAT_ARCHIVE_REQUIRE_SUMMARY=1 일 때)
+옮긴 메시지의 id 와 세션은 chat_archived_messages 에 남기고, 색인 삭제 트리거가 이 id 들을 건너뛰어
+FTS 행이 그대로 남으므로 전문 검색은 보관된 메시지도 찾는다 (본문은 search_messages 가 블롭에서 읽음).
+색인 크기는 줄지 않지만 메시지 본문과 chat_messages 인덱스는 블롭으로 옮겨 간다.
+
+한 번 돌 때마다 FTS 색인 세그먼트를 조금 병합하고, auto_vacuum=INCREMENTAL 이면 빈 페이지를 나누어 파일에서
+잘라 내며 회수한 공간을 보고한다. 기존 DB 는 한 번 오프라인으로 --enable-incremental-vacuum 을 실행해야 한다.
+
+실행:
+    python chat_archive.py --stats
+    python chat_archive.py --once --after-days 30
+    python chat_archive.py --enable-incremental-vacuum    # 서버를 멈추고 실행 (전체 VACUUM)
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+
+CHAT_ARCHIVE_ENABLED = os.getenv('CHAT_ARCHIVE_ENABLED', '0') == '1'
+CHAT_ARCHIVE_AFTER_DAYS = float(os.getenv('CHAT_ARCHIVE_AFTER_DAYS', '90'))
+CHAT_ARCHIVE_KEEP_RECENT = int(os.getenv('CHAT_ARCHIVE_KEEP_RECENT', '100'))
+CHAT_ARCHIVE_REQUIRE_SUMMARY = os.getenv('CHAT_ARCHIVE_REQUIRE_SUMMARY', '1') == '1'
+CHAT_ARCHIVE_CHUNK_MESSAGES = int(os.getenv('CHAT_ARCHIVE_CHUNK_MESSAGES', '500'))
+CHAT_ARCHIVE_INTERVAL = float(os.getenv('CHAT_ARCHIVE_INTERVAL', '3600'))
+# 트랜잭션 사이에 쉬어 채팅 쓰기가 잠금을 얻을 틈을 줌 (초)
+CHAT_ARCHIVE_PAUSE = float(os.getenv('CHAT_ARCHIVE_PAUSE', '0.02'))
+CHAT_ARCHIVE_SESSION_BATCH = 200
+VACUUM_PAGES_PER_STEP = int(os.getenv('VACUUM_PAGES_PER_STEP', '1000'))
+FTS_MERGE_PAGES = 500
+
+AUTO_VACUUM_MODES = {0: 'none', 1: 'full', 2: 'incremental'}
+SQLITE_MAX_ROWID = 2 ** 63 - 1
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def encode_chunk(rows):
+    """메시지 행 목록을 압축 블롭으로 변환 (블롭, 압축 전 바이트 수)"""
+    raw = json.dumps(
+        [[row['id'], row['sender'], row['content'], row['timestamp']] for row in rows],
+        ensure_ascii=False, separators=(',', ':')
+    ).encode('utf-8')
+    return zlib.compress(raw, 6), len(raw)
+
+
+def decode_chunk(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+def load_archived_messages(conn, session_id, before_id, limit):
+    """보관된 메시지 중 before_id 보다 오래된 최근 limit 개를 최신순 dict 목록으로 반환"""
+    messages = []
+    chunks = conn.execute(
+        'SELECT data FROM chat_message_archive WHERE session_id = ? AND first_id < ? ORDER BY last_id DESC',
+        (session_id, before_id)
+    )
+    for chunk in chunks:
+        for message_id, sender, content, timestamp in reversed(decode_chunk(chunk['data'])):
+            if message_id >= before_id:
+                continue
+            messages.append({'id': message_id, 'sender': sender, 'content': content, 'timestamp': timestamp})
+            if len(messages) >= limit:
+                return messages
+    return messages
+
+
+def load_archived_by_ids(conn, session_id, message_ids):
+    """세션의 보관된 메시지 중 message_ids 를 {id: dict} 로 반환 (검색 결과 본문용)"""
+    wanted = set(message_ids)
+    found = {}
+    chunks = conn.execute(
+        'SELECT data FROM chat_message_archive WHERE session_id = ? AND first_id <= ? AND last_id >= ?',
+        (session_id, max(wanted), min(wanted))
+    )
+    for chunk in chunks:
+        for message_id, sender, content, timestamp in decode_chunk(chunk['data']):
+            if message_id in wanted:
+                found[message_id] = {'id': message_id, 'sender': sender, 'content': content, 'timestamp': timestamp}
+    return found
+
+
+def register_archived(conn, session_id, messages, index_ids):
+    """보관한 메시지 [id, sender, content, timestamp] 를 검색 대상으로 등록
+
+    chat_archived_messages 에 먼저 넣어야 뒤이은 DELETE 에서 색인 삭제 트리거가 FTS 행을 남긴다.
+    index_ids 는 아직 FTS 에 없는 메시지 id 로, 여기서 색인한다.
+    """
+    conn.executemany('INSERT OR IGNORE INTO chat_archived_messages (id, session_id) VALUES (?, ?)',
+                     [(message[0], session_id) for message in messages])
+    conn.executemany('INSERT INTO chat_messages_fts (rowid, content) VALUES (?, ?)',
+                     [(message[0], message[2]) for message in messages if message[0] in index_ids])
+
+
+def unindexed_ids(conn, message_ids):
+    """백필이 아직 색인하지 않은 범위(until_id 이하, indexed_upto 초과)의 id"""
+    state = conn.execute('SELECT until_id, indexed_upto FROM chat_search_backfill WHERE id = 1').fetchone()
+    if state is None:
+        return set()
+    return {message_id for message_id in message_ids if state[1] < message_id <= state[0]}
+
+
+def index_unregistered_chunks(conn, limit=CHAT_ARCHIVE_SESSION_BATCH):
+    """검색 대상으로 등록되지 않은 보관 묶음을 최대 limit 개 색인 (색인한 묶음 수, run_in_transaction 용)
+
+    마이그레이션 8 이전에 보관한 메시지는 색인 삭제 트리거로 FTS 에서 빠졌으므로 다시 넣는다.
+    묶음의 첫 메시지가 등록되어 있으면 묶음 전체가 등록된 것이다.
+    """
+    chunks = conn.execute('''
+        SELECT session_id, data FROM chat_message_archive a
+        WHERE NOT EXISTS (SELECT 1 FROM chat_archived_messages WHERE id = a.first_id)
+        LIMIT ?
+    ''', (limit,)).fetchall()
+    for chunk in chunks:
+        messages = decode_chunk(chunk['data'])
+        register_archived(conn, chunk['session_id'], messages, {message[0] for message in messages})
+    return len(chunks)
+
+
+def archive_session(conn, session_id, cutoff, keep_recent=CHAT_ARCHIVE_KEEP_RECENT,
+                    require_summary=CHAT_ARCHIVE_REQUIRE_SUMMARY, chunk_size=CHAT_ARCHIVE_CHUNK_MESSAGES):
+    """세션의 보관 대상 메시지를 최대 chunk_size 개 블롭 하나로 옮김 (옮긴 결과 dict, 없으면 None)
+
+    run_in_transaction 으로 실행하므로 블롭 저장, 검색 대상 등록, 메시지 삭제, archived_until_id 갱신이
+    함께 반영된다.
+    """
+    session_row = conn.execute(
+        'SELECT archived_until_id, summary_until_id FROM chat_sessions WHERE id = ?', (session_id,)
+    ).fetchone()
+    if session_row is None:
+        return None
+
+    boundary = session_row['summary_until_id'] if require_summary else SQLITE_MAX_ROWID
+    if keep_recent > 0:
+        keep_row = conn.execute(
+            'SELECT id FROM chat_messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?',
+            (session_id, keep_recent - 1)
+        ).fetchone()
+        if keep_row is None:
+            return None
+        boundary = min(boundary, keep_row['id'] - 1)
+
+    candidates = conn.execute(
+        'SELECT id, sender, content, timestamp FROM chat_messages '
+        'WHERE session_id = ? AND id > ? AND id <= ? ORDER BY id LIMIT ?',
+        (session_id, session_row['archived_until_id'], boundary, chunk_size)
+    ).fetchall()
+    # 세션 안에서 오래된 앞부분만 (중간에 최근 메시지가 끼면 거기서 멈춤)
+    rows = list(itertools.takewhile(lambda row: row['timestamp'] < cutoff, candidates))
+    if not rows:
+        return None
+
+    blob, raw_bytes = encode_chunk(rows)
+    first_id, last_id = rows[0]['id'], rows[-1]['id']
+    conn.execute(
+        'INSERT INTO chat_message_archive (session_id, first_id, last_id, message_count, raw_bytes, data) '
+        'VALUES (?, ?, ?, ?, ?, ?)',
+        (session_id, first_id, last_id, len(rows), raw_bytes, blob)
+    )
+    messages = [[row['id'], row['sender'], row['content'], row['timestamp']] for row in rows]
+    register_archived(conn, session_id, messages, unindexed_ids(conn, [row['id'] for row in rows]))
+    conn.execute('DELETE FROM chat_messages WHERE session_id = ? AND id >= ? AND id <= ?',
+                 (session_id, first_id, last_id))
+    conn.execute('UPDATE chat_sessions SET archived_until_id = ? WHERE id = ?', (last_id, session_id))
+    return {'messages': len(rows), 'raw_bytes': raw_bytes, 'compressed_bytes': len(blob)}
+
+
+def space_usage(conn):
+    """DB 파일 페이지 사용량과 보관 블롭 크기"""
+    page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+    page_count = conn.execute('PRAGMA page_count').fetchone()[0]
+    freelist_count = conn.execute('PRAGMA freelist_count').fetchone()[0]
+    archive = conn.execute(
+        'SELECT COUNT(*), COALESCE(SUM(message_count), 0), COALESCE(SUM(length(data)), 0) FROM chat_message_archive'
+    ).fetchone()
+    return {
+        'auto_vacuum': AUTO_VACUUM_MODES.get(conn.execute('PRAGMA auto_vacuum').fetchone()[0], 'unknown'),
+        'page_size': page_size,
+        'db_bytes': page_count * page_size,
+        'free_bytes': freelist_count * page_size,
+        'archive_chunks': archive[0],
+        'archived_messages': archive[1],
+        'archive_bytes': archive[2],
+    }
+
+
+class ChatArchiver:
+    """오래된 메시지 보관과 점진적 VACUUM 을 주기적으로 실행하는 백그라운드 작업"""
+
+    def __init__(self, pool, after_days=CHAT_ARCHIVE_AFTER_DAYS, keep_recent=CHAT_ARCHIVE_KEEP_RECENT,
+                 require_summary=CHAT_ARCHIVE_REQUIRE_SUMMARY, chunk_size=CHAT_ARCHIVE_CHUNK_MESSAGES,
+                 interval=CHAT_ARCHIVE_INTERVAL, pause=CHAT_ARCHIVE_PAUSE):
+        self.pool = pool
+        self.after_days = after_days
+        self.keep_recent = keep_recent
+        self.require_summary = require_summary
+        self.chunk_size = chunk_size
+        self.interval = interval
+        self.pause = pause
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {
+            'rounds': 0,
+            'archived_messages': 0,
+            'archived_chunks': 0,
+            'raw_bytes': 0,
+            'compressed_bytes': 0,
+            'reclaimed_bytes': 0,
+            'errors': 0,
+        }
+        self._last_report = None
+
+    def _candidate_sessions(self, after_session_id, cutoff):
+        """세션 id 순으로 한 묶음을 훑어 (마지막 세션 id, 훑은 세션 수, 보관할 메시지가 있을 수 있는 세션 목록)
+
+        미보관 메시지 중 가장 오래된 것이 cutoff 이전인 세션만 쓰기 트랜잭션을 연다.
+        """
+        with self.pool.connection() as conn:
+            rows = conn.execute('''
+                SELECT s.id, (
+                    SELECT m.timestamp FROM chat_messages m
+                    WHERE m.session_id = s.id AND m.id > s.archived_until_id
+                    ORDER BY m.id LIMIT 1
+                ) AS oldest
+                FROM chat_sessions s
+                WHERE s.id > ?
+                ORDER BY s.id
+                LIMIT ?
+            ''', (after_session_id, CHAT_ARCHIVE_SESSION_BATCH)).fetchall()
+        if not rows:
+            return None, 0, []
+        candidates = [row['id'] for row in rows if row['oldest'] is not None and row['oldest'] < cutoff]
+        return rows[-1]['id'], len(rows), candidates
+
+    def archive_old_messages(self, cutoff):
+        """모든 세션의 보관 대상 메시지를 옮기고 집계 반환"""
+        totals = {'sessions_scanned': 0, 'sessions_archived': 0, 'archived_messages': 0, 'archived_chunks': 0,
+                  'raw_bytes': 0, 'compressed_bytes': 0}
+        after_session_id = 0
+        while not self._stop.is_set():
+            last_session_id, scanned, candidates = self._candidate_sessions(after_session_id, cutoff)
+            if last_session_id is None:
+                break
+            totals['sessions_scanned'] += scanned
+            for session_id in candidates:
+                archived = False
+                while not self._stop.is_set():
+                    result = self.pool.run_in_transaction(
+                        archive_session, session_id, cutoff, self.keep_recent, self.require_summary, self.chunk_size
+                    )
+                    if result is None:
+                        break
+                    archived = True
+                    totals['archived_chunks'] += 1
+                    totals['archived_messages'] += result['messages']
+                    totals['raw_bytes'] += result['raw_bytes']
+                    totals['compressed_bytes'] += result['compressed_bytes']
+                    self._stop.wait(self.pause)
+                totals['sessions_archived'] += archived
+            after_session_id = last_session_id
+        return totals
+
+    def index_unregistered(self):
+        """검색 대상으로 등록되지 않은 보관 묶음을 나누어 색인 (색인한 묶음 수)"""
+        total = 0
+        while not self._stop.is_set():
+            indexed = self.pool.run_in_transaction(index_unregistered_chunks)
+            if not indexed:
+                break
+            total += indexed
+            self._stop.wait(self.pause)
+        return total
+
+    def reclaim_space(self):
+        """FTS 세그먼트 병합 후 빈 페이지를 VACUUM_PAGES_PER_STEP 씩 파일에서 잘라 냄 (잘라 낸 바이트 수)"""
+        self.pool.run_in_transaction(
+            lambda conn: conn.execute(
+                "INSERT INTO chat_messages_fts (chat_messages_fts, rank) VALUES ('merge', ?)", (FTS_MERGE_PAGES,)
+            )
+        )
+        with self.pool.connection() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                # 빈 페이지는 이후 쓰기에 재사용되지만 파일 크기는 줄지 않음
+                return 0
+            page_size = conn.execute('PRAGMA page_size').fetchone()[0]
+            before = conn.execute('PRAGMA page_count').fetchone()[0]
+            while not self._stop.is_set() and conn.execute('PRAGMA freelist_count').fetchone()[0] > 0:
+                # execute() 는 결과 열이 없는 이 PRAGMA 를 한 단계만 실행해 페이지 하나만 회수하므로
+                # executescript() 로 끝까지 실행
+                conn.executescript(f'PRAGMA incremental_vacuum({VACUUM_PAGES_PER_STEP})')
+                self._stop.wait(self.pause)
+            return (before - conn.execute('PRAGMA page_count').fetchone()[0]) * page_size
+
+    def run_once(self):
+        """보관 + 공간 회수 한 번 실행 후 보고서 반환"""
+        started = time.monotonic()
+        cutoff = (datetime.utcnow() - timedelta(days=self.after_days)).strftime(TIMESTAMP_FORMAT)
+        with self.pool.connection() as conn:
+            before = space_usage(conn)
+
+        report = self.archive_old_messages(cutoff)
+        report['reindexed_chunks'] = self.index_unregistered()
+        report['reclaimed_bytes'] = self.reclaim_space()
+
+        with self.pool.connection() as conn:
+            after = space_usage(conn)
+        report.update({
+            'cutoff': cutoff,
+            'auto_vacuum': after['auto_vacuum'],
+            'db_bytes_before': before['db_bytes'],
+            'db_bytes_after': after['db_bytes'],
+            'free_bytes': after['free_bytes'],
+            'duration_s': round(time.monotonic() - started, 3),
+        })
+        with self._lock:
+            self._stats['rounds'] += 1
+            for key in ('archived_messages', 'archived_chunks', 'raw_bytes', 'compressed_bytes', 'reclaimed_bytes'):
+                self._stats[key] += report[key]
+            self._last_report = report
+        logging.info(f'채팅 메시지 보관: {json.dumps(report, ensure_ascii=False)}')
+        return report
+
+    def start(self):
+        """주기 실행 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='chat-archive', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                with self._lock:
+                    self._stats['errors'] += 1
+                logging.error(f'채팅 메시지 보관 오류: {e}')
+            self._stop.wait(self.interval)
+
+    def stats(self):
+        """누적 통계와 마지막 실행 보고서"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['running'] = self._thread is not None and self._thread.is_alive()
+            stats['last_report'] = self._last_report
+        return stats
+
+
+def enable_incremental_vacuum(conn):
+    """기존 DB 를 auto_vacuum=INCREMENTAL 로 바꿈 (전체 VACUUM 이 필요해 DB 를 잠그므로 서버를 멈추고 실행)"""
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+        return False
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='채팅 메시지 보관 / DB 공간 회수')
+    parser.add_argument('--stats', action='store_true', help='DB 공간 사용량 출력')
+    parser.add_argument('--once', action='store_true', help='보관과 공간 회수를 한 번 실행')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true',
+                        help='기존 DB 를 auto_vacuum=INCREMENTAL 로 전환 (전체 VACUUM)')
+    parser.add_argument('--after-days', type=float, default=CHAT_ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--keep-recent', type=int, default=CHAT_ARCHIVE_KEEP_RECENT)
+    parser.add_argument('--no-require-summary', action='store_true', help='요약되지 않은 메시지도 보관')
+    args = parser.parse_args()
+
+    from database import pool
+    if args.enable_incremental_vacuum:
+        with pool.connection() as conn:
+            before = space_usage(conn)
+            changed = enable_incremental_vacuum(conn)
+            after = space_usage(conn)
+        print(json.dumps({'changed': changed, 'db_bytes_before': before['db_bytes'],
+                          'db_bytes_after': after['db_bytes'], 'auto_vacuum': after['auto_vacuum']}))
+    if args.once:
+        archiver = ChatArchiver(pool, args.after_days, args.keep_recent, not args.no_require_summary)
+        print(json.dumps(archiver.run_once(), ensure_ascii=False))
+    if args.stats or not (args.once or args.enable_incremental_vacuum):
+        with pool.connection() as conn:
+            print(json.dumps(space_usage(conn), ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+# conversation_memory.py
+import threading
+import logging
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# 대화 메모리 설정 (환경변수로 조정 가능)
+HISTORY_TOKEN_BUDGET = int(os.getenv('HISTORY_TOKEN_BUDGET', '1200'))
+SUMMARY_TRIGGER_TOKENS = int(os.getenv('SUMMARY_TRIGGER_TOKENS', '400'))
+SUMMARY_MAX_TOKENS = int(os.getenv('SUMMARY_MAX_TOKENS', '300'))
+HISTORY_SCAN_LIMIT = int(os.getenv('HISTORY_SCAN_LIMIT', '100'))
+SUMMARY_BATCH_LIMIT = int(os.getenv('SUMMARY_BATCH_LIMIT', '200'))
+
+# 메시지 하나당 role/구분자 오버헤드 (OpenAI 채팅 포맷 기준 근사값)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding('cl100k_base')
+except Exception:
+    # tiktoken 이 없거나 인코딩 파일을 받을 수 없으면 근사치로 계산
+    _encoding = None
+
+
+def count_tokens(text):
+    """텍스트의 토큰 수 계산 (tiktoken 이 없으면 근사치)"""
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    # 영문은 약 4글자당 1토큰, 한글/이모지는 글자당 1토큰 이상
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) * 1.2)
+
+
+def message_tokens(content):
+    """대화 메시지 하나가 프롬프트에서 차지하는 토큰 수"""
+    return count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+
+
+def fit_history(messages, budget=HISTORY_TOKEN_BUDGET):
+    """최근 메시지부터 토큰 예산을 채울 때까지 선택 (시간순으로 반환)"""
+    selected = []
+    used = 0
+    for msg in reversed(messages):
+        tokens = message_tokens(msg['content'])
+        if used + tokens > budget:
+            break
+        selected.append(msg)
+        used += tokens
+    selected.reverse()
+    return selected
+
+
+class ConversationMemory:
+    """토큰 예산 기반 대화 메모리
+
+    최근 메시지는 예산 안에서 그대로 프롬프트에 넣고, 예산을 넘는 오래된 메시지는
+    세션별 누적 요약(chat_sessions.summary)에 점진적으로 합친다. 요약은 응답 이후
+    백그라운드에서 갱신되므로 채팅 지연시간에 영향을 주지 않는다.
+    """
+
+    def __init__(self, pool, summarizer, budget_tokens=HISTORY_TOKEN_BUDGET,
+                 trigger_tokens=SUMMARY_TRIGGER_TOKENS, max_workers=2):
+        self.pool = pool
+        self.summarizer = summarizer
+        self.budget_tokens = budget_tokens
+        self.trigger_tokens = trigger_tokens
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='summary')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'summaries': 0,
+            'summarized_messages': 0,
+            'summary_failures': 0,
+            'summary_conflicts': 0,
+        }
+
+    def _select_window(self, conn, session_id, summary_until_id):
+        """요약 이후 메시지 중 예산에 맞는 최근 메시지와 요약 갱신 필요 여부 조회
+
+        예산을 넘은 미요약 메시지가 trigger_tokens 이상일 때만 요약이 필요하다.
+        넘친 토큰은 trigger_tokens 에 닿을 때까지만 센다.
+        """
+        rows = conn.execute(
+            'SELECT id, sender, content, timestamp FROM chat_messages '
+            'WHERE session_id = ? AND id > ? ORDER BY id DESC LIMIT ?',
+            (session_id, summary_until_id, HISTORY_SCAN_LIMIT)
+        ).fetchall()
+
+        history = []
+        used = 0
+        overflow_tokens = 0
+        for row in rows:
+            tokens = message_tokens(row['content'])
+            if overflow_tokens or used + tokens > self.budget_tokens:
+                overflow_tokens += tokens
+                if overflow_tokens >= self.trigger_tokens:
+                    break
+                continue
+            history.append({
+                'id': row['id'],
+                'sender': row['sender'],
+                'content': row['content'],
+                'timestamp': row['timestamp']
+            })
+            used += tokens
+
+        # 스캔 한도까지 읽었으면 더 오래된 미요약 메시지가 있을 수 있으므로 요약 대상으로 봄
+        needs_summary = overflow_tokens >= self.trigger_tokens or len(rows) == HISTORY_SCAN_LIMIT
+
+        history.reverse()
+        return history, needs_summary
+
+    def load_context(self, conn, session_id):
+        """세션 요약과 예산 내 최근 대화 조회 (summary, history, 요약 갱신 필요 여부)"""
+        row = conn.execute(
+            'SELECT summary, summary_until_id FROM chat_sessions WHERE id = ?',
+            (session_id,)
+        ).fetchone()
+        summary = row['summary'] if row else None
+        summary_until_id = row['summary_until_id'] if row else 0
+
+        history, needs_summary = self._select_window(conn, session_id, summary_until_id)
+        return summary, history, needs_summary
+
+    def schedule_summary(self, session_id, pet_info):
+        """백그라운드 요약 갱신 예약 (세션당 하나만 실행)"""
+        with self._lock:
+            if session_id in self._pending:
+                return
+            self._pending.add(session_id)
+        self._executor.submit(self._run_summary, session_id, pet_info)
+
+    def _run_summary(self, session_id, pet_info):
+        try:
+            self.update_summary(session_id, pet_info)
+        except Exception as e:
+            with self._lock:
+                self._stats['summary_failures'] += 1
+            logging.error(f'대화 요약 갱신 오류 (session={session_id}): {e}')
+        finally:
+            with self._lock:
+                self._pending.discard(session_id)
+
+    def update_summary(self, session_id, pet_info):
+        """예산을 넘은 오래된 메시지를 기존 요약에 합쳐 저장 (요약했으면 True)"""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT summary, summary_until_id FROM chat_sessions WHERE id = ?',
+                (session_id,)
+            ).fetchone()
+            if not row:
+                return False
+            summary, summary_until_id = row['summary'], row['summary_until_id']
+
+            history, needs_summary = self._select_window(conn, session_id, summary_until_id)
+            if not needs_summary:
+                return False
+
+            # 프롬프트에 남는 가장 오래된 메시지 이전까지가 요약 대상
+            keep_from_id = history[0]['id'] if history else None
+            if keep_from_id is None:
+                keep_from_id = conn.execute(
+                    'SELECT MAX(id) + 1 FROM chat_messages WHERE session_id = ?',
+                    (session_id,)
+                ).fetchone()[0] or 0
+            old_messages = conn.execute(
+                'SELECT id, sender, content FROM chat_messages '
+                'WHERE session_id = ? AND id > ? AND id < ? ORDER BY id ASC LIMIT ?',
+                (session_id, summary_until_id, keep_from_id, SUMMARY_BATCH_LIMIT)
+            ).fetchall()
+
+        old_messages = [dict(m) for m in old_messages]
+        if sum(message_tokens(m['content']) for m in old_messages) < self.trigger_tokens:
+            return False
+
+        # DB 연결 없이 요약 생성 (LLM 호출 가능)
+        new_summary = self.summarizer(summary, old_messages, pet_info)
+        new_until_id = old_messages[-1]['id']
+
+        def store(conn):
+            # 다른 작업이 먼저 요약을 갱신했으면 덮어쓰지 않음
+            cursor = conn.execute(
+                'UPDATE chat_sessions SET summary = ?, summary_until_id = ? '
+                'WHERE id = ? AND summary_until_id = ?',
+                (new_summary, new_until_id, session_id, summary_until_id)
+            )
+            return cursor.rowcount > 0
+
+        stored = self.pool.run_in_transaction(store)
+        with self._lock:
+            if stored:
+                self._stats['summaries'] += 1
+                self._stats['summarized_messages'] += len(old_messages)
+            else:
+                self._stats['summary_conflicts'] += 1
+        return stored
+
+    def stats(self):
+        """요약 작업 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pending'] = len(self._pending)
+        stats['budget_tokens'] = self.budget_tokens
+        stats['token_counter'] = 'tiktoken' if _encoding is not None else 'estimate'
+        return stats
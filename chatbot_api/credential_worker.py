@@ -0,0 +1,33 @@
+# credential_worker.py
+"""비밀번호 해시 워커 프로세스 진입점
+
+CredentialHasher 가 `python credential_worker.py` 로 실행한다. multiprocessing 의 spawn/forkserver 는
+워커마다 부모의 __main__(Flask/ASGI 앱 모듈)을 다시 import 해서 앱 전역 객체와 연결 풀, LLM 클라이언트까지
+만들기 때문에, 해시 계산에 필요한 credentials 모듈만 import 하는 이 모듈로 워커를 띄운다.
+
+stdin 으로 (작업 이름, 인자) 를 pickle 로 받아 실행하고 (성공 여부, 결과 또는 예외) 를 stdout 으로 돌려준다.
+stdin 이 닫히면 종료한다.
+"""
+import pickle
+import sys
+
+from credentials import WORKER_TASKS
+
+
+def main():
+    requests, replies = sys.stdin.buffer, sys.stdout.buffer
+    while True:
+        try:
+            name, args = pickle.load(requests)
+        except EOFError:
+            return
+        try:
+            reply = (True, WORKER_TASKS[name](*args))
+        except Exception as e:
+            reply = (False, e)
+        pickle.dump(reply, replies)
+        replies.flush()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+# credentials.py
+import asyncio
+import hashlib
+import hmac
+import os
+import pickle
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import LatencyRecorder
+
+# 비밀번호 해시 정책 (올리면 다음 로그인 때 기존 해시가 자동으로 재해시됨)
+# 기본값은 초기 버전과 같은 100,000회. 저장된 해시마다 반복 횟수가 들어 있으므로
+# 로그인 비용을 감당할 수 있는 배포에서만 환경변수로 올린다.
+PASSWORD_HASH_ALGORITHM = 'pbkdf2_sha256'
+PASSWORD_HASH_ITERATIONS = int(os.getenv('PASSWORD_HASH_ITERATIONS', '100000'))
+
+# 해시 전용 프로세스 풀 설정 (워커 0 이면 호출 스레드에서 직접 계산)
+CREDENTIAL_HASHER_WORKERS = int(os.getenv('CREDENTIAL_HASHER_WORKERS', str(min(4, os.cpu_count() or 1))))
+CREDENTIAL_HASHER_QUEUE = int(os.getenv('CREDENTIAL_HASHER_QUEUE', '64'))
+CREDENTIAL_HASHER_WAIT_TIMEOUT = float(os.getenv('CREDENTIAL_HASHER_WAIT_TIMEOUT', '0.5'))
+
+# 워커 프로세스 진입점 (앱 모듈을 다시 import 하지 않도록 이 스크립트만 실행)
+CREDENTIAL_WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'credential_worker.py')
+
+# 초기 버전 형식: salt(hex 32자) + PBKDF2-SHA256 100,000회 해시(hex)
+LEGACY_SALT_LENGTH = 32
+LEGACY_ITERATIONS = 100000
+
+
+class CredentialHasherBusy(Exception):
+    """해시 작업 대기열이 가득 차서 요청을 받을 수 없음 (잠시 후 재시도)"""
+
+
+def hash_password(password, iterations=PASSWORD_HASH_ITERATIONS):
+    """비밀번호를 현재 정책의 버전 형식으로 해시 (algorithm$iterations$salt$hash)"""
+    salt = secrets.token_hex(16)
+    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+    return f'{PASSWORD_HASH_ALGORITHM}${iterations}${salt}${pwd_hash.hex()}'
+
+
+def _parse_hash(hashed):
+    """저장된 해시를 (algorithm, iterations, salt, hash_hex) 로 분해"""
+    if '$' not in hashed:
+        return 'legacy', LEGACY_ITERATIONS, hashed[:LEGACY_SALT_LENGTH], hashed[LEGACY_SALT_LENGTH:]
+    algorithm, iterations, salt, hash_hex = hashed.split('$', 3)
+    return algorithm, int(iterations), salt, hash_hex
+
+
+def verify_password(password, hashed):
+    """비밀번호 검증 (상수 시간 비교)"""
+    try:
+        algorithm, iterations, salt, stored_hash = _parse_hash(hashed)
+    except ValueError:
+        return False
+    if algorithm not in ('legacy', PASSWORD_HASH_ALGORITHM):
+        return False
+    pwd_hash = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), iterations)
+    return hmac.compare_digest(pwd_hash.hex(), stored_hash)
+
+
+def needs_rehash(hashed):
+    """저장된 해시가 현재 정책(알고리즘/반복 횟수)보다 약하면 True"""
+    try:
+        algorithm, iterations, _, _ = _parse_hash(hashed)
+    except ValueError:
+        return True
+    return algorithm != PASSWORD_HASH_ALGORITHM or iterations < PASSWORD_HASH_ITERATIONS
+
+
+def verify_and_upgrade(password, hashed):
+    """검증 후 필요하면 새 정책으로 재해시 (ok, 새 해시 또는 None)
+
+    워커 프로세스에서 한 번에 실행되도록 검증과 재해시를 하나의 작업으로 묶는다.
+    """
+    if not verify_password(password, hashed):
+        return False, None
+    if needs_rehash(hashed):
+        return True, hash_password(password)
+    return True, None
+
+
+# 존재하지 않는 사용자 로그인에도 같은 비용을 쓰기 위한 더미 해시 (사용자 존재 여부 노출 방지)
+DUMMY_PASSWORD_HASH = f'{PASSWORD_HASH_ALGORITHM}${PASSWORD_HASH_ITERATIONS}${"0" * 32}${"0" * 64}'
+
+# 워커 프로세스에서 실행할 수 있는 작업 (이름으로 주고받음)
+WORKER_TASKS = {
+    'hash_password': hash_password,
+    'verify_and_upgrade': verify_and_upgrade,
+}
+
+
+class _WorkerProcess:
+    """credential_worker.py 를 실행하는 해시 워커 프로세스 하나 (stdin/stdout 으로 pickle 요청/응답)"""
+
+    def __init__(self):
+        self._process = subprocess.Popen([sys.executable, CREDENTIAL_WORKER_SCRIPT],
+                                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def call(self, name, args):
+        """작업 실행 후 결과 반환 (작업의 예외는 그대로 다시 발생)"""
+        pickle.dump((name, args), self._process.stdin)
+        self._process.stdin.flush()
+        ok, result = pickle.load(self._process.stdout)
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        """stdin 을 닫아 종료시키고, 응답하지 않으면 강제 종료"""
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+            self._process.wait()
+
+
+class CredentialHasher:
+    """비밀번호 해시 전용 프로세스 풀
+
+    PBKDF2 는 CPU 를 수십~수백 ms 점유하므로 요청 스레드(또는 이벤트 루프)에서 계산하면
+    로그인이 몰릴 때 채팅 요청까지 밀린다. 별도 프로세스에서 계산하고, 대기열은
+    workers + max_queue 개로 제한해 넘치면 CredentialHasherBusy 로 즉시 거절한다.
+
+    워커는 multiprocessing 이 아니라 credential_worker.py 를 직접 실행한 프로세스다.
+    spawn/forkserver 는 워커마다 앱의 __main__ 을 다시 import 하고, fork 는 스레드가 도는
+    앱 프로세스를 복제하므로 둘 다 쓰지 않는다. 워커 프로세스마다 전담 스레드가 하나씩 붙어
+    작업 큐에서 꺼낸 작업을 보내고 결과를 Future 에 채운다. 워커가 죽으면 다음 작업 때 새로 띄운다.
+    """
+
+    def __init__(self, workers=CREDENTIAL_HASHER_WORKERS, max_queue=CREDENTIAL_HASHER_QUEUE,
+                 wait_timeout=CREDENTIAL_HASHER_WAIT_TIMEOUT):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.wait_timeout = wait_timeout
+        self._slots = threading.BoundedSemaphore(workers + max_queue if workers > 0 else max(1, max_queue))
+        self._jobs = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._latency = LatencyRecorder()
+        self._stats = {'submitted': 0, 'completed': 0, 'rejected': 0, 'rehashed': 0, 'in_flight': 0}
+
+    def _ensure_started(self):
+        # 첫 사용 시 시작 (import 시점에 프로세스를 띄우지 않음)
+        with self._lock:
+            if not self._threads:
+                for index in range(self.workers):
+                    thread = threading.Thread(target=self._serve, name=f'credential-hasher-{index}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _serve(self):
+        """워커 전담 스레드: 작업 큐의 작업을 워커 프로세스에서 실행 (None 을 받으면 종료)"""
+        worker = None
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            future, name, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                if worker is None:
+                    worker = _WorkerProcess()
+                future.set_result(worker.call(name, args))
+            except (OSError, EOFError, pickle.UnpicklingError) as e:
+                # 워커 프로세스가 죽었거나 응답이 깨짐 -> 버리고 다음 작업 때 새로 띄움
+                if worker is not None:
+                    worker.close()
+                    worker = None
+                future.set_exception(e)
+            except Exception as e:
+                future.set_exception(e)
+        if worker is not None:
+            worker.close()
+
+    def _acquire_slot(self):
+        if not self._slots.acquire(timeout=self.wait_timeout):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise CredentialHasherBusy('비밀번호 처리 요청이 많습니다. 잠시 후 다시 시도해주세요')
+        with self._lock:
+            self._stats['submitted'] += 1
+            self._stats['in_flight'] += 1
+
+    def _release_slot(self, started):
+        self._slots.release()
+        self._latency.observe(time.perf_counter() - started)
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['in_flight'] -= 1
+
+    def _submit(self, func, *args):
+        """작업 제출 (concurrent.futures.Future 반환, 대기열이 차면 CredentialHasherBusy)"""
+        self._acquire_slot()
+        started = time.perf_counter()
+        try:
+            if self.workers <= 0:
+                future = _completed_future(func, *args)
+            else:
+                self._ensure_started()
+                future = Future()
+                self._jobs.put((future, func.__name__, args))
+        except Exception:
+            self._release_slot(started)
+            raise
+        future.add_done_callback(lambda _: self._release_slot(started))
+        return future
+
+    def hash(self, password):
+        """비밀번호 해시 (호출 스레드는 결과를 기다리기만 함)"""
+        return self._submit(hash_password, password).result()
+
+    def verify(self, password, hashed):
+        """비밀번호 검증 (ok, 재해시가 필요하면 새 해시)"""
+        ok, new_hash = self._submit(verify_and_upgrade, password, hashed).result()
+        if new_hash:
+            with self._lock:
+                self._stats['rehashed'] += 1
+        return ok, new_hash
+
+    async def hash_async(self, password):
+        """비동기 서버용 hash (이벤트 루프를 막지 않음)"""
+        future = await asyncio.to_thread(self._submit, hash_password, password)
+        return await asyncio.wrap_future(future)
+
+    async def verify_async(self, password, hashed):
+        """비동기 서버용 verify (이벤트 루프를 막지 않음)"""
+        future = await asyncio.to_thread(self._submit, verify_and_upgrade, password, hashed)
+        ok, new_hash = await asyncio.wrap_future(future)
+        if new_hash:
+            with self._lock:
+                self._stats['rehashed'] += 1
+        return ok, new_hash
+
+    def stats(self):
+        """해시 작업 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['workers'] = self.workers
+        stats['max_queue'] = self.max_queue
+        stats['iterations'] = PASSWORD_HASH_ITERATIONS
+        stats['latency'] = self._latency.summary()
+        return stats
+
+    def shutdown(self):
+        """대기 중인 작업을 마친 뒤 워커 프로세스 종료"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._jobs.put(None)
+        for thread in threads:
+            thread.join()
+
+
+def _completed_future(func, *args):
+    """워커 없이 호출 스레드에서 실행한 결과를 Future 로 감쌈"""
+    future = Future()
+    try:
+        future.set_result(func(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+# 앱 전역 해시 실행기
+hasher = CredentialHasher()
@@ -0,0 +1,291 @@
+# database.py
+import sqlite3
+import threading
+import queue
+import random
+import time
+import logging
+import os
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# 데이터베이스 설정 (환경변수로 조정 가능)
+DATABASE_PATH = os.getenv('DATABASE_PATH', 'pet_chatbot.db')
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+DB_BUSY_TIMEOUT_MS = int(os.getenv('DB_BUSY_TIMEOUT_MS', '5000'))
+DB_CACHE_SIZE_KB = int(os.getenv('DB_CACHE_SIZE_KB', '16384'))
+DB_MMAP_SIZE = int(os.getenv('DB_MMAP_SIZE', str(64 * 1024 * 1024)))
+DB_MAX_RETRIES = int(os.getenv('DB_MAX_RETRIES', '5'))
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """풀에서 사용 가능한 연결을 얻지 못했을 때 발생"""
+
+
+def is_busy_error(error):
+    """SQLite 잠금(busy/locked) 오류인지 확인"""
+    if not isinstance(error, sqlite3.OperationalError) or isinstance(error, PoolTimeoutError):
+        return False
+    message = str(error).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class PooledConnection:
+    """풀에 반납되는 sqlite3 연결 래퍼
+
+    기존 코드처럼 execute/cursor/commit/rollback/close 를 그대로 사용할 수 있으며,
+    close() 호출 시 실제로 닫지 않고 풀에 반납한다.
+    """
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """연결을 풀에 반납"""
+        if not self._released:
+            self._released = True
+            self._pool.release(self._conn)
+
+
+class ConnectionPool:
+    """WAL 모드로 설정된 재사용 가능한 SQLite 연결 풀"""
+
+    def __init__(self, db_path=DATABASE_PATH, pool_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT,
+                 busy_timeout_ms=DB_BUSY_TIMEOUT_MS, cache_size_kb=DB_CACHE_SIZE_KB,
+                 mmap_size=DB_MMAP_SIZE, max_retries=DB_MAX_RETRIES):
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.max_retries = max_retries
+
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            'created': 0,
+            'closed': 0,
+            'in_use': 0,
+            'acquired': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'busy_errors': 0,
+            'retries': 0,
+            'wait_time_total': 0.0,
+        }
+
+    def _create_connection(self):
+        """새 연결 생성 및 PRAGMA 설정"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False
+        )
+        conn.row_factory = sqlite3.Row
+        # 새 DB 파일에만 적용됨 (WAL 설정보다 먼저 해야 함, 기존 DB 는 chat_archive.py 로 한 번 VACUUM)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')  # WAL 모드에서는 NORMAL 로도 안전
+        conn.execute('PRAGMA foreign_keys = ON')  # 외래키 제약조건 활성화
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA cache_size = -{int(self.cache_size_kb)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        return conn
+
+    def acquire(self):
+        """풀에서 연결을 가져옴 (없으면 생성, 한도 초과 시 대기)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError('연결 풀이 닫혔습니다')
+
+        conn = None
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                total = self._stats['created'] - self._stats['closed']
+                can_create = total < self.pool_size
+                if can_create:
+                    self._stats['created'] += 1
+            if can_create:
+                try:
+                    conn = self._create_connection()
+                except Exception:
+                    with self._lock:
+                        self._stats['created'] -= 1
+                    raise
+            else:
+                started = time.monotonic()
+                with self._lock:
+                    self._stats['waits'] += 1
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    with self._lock:
+                        self._stats['timeouts'] += 1
+                    raise PoolTimeoutError('데이터베이스 연결을 얻지 못했습니다 (풀 대기 시간 초과)')
+                finally:
+                    with self._lock:
+                        self._stats['wait_time_total'] += time.monotonic() - started
+
+        with self._lock:
+            self._stats['in_use'] += 1
+            self._stats['acquired'] += 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        """연결을 풀에 반납 (열린 트랜잭션은 롤백)"""
+        with self._lock:
+            self._stats['in_use'] -= 1
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logging.warning(f'반납된 연결 롤백 실패, 연결을 폐기합니다: {e}')
+            self._discard(conn)
+            return
+
+        if self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn):
+        """연결을 닫고 통계에 반영"""
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._stats['closed'] += 1
+
+    @contextmanager
+    def connection(self):
+        """with 문으로 사용할 수 있는 연결 컨텍스트"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def run_in_transaction(self, func, *args, **kwargs):
+        """쓰기 트랜잭션을 실행하고, 잠금 오류 시 지터 백오프로 재시도
+
+        func(conn, *args, **kwargs) 는 재시도될 수 있으므로 부작용 없이
+        데이터베이스 작업만 수행해야 한다.
+        """
+        attempt = 0
+        while True:
+            conn = self.acquire()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                result = func(conn, *args, **kwargs)
+                conn.commit()
+                return result
+            except sqlite3.OperationalError as e:
+                if conn.in_transaction:
+                    conn.rollback()
+                if not is_busy_error(e):
+                    raise
+                with self._lock:
+                    self._stats['busy_errors'] += 1
+                if attempt >= self.max_retries:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self._stats['retries'] += 1
+                delay = min(1.0, 0.02 * (2 ** attempt)) * random.uniform(0.5, 1.5)
+                logging.info(f'데이터베이스 잠금으로 재시도합니다 ({attempt}/{self.max_retries}, {delay:.3f}s)')
+                time.sleep(delay)
+            except Exception:
+                if conn.in_transaction:
+                    conn.rollback()
+                raise
+            finally:
+                conn.close()
+
+    def stats(self):
+        """풀 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['open'] = stats['created'] - stats['closed']
+        stats['idle'] = self._idle.qsize()
+        stats['pool_size'] = self.pool_size
+        stats['avg_wait_ms'] = round(stats['wait_time_total'] * 1000 / stats['waits'], 3) if stats['waits'] else 0.0
+        stats['wait_time_total'] = round(stats['wait_time_total'], 6)
+        return stats
+
+    def close_all(self):
+        """풀의 모든 유휴 연결을 닫음"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+
+class AsyncConnectionPool:
+    """asyncio 서버용 접근 계층
+
+    sqlite3 는 블로킹 API 이므로, 연결 풀 크기만큼의 전용 스레드에서 작업을 실행하고
+    이벤트 루프는 결과만 기다린다. 트랜잭션 재시도 정책과 통계는 동기 풀과 공유한다.
+    """
+
+    def __init__(self, sync_pool, max_workers=None):
+        self.pool = sync_pool
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or sync_pool.pool_size,
+            thread_name_prefix='sqlite'
+        )
+
+    async def _submit(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # 요청 계측(contextvar)이 실행 스레드에서도 보이도록 현재 컨텍스트에서 실행
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(context.run, func, *args, **kwargs)
+        )
+
+    def _run(self, func, *args, **kwargs):
+        with self.pool.connection() as conn:
+            return func(conn, *args, **kwargs)
+
+    async def run(self, func, *args, **kwargs):
+        """읽기 작업 func(conn, ...) 실행"""
+        return await self._submit(self._run, func, *args, **kwargs)
+
+    async def run_in_transaction(self, func, *args, **kwargs):
+        """쓰기 트랜잭션 func(conn, ...) 실행 (잠금 오류 시 재시도)"""
+        return await self._submit(self.pool.run_in_transaction, func, *args, **kwargs)
+
+    def stats(self):
+        """풀 통계 조회"""
+        return self.pool.stats()
+
+    def close(self):
+        """실행 스레드 종료"""
+        self._executor.shutdown(wait=False)
+
+
+# 애플리케이션 전역 연결 풀
+pool = ConnectionPool()
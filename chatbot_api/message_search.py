@@ -0,0 +1,344 @@
+# message_search.py
+"""채팅 기록 전문 검색 (SQLite FTS5 trigram 색인)
+
+chat_messages_fts 는 chat_messages.content 를 외부 콘텐츠로 쓰는 FTS5 색인이며 트리거로 동기화된다.
+trigram 토크나이저는 띄어쓰기/형태소와 무관하게 3글자 이상의 부분 문자열을 찾으므로 한국어에 맞다.
+3글자보다 짧은 검색어('참치')는 색인으로 찾을 수 없어, 해당 사용자(와 반려동물)의 메시지만
+LIKE 로 훑어 찾고 최신순으로 정렬한다.
+
+마이그레이션 이전에 있던 메시지(id <= until_id)는 백필 작업이 짧은 트랜잭션으로 나누어 색인한다.
+트리거는 색인된 범위(id > until_id 또는 id <= indexed_upto)의 행만 갱신하므로 백필과 겹치지 않는다.
+
+chat_archive 가 블롭으로 옮긴 메시지는 FTS 행이 남아 있어 색인 검색에 그대로 걸리고, 세션은
+chat_archived_messages 에서, 본문은 보관 블롭에서 읽는다. 색인 검색에 짧은 단어가 섞여 있으면 보관된
+메시지는 SQL 의 LIKE 대신 블롭에서 푼 본문으로 거른다. 짧은 단어만으로 된 검색(LIKE 스캔)은
+chat_messages 에 남은 메시지만 찾는다.
+
+실행 (오프라인 백필):
+    python message_search.py --backfill
+"""
+import argparse
+import logging
+import os
+import threading
+import time
+
+from chat_archive import load_archived_by_ids
+
+SEARCH_PAGE_DEFAULT = int(os.getenv('SEARCH_PAGE_DEFAULT', '20'))
+SEARCH_PAGE_MAX = int(os.getenv('SEARCH_PAGE_MAX', '50'))
+SEARCH_MAX_OFFSET = int(os.getenv('SEARCH_MAX_OFFSET', '1000'))
+SEARCH_MAX_QUERY_CHARS = int(os.getenv('SEARCH_MAX_QUERY_CHARS', '100'))
+SEARCH_MAX_TERMS = 8
+SEARCH_SNIPPET_CHARS = int(os.getenv('SEARCH_SNIPPET_CHARS', '60'))
+SEARCH_BACKFILL_ENABLED = os.getenv('SEARCH_BACKFILL_ENABLED', '1') == '1'
+SEARCH_BACKFILL_BATCH = int(os.getenv('SEARCH_BACKFILL_BATCH', '2000'))
+# 배치 사이에 쉬어 쓰기 요청이 잠금을 얻을 틈을 줌 (초)
+SEARCH_BACKFILL_PAUSE = float(os.getenv('SEARCH_BACKFILL_PAUSE', '0.05'))
+
+# trigram 토크나이저가 색인할 수 있는 최소 길이
+TRIGRAM_MIN_CHARS = 3
+
+SEARCH_COLUMNS = 'm.id, s.pet_id, m.session_id, m.sender, m.content, m.timestamp'
+# 보관된 메시지는 chat_messages 행이 없으므로 sender/content/timestamp 가 NULL (블롭에서 채움)
+FTS_SEARCH_COLUMNS = 'chat_messages_fts.rowid AS id, s.pet_id, s.id AS session_id, m.sender, m.content, m.timestamp'
+
+
+def parse_search_params(args):
+    """검색 파라미터(q, pet_id, limit, offset) 파싱 (잘못된 값이면 ValueError)"""
+    query = (args.get('q') or '').strip()
+    if not query or len(query) > SEARCH_MAX_QUERY_CHARS:
+        raise ValueError(f'q 는 1~{SEARCH_MAX_QUERY_CHARS}자여야 합니다')
+    try:
+        pet_id = args.get('pet_id')
+        pet_id = int(pet_id) if pet_id not in (None, '') else None
+        limit = int(args.get('limit') or SEARCH_PAGE_DEFAULT)
+        offset = int(args.get('offset') or 0)
+    except ValueError:
+        raise ValueError('pet_id, limit, offset 은 정수여야 합니다')
+    if limit < 1 or offset < 0 or offset > SEARCH_MAX_OFFSET:
+        raise ValueError(f'limit 는 1 이상, offset 은 0~{SEARCH_MAX_OFFSET} 이어야 합니다')
+    return query, pet_id, min(limit, SEARCH_PAGE_MAX), offset
+
+
+def split_terms(query):
+    """검색어를 공백으로 나눈 단어 목록 (중복 제거, 최대 SEARCH_MAX_TERMS 개)"""
+    terms = []
+    for term in query.split():
+        if term.lower() not in (t.lower() for t in terms):
+            terms.append(term)
+    return terms[:SEARCH_MAX_TERMS]
+
+
+def fts_phrase(term):
+    """FTS5 문법 문자가 그대로 검색되도록 큰따옴표 구문으로 감쌈"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_pattern(term):
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def make_snippet(content, terms, width=SEARCH_SNIPPET_CHARS):
+    """첫 일치 위치 주변 width 글자와 스니펫 안의 일치 구간 [[시작, 끝], ...] 반환
+
+    클라이언트가 안전하게 강조 표시할 수 있도록 마크업 대신 구간 오프셋을 준다.
+    """
+    lowered = content.lower()
+    if len(lowered) != len(content):
+        lowered = content
+    spans = []
+    for term in terms:
+        needle = term.lower()
+        start = lowered.find(needle)
+        while start != -1:
+            spans.append((start, start + len(needle)))
+            start = lowered.find(needle, start + len(needle))
+    spans.sort()
+
+    first = spans[0][0] if spans else 0
+    begin = max(0, min(first - width // 4, len(content) - width))
+    end = min(len(content), begin + width)
+    prefix = '…' if begin > 0 else ''
+    snippet = prefix + content[begin:end] + ('…' if end < len(content) else '')
+
+    highlights = []
+    for start, stop in spans:
+        if start >= end or stop <= begin:
+            continue
+        start, stop = max(start, begin) - begin + len(prefix), min(stop, end) - begin + len(prefix)
+        if highlights and start <= highlights[-1][1]:
+            highlights[-1][1] = max(highlights[-1][1], stop)
+        else:
+            highlights.append([start, stop])
+    return snippet, highlights
+
+
+def backfill_state(conn):
+    """백필 진행 상태 (until_id 이하 메시지를 indexed_upto 까지 색인함)"""
+    row = conn.execute('SELECT until_id, indexed_upto FROM chat_search_backfill WHERE id = 1').fetchone()
+    if row is None:
+        return {'until_id': 0, 'indexed_upto': 0, 'complete': True}
+    return {'until_id': row[0], 'indexed_upto': row[1], 'complete': row[1] >= row[0]}
+
+
+def search_messages(conn, user_id, query, pet_id=None, limit=SEARCH_PAGE_DEFAULT, offset=0):
+    """사용자(와 반려동물) 범위의 메시지 검색
+
+    3글자 이상 단어가 있으면 FTS5 색인으로 후보를 찾아 bm25 점수순(같으면 최신순)으로, 모두 짧으면
+    사용자 메시지를 LIKE 로 훑어 최신순으로 반환한다. 짧은 단어는 두 경우 모두 LIKE 조건으로 더한다.
+    색인 검색은 보관된 메시지도 찾는다 (결과의 archived 가 True).
+    """
+    terms = split_terms(query)
+    long_terms = [term for term in terms if len(term) >= TRIGRAM_MIN_CHARS]
+    short_terms = [term for term in terms if len(term) < TRIGRAM_MIN_CHARS]
+
+    conditions = ['s.user_id = ?']
+    params = [user_id]
+    if pet_id is not None:
+        conditions.append('s.pet_id = ?')
+        params.append(pet_id)
+    for term in short_terms:
+        # 보관된 메시지(m 행 없음)는 본문이 블롭에 있어 fetch_matches 에서 거름
+        conditions.append("(m.id IS NULL OR m.content LIKE ? ESCAPE '\\')" if long_terms
+                          else "m.content LIKE ? ESCAPE '\\'")
+        params.append(like_pattern(term))
+
+    if long_terms:
+        sql = f'''
+            SELECT {FTS_SEARCH_COLUMNS}, bm25(chat_messages_fts) AS score
+            FROM chat_messages_fts
+            LEFT JOIN chat_messages m ON m.id = chat_messages_fts.rowid
+            LEFT JOIN chat_archived_messages am ON m.id IS NULL AND am.id = chat_messages_fts.rowid
+            JOIN chat_sessions s ON s.id = COALESCE(m.session_id, am.session_id)
+            WHERE chat_messages_fts MATCH ? AND {' AND '.join(conditions)}
+            ORDER BY score, chat_messages_fts.rowid DESC
+            LIMIT ? OFFSET ?
+        '''
+        params.insert(0, ' AND '.join(fts_phrase(term) for term in long_terms))
+    else:
+        sql = f'''
+            SELECT {SEARCH_COLUMNS}, NULL AS score
+            FROM chat_sessions s
+            JOIN chat_messages m ON m.session_id = s.id
+            WHERE {' AND '.join(conditions)}
+            ORDER BY m.id DESC
+            LIMIT ? OFFSET ?
+        '''
+    rows, archived = fetch_matches(conn, sql, params, short_terms if long_terms else (), limit, offset)
+
+    results = []
+    for row in rows[:limit]:
+        message = archived.get(row['id'], row)
+        snippet, highlights = make_snippet(message['content'], terms)
+        results.append({
+            'id': row['id'],
+            'pet_id': row['pet_id'],
+            'session_id': row['session_id'],
+            'sender': message['sender'],
+            'timestamp': message['timestamp'],
+            'snippet': snippet,
+            'highlights': highlights,
+            'score': round(-row['score'], 4) if row['score'] is not None else None,
+            'archived': row['id'] in archived,
+        })
+
+    has_more = len(rows) > limit
+    return {
+        'query': query,
+        'results': results,
+        'has_more': has_more,
+        'next_offset': offset + limit if has_more else None,
+        'ranking': 'bm25' if long_terms else 'recent',
+        # 백필 중에는 마이그레이션 이전 메시지 일부가 색인 검색에서 빠질 수 있음
+        'index_complete': backfill_state(conn)['complete'] if long_terms else True,
+    }
+
+
+def contains_terms(content, terms):
+    """본문에 모든 단어가 들어 있는지 (LIKE 처럼 대소문자 무시)"""
+    lowered = content.lower()
+    return all(term.lower() in lowered for term in terms)
+
+
+def fetch_matches(conn, sql, params, archived_terms, limit, offset):
+    """검색 결과 한 페이지(+다음 페이지 확인용 1행)와 보관된 행의 본문 {id: dict} 반환
+
+    archived_terms 가 있으면 SQL 로 거르지 못한 보관 메시지를 푼 본문으로 거른다. 이때 offset 은 거른
+    결과 기준이므로, 처음부터 후보를 배치로 읽어 offset + limit + 1 개가 모일 때까지 거른다.
+    """
+    if not archived_terms:
+        rows = conn.execute(sql, params + [limit + 1, offset]).fetchall()
+        return rows, load_archived_rows(conn, [row for row in rows[:limit] if row['content'] is None])
+
+    wanted = offset + limit + 1
+    matched, archived, scanned = [], {}, 0
+    while len(matched) < wanted:
+        batch = conn.execute(sql, params + [wanted, scanned]).fetchall()
+        scanned += len(batch)
+        loaded = load_archived_rows(conn, [row for row in batch if row['content'] is None])
+        for row in batch:
+            if row['content'] is None:
+                message = loaded.get(row['id'])
+                if message is None or not contains_terms(message['content'], archived_terms):
+                    continue
+                archived[row['id']] = message
+            matched.append(row)
+        if len(batch) < wanted:
+            break
+    rows = matched[offset:wanted]
+    return rows, {row['id']: archived[row['id']] for row in rows[:limit] if row['id'] in archived}
+
+
+def load_archived_rows(conn, rows):
+    """보관된 검색 결과 행의 본문을 세션별로 블롭에서 읽어 {id: dict} 로 반환"""
+    by_session = {}
+    for row in rows:
+        by_session.setdefault(row['session_id'], []).append(row['id'])
+    archived = {}
+    for session_id, message_ids in by_session.items():
+        archived.update(load_archived_by_ids(conn, session_id, message_ids))
+    return archived
+
+
+def backfill_batch(conn, batch_size=SEARCH_BACKFILL_BATCH):
+    """색인되지 않은 기존 메시지를 batch_size 개 색인하고 색인한 행 수 반환 (끝났으면 0)
+
+    run_in_transaction 으로 실행하며, 배치마다 짧은 쓰기 트랜잭션이라 채팅 쓰기와 번갈아 진행된다.
+    """
+    state = backfill_state(conn)
+    if state['complete']:
+        return 0
+    lower, until = state['indexed_upto'], state['until_id']
+    ids = conn.execute(
+        'SELECT id FROM chat_messages WHERE id > ? AND id <= ? ORDER BY id LIMIT ?',
+        (lower, until, batch_size)
+    ).fetchall()
+    # 남은 행이 배치보다 적으면 until_id 까지 끝냄
+    upper = ids[-1][0] if len(ids) == batch_size else until
+    conn.execute(
+        'INSERT INTO chat_messages_fts (rowid, content) SELECT id, content FROM chat_messages WHERE id > ? AND id <= ?',
+        (lower, upper)
+    )
+    conn.execute('UPDATE chat_search_backfill SET indexed_upto = ? WHERE id = 1', (upper,))
+    return max(len(ids), 1)
+
+
+class SearchIndexBackfill:
+    """기존 메시지 FTS 색인 백필을 백그라운드 스레드에서 배치 단위로 실행"""
+
+    def __init__(self, pool, batch_size=SEARCH_BACKFILL_BATCH, pause=SEARCH_BACKFILL_PAUSE):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.pause = pause
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'running': False, 'batches': 0, 'indexed_rows': 0, 'errors': 0, 'complete': False}
+
+    def start(self):
+        """백필 스레드 시작 (이미 실행 중이면 무시)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name='search-backfill', daemon=True)
+            self._stats['running'] = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """색인이 끝날 때까지 배치 실행 (오류가 나면 잠시 쉬었다가 다시 시도)"""
+        try:
+            while not self._stop.is_set():
+                try:
+                    indexed = self.pool.run_in_transaction(backfill_batch, self.batch_size)
+                except Exception as e:
+                    logging.warning(f'검색 색인 백필 오류, 다시 시도합니다: {e}')
+                    with self._lock:
+                        self._stats['errors'] += 1
+                    self._stop.wait(max(self.pause, 1.0))
+                    continue
+                if not indexed:
+                    with self._lock:
+                        self._stats['complete'] = True
+                    logging.info('검색 색인 백필 완료')
+                    return
+                with self._lock:
+                    self._stats['batches'] += 1
+                    self._stats['indexed_rows'] += indexed
+                self._stop.wait(self.pause)
+        finally:
+            with self._lock:
+                self._stats['running'] = False
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='채팅 기록 검색 색인 백필')
+    parser.add_argument('--backfill', action='store_true', help='색인되지 않은 기존 메시지를 끝까지 색인')
+    parser.add_argument('--batch-size', type=int, default=SEARCH_BACKFILL_BATCH)
+    parser.add_argument('--pause', type=float, default=SEARCH_BACKFILL_PAUSE, help='배치 사이 대기 (초)')
+    args = parser.parse_args()
+
+    from database import pool
+    with pool.connection() as conn:
+        print(backfill_state(conn))
+    if not args.backfill:
+        return
+
+    started = time.perf_counter()
+    backfill = SearchIndexBackfill(pool, args.batch_size, args.pause)
+    backfill.run()
+    with pool.connection() as conn:
+        print(backfill_state(conn), backfill.stats(), f'{time.perf_counter() - started:.1f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+# metrics.py
+import threading
+from collections import deque
+
+
+class LatencyRecorder:
+    """최근 샘플(이동 윈도우) 기반 지연시간 통계"""
+
+    def __init__(self, window=1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._count = 0
+        self._total = 0.0
+
+    def observe(self, seconds):
+        """지연시간 샘플 기록 (초 단위)"""
+        with self._lock:
+            self._samples.append(seconds)
+            self._count += 1
+            self._total += seconds
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        if not ordered:
+            return 0.0
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def summary(self):
+        """누적 횟수/평균과 최근 윈도우의 백분위수 (밀리초 단위)"""
+        with self._lock:
+            ordered = sorted(self._samples)
+            count = self._count
+            total = self._total
+        return {
+            'count': count,
+            'avg_ms': round(total * 1000 / count, 3) if count else 0.0,
+            'p50_ms': round(self._percentile(ordered, 50) * 1000, 3),
+            'p95_ms': round(self._percentile(ordered, 95) * 1000, 3),
+            'p99_ms': round(self._percentile(ordered, 99) * 1000, 3),
+            'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+        }
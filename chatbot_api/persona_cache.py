@@ -0,0 +1,107 @@
+# persona_cache.py
+import threading
+import os
+from collections import OrderedDict
+
+PERSONA_CACHE_MAX_ENTRIES = int(os.getenv('PERSONA_CACHE_MAX_ENTRIES', '2048'))
+PERSONA_CACHE_MAX_BYTES = int(os.getenv('PERSONA_CACHE_MAX_BYTES', str(16 * 1024 * 1024)))
+
+
+class PersonaCache:
+    """반려동물별 페르소나(pet_info + 시스템 프롬프트) LRU 캐시
+
+    (pet_id, profile_version) 으로 조회하므로, 다른 프로세스에서 프로필이 수정되어
+    버전이 올라가면 자동으로 미스가 된다. 같은 프로세스의 수정은 invalidate() 로 즉시 제거한다.
+    """
+
+    def __init__(self, max_entries=PERSONA_CACHE_MAX_ENTRIES, max_bytes=PERSONA_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # pet_id -> (version, pet_info, system_prompt, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'invalidations': 0,
+            'prompt_tokens': 0,
+            'cached_prompt_tokens': 0,
+        }
+
+    @staticmethod
+    def _entry_size(pet_info, system_prompt):
+        # 문자열 데이터 기준 근사 메모리 사용량
+        size = len(system_prompt.encode('utf-8'))
+        for value in pet_info.values():
+            if isinstance(value, str):
+                size += len(value.encode('utf-8'))
+        return size
+
+    def get(self, pet_id, version):
+        """캐시된 (pet_info, system_prompt) 조회 (없거나 버전이 다르면 None)"""
+        with self._lock:
+            entry = self._entries.get(pet_id)
+            if entry is None or entry[0] != version:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(pet_id)
+            self._stats['hits'] += 1
+            return entry[1], entry[2]
+
+    def put(self, pet_id, version, pet_info, system_prompt):
+        """페르소나 저장 후 용량 한도를 넘으면 가장 오래 사용하지 않은 항목부터 제거"""
+        size = self._entry_size(pet_info, system_prompt)
+        with self._lock:
+            old = self._entries.pop(pet_id, None)
+            if old is not None:
+                self._bytes -= old[3]
+            if size > self.max_bytes:
+                return
+            self._entries[pet_id] = (version, pet_info, system_prompt, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted[3]
+                self._stats['evictions'] += 1
+
+    def get_or_load(self, pet_id, version, loader):
+        """캐시에 없으면 loader() 로 (pet_info, system_prompt) 를 만들어 저장"""
+        cached = self.get(pet_id, version)
+        if cached is not None:
+            return cached
+        pet_info, system_prompt = loader()
+        self.put(pet_id, version, pet_info, system_prompt)
+        return pet_info, system_prompt
+
+    def invalidate(self, pet_id):
+        """반려동물 프로필 변경 시 캐시 항목 제거"""
+        with self._lock:
+            entry = self._entries.pop(pet_id, None)
+            if entry is not None:
+                self._bytes -= entry[3]
+            self._stats['invalidations'] += 1
+
+    def clear(self):
+        """전체 캐시 비우기"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def record_prompt_usage(self, prompt_tokens, cached_tokens):
+        """LLM 제공자의 프롬프트 접두사 캐시 적중 토큰 수 기록"""
+        with self._lock:
+            self._stats['prompt_tokens'] += prompt_tokens or 0
+            self._stats['cached_prompt_tokens'] += cached_tokens or 0
+
+    def stats(self):
+        """캐시 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_entries'] = self.max_entries
+        stats['max_bytes'] = self.max_bytes
+        return stats
@@ -0,0 +1,158 @@
+# pet_transfer.py
+import csv
+import io
+import json
+import os
+import queue
+
+BULK_IMPORT_CHUNK_SIZE = int(os.getenv('BULK_IMPORT_CHUNK_SIZE', '500'))
+BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', '50000'))
+BULK_IMPORT_MAX_ERRORS = int(os.getenv('BULK_IMPORT_MAX_ERRORS', '100'))
+PET_EXPORT_BATCH_SIZE = int(os.getenv('PET_EXPORT_BATCH_SIZE', '500'))
+
+# 가져오기에서 읽는 필드 (id, created_at 등 나머지 열은 무시)
+PET_IMPORT_FIELDS = ['name', 'species', 'breed', 'personality', 'speaking_style',
+                     'user_call', 'likes', 'dislikes', 'etc_info']
+# 내보내기 열 순서 (내보낸 파일을 그대로 다시 가져올 수 있음)
+PET_EXPORT_FIELDS = ['id'] + PET_IMPORT_FIELDS + ['created_at']
+
+TRANSFER_MIMETYPES = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+_FORMAT_ALIASES = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'application/json-lines': 'ndjson',
+    'text/csv': 'csv',
+    'application/csv': 'csv',
+}
+
+
+def detect_format(content_type, requested=None):
+    """?format= 또는 Content-Type 으로 형식 결정 ('ndjson' / 'csv', 알 수 없으면 None)"""
+    if requested:
+        requested = requested.strip().lower()
+        return requested if requested in TRANSFER_MIMETYPES else None
+    mimetype = (content_type or '').split(';')[0].strip().lower()
+    return _FORMAT_ALIASES.get(mimetype)
+
+
+def text_lines(binary_stream):
+    """바이트 스트림을 UTF-8(BOM 허용) 텍스트 줄 단위로 읽는 파일 객체로 감쌈"""
+    if not isinstance(binary_stream, io.BufferedIOBase):
+        binary_stream = io.BufferedReader(binary_stream)
+    return io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+
+def iter_rows(lines, fmt):
+    """(줄 번호, 입력 행 dict, 파싱 오류 메시지) 를 한 행씩 반환
+
+    파일 전체를 메모리에 올리지 않도록 줄 단위로 읽는다. 파싱에 실패한 행은 dict 대신
+    None 과 오류 메시지를 돌려주고 다음 행을 계속 읽는다.
+    """
+    if fmt == 'csv':
+        # 줄 번호는 행이 끝나는 줄 (따옴표 안 줄바꿈이 없으면 행이 있는 줄)
+        reader = csv.DictReader(lines)
+        try:
+            for row in reader:
+                if None in row:
+                    yield reader.line_num, None, '헤더보다 열이 많습니다'
+                    continue
+                yield reader.line_num, row, None
+        except (csv.Error, UnicodeDecodeError) as e:
+            yield reader.line_num + 1, None, f'CSV 형식 오류: {e}'
+        return
+
+    line_no = 0
+    while True:
+        try:
+            line = next(lines, None)
+        except UnicodeDecodeError as e:
+            yield line_no + 1, None, f'UTF-8 이 아닙니다: {e}'
+            return
+        if line is None:
+            return
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, 'JSON 형식이 아닙니다'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'JSON 객체가 아닙니다'
+            continue
+        yield line_no, row, None
+
+
+def normalize_row(row):
+    """가져올 필드만 남기고 빈 선택 필드는 '' 로 채움 ((data, 오류 메시지) 반환)"""
+    data = {}
+    for field in PET_IMPORT_FIELDS:
+        value = row.get(field)
+        if value is None:
+            value = ''
+        if not isinstance(value, str):
+            return None, f'{field}는 문자열이어야 합니다'
+        data[field] = value
+    return data, None
+
+
+def export_header(fmt):
+    """내보내기 첫 부분 (CSV 헤더)"""
+    if fmt != 'csv':
+        return ''
+    return ','.join(PET_EXPORT_FIELDS) + '\n'
+
+
+def serialize_rows(rows, fmt):
+    """조회한 반려동물 행 묶음을 NDJSON / CSV 텍스트로 변환"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerows([row[field] for field in PET_EXPORT_FIELDS] for row in rows)
+        return buffer.getvalue()
+    return ''.join(
+        json.dumps({field: row[field] for field in PET_EXPORT_FIELDS}, ensure_ascii=False) + '\n'
+        for row in rows
+    )
+
+
+class QueueStream(io.RawIOBase):
+    """이벤트 루프가 넣어 주는 요청 본문 청크를 작업 스레드에서 읽는 바이트 스트림
+
+    비동기 서버에서 가져오기를 스레드로 실행할 때 본문 전체를 모으지 않고 넘기기 위해 쓴다.
+    feed(None) 이 본문의 끝이다. 읽는 쪽이 먼저 끝나면(close) 이후 feed() 는 버린다.
+    """
+
+    def __init__(self, max_chunks=16):
+        super().__init__()
+        self._chunks = queue.Queue(max_chunks)
+        self._buffer = b''
+        self._eof = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self._buffer:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            if chunk is None:
+                self._eof = True
+                return 0
+            self._buffer = chunk
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def feed(self, chunk):
+        """본문 청크 전달 (큐가 가득 차면 읽는 쪽을 기다림, 블로킹)"""
+        while not self.closed:
+            try:
+                self._chunks.put(chunk, timeout=0.1)
+                return
+            except queue.Full:
+                continue
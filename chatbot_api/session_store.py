@@ -0,0 +1,231 @@
+# session_store.py
+"""서버 측 로그인 세션과 요청별 권한 확인 캐시
+
+로그인하면 임의 토큰을 발급해 쿠키 세션(sid)에 넣고, DB(user_sessions)에는 토큰의 SHA-256 만 저장한다.
+로그아웃하면 행을 지우므로 쿠키를 복사해 두어도 더 이상 쓸 수 없다.
+
+요청마다 DB 를 읽지 않도록 두 가지를 프로세스 안 LRU 에 둔다.
+    토큰 → user_id (만료 시각 포함)
+    (user_id, pet_id) → 반려동물 프로필 버전, 최근 대화 세션 id (소유권 확인 결과)
+채팅 한 턴의 세션 확인, 반려동물 소유권 확인, 최근 세션 조회가 메모리 조회 한 번이 된다.
+
+같은 프로세스의 쓰기(로그아웃, 프로필 수정, 새 대화 세션)는 바로 캐시에 반영한다.
+로그아웃은 session_revocations 의 세대 번호도 올린다. 각 프로세스는 SESSION_REVOCATION_CHECK_INTERVAL
+초마다 한 번 이 번호를 읽고, 바뀌었으면 캐시한 세션을 모두 비운다. 그래서 다른 프로세스에서 로그아웃한
+쿠키도 그 간격 안에 거부된다. 반려동물 프로필 수정은 항목이 SESSION_CACHE_TTL 초 뒤 만료되어 DB 를
+다시 읽을 때 반영된다. 반려동물과 대화 세션은 삭제되지 않으므로 소유권과 세션 id 는 캐시가 오래되어도
+틀리지 않는다.
+"""
+import hashlib
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_TTL = float(os.getenv('SESSION_TTL', str(30 * 24 * 3600)))
+SESSION_CACHE_TTL = float(os.getenv('SESSION_CACHE_TTL', '60'))
+SESSION_CACHE_MAX_ENTRIES = int(os.getenv('SESSION_CACHE_MAX_ENTRIES', '10000'))
+SESSION_REVOCATION_CHECK_INTERVAL = float(os.getenv('SESSION_REVOCATION_CHECK_INTERVAL', '1'))
+
+
+def hash_token(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def insert_session(conn, token_hash, user_id, expires_at):
+    """세션 행 추가 (사용자가 없으면 None, run_in_transaction 용)"""
+    try:
+        conn.execute('INSERT INTO user_sessions (id, user_id, expires_at) VALUES (?, ?, ?)',
+                     (token_hash, user_id, expires_at))
+    except sqlite3.IntegrityError:
+        return None
+    return token_hash
+
+
+def delete_session(conn, token_hash):
+    """세션 행 삭제 후 세대 번호를 올려 다른 프로세스의 캐시도 비우게 함 (run_in_transaction 용)"""
+    if conn.execute('DELETE FROM user_sessions WHERE id = ?', (token_hash,)).rowcount:
+        conn.execute('UPDATE session_revocations SET generation = generation + 1 WHERE id = 1')
+
+
+def fetch_pet_access(conn, user_id, pet_id):
+    """소유권 확인 후 {'profile_version', 'chat_session_id'} 반환 (사용자의 반려동물이 아니면 None)"""
+    pet = conn.execute(
+        'SELECT profile_version FROM pets WHERE id = ? AND user_id = ?', (pet_id, user_id)
+    ).fetchone()
+    if pet is None:
+        return None
+    session_row = conn.execute(
+        'SELECT id FROM chat_sessions WHERE user_id = ? AND pet_id = ? ORDER BY last_message_time DESC LIMIT 1',
+        (user_id, pet_id)
+    ).fetchone()
+    return {
+        'profile_version': pet['profile_version'],
+        'chat_session_id': session_row['id'] if session_row else None,
+    }
+
+
+class SessionStore:
+    """user_sessions 테이블 앞단의 LRU 캐시
+
+    DB 를 읽는 load_user / check_revocations 는 conn 을 받으므로 동기 서버는 pool 연결로, 비동기 서버는
+    db.run() 으로 실행한다. cached_* / remember_* 메서드는 DB 를 읽지 않는다. 반려동물 소유권은 store_user_turn 이 트랜잭션 안에서
+    확인한 결과를 커밋 후 remember_pet_access 로 넣는다.
+    """
+
+    def __init__(self, ttl=SESSION_TTL, cache_ttl=SESSION_CACHE_TTL, max_entries=SESSION_CACHE_MAX_ENTRIES,
+                 revocation_interval=SESSION_REVOCATION_CHECK_INTERVAL):
+        self.ttl = ttl
+        self.cache_ttl = cache_ttl
+        self.max_entries = max_entries
+        self.revocation_interval = revocation_interval
+        self._generation = None
+        self._next_revocation_check = 0.0
+        self._sessions = OrderedDict()  # token_hash -> (user_id, expires_at, cached_at)
+        self._pets = OrderedDict()      # (user_id, pet_id) -> (access, cached_at)
+        self._lock = threading.Lock()
+        self._stats = {
+            'session_hits': 0,
+            'session_misses': 0,
+            'pet_hits': 0,
+            'pet_misses': 0,
+            'created': 0,
+            'revoked': 0,
+            'rejected': 0,
+            'evictions': 0,
+            'revocation_checks': 0,
+            'revocation_flushes': 0,
+        }
+
+    def _put(self, table, key, value):
+        # self._lock 안에서 호출
+        table[key] = value
+        table.move_to_end(key)
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def new_session(self, user_id):
+        """발급할 (토큰, 토큰 해시, 만료 시각) 생성 (insert_session 으로 저장한 뒤 remember_session 호출)"""
+        token = secrets.token_urlsafe(32)
+        return token, hash_token(token), time.time() + self.ttl
+
+    def remember_session(self, token_hash, user_id, expires_at):
+        with self._lock:
+            self._put(self._sessions, token_hash, (user_id, expires_at, time.monotonic()))
+            self._stats['created'] += 1
+
+    def cached_user(self, token):
+        """캐시에 있는 유효한 세션의 user_id (없거나 만료됐으면 None)"""
+        if not token:
+            return None
+        token_hash = hash_token(token)
+        with self._lock:
+            entry = self._sessions.get(token_hash)
+            if entry is None or time.monotonic() - entry[2] > self.cache_ttl:
+                self._stats['session_misses'] += 1
+                return None
+            if entry[1] <= time.time():
+                del self._sessions[token_hash]
+                self._stats['session_misses'] += 1
+                return None
+            self._sessions.move_to_end(token_hash)
+            self._stats['session_hits'] += 1
+            return entry[0]
+
+    def load_user(self, conn, token):
+        """DB 에서 세션을 읽어 캐시에 넣고 user_id 반환 (없거나 만료됐으면 None)"""
+        if not token:
+            return None
+        token_hash = hash_token(token)
+        row = conn.execute(
+            'SELECT user_id, expires_at FROM user_sessions WHERE id = ? AND expires_at > ?',
+            (token_hash, time.time())
+        ).fetchone()
+        with self._lock:
+            if row is None:
+                self._sessions.pop(token_hash, None)
+                self._stats['rejected'] += 1
+                return None
+            self._put(self._sessions, token_hash, (row['user_id'], row['expires_at'], time.monotonic()))
+        return row['user_id']
+
+    def revocation_check_due(self):
+        """세대 번호를 확인할 때가 됐는지 (revocation_interval 마다 한 요청만 True)"""
+        now = time.monotonic()
+        with self._lock:
+            if now < self._next_revocation_check:
+                return False
+            self._next_revocation_check = now + self.revocation_interval
+            return True
+
+    def check_revocations(self, conn):
+        """세대 번호가 바뀌었으면 (어느 프로세스에서든 로그아웃) 캐시한 세션을 모두 비움
+
+        처음 확인할 때도 비워, 확인 전에 캐시한 세션이 그사이 폐기됐어도 남지 않게 한다.
+        """
+        row = conn.execute('SELECT generation FROM session_revocations WHERE id = 1').fetchone()
+        generation = row[0] if row else 0
+        with self._lock:
+            self._stats['revocation_checks'] += 1
+            if generation != self._generation:
+                self._sessions.clear()
+                self._generation = generation
+                self._stats['revocation_flushes'] += 1
+
+    def forget_session(self, token):
+        """로그아웃한 세션을 캐시에서 제거 (DB 행은 delete_session 으로 삭제)"""
+        if not token:
+            return None
+        token_hash = hash_token(token)
+        with self._lock:
+            self._sessions.pop(token_hash, None)
+            self._stats['revoked'] += 1
+        return token_hash
+
+    def cached_pet_access(self, user_id, pet_id):
+        with self._lock:
+            entry = self._pets.get((user_id, pet_id))
+            if entry is None or time.monotonic() - entry[1] > self.cache_ttl:
+                self._stats['pet_misses'] += 1
+                return None
+            self._pets.move_to_end((user_id, pet_id))
+            self._stats['pet_hits'] += 1
+            return dict(entry[0])
+
+    def remember_pet_access(self, user_id, pet_id, access):
+        """확인한 소유권/최근 세션을 캐시에 반영 (트랜잭션 커밋 후 호출)
+
+        아직 유효한 항목이면 세션 id 만 바꾸고 읽은 시각은 그대로 두어, 대화가 이어지는 동안에도
+        SESSION_CACHE_TTL 마다 DB 를 다시 읽어 다른 프로세스의 프로필 수정을 반영한다.
+        """
+        key = (user_id, pet_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._pets.get(key)
+            if entry is not None and now - entry[1] <= self.cache_ttl:
+                entry[0]['chat_session_id'] = access['chat_session_id']
+                return
+            self._put(self._pets, key, (dict(access), now))
+
+    def invalidate_pet(self, user_id, pet_id):
+        """반려동물 프로필 수정 시 캐시 항목 제거"""
+        with self._lock:
+            self._pets.pop((user_id, pet_id), None)
+
+    def purge_expired(self, conn):
+        """만료된 세션 행 삭제 (삭제한 행 수)"""
+        return conn.execute('DELETE FROM user_sessions WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['sessions'] = len(self._sessions)
+            stats['pets'] = len(self._pets)
+        lookups = stats['session_hits'] + stats['session_misses']
+        stats['session_hit_rate'] = round(stats['session_hits'] / lookups, 4) if lookups else 0.0
+        lookups = stats['pet_hits'] + stats['pet_misses']
+        stats['pet_hit_rate'] = round(stats['pet_hits'] / lookups, 4) if lookups else 0.0
+        return stats
@@ -80,9 +80,110 @@ class ChatbotAPI {
         });
     }
 
-    // 대화 기록 조회
-    async getChatHistory(petId) {
-        return await this.makeRequest(`/chat/history/${petId}`);
+    // 채팅 메시지 스트리밍 전송 (SSE) - 토큰이 도착할 때마다 onToken 호출
+    async sendMessageStream(message, petId, onToken) {
+        const response = await fetch(this.baseURL + '/chat/send', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
+            },
+            credentials: 'include',
+            body: JSON.stringify({
+                message: message,
+                pet_id: petId,
+                stream: true
+            })
+        });
+
+        if (!response.ok) {
+            const error = new Error(`HTTP ${response.status}`);
+            error.status = response.status;
+            error.data = await response.json().catch(() => ({}));
+            throw error;
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let result = null;
+
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+
+            // SSE 이벤트는 빈 줄로 구분됨
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                const frame = this.parseSSEFrame(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
+
+                if (frame.event === 'token') {
+                    onToken(frame.data.delta);
+                } else if (frame.event === 'done') {
+                    result = frame.data;
+                } else if (frame.event === 'error') {
+                    const error = new Error(frame.data.error || '스트리밍 오류');
+                    error.status = 500;
+                    error.data = frame.data;
+                    throw error;
+                }
+            }
+        }
+
+        if (!result) {
+            const error = new Error('응답 스트림이 완료되지 않았습니다');
+            error.status = 0;
+            throw error;
+        }
+
+        return result;
+    }
+
+    // SSE 프레임 파싱 (event/data 필드)
+    parseSSEFrame(frame) {
+        let event = 'message';
+        const dataLines = [];
+
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                dataLines.push(line.slice(5).trim());
+            }
+        });
+
+        let data = {};
+        try {
+            data = JSON.parse(dataLines.join('\n') || '{}');
+        } catch (e) {
+            console.error('SSE 데이터 파싱 실패:', e);
+        }
+        return { event, data };
+    }
+
+    // 스트리밍 지원 여부
+    supportsStreaming() {
+        return typeof ReadableStream !== 'undefined' && typeof TextDecoder !== 'undefined';
+    }
+
+    // 대화 기록 조회 (beforeId 보다 오래된 메시지 limit 개, compact 응답을 객체로 변환)
+    async getChatHistory(petId, beforeId = null, limit = 50) {
+        const params = new URLSearchParams({ limit: String(limit), compact: '1' });
+        if (beforeId) {
+            params.set('before_id', String(beforeId));
+        }
+        const page = await this.makeRequest(`/chat/history/${petId}?${params}`);
+        if (page.fields) {
+            page.messages = page.messages.map(row => {
+                const msg = {};
+                page.fields.forEach((field, i) => { msg[field] = row[i]; });
+                return msg;
+            });
+        }
+        return page;
     }
 
     // 채팅 세션 목록 조회
@@ -107,6 +208,8 @@ class PetChatbotReal {
         this.initEventListeners();
         this.currentPetId = null;
         this.currentConversation = [];
+        this.historyCursor = null;   // 더 오래된 기록을 불러올 before_id (없으면 null)
+        this.loadingOlder = false;
         this.isDragging = false;
         this.dragOffset = { x: 0, y: 0 };
         this.dragTarget = null;
@@ -166,6 +269,13 @@ class PetChatbotReal {
         this.historyBtn.addEventListener('click', () => this.showHistory());
         this.closeHistoryBtn.addEventListener('click', () => this.hideHistory());
         
+        // 스크롤이 맨 위에 가까워지면 이전 대화 불러오기
+        this.chatMessages.addEventListener('scroll', () => {
+            if (this.chatMessages.scrollTop < 50) {
+                this.loadOlderMessages();
+            }
+        });
+        
         // 반려동물 선택
         this.petSelect.addEventListener('change', () => this.onPetChange());
         
@@ -306,14 +416,43 @@ class PetChatbotReal {
         try {
             const response = await this.api.getChatHistory(petId);
             this.currentConversation = response.messages || [];
+            this.historyCursor = response.has_more ? response.next_before_id : null;
             this.renderMessages();
         } catch (error) {
             console.error('대화 기록 로드 실패:', error);
             this.currentConversation = [];
+            this.historyCursor = null;
             this.renderMessages();
         }
     }
 
+    // 이전 대화 한 페이지를 불러와 위쪽에 추가 (스크롤 위치 유지)
+    async loadOlderMessages() {
+        if (!this.historyCursor || this.loadingOlder || !this.currentPetId) return;
+        
+        this.loadingOlder = true;
+        const petId = this.currentPetId;
+        try {
+            const response = await this.api.getChatHistory(petId, this.historyCursor);
+            if (petId !== this.currentPetId) return;  // 그 사이 다른 반려동물로 전환됨
+            
+            const older = response.messages || [];
+            this.historyCursor = response.has_more ? response.next_before_id : null;
+            this.currentConversation = older.concat(this.currentConversation);
+            
+            const previousHeight = this.chatMessages.scrollHeight;
+            const anchor = this.chatMessages.firstChild;
+            older.forEach(msg => {
+                this.chatMessages.insertBefore(this.createMessageElement(msg.content, msg.sender, new Date(msg.timestamp)), anchor);
+            });
+            this.chatMessages.scrollTop += this.chatMessages.scrollHeight - previousHeight;
+        } catch (error) {
+            console.error('이전 대화 로드 실패:', error);
+        } finally {
+            this.loadingOlder = false;
+        }
+    }
+
     // 메시지 렌더링
     renderMessages() {
         this.chatMessages.innerHTML = '';
@@ -363,23 +502,51 @@ class PetChatbotReal {
         this.showTypingIndicator();
 
         try {
-            // 선택된 반려동물 페르소나 정보
-            const selectedOption = this.petSelect.selectedOptions[0];
-            const persona = JSON.parse(selectedOption.dataset.persona || '{}');
-            
-            // AI 응답 요청
-            const response = await this.api.sendMessage(
-                message, 
-                this.currentPetId, 
-                persona, 
-                this.currentConversation.slice(-10) // 최근 10개 메시지만
-            );
-            
-            // 타이핑 인디케이터 숨김
-            this.hideTypingIndicator();
-            
-            // AI 응답 추가
-            this.addMessageToChat(response.content, 'bot', new Date());
+            let replyContent;
+
+            if (this.api.supportsStreaming()) {
+                // 스트리밍 응답: 토큰이 도착할 때마다 말풍선을 갱신
+                let botMessage = null;
+                let partial = '';
+
+                const result = await this.api.sendMessageStream(message, this.currentPetId, (delta) => {
+                    if (!botMessage) {
+                        this.hideTypingIndicator();
+                        botMessage = this.addMessageToChat('', 'bot', new Date());
+                    }
+                    partial += delta;
+                    this.updateMessageContent(botMessage, partial);
+                });
+
+                this.hideTypingIndicator();
+                replyContent = result.content;
+
+                // 폴백 등으로 최종 응답이 스트리밍된 내용과 다르면 교체
+                if (!botMessage) {
+                    botMessage = this.addMessageToChat(replyContent, 'bot', new Date());
+                } else if (replyContent !== partial) {
+                    this.updateMessageContent(botMessage, replyContent);
+                }
+            } else {
+                // 선택된 반려동물 페르소나 정보
+                const selectedOption = this.petSelect.selectedOptions[0];
+                const persona = JSON.parse(selectedOption.dataset.persona || '{}');
+                
+                // AI 응답 요청
+                const response = await this.api.sendMessage(
+                    message, 
+                    this.currentPetId, 
+                    persona, 
+                    this.currentConversation.slice(-10) // 최근 10개 메시지만
+                );
+                
+                // 타이핑 인디케이터 숨김
+                this.hideTypingIndicator();
+                
+                // AI 응답 추가
+                replyContent = response.content;
+                this.addMessageToChat(replyContent, 'bot', new Date());
+            }
             
             // 대화 내용 업데이트
             this.currentConversation.push({
@@ -388,7 +555,7 @@ class PetChatbotReal {
                 timestamp: new Date().toISOString()
             });
             this.currentConversation.push({
-                content: response.content,
+                content: replyContent,
                 sender: 'bot',
                 timestamp: new Date().toISOString()
             });
@@ -410,16 +577,29 @@ class PetChatbotReal {
 
     // 메시지를 채팅창에 추가
     addMessageToChat(content, sender, timestamp, save = true) {
+        const messageDiv = this.createMessageElement(content, sender, timestamp);
+        
+        // 타이핑 인디케이터 앞에 삽입
+        this.chatMessages.insertBefore(messageDiv, this.typingIndicator);
+        
+        this.scrollToBottom();
+        return messageDiv;
+    }
+
+    // 말풍선 요소 생성
+    createMessageElement(content, sender, timestamp) {
         const messageDiv = document.createElement('div');
         messageDiv.className = `message ${sender}`;
         messageDiv.innerHTML = `
             <div>${this.formatMessageContent(content)}</div>
             <div class="message-time">${this.formatTime(timestamp)}</div>
         `;
-        
-        // 타이핑 인디케이터 앞에 삽입
-        this.chatMessages.insertBefore(messageDiv, this.typingIndicator);
-        
+        return messageDiv;
+    }
+
+    // 기존 말풍선의 내용 갱신 (스트리밍 응답용)
+    updateMessageContent(messageDiv, content) {
+        messageDiv.firstElementChild.innerHTML = this.formatMessageContent(content);
         this.scrollToBottom();
     }
 
@@ -0,0 +1,84 @@
+# lazy_provider.py
+"""무거운 LLM SDK 의 지연 초기화 (chatbot_api, chat 공용)
+
+openai / langchain_openai 는 import 만으로 수백 ms 가 걸려 워커 시작 시간의 대부분을 차지한다.
+LazyProvider 는 클라이언트를 만드는 factory 를 처음 필요할 때 한 번만 실행하므로, 그 전까지는
+SDK 를 import 하지 않는다. 속성 접근(client.chat.completions.create, llm.stream ...)을 만들어 둔
+클라이언트로 그대로 넘기므로 호출하는 코드는 바꾸지 않아도 된다.
+
+초기화 시점은 LLM_PRELOAD 로 정한다.
+    lazy        첫 LLM 호출 때 (첫 요청이 import 시간만큼 느려짐)
+    background  서버 시작 후 start_preload() 가 띄운 스레드에서 (기본값, 요청을 받으면서 예열)
+    eager       LazyProvider 를 만들 때 바로 (gunicorn --preload 처럼 fork 전 마스터 프로세스에서
+                한 번 읽어 두고 워커들이 copy-on-write 로 공유할 때)
+
+비동기 서버에서 lazy 로 쓰면 첫 호출의 import 가 이벤트 루프를 막으므로 background 나 eager 를 쓴다.
+"""
+import logging
+import os
+import threading
+import time
+
+LLM_PRELOAD = os.getenv('LLM_PRELOAD', 'background')  # 'lazy', 'background', 'eager'
+
+
+class LazyProvider:
+    """factory() 결과를 처음 쓸 때 만들어 두고 속성 접근을 넘기는 프록시"""
+
+    def __init__(self, name, factory, preload=LLM_PRELOAD):
+        self._name = name
+        self._factory = factory
+        self._preload = preload
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._stats = {'loaded': False, 'load_seconds': 0.0, 'load_errors': 0, 'preloaded': False}
+        if preload == 'eager':
+            self.get()
+
+    def get(self):
+        """만들어 둔 클라이언트 반환 (처음이면 factory 실행, 동시에 불려도 한 번만 실행)"""
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception:
+                    self._stats['load_errors'] += 1
+                    raise
+                self._loaded = True
+                self._stats['loaded'] = True
+                self._stats['load_seconds'] = round(time.perf_counter() - started, 4)
+                logging.info(f'{self._name} 초기화 완료 ({self._stats["load_seconds"]}s)')
+        return self._value
+
+    def __getattr__(self, name):
+        # 초기화 전 내부 속성 조회(복사, pickle 등)가 factory 를 실행하지 않도록 함
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.get(), name)
+
+    def start_preload(self):
+        """LLM_PRELOAD=background 이면 백그라운드 스레드에서 미리 초기화 (서버 시작 시 호출)"""
+        if self._preload != 'background' or self._loaded:
+            return
+        threading.Thread(target=self._run_preload, name=f'{self._name}-preload', daemon=True).start()
+
+    def _run_preload(self):
+        try:
+            self.get()
+        except Exception as e:
+            logging.error(f'{self._name} 미리 초기화 실패 (첫 호출 때 다시 시도): {e}')
+            return
+        with self._lock:
+            self._stats['preloaded'] = True
+
+    @property
+    def loaded(self):
+        return self._loaded
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,217 @@
+# llm_batcher.py
+"""LLM 요청 마이크로 배칭
+
+자체 호스팅한 OpenAI 호환 추론 서버(vLLM 등)는 여러 프롬프트를 한 번에 처리할 때 처리량이 크게 늘어난다.
+BatchDispatcher 는 동시에 들어온 요청을 최대 max_wait 초(또는 max_batch_size 개가 찰 때까지) 모아
+send_batch(items, timeout) 로 한꺼번에 보내고, 결과를 기다리던 요청들에게 나눠 준다.
+
+백엔드:
+    completions  /v1/completions 에 프롬프트 목록을 한 번에 보냄 (배치 프롬프트를 지원하는 서버)
+    parallel     배치 안의 채팅 요청을 동시에 보냄 (배치 API 는 없지만 연속 배칭을 하는 서버)
+
+게이트웨이(llm_gateway)와 함께 쓸 때는 llm_gateway.call(lambda timeout: batcher.submit(item, timeout)) 처럼
+감싸 마감시간/재시도/서킷 브레이커를 그대로 적용한다.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+# 배칭 설정 (환경변수로 조정 가능)
+LLM_BATCH_MODE = os.getenv('LLM_BATCH_MODE', '')  # '' 이면 사용 안 함, 'completions' 또는 'parallel'
+LLM_BATCH_MAX_SIZE = int(os.getenv('LLM_BATCH_MAX_SIZE', '16'))
+LLM_BATCH_MAX_WAIT_MS = float(os.getenv('LLM_BATCH_MAX_WAIT_MS', '10'))
+LLM_BATCH_MAX_IN_FLIGHT = int(os.getenv('LLM_BATCH_MAX_IN_FLIGHT', '4'))
+
+
+class BatchDispatcher:
+    """동시 요청을 모아 send_batch(items, timeout) 로 한 번에 보내는 디스패처
+
+    send_batch 는 items 와 같은 순서의 결과 목록을 돌려준다. 결과 자리에 예외 객체를 넣으면
+    그 요청만 실패하고, send_batch 자체가 예외를 던지면 배치의 모든 요청이 실패한다.
+    배치는 최대 max_in_flight 개까지 동시에 보내며, 그동안 다음 배치를 계속 모은다.
+    """
+
+    def __init__(self, send_batch, max_batch_size=LLM_BATCH_MAX_SIZE, max_wait=LLM_BATCH_MAX_WAIT_MS / 1000,
+                 max_in_flight=LLM_BATCH_MAX_IN_FLIGHT, name='llm'):
+        self.send_batch = send_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.max_in_flight = max_in_flight
+        self.name = name
+        self._pending = deque()  # (future, item, enqueued_at, deadline_at)
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix=f'{name}-batch')
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._stats = {
+            'requests': 0,
+            'batches': 0,
+            'batched_items': 0,
+            'largest_batch': 0,
+            'expired': 0,
+            'failed_batches': 0,
+            'queue_wait_total_s': 0.0,
+        }
+        threading.Thread(target=self._run, name=f'{name}-batcher', daemon=True).start()
+
+    def submit_future(self, item, timeout):
+        """요청을 대기열에 넣고 결과 Future 반환"""
+        future = Future()
+        now = time.monotonic()
+        with self._cond:
+            self._pending.append((future, item, now, now + timeout))
+            self._stats['requests'] += 1
+            self._cond.notify()
+        return future
+
+    def submit(self, item, timeout):
+        """요청을 배치에 넣고 결과를 기다림 (timeout 초 안에 끝나지 않으면 TimeoutError)"""
+        future = self.submit_future(item, timeout)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 아직 보내지 않은 요청이면 배치에서 빠진다
+            future.cancel()
+            raise TimeoutError(f'{self.name}: 배치 응답 대기 시간 초과') from None
+
+    async def submit_async(self, item, timeout):
+        """비동기 서버용 submit"""
+        future = self.submit_future(item, timeout)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise TimeoutError(f'{self.name}: 배치 응답 대기 시간 초과') from None
+
+    def _collect(self):
+        """첫 요청이 들어온 뒤 max_wait 동안(또는 배치가 찰 때까지) 요청을 모아 반환"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            flush_at = self._pending[0][2] + self.max_wait
+            while len(self._pending) < self.max_batch_size:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # 이미 시간 초과로 취소된 요청은 보내지 않는다
+            now = time.monotonic()
+            live = [entry for entry in batch if entry[0].set_running_or_notify_cancel()]
+            with self._cond:
+                self._stats['expired'] += len(batch) - len(live)
+                if live:
+                    self._stats['batches'] += 1
+                    self._stats['batched_items'] += len(live)
+                    self._stats['largest_batch'] = max(self._stats['largest_batch'], len(live))
+                    self._stats['queue_wait_total_s'] += sum(now - entry[2] for entry in live)
+            if not live:
+                continue
+            self._slots.acquire()
+            self._executor.submit(self._dispatch, live)
+
+    def _dispatch(self, batch):
+        try:
+            timeout = max(max(entry[3] for entry in batch) - time.monotonic(), 0.001)
+            try:
+                results = self.send_batch([entry[1] for entry in batch], timeout)
+                if len(results) != len(batch):
+                    raise RuntimeError(f'{self.name}: 배치 결과 수가 요청 수와 다릅니다')
+            except Exception as e:
+                with self._cond:
+                    self._stats['failed_batches'] += 1
+                for future, *_ in batch:
+                    future.set_exception(e)
+                return
+            for (future, *_), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        """배치 수, 평균 배치 크기, 평균 대기 시간 등 조회"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queued'] = len(self._pending)
+        wait_total = stats.pop('queue_wait_total_s')
+        batches = stats['batches']
+        items = stats['batched_items']
+        stats['avg_batch_size'] = round(items / batches, 2) if batches else 0.0
+        stats['avg_queue_wait_ms'] = round(wait_total / items * 1000, 2) if items else 0.0
+        stats['max_batch_size'] = self.max_batch_size
+        stats['max_wait_ms'] = round(self.max_wait * 1000, 2)
+        stats['max_in_flight'] = self.max_in_flight
+        return stats
+
+
+def render_chat_prompt(messages):
+    """채팅 메시지 목록을 ChatML 형식 프롬프트로 변환 (completions 백엔드용)
+
+    서버 모델의 채팅 템플릿과 다르면 render_prompt 로 다른 함수를 넘긴다.
+    """
+    parts = [f"<|im_start|>{message['role']}\n{message['content']}<|im_end|>" for message in messages]
+    parts.append('<|im_start|>assistant\n')
+    return '\n'.join(parts)
+
+
+def completions_backend(client, options, render_prompt=render_chat_prompt):
+    """OpenAI SDK 클라이언트로 프롬프트 목록을 /v1/completions 에 한 번에 보내는 send_batch
+
+    items 는 채팅 메시지 목록이고, 결과는 응답 텍스트다.
+    """
+    def send_batch(items, timeout):
+        response = client.completions.create(
+            prompt=[render_prompt(messages) for messages in items],
+            stop=['<|im_end|>'],
+            timeout=timeout,
+            **options
+        )
+        texts = [RuntimeError('배치 응답에 결과가 없습니다') for _ in items]
+        for choice in response.choices:
+            texts[choice.index] = choice.text.strip()
+        return texts
+    return send_batch
+
+
+def parallel_backend(send_one, max_workers=LLM_BATCH_MAX_SIZE):
+    """배치 안의 요청을 send_one(item, timeout) 으로 동시에 보내는 send_batch"""
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-batch-parallel')
+
+    def send_batch(items, timeout):
+        futures = [executor.submit(send_one, item, timeout) for item in items]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(e)
+        return results
+    return send_batch
+
+
+def create_batcher(mode, client, options, name='llm', **kwargs):
+    """LLM_BATCH_MODE 에 맞는 BatchDispatcher 생성 (mode 가 비어 있거나 client 가 없으면 None)"""
+    if not mode or client is None:
+        return None
+    if mode == 'completions':
+        send_batch = completions_backend(client, options)
+    elif mode == 'parallel':
+        def send_one(messages, timeout):
+            response = client.chat.completions.create(messages=messages, timeout=timeout, **options)
+            return response.choices[0].message.content.strip()
+        send_batch = parallel_backend(send_one, kwargs.get('max_batch_size', LLM_BATCH_MAX_SIZE))
+    else:
+        raise ValueError(f'지원하지 않는 LLM_BATCH_MODE 입니다: {mode}')
+    return BatchDispatcher(send_batch, name=name, **kwargs)
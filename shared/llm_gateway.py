@@ -0,0 +1,570 @@
+# llm_gateway.py
+"""LLM 호출 게이트웨이 (chatbot_api, chat 공용)
+
+업스트림 LLM 호출에 호출별 마감시간, 지터 재시도, 선택적 헤지(hedged) 요청, 서킷 브레이커,
+동시 호출 제한을 적용한다. 실제 요청은 func(timeout) 이 보내므로 OpenAI SDK, LangChain 어느 쪽에도
+쓸 수 있고, func 는 전달받은 timeout(초) 을 요청 타임아웃으로 사용해야 한다.
+
+게이트웨이가 호출을 포기하면 LLMUnavailable(또는 마지막 업스트림 예외)을 던지고,
+호출한 쪽은 이를 잡아 폴백 응답을 보낸다.
+"""
+import asyncio
+import inspect
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# 게이트웨이 설정 (환경변수로 조정 가능)
+LLM_DEADLINE = float(os.getenv('LLM_DEADLINE', '20'))
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '2'))
+LLM_RETRY_BASE_DELAY = float(os.getenv('LLM_RETRY_BASE_DELAY', '0.2'))
+LLM_RETRY_MAX_DELAY = float(os.getenv('LLM_RETRY_MAX_DELAY', '2.0'))
+LLM_HEDGE_PERCENTILE = float(os.getenv('LLM_HEDGE_PERCENTILE', '0'))  # 0 이면 헤지 요청 사용 안 함
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '32'))
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '2.0'))
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '5'))
+LLM_BREAKER_RESET = float(os.getenv('LLM_BREAKER_RESET', '30'))
+
+# 재시도할 HTTP 상태 코드 (그 외 4xx 는 요청 자체의 문제이므로 재시도하지 않음)
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMUnavailable(Exception):
+    """게이트웨이가 LLM 호출을 포기함 (폴백 응답 사용)"""
+
+
+class CircuitOpenError(LLMUnavailable):
+    """서킷 브레이커가 열려 있어 호출하지 않음"""
+
+
+class ConcurrencyLimitError(LLMUnavailable):
+    """동시 호출 한도를 넘어 대기 시간 안에 순서가 오지 않음"""
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """호출 마감시간 안에 성공하지 못함"""
+
+
+def is_retryable(exc):
+    """일시적인 업스트림 오류(타임아웃, 연결 오류, 429, 5xx)인지 판단"""
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, 'status_code', None)
+    if status is not None:
+        return status in RETRYABLE_STATUS or status >= 500
+    # openai.APITimeoutError / APIConnectionError 등 (SDK 에 의존하지 않도록 이름으로 판단)
+    name = type(exc).__name__
+    return 'Timeout' in name or 'Connection' in name
+
+
+class CircuitBreaker:
+    """연속 실패 횟수 기반 서킷 브레이커
+
+    연속 failure_threshold 번 실패하면 열리고(open), reset_timeout 초 동안 호출을 막는다.
+    이후 한 번의 시험 호출(half_open)이 성공하면 닫히고, 실패하면 다시 열린다.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=LLM_BREAKER_FAILURES, reset_timeout=LLM_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._opens = 0
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        """호출을 시도해볼 필요도 없이 열려 있는지 (재설정 시간 전)"""
+        with self._lock:
+            return self._state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def allow(self):
+        """이번 호출을 보내도 되는지 (half_open 에서는 시험 호출 하나만 허용)"""
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self._state == self.HALF_OPEN:
+                if self._trial_in_flight:
+                    return False
+                self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release_trial(self):
+        """결과 없이 끝난 시험 호출의 자리를 비움 (스트림 닫힘, 취소, 요청 오류 - 성공/실패로 세지 않음)"""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._opens += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state, 'consecutive_failures': self._failures, 'opens': self._opens}
+
+
+class LLMGateway:
+    """업스트림 LLM 호출을 보호하는 게이트웨이
+
+    - 마감시간: 재시도와 헤지를 포함한 호출 전체가 deadline 초 안에 끝나도록 시도별 timeout 을 줄여 간다.
+    - 재시도: 일시적 오류만 full jitter 지수 백오프로 max_retries 번까지 재시도한다.
+    - 헤지: hedge_percentile 을 설정하면 최근 성공 지연시간의 해당 백분위수가 지나도 응답이 없을 때
+      같은 요청을 하나 더 보내 먼저 온 응답을 쓴다 (스트리밍 호출에는 적용하지 않음).
+      진 요청도 실제로 끝날 때까지 동시 호출 슬롯을 차지한다.
+    - 서킷 브레이커: 업스트림이 계속 실패하면 호출 없이 곧바로 CircuitOpenError 를 던진다.
+    - 동시 호출 제한: 진행 중인 업스트림 요청을 max_concurrency 개로 제한하고,
+      queue_timeout 안에 순서가 오지 않으면 ConcurrencyLimitError 를 던진다.
+    """
+
+    def __init__(self, name='llm', deadline=LLM_DEADLINE, max_retries=LLM_MAX_RETRIES,
+                 retry_base_delay=LLM_RETRY_BASE_DELAY, retry_max_delay=LLM_RETRY_MAX_DELAY,
+                 hedge_percentile=LLM_HEDGE_PERCENTILE, hedge_min_samples=LLM_HEDGE_MIN_SAMPLES,
+                 max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT, breaker=None):
+        self.name = name
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._limiter = threading.BoundedSemaphore(max_concurrency)
+        self._async_limiter = None
+        self._executor = None
+        self._latencies = deque(maxlen=500)
+        self._lock = threading.Lock()
+        self._stats = {
+            'calls': 0,
+            'successes': 0,
+            'failures': 0,
+            'retries': 0,
+            'hedges': 0,
+            'hedge_wins': 0,
+            'short_circuited': 0,
+            'rejected': 0,
+            'deadline_exceeded': 0,
+            'in_flight': 0,
+        }
+
+    # ---- 공통 ----
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def _backoff(self, attempt):
+        """full jitter 지수 백오프 지연시간"""
+        return random.uniform(0, min(self.retry_max_delay, self.retry_base_delay * (2 ** (attempt - 1))))
+
+    def hedge_delay(self):
+        """헤지 요청을 보낼 대기 시간 (사용하지 않거나 표본이 부족하면 None)"""
+        if not self.hedge_percentile:
+            return None
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return ordered[index]
+
+    def _start_call(self, deadline):
+        self._count('calls')
+        if self.breaker.is_open():
+            self._count('short_circuited')
+            raise CircuitOpenError(f'{self.name}: 서킷 브레이커 열림')
+        return time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+    def _check_breaker(self):
+        if not self.breaker.allow():
+            self._count('short_circuited')
+            raise CircuitOpenError(f'{self.name}: 서킷 브레이커 열림')
+
+    def _record_result(self, error=None, latency=None):
+        """시도 결과를 브레이커와 통계에 반영 (요청 자체의 오류는 업스트림 장애로 보지 않음)"""
+        if error is None:
+            self.breaker.record_success()
+            self._count('successes')
+            if latency is not None:
+                with self._lock:
+                    self._latencies.append(latency)
+        elif is_retryable(error):
+            self.breaker.record_failure()
+            self._count('failures')
+        else:
+            # 요청 오류(400 등)는 업스트림 상태를 알려주지 않으므로 브레이커 상태는 그대로 두고 시험 호출 자리만 비움
+            self.breaker.release_trial()
+            self._count('failures')
+
+    def _track_in_flight(self, delta):
+        self._count('in_flight', delta)
+
+    def _give_up(self, last_error, deadline_at):
+        if last_error is not None and time.monotonic() < deadline_at:
+            raise last_error
+        self._count('deadline_exceeded')
+        raise DeadlineExceeded(f'{self.name}: 호출 마감시간 초과') from last_error
+
+    # ---- 동기 호출 ----
+
+    def _acquire(self, deadline_at):
+        timeout = min(self.queue_timeout, deadline_at - time.monotonic())
+        if timeout <= 0 or not self._limiter.acquire(timeout=timeout):
+            self._count('rejected')
+            raise ConcurrencyLimitError(f'{self.name}: 동시 호출 한도 초과')
+        self._track_in_flight(1)
+
+    def _release(self):
+        self._track_in_flight(-1)
+        self._limiter.release()
+
+    def _retry_loop(self, attempt, deadline_at):
+        """attempt(deadline_at) 를 일시적 오류에 한해 마감시간 안에서 재시도"""
+        last_error = None
+        for attempt_no in range(self.max_retries + 1):
+            if attempt_no:
+                delay = self._backoff(attempt_no)
+                if time.monotonic() + delay >= deadline_at:
+                    break
+                time.sleep(delay)
+                self._count('retries')
+            try:
+                return attempt(deadline_at)
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                last_error = e
+        self._give_up(last_error, deadline_at)
+
+    def call(self, func, deadline=None, hedge=True):
+        """func(timeout) 을 보호해서 호출하고 결과 반환"""
+        deadline_at = self._start_call(deadline)
+        return self._retry_loop(lambda d: self._attempt(func, d, hedge), deadline_at)
+
+    def _attempt(self, func, deadline_at, hedge):
+        self._acquire(deadline_at)
+        owns_slot = True
+        try:
+            self._check_breaker()
+            hedge_delay = self.hedge_delay() if hedge else None
+            started = time.monotonic()
+            try:
+                if hedge_delay is None:
+                    result = func(max(deadline_at - started, 0.001))
+                else:
+                    # 슬롯은 _hedged 가 먼저 보낸 요청이 실제로 끝날 때 반납
+                    owns_slot = False
+                    result = self._hedged(func, deadline_at, hedge_delay)
+            except Exception as e:
+                self._record_result(e)
+                raise
+            self._record_result(latency=time.monotonic() - started)
+            return result
+        finally:
+            if owns_slot:
+                self._release()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency * 2,
+                                                    thread_name_prefix=f'{self.name}-hedge')
+            return self._executor
+
+    def _submit(self, func, deadline_at):
+        """실행기에서 func 를 실행하고, 요청이 끝나거나 취소되면 점유한 슬롯을 반납"""
+        try:
+            future = self._get_executor().submit(func, max(deadline_at - time.monotonic(), 0.001))
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+        return future
+
+    def _hedged(self, func, deadline_at, hedge_delay):
+        """먼저 보낸 요청이 hedge_delay 안에 끝나지 않으면 같은 요청을 하나 더 보냄
+
+        호출한 쪽이 잡아 둔 슬롯은 먼저 보낸 요청이, 헤지 요청은 새로 잡은 슬롯을 쓰고 각 요청이 끝날 때
+        반납한다. 이미 시작한 동기 SDK 호출은 스레드 밖에서 끊을 수 없으므로 진 요청은 시작 전일 때만
+        취소되고, 시작했으면 결과는 기다리지 않되 func 에 넘긴 timeout 안에 끝날 때까지 슬롯을 차지한다.
+        """
+        primary = self._submit(func, deadline_at)
+        done, _ = wait([primary], timeout=min(hedge_delay, max(deadline_at - time.monotonic(), 0)))
+        if done:
+            return primary.result()
+
+        # 헤지 요청도 동시 호출 한도 안에서만 보냄 (여유가 없으면 기존 요청만 기다림)
+        if not self._limiter.acquire(blocking=False):
+            return primary.result(timeout=max(deadline_at - time.monotonic(), 0))
+        self._track_in_flight(1)
+        self._count('hedges')
+        secondary = self._submit(func, deadline_at)
+
+        pending = {primary, secondary}
+        first_error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline_at - time.monotonic(), 0),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                raise TimeoutError(f'{self.name}: 호출 마감시간 초과')
+            for future in done:
+                if future.exception() is None:
+                    if future is secondary:
+                        self._count('hedge_wins')
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                first_error = first_error or future.exception()
+        raise first_error
+
+    def stream(self, open_stream, deadline=None):
+        """스트리밍 호출 제너레이터
+
+        open_stream(timeout) 이 돌려준 스트림을 그대로 내보낸다. 스트림을 여는 단계만 재시도하고
+        (이미 일부를 보낸 뒤에는 재시도하지 않음), 스트림이 끝날 때까지 동시 호출 슬롯을 점유한다.
+        """
+        deadline_at = self._start_call(deadline)
+        self._acquire(deadline_at)
+        try:
+            stream = self._retry_loop(lambda d: self._open(open_stream, d), deadline_at)
+            received = False
+            try:
+                for item in stream:
+                    received = True
+                    yield item
+            except Exception as e:
+                self._record_result(e)
+                raise
+            except BaseException:
+                # 소비자가 중간에 닫음 (GeneratorExit): 업스트림 실패가 아니므로 브레이커를 열지 않음
+                self._finish_early(received)
+                raise
+            finally:
+                close = getattr(stream, 'close', None)
+                if close:
+                    close()
+            self._record_result()
+        finally:
+            self._release()
+
+    def _finish_early(self, received):
+        """스트림을 끝까지 읽지 않고 닫았을 때 (응답이 오기 시작했으면 성공, 아니면 시험 호출 자리만 비움)"""
+        if received:
+            self._record_result()
+        else:
+            self.breaker.release_trial()
+
+    def _open(self, open_stream, deadline_at):
+        self._check_breaker()
+        try:
+            stream = open_stream(max(deadline_at - time.monotonic(), 0.001))
+        except Exception as e:
+            self._record_result(e)
+            raise
+        return stream
+
+    # ---- 비동기 호출 ----
+
+    def _get_async_limiter(self):
+        if self._async_limiter is None:
+            self._async_limiter = asyncio.Semaphore(self.max_concurrency)
+        return self._async_limiter
+
+    async def _acquire_async(self, deadline_at):
+        timeout = min(self.queue_timeout, deadline_at - time.monotonic())
+        try:
+            if timeout <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(self._get_async_limiter().acquire(), timeout)
+        except asyncio.TimeoutError:
+            self._count('rejected')
+            raise ConcurrencyLimitError(f'{self.name}: 동시 호출 한도 초과') from None
+        self._track_in_flight(1)
+
+    def _release_async(self):
+        self._track_in_flight(-1)
+        self._get_async_limiter().release()
+
+    async def _retry_loop_async(self, attempt, deadline_at):
+        last_error = None
+        for attempt_no in range(self.max_retries + 1):
+            if attempt_no:
+                delay = self._backoff(attempt_no)
+                if time.monotonic() + delay >= deadline_at:
+                    break
+                await asyncio.sleep(delay)
+                self._count('retries')
+            try:
+                return await attempt(deadline_at)
+            except LLMUnavailable:
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    raise
+                last_error = e
+        self._give_up(last_error, deadline_at)
+
+    async def call_async(self, func, deadline=None, hedge=True):
+        """비동기 서버용 call: func(timeout) 은 코루틴을 반환"""
+        deadline_at = self._start_call(deadline)
+        return await self._retry_loop_async(lambda d: self._attempt_async(func, d, hedge), deadline_at)
+
+    async def _attempt_async(self, func, deadline_at, hedge):
+        await self._acquire_async(deadline_at)
+        owns_slot = True
+        try:
+            self._check_breaker()
+            hedge_delay = self.hedge_delay() if hedge else None
+            started = time.monotonic()
+            try:
+                remaining = max(deadline_at - started, 0.001)
+                if hedge_delay is None:
+                    result = await asyncio.wait_for(func(remaining), remaining)
+                else:
+                    owns_slot = False
+                    result = await self._hedged_async(func, deadline_at, hedge_delay)
+            except Exception as e:
+                self._record_result(e)
+                raise
+            except BaseException:
+                # 호출한 쪽이 취소함 (CancelledError): 업스트림 실패가 아님
+                self.breaker.release_trial()
+                raise
+            self._record_result(latency=time.monotonic() - started)
+            return result
+        finally:
+            if owns_slot:
+                self._release_async()
+
+    def _start_task(self, func, deadline_at):
+        """func 를 태스크로 실행하고, 태스크가 끝나거나 취소되면 점유한 슬롯을 반납"""
+        try:
+            task = asyncio.ensure_future(func(max(deadline_at - time.monotonic(), 0.001)))
+        except BaseException:
+            self._release_async()
+            raise
+        task.add_done_callback(lambda _: self._release_async())
+        return task
+
+    async def _hedged_async(self, func, deadline_at, hedge_delay):
+        """_hedged 의 비동기 버전 (진 요청은 태스크를 취소해 HTTP 요청도 끊음, 슬롯은 태스크가 끝날 때 반납)"""
+        limiter = self._get_async_limiter()
+        primary = self._start_task(func, deadline_at)
+        secondary = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=min(hedge_delay, max(deadline_at - time.monotonic(), 0)))
+            if done:
+                return primary.result()
+
+            if limiter.locked():
+                return await asyncio.wait_for(asyncio.shield(primary), max(deadline_at - time.monotonic(), 0))
+            await limiter.acquire()
+            self._track_in_flight(1)
+            self._count('hedges')
+            secondary = self._start_task(func, deadline_at)
+
+            pending = {primary, secondary}
+            first_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(deadline_at - time.monotonic(), 0),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise TimeoutError(f'{self.name}: 호출 마감시간 초과')
+                for task in done:
+                    if task.exception() is None:
+                        if task is secondary:
+                            self._count('hedge_wins')
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            # 지거나 남은 요청은 취소
+            for task in (primary, secondary):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def stream_async(self, open_stream, deadline=None):
+        """비동기 서버용 stream: open_stream(timeout) 은 비동기 이터러블을 돌려주는 코루틴"""
+        deadline_at = self._start_call(deadline)
+        await self._acquire_async(deadline_at)
+        try:
+            stream = await self._retry_loop_async(lambda d: self._open_async(open_stream, d), deadline_at)
+            received = False
+            try:
+                async for item in stream:
+                    received = True
+                    yield item
+            except Exception as e:
+                self._record_result(e)
+                raise
+            except BaseException:
+                # aclose() (GeneratorExit) 나 취소 (CancelledError)
+                self._finish_early(received)
+                raise
+            finally:
+                close = getattr(stream, 'aclose', None) or getattr(stream, 'close', None)
+                if close:
+                    result = close()
+                    if inspect.isawaitable(result):
+                        await result
+            self._record_result()
+        finally:
+            self._release_async()
+
+    async def _open_async(self, open_stream, deadline_at):
+        self._check_breaker()
+        remaining = max(deadline_at - time.monotonic(), 0.001)
+        try:
+            stream = await asyncio.wait_for(open_stream(remaining), remaining)
+        except Exception as e:
+            self._record_result(e)
+            raise
+        except BaseException:
+            self.breaker.release_trial()
+            raise
+        return stream
+
+    # ---- 통계 ----
+
+    def stats(self):
+        """게이트웨이 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+            ordered = sorted(self._latencies)
+        stats['breaker'] = self.breaker.stats()
+        stats['max_concurrency'] = self.max_concurrency
+        stats['deadline_s'] = self.deadline
+        if ordered:
+            stats['latency_p50_ms'] = round(ordered[len(ordered) // 2] * 1000, 1)
+            stats['latency_p95_ms'] = round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1)
+        hedge_delay = self.hedge_delay()
+        stats['hedge_delay_ms'] = round(hedge_delay * 1000, 1) if hedge_delay is not None else None
+        return stats
@@ -0,0 +1,286 @@
+# rate_limit.py
+"""토큰 버킷 요청 한도 (chatbot_api, chat 공용)
+
+한 사용자가 메시지를 빠르게 계속 보내면 LLM 동시 호출 슬롯과 SQLite 쓰기를 혼자 차지하게 된다.
+요청마다 (예산, 범위) 별 토큰 버킷에서 토큰을 하나씩 꺼내고, 모자라면 RateLimitExceeded 를 낸다.
+
+    예산  llm    LLM 을 호출하는 요청 (/api/chat/send, Socket.IO send_message)
+          api    그 밖의 가벼운 요청
+    범위  user   로그인 사용자 (chat 앱은 대화 id)
+          ip     클라이언트 IP (로그인 전 요청, 대화를 새로 만들어 user 한도를 피하는 경우)
+          global 서버 전체
+
+한도는 RATE_LIMIT_{예산}_{범위} 환경변수에 '요청 수/초' 로 지정한다. 예를 들어 20/60 은 한 번에
+20개까지 몰아서 보낼 수 있고, 이후 60초에 20개 (3초에 1개) 씩 다시 채워진다. 0 이면 그 범위는 제한하지 않는다.
+여러 범위 중 하나라도 모자라면 어느 버킷에서도 토큰을 꺼내지 않는다 (거절된 요청은 한도를 쓰지 않음).
+
+버킷 상태는 RATE_LIMIT_BACKEND 로 정한다.
+    memory  프로세스 안 dict (기본값, 워커 하나일 때)
+    sqlite  RATE_LIMIT_DB_PATH 의 로컬 SQLite 파일 (같은 호스트의 워커 프로세스들이 한도를 공유)
+sqlite 는 검사 한 번이 BEGIN IMMEDIATE 트랜잭션 하나이다. 버킷은 언제든 다시 채워지는 값이라
+synchronous=OFF 로 두고, 저장소 오류가 나면 요청을 막지 않고 통과시킨다.
+"""
+import asyncio
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# 요청 한도 설정 (환경변수로 조정 가능)
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') == '1'
+RATE_LIMIT_BACKEND = os.getenv('RATE_LIMIT_BACKEND', 'memory')  # 'memory' 또는 'sqlite'
+RATE_LIMIT_DB_PATH = os.getenv('RATE_LIMIT_DB_PATH', os.path.join(tempfile.gettempdir(), 'pet_chatbot_rate_limit.db'))
+RATE_LIMIT_MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+
+BUDGETS = ('llm', 'api')
+SCOPES = ('user', 'ip', 'global')
+
+# (예산, 범위) 별 기본 한도. 서버 전체 한도는 배포 규모에 따라 다르므로 기본으로는 두지 않음
+DEFAULT_LIMITS = {
+    ('llm', 'user'): '20/60',
+    ('llm', 'ip'): '60/60',
+    ('llm', 'global'): '0',
+    ('api', 'user'): '300/60',
+    ('api', 'ip'): '600/60',
+    ('api', 'global'): '0',
+}
+
+# sqlite 저장소에서 오래 쓰지 않은 버킷 행을 지우는 간격 (초)
+PURGE_INTERVAL = 60
+
+
+def parse_limit(text):
+    """'요청 수/초' 를 (버킷 크기, 초당 충전량) 으로 변환 ('0' 이나 빈 값이면 None)"""
+    text = (text or '').strip()
+    if text in ('', '0'):
+        return None
+    count, _, seconds = text.partition('/')
+    count = float(count)
+    seconds = float(seconds or 1)
+    if count < 1 or seconds <= 0:
+        raise ValueError(f'잘못된 요청 한도: {text!r} (예: 20/60)')
+    return count, count / seconds
+
+
+def load_limits():
+    """환경변수 RATE_LIMIT_{예산}_{범위} 를 읽어 {(예산, 범위): (버킷 크기, 초당 충전량)} 반환"""
+    limits = {}
+    for (budget, scope), default in DEFAULT_LIMITS.items():
+        limit = parse_limit(os.getenv(f'RATE_LIMIT_{budget.upper()}_{scope.upper()}', default))
+        if limit is not None:
+            limits[(budget, scope)] = limit
+    return limits
+
+
+def take_tokens(entries, states, now, cost):
+    """모든 버킷에서 cost 만큼 꺼낼 수 있으면 새 상태를, 아니면 대기 시간과 막힌 범위를 반환
+
+    entries 는 (범위, 키, 버킷 크기, 초당 충전량) 목록, states 는 키 -> (토큰 수, 갱신 시각) (없으면 가득 참).
+    반환값은 (새 상태 dict 또는 None, 재시도까지 초, 막힌 범위 또는 None).
+    """
+    updated = {}
+    retry_after = 0.0
+    limited_scope = None
+    for scope, key, capacity, rate in entries:
+        state = states.get(key)
+        if state is None:
+            tokens = capacity
+        else:
+            # 시계가 뒤로 가도 토큰이 줄지 않도록 경과 시간은 0 이상으로
+            tokens = min(capacity, state[0] + max(0.0, now - state[1]) * rate)
+        if tokens < cost:
+            wait = (cost - tokens) / rate
+            if wait > retry_after:
+                retry_after = wait
+                limited_scope = scope
+        updated[key] = (tokens - cost, now)
+    if limited_scope is not None:
+        return None, retry_after, limited_scope
+    return updated, 0.0, None
+
+
+class MemoryBucketStore:
+    """프로세스 안 버킷 (max_keys 를 넘으면 가장 오래 쓰지 않은 버킷부터 제거, 제거된 버킷은 가득 찬 상태로 다시 시작)"""
+
+    blocking = False
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # 키 -> (토큰 수, 갱신 시각)
+        self._lock = threading.Lock()
+        self._evictions = 0
+
+    def acquire(self, entries, cost):
+        now = time.monotonic()
+        with self._lock:
+            states = {key: self._buckets.get(key) for _, key, _, _ in entries}
+            updated, retry_after, scope = take_tokens(entries, states, now, cost)
+            if updated:
+                for key, state in updated.items():
+                    self._buckets[key] = state
+                    self._buckets.move_to_end(key)
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                    self._evictions += 1
+        return retry_after, scope
+
+    def stats(self):
+        with self._lock:
+            return {'keys': len(self._buckets), 'evictions': self._evictions}
+
+
+class SQLiteBucketStore:
+    """로컬 SQLite 파일에 둔 버킷 (같은 파일을 쓰는 프로세스들이 한도를 공유)
+
+    프로세스 사이에서 비교할 수 있도록 갱신 시각은 time.time() 으로 저장한다.
+    idle_ttl 초 넘게 쓰지 않은 버킷은 이미 가득 찬 상태와 같으므로 주기적으로 지운다.
+    """
+
+    blocking = True
+
+    def __init__(self, path=RATE_LIMIT_DB_PATH, idle_ttl=3600, timeout=1.0):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.timeout = timeout
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS rate_buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+        )
+
+    def _connection(self):
+        """스레드별 연결 (트랜잭션은 직접 BEGIN/COMMIT)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, entries, cost):
+        conn = self._connection()
+        keys = [key for _, key, _, _ in entries]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            now = time.time()
+            rows = conn.execute(
+                f'SELECT key, tokens, updated FROM rate_buckets WHERE key IN ({",".join("?" * len(keys))})', keys
+            ).fetchall()
+            states = {key: (tokens, updated) for key, tokens, updated in rows}
+            updated, retry_after, scope = take_tokens(entries, states, now, cost)
+            if updated:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                    [(key, tokens, at) for key, (tokens, at) in updated.items()]
+                )
+            if now - self._last_purge > PURGE_INTERVAL:
+                self._last_purge = now
+                conn.execute('DELETE FROM rate_buckets WHERE updated < ?', (now - self.idle_ttl,))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return retry_after, scope
+
+    def stats(self):
+        try:
+            keys = self._connection().execute('SELECT COUNT(*) FROM rate_buckets').fetchone()[0]
+        except sqlite3.Error:
+            keys = -1
+        return {'keys': keys}
+
+
+def create_bucket_store(backend=RATE_LIMIT_BACKEND, idle_ttl=3600):
+    if backend == 'memory':
+        return MemoryBucketStore()
+    if backend == 'sqlite':
+        return SQLiteBucketStore(idle_ttl=idle_ttl)
+    raise ValueError(f'알 수 없는 RATE_LIMIT_BACKEND: {backend}')
+
+
+class RateLimitExceeded(Exception):
+    """요청 한도를 넘어 요청을 받을 수 없음 (retry_after 초 뒤 재시도)"""
+
+    def __init__(self, budget, scope, retry_after):
+        self.budget = budget
+        self.scope = scope
+        # Retry-After 헤더 / 클라이언트 안내용 정수 초 (최소 1초)
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(f'요청이 너무 많습니다. {self.retry_after}초 후에 다시 시도해주세요.')
+
+
+class RateLimiter:
+    """예산별 user / ip / global 토큰 버킷 검사
+
+    name 은 버킷 키 앞에 붙어, 같은 sqlite 파일을 쓰는 다른 앱과 한도가 섞이지 않게 한다.
+    registry(MetricsRegistry) 를 주면 판정마다 rate_limit_requests_total 카운터를 올린다.
+    """
+
+    def __init__(self, name, registry=None, limits=None, backend=RATE_LIMIT_BACKEND, enabled=RATE_LIMIT_ENABLED):
+        self.name = name
+        self.limits = load_limits() if limits is None else limits
+        self.enabled = enabled and bool(self.limits)
+        self._registry = registry
+        self._store = None
+        if self.enabled:
+            # 한도를 채우는 데 걸리는 가장 긴 시간이 지나면 버킷은 가득 찬 상태와 같음
+            idle_ttl = max(capacity / rate for capacity, rate in self.limits.values())
+            self._store = create_bucket_store(backend, idle_ttl)
+        self._lock = threading.Lock()
+        self._stats = {'allowed': 0, 'limited': 0, 'errors': 0}
+
+    def _entries(self, budget, user, ip):
+        entries = []
+        for scope, identity in (('user', user), ('ip', ip), ('global', '*')):
+            limit = self.limits.get((budget, scope))
+            if limit is None or identity is None:
+                continue
+            entries.append((scope, f'{self.name}:{budget}:{scope}:{identity}', limit[0], limit[1]))
+        return entries
+
+    def _count(self, key, budget, scope=None):
+        with self._lock:
+            self._stats[key] += 1
+        if self._registry is not None:
+            self._registry.inc('rate_limit_requests_total', description='요청 한도 판정 수',
+                               app=self.name, budget=budget, result=key, scope=scope or '')
+
+    def acquire(self, budget, user=None, ip=None, cost=1):
+        """budget 예산에서 토큰을 꺼냄 (한도를 넘으면 RateLimitExceeded)"""
+        if not self.enabled:
+            return
+        entries = self._entries(budget, user, ip)
+        if not entries:
+            return
+        try:
+            retry_after, scope = self._store.acquire(entries, cost)
+        except sqlite3.Error as e:
+            # 한도 저장소 장애로 서비스 전체를 막지 않음
+            logging.warning(f'요청 한도 확인 실패 (통과 처리): {e}')
+            self._count('errors', budget)
+            return
+        if scope is None:
+            self._count('allowed', budget)
+            return
+        self._count('limited', budget, scope)
+        raise RateLimitExceeded(budget, scope, retry_after)
+
+    async def acquire_async(self, budget, user=None, ip=None, cost=1):
+        """비동기 서버용 acquire (sqlite 저장소면 이벤트 루프를 막지 않도록 스레드에서 실행)"""
+        if self._store is not None and self._store.blocking:
+            await asyncio.to_thread(self.acquire, budget, user, ip, cost)
+        else:
+            self.acquire(budget, user, ip, cost)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats['enabled'] = self.enabled
+        if self._store is not None:
+            stats.update(self._store.stats())
+        return stats
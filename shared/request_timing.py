@@ -0,0 +1,472 @@
+# request_timing.py
+"""요청 단계별 지연시간 계측과 Prometheus 지표 (chatbot_api, chat 공용)
+
+요청(또는 소켓 이벤트)마다 RequestTimer 를 contextvar 에 두고, 처리 코드는
+`with phase('db_read'):` 처럼 단계 구간을 기록한다. 요청이 끝나면 전체 시간과 단계별 합계를
+경로/단계별 히스토그램에 넣고, MetricsRegistry.render() 가 Prometheus 텍스트 형식으로 내보낸다.
+계측 중인 요청이 없으면 phase() 는 아무것도 하지 않는다.
+
+단계 이름:
+    queue_wait    응답 생성 대기열에서 기다린 시간 (chat)
+    db_read       DB / 대화 저장소 조회
+    prompt_build  시스템 프롬프트 / 메시지 구성
+    llm_wait      LLM 응답 대기 (스트리밍은 청크 사이 대기 시간의 합)
+    db_write      DB / 대화 저장소 쓰기
+    serialize     JSON / SSE 직렬화, 소켓 이벤트 전송
+    other         위 단계에 속하지 않은 나머지 시간
+
+PROFILE_SLOW_REQUEST_MS 를 지정하면 SlowRequestProfiler 가 계측 중인 요청의 스레드 스택을
+주기적으로 샘플링하고, 그 시간 이상 걸린 요청의 스택을 flamegraph.pl / speedscope 에서 읽을 수 있는
+folded 형식(`프레임;프레임;... 횟수`) 파일로 저장한다.
+"""
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# 계측 설정 (환경변수로 조정 가능)
+REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', '1') == '1'
+METRICS_NAMESPACE = os.getenv('METRICS_NAMESPACE', 'pet_chatbot')
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_SLOW_REQUEST_MS = float(os.getenv('PROFILE_SLOW_REQUEST_MS', '0'))  # 0 이면 프로파일러 사용 안 함
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '5'))
+PROFILE_OUTPUT_DIR = os.getenv('PROFILE_OUTPUT_DIR', 'profiles')
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', '200'))
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current_timer = contextvars.ContextVar('request_timer', default=None)
+_INVALID_NAME = re.compile(r'[^a-zA-Z0-9_]')
+
+
+def _metric_name(name):
+    return _INVALID_NAME.sub('_', name)
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_label_value(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+class Histogram:
+    """고정 버킷 히스토그램 (Prometheus 누적 버킷 형식)"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = position
+                break
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self):
+        """(누적 버킷 횟수 목록, 합계, 전체 횟수)"""
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        return cumulative, total, running
+
+
+class MetricsRegistry:
+    """히스토그램 / 카운터 / 통계 수집기를 모아 Prometheus 텍스트로 내보내는 저장소
+
+    register_collector(prefix, collect) 로 등록한 collect() 의 dict 결과는 숫자 값만
+    `{namespace}_{prefix}_{키}` gauge 로 펼쳐서 내보낸다 (기존 stats() 재사용용).
+    """
+
+    def __init__(self, namespace=METRICS_NAMESPACE, buckets=LATENCY_BUCKETS):
+        self.namespace = namespace
+        self.buckets = buckets
+        self._histograms = {}  # 이름 -> (설명, {라벨: Histogram})
+        self._counters = {}  # 이름 -> (설명, {라벨: 값})
+        self._collectors = []  # (prefix, collect)
+        self._lock = threading.Lock()
+
+    def _full_name(self, name):
+        return _metric_name(f'{self.namespace}_{name}' if self.namespace else name)
+
+    def observe(self, name, value, description='', **labels):
+        """히스토그램에 값 기록 (라벨 조합마다 시계열 하나)"""
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self._lock:
+            _, series = self._histograms.setdefault(name, (description, {}))
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def inc(self, name, amount=1, description='', **labels):
+        """카운터 증가"""
+        key = tuple(sorted((label, str(label_value)) for label, label_value in labels.items()))
+        with self._lock:
+            _, series = self._counters.setdefault(name, (description, {}))
+            series[key] = series.get(key, 0) + amount
+
+    def register_collector(self, prefix, collect):
+        """지표를 내보낼 때마다 collect() 결과를 gauge 로 추가"""
+        with self._lock:
+            self._collectors.append((prefix, collect))
+
+    def _flatten(self, prefix, value, out):
+        if isinstance(value, bool):
+            out.append((prefix, int(value)))
+        elif isinstance(value, (int, float)):
+            out.append((prefix, value))
+        elif isinstance(value, dict):
+            for key, item in value.items():
+                self._flatten(f'{prefix}_{key}', item, out)
+
+    def render(self):
+        """Prometheus 텍스트 형식 (version 0.0.4)"""
+        with self._lock:
+            histograms = {name: (description, dict(series))
+                          for name, (description, series) in self._histograms.items()}
+            counters = {name: (description, dict(series))
+                        for name, (description, series) in self._counters.items()}
+            collectors = list(self._collectors)
+
+        lines = []
+        for name, (description, series) in sorted(histograms.items()):
+            full_name = self._full_name(name)
+            lines.append(f'# HELP {full_name} {description or name}')
+            lines.append(f'# TYPE {full_name} histogram')
+            for labels, histogram in sorted(series.items()):
+                cumulative, total, count = histogram.snapshot()
+                bounds = [repr(float(bound)) for bound in histogram.buckets] + ['+Inf']
+                for bound, bucket_count in zip(bounds, cumulative):
+                    lines.append(f'{full_name}_bucket{_format_labels(labels + (("le", bound),))} {bucket_count}')
+                lines.append(f'{full_name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{full_name}_count{_format_labels(labels)} {count}')
+
+        for name, (description, series) in sorted(counters.items()):
+            full_name = self._full_name(name)
+            lines.append(f'# HELP {full_name} {description or name}')
+            lines.append(f'# TYPE {full_name} counter')
+            for labels, value in sorted(series.items()):
+                lines.append(f'{full_name}{_format_labels(labels)} {_format_value(value)}')
+
+        for prefix, collect in collectors:
+            try:
+                values = []
+                self._flatten(prefix, collect(), values)
+            except Exception:
+                continue
+            for name, value in values:
+                full_name = self._full_name(name)
+                lines.append(f'# TYPE {full_name} gauge')
+                lines.append(f'{full_name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class RequestTimer:
+    """요청 하나의 전체 시간과 단계별 시간 기록"""
+
+    def __init__(self, registry, app, route, method, profiler=None):
+        self.registry = registry
+        self.app = app
+        self.route = route
+        self.method = method
+        self.profiler = profiler
+        self.status = None
+        self.deferred = False  # 스트리밍 응답이면 본문 전송이 끝날 때 finish
+        self.phases = {}
+        self.samples = Counter()  # 프로파일러가 채우는 folded 스택 -> 샘플 수
+        self.started = time.perf_counter()
+        self._finished = False
+
+    def activate(self):
+        """현재 컨텍스트(스레드/태스크)의 계측 대상으로 지정"""
+        _current_timer.set(self)
+        if self.profiler is not None:
+            self.profiler.track(self)
+        return self
+
+    def add(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def finish(self, status=None):
+        """히스토그램에 기록 (여러 번 호출해도 한 번만 기록)"""
+        if self._finished:
+            return
+        self._finished = True
+        duration = time.perf_counter() - self.started
+        if status is not None:
+            self.status = status
+        if _current_timer.get() is self:
+            _current_timer.set(None)
+        if self.profiler is not None:
+            self.profiler.untrack(self, duration)
+
+        self.registry.observe('request_duration_seconds', duration, '요청 전체 처리 시간 (초)',
+                              app=self.app, route=self.route, method=self.method, status=self.status or 'unknown')
+        accounted = 0.0
+        for name, seconds in self.phases.items():
+            accounted += seconds
+            self.registry.observe('request_phase_seconds', seconds, '요청 단계별 처리 시간 (초)',
+                                  app=self.app, route=self.route, phase=name)
+        self.registry.observe('request_phase_seconds', max(duration - accounted, 0.0), '요청 단계별 처리 시간 (초)',
+                              app=self.app, route=self.route, phase='other')
+
+
+def current_timer():
+    """현재 계측 중인 RequestTimer (없으면 None)"""
+    return _current_timer.get()
+
+
+@contextmanager
+def phase(name):
+    """현재 요청의 단계 구간 기록 (계측 중이 아니면 아무것도 하지 않음)"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timer.add(name, time.perf_counter() - started)
+
+
+def record_phase(name, seconds):
+    """직접 잰 단계 시간을 현재 요청에 더함"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def timed_stream(iterable):
+    """스트리밍 응답 본문을 감싸 전송이 끝날 때 요청 계측을 마침"""
+    timer = _current_timer.get()
+    if timer is None:
+        return iterable
+    timer.deferred = True
+
+    def generate():
+        timer.activate()
+        try:
+            yield from iterable
+        finally:
+            timer.finish()
+    return generate()
+
+
+def timed_async_stream(iterable):
+    """비동기 스트리밍 응답용 timed_stream"""
+    timer = _current_timer.get()
+    if timer is None:
+        return iterable
+    timer.deferred = True
+
+    async def generate():
+        timer.activate()
+        try:
+            async for item in iterable:
+                yield item
+        finally:
+            timer.finish()
+    return generate()
+
+
+class SlowRequestProfiler:
+    """계측 중인 요청의 스레드 스택을 샘플링해 느린 요청의 folded 스택을 저장
+
+    비동기 서버에서는 한 이벤트 루프 스레드의 샘플이 그 시점에 진행 중인 모든 요청에 기록되고,
+    실행기 스레드(DB 등)에서 보낸 시간은 샘플링되지 않으므로 대략적인 분포로만 본다.
+    """
+
+    def __init__(self, threshold_ms=PROFILE_SLOW_REQUEST_MS, interval_ms=PROFILE_SAMPLE_INTERVAL_MS,
+                 output_dir=PROFILE_OUTPUT_DIR, max_files=PROFILE_MAX_FILES):
+        self.threshold = threshold_ms / 1000
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.output_dir = output_dir
+        self.max_files = max_files
+        self.enabled = threshold_ms > 0
+        self._active = {}  # 스레드 id -> {RequestTimer, ...}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._labels = {}  # 코드 객체 -> 프레임 이름
+        self._stats = {'samples': 0, 'profiled': 0, 'dumped': 0, 'dropped': 0}
+
+    def track(self, timer):
+        if not self.enabled:
+            return
+        thread_id = threading.get_ident()
+        with self._lock:
+            for timers in self._active.values():
+                timers.discard(timer)
+            self._active.setdefault(thread_id, set()).add(timer)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def untrack(self, timer, duration):
+        if not self.enabled:
+            return
+        with self._lock:
+            for thread_id, timers in list(self._active.items()):
+                timers.discard(timer)
+                if not timers:
+                    del self._active[thread_id]
+            self._stats['profiled'] += 1
+        if duration >= self.threshold and timer.samples:
+            self._dump(timer, duration)
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = f'{os.path.basename(code.co_filename)}:{code.co_name}'.replace(';', ':')
+            self._labels[code] = label
+        return label
+
+    def _fold(self, frame):
+        stack = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ';'.join(reversed(stack))
+
+    def _run(self):
+        while True:
+            with self._lock:
+                active = {thread_id: list(timers) for thread_id, timers in self._active.items()}
+            if not active:
+                self._wakeup.wait()
+                self._wakeup.clear()
+                continue
+            frames = sys._current_frames()
+            sampled = 0
+            for thread_id, timers in active.items():
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = self._fold(frame)
+                for timer in timers:
+                    timer.samples[stack] += 1
+                sampled += 1
+            del frames
+            with self._lock:
+                self._stats['samples'] += sampled
+            time.sleep(self.interval)
+
+    def _dump(self, timer, duration):
+        with self._lock:
+            if self._stats['dumped'] >= self.max_files:
+                self._stats['dropped'] += 1
+                return
+            self._stats['dumped'] += 1
+        route = re.sub(r'[^a-zA-Z0-9_.-]+', '_', timer.route).strip('_') or 'root'
+        filename = (f'{datetime.now():%Y%m%d-%H%M%S-%f}-{timer.app}-{route}-'
+                    f'{duration * 1000:.0f}ms.folded')
+        try:
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(os.path.join(self.output_dir, filename), 'w', encoding='utf-8') as f:
+                for stack, count in timer.samples.most_common():
+                    f.write(f'{stack} {count}\n')
+        except OSError:
+            with self._lock:
+                self._stats['dropped'] += 1
+
+    def stats(self):
+        """샘플 수, 저장한 프로파일 수 등 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['active_requests'] = sum(len(timers) for timers in self._active.values())
+        stats['enabled'] = self.enabled
+        stats['threshold_ms'] = round(self.threshold * 1000, 1)
+        return stats
+
+
+def _route_label(request):
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def instrument_flask(app, registry, app_name, profiler=None):
+    """Flask 앱의 모든 요청을 경로별로 계측"""
+    if not REQUEST_TIMING_ENABLED:
+        return
+    from flask import request
+
+    @app.before_request
+    def _start_request_timer():
+        RequestTimer(registry, app_name, _route_label(request), request.method, profiler).activate()
+
+    @app.after_request
+    def _finish_request_timer(response):
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.status = response.status_code
+            if not timer.deferred:
+                timer.finish()
+        return response
+
+    @app.teardown_request
+    def _abandon_request_timer(exc):
+        timer = _current_timer.get()
+        if timer is not None and not timer.deferred:
+            timer.finish(timer.status or 500)
+
+
+def instrument_quart(app, registry, app_name, profiler=None):
+    """Quart(ASGI) 앱의 모든 요청을 경로별로 계측"""
+    if not REQUEST_TIMING_ENABLED:
+        return
+    from quart import request
+
+    @app.before_request
+    async def _start_request_timer():
+        RequestTimer(registry, app_name, _route_label(request), request.method, profiler).activate()
+
+    @app.after_request
+    async def _finish_request_timer(response):
+        timer = _current_timer.get()
+        if timer is not None:
+            timer.status = response.status_code
+            if not timer.deferred:
+                timer.finish()
+        return response
+
+    @app.teardown_request
+    async def _abandon_request_timer(exc):
+        timer = _current_timer.get()
+        if timer is not None and not timer.deferred:
+            timer.finish(timer.status or 500)
@@ -0,0 +1,234 @@
+# response_cache.py
+"""반복되는 짧은 인사말용 응답 캐시 (chatbot_api, chat 공용)
+
+"안녕!", "밥 먹었어?", "사랑해" 처럼 거의 같은 짧은 메시지에 매번 LLM 을 호출하지 않도록,
+(페르소나, 대화 문맥 지문, 정규화한 메시지) 를 키로 응답 후보를 저장한다.
+
+- 정규화한 메시지가 정확히 같을 때만 적중한다. 문맥 지문에는 직전 대화 턴이 들어간다.
+- similarity 를 0 보다 크게 주면 (RESPONSE_CACHE_SIMILARITY) 정확한 항목이 없을 때 같은
+  페르소나/문맥의 항목 중 글자 n-gram 벡터의 코사인 유사도가 similarity 이상인 가장 가까운
+  항목도 쓴다. "밥 먹었어" 와 "밥 안 먹었어" 처럼 글자는 비슷해도 뜻이 반대인 메시지가
+  섞일 수 있어 기본으로는 끈다.
+- 항목마다 응답 후보를 variants 개까지 모은 뒤부터 그 중 하나를 무작위로 돌려준다
+  (그 전까지는 미스로 처리해 LLM 응답을 더 모은다). 같은 말을 반복하지 않게 하기 위함이다.
+- 항목은 ttl 초 뒤 만료되고, max_entries 를 넘으면 가장 오래 쓰지 않은 항목부터 제거한다.
+
+기본값은 꺼져 있으며 RESPONSE_CACHE_ENABLED=1 로 켠다.
+"""
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, OrderedDict
+
+# 응답 캐시 설정 (환경변수로 조정 가능)
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', '0') == '1'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', '10000'))
+RESPONSE_CACHE_TTL = float(os.getenv('RESPONSE_CACHE_TTL', '3600'))
+RESPONSE_CACHE_VARIANTS = int(os.getenv('RESPONSE_CACHE_VARIANTS', '3'))
+RESPONSE_CACHE_SIMILARITY = float(os.getenv('RESPONSE_CACHE_SIMILARITY', '0'))  # 0 = 유사 메시지 조회 끔
+RESPONSE_CACHE_MAX_MESSAGE_CHARS = int(os.getenv('RESPONSE_CACHE_MAX_MESSAGE_CHARS', '20'))
+RESPONSE_CACHE_CONTEXT_TURNS = int(os.getenv('RESPONSE_CACHE_CONTEXT_TURNS', '1'))
+
+_PUNCTUATION = re.compile(r'[^\w\s]|_')
+_REPEATED = re.compile(r'(.)\1{2,}')
+
+
+def normalize_message(text):
+    """비교용 메시지 정규화 (소문자, 문장부호/이모지 제거, ㅋㅋㅋㅋ → ㅋㅋ)"""
+    text = unicodedata.normalize('NFKC', text or '').lower()
+    text = _PUNCTUATION.sub(' ', text)
+    text = _REPEATED.sub(r'\1\1', text)
+    return ' '.join(text.split())
+
+
+def embed(normalized):
+    """글자 1-gram / 2-gram 빈도 벡터 (공백 제거 후, 외부 임베딩 모델 없이 쓰는 근사 임베딩)"""
+    compact = normalized.replace(' ', '')
+    vector = Counter(compact)
+    vector.update(compact[i:i + 2] for i in range(len(compact) - 1))
+    return vector
+
+
+def cosine(a, b):
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b.get(gram, 0) for gram, count in a.items())
+    if not dot:
+        return 0.0
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(sum(c * c for c in b.values()))
+    return dot / norm
+
+
+def fingerprint(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+
+class _Entry:
+    __slots__ = ('vector', 'variants', 'expires_at')
+
+    def __init__(self, vector, expires_at):
+        self.vector = vector
+        self.variants = []
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """페르소나/문맥별 짧은 메시지 응답 캐시 (LRU + TTL)
+
+    persona 는 페르소나를 대표하는 문자열(보통 시스템 프롬프트)이고, context 는 최근 대화 메시지
+    문자열 목록(사용자/응답 순서)이다. 문맥은 마지막 context_turns 턴(메시지 2개씩)과 대화 진행
+    여부를 지문으로 쓰므로, 대화 첫 인사와 대화 중의 인사, 직전 대화가 다른 같은 말은 서로 다른
+    항목이 된다.
+    """
+
+    def __init__(self, enabled=RESPONSE_CACHE_ENABLED, max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+                 ttl=RESPONSE_CACHE_TTL, variants=RESPONSE_CACHE_VARIANTS,
+                 similarity=RESPONSE_CACHE_SIMILARITY, max_message_chars=RESPONSE_CACHE_MAX_MESSAGE_CHARS,
+                 context_turns=RESPONSE_CACHE_CONTEXT_TURNS, rng=None):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self.similarity = similarity
+        self.max_message_chars = max_message_chars
+        self.context_turns = context_turns
+        self._rng = rng or random.Random()
+        self._entries = OrderedDict()  # (bucket, normalized) -> _Entry
+        self._buckets = {}  # bucket -> {normalized, ...} (유사도 검색 대상)
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'exact_hits': 0,
+            'similar_hits': 0,
+            'misses': 0,
+            'warming': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+        }
+
+    def _bucket(self, persona, context):
+        context = [text for text in (context or ()) if text]
+        recent = context[-2 * self.context_turns:] if self.context_turns > 0 else []
+        state = 'ongoing' if context else 'new'
+        return fingerprint(persona), fingerprint('\x1f'.join([state] + recent))
+
+    def _cacheable(self, message):
+        """캐시 대상인 짧은 메시지면 정규화한 문자열, 아니면 None"""
+        if not self.enabled:
+            return None
+        normalized = normalize_message(message)
+        if not normalized or len(normalized) > self.max_message_chars:
+            return None
+        return normalized
+
+    def _remove(self, key):
+        self._entries.pop(key, None)
+        bucket, normalized = key
+        members = self._buckets.get(bucket)
+        if members is not None:
+            members.discard(normalized)
+            if not members:
+                del self._buckets[bucket]
+
+    def _live_entry(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            self._remove(key)
+            self._stats['expirations'] += 1
+            return None
+        return entry
+
+    def get(self, persona, message, context=()):
+        """캐시된 응답 후보 중 하나를 무작위로 반환 (없거나 후보가 덜 모였으면 None)"""
+        normalized = self._cacheable(message)
+        if normalized is None:
+            with self._lock:
+                self._stats['bypassed'] += 1
+            return None
+
+        bucket = self._bucket(persona, context)
+        now = time.monotonic()
+        with self._lock:
+            key = (bucket, normalized)
+            entry = self._live_entry(key, now)
+            kind = 'exact_hits'
+            if entry is None or len(entry.variants) < self.variants:
+                warming = entry is not None
+                entry, key = self._nearest(bucket, normalized, now) if self.similarity > 0 else (None, None)
+                kind = 'similar_hits'
+                if entry is None:
+                    self._stats['warming' if warming else 'misses'] += 1
+                    return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            self._stats[kind] += 1
+            return self._rng.choice(entry.variants)
+
+    def _nearest(self, bucket, normalized, now):
+        """같은 페르소나/문맥에서 후보가 다 모인 가장 비슷한 항목 (없으면 (None, None))"""
+        vector = embed(normalized)
+        best, best_key, best_score = None, None, self.similarity
+        for other in list(self._buckets.get(bucket, ())):
+            if other == normalized:
+                continue
+            key = (bucket, other)
+            entry = self._live_entry(key, now)
+            if entry is None or len(entry.variants) < self.variants:
+                continue
+            score = cosine(vector, entry.vector)
+            if score >= best_score:
+                best, best_key, best_score = entry, key, score
+        return best, best_key
+
+    def put(self, persona, message, response, context=()):
+        """LLM 이 만든 응답을 후보로 추가 (후보가 다 모인 항목은 무시)"""
+        normalized = self._cacheable(message)
+        if normalized is None or not response:
+            return
+
+        bucket = self._bucket(persona, context)
+        key = (bucket, normalized)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is None:
+                entry = _Entry(embed(normalized), now + self.ttl)
+                self._entries[key] = entry
+                self._buckets.setdefault(bucket, set()).add(normalized)
+            if len(entry.variants) >= self.variants:
+                return
+            entry.variants.append(response)
+            self._entries.move_to_end(key)
+            self._stats['stores'] += 1
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        """전체 캐시 비우기"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self):
+        """적중률, 항목 수 등 캐시 통계 조회"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses'] + stats['warming']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['enabled'] = self.enabled
+        stats['max_entries'] = self.max_entries
+        stats['ttl_s'] = self.ttl
+        stats['variants'] = self.variants
+        stats['similarity'] = self.similarity
+        stats['context_turns'] = self.context_turns
+        return stats
@@ -0,0 +1,94 @@
+# conftest.py
+"""chatbot_api / shared 모듈 테스트 공용 설정
+
+앱 모듈은 import 시 환경변수를 읽으므로, 임시 DB 경로와 테스트용 설정을 먼저 넣고 import 한다.
+db 픽스처는 테스트마다 새 SQLite 파일의 연결 풀을 만들어 app.pool 을 바꾸고 init_db() 로 스키마를 만든다.
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'shared'))
+sys.path.insert(0, os.path.join(ROOT_DIR, 'chatbot_api'))
+# chat 앱 모듈 (history_store 등, app 이름은 chatbot_api 쪽이 먼저 잡힘)
+sys.path.append(os.path.join(ROOT_DIR, 'chat'))
+
+_TMP_DIR = tempfile.mkdtemp(prefix='pet_chatbot_tests_')
+os.environ['DATABASE_PATH'] = os.path.join(_TMP_DIR, 'import.db')
+os.environ['SECRET_KEY'] = 'test-secret'
+os.environ['LLM_PRELOAD'] = 'lazy'
+os.environ['REQUEST_TIMING_ENABLED'] = '0'
+os.environ['RATE_LIMIT_ENABLED'] = '0'
+os.environ['CREDENTIAL_HASHER_WORKERS'] = '0'  # 해시는 호출 스레드에서 (프로세스 풀 없이)
+os.environ['PASSWORD_HASH_ITERATIONS'] = '1000'
+os.environ.pop('OPENAI_API_KEY', None)  # 더미 응답 사용
+
+
+@pytest.fixture
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch, app_module):
+    """스키마를 만든 새 DB 의 연결 풀 (app.pool 로도 쓰임)"""
+    from database import ConnectionPool
+    from persona_cache import PersonaCache
+    from session_store import SessionStore
+    pool = ConnectionPool(str(tmp_path / 'test.db'))
+    monkeypatch.setattr(app_module, 'pool', pool)
+    monkeypatch.setattr(app_module.conversation_memory, 'pool', pool)
+    # 이전 테스트 DB 의 세션/소유권/페르소나가 캐시에 남지 않도록 새로 만듦
+    monkeypatch.setattr(app_module, 'session_store', SessionStore())
+    monkeypatch.setattr(app_module, 'persona_cache', PersonaCache())
+    app_module.init_db()
+    yield pool
+    pool.close_all()
+
+
+@pytest.fixture
+def chat_session(db):
+    """사용자 1 / 반려동물 1 / 빈 대화 세션 1 (session_id 반환)"""
+    def create(conn):
+        conn.execute("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'u1', 'u1@example.com', 'x')")
+        conn.execute("INSERT INTO pets (id, user_id, name, species) VALUES (1, 1, '초코', '강아지')")
+        return conn.execute('INSERT INTO chat_sessions (user_id, pet_id) VALUES (1, 1)').lastrowid
+    return db.run_in_transaction(create)
+
+
+def add_messages(pool, session_id, count, timestamp=None):
+    """세션에 user/bot 메시지를 번갈아 count 개 추가하고 id 목록 반환"""
+    def insert(conn):
+        ids = []
+        for index in range(count):
+            sender = 'user' if index % 2 == 0 else 'bot'
+            if timestamp is None:
+                cursor = conn.execute('INSERT INTO chat_messages (session_id, sender, content) VALUES (?, ?, ?)',
+                                      (session_id, sender, f'메시지 {index}'))
+            else:
+                cursor = conn.execute(
+                    'INSERT INTO chat_messages (session_id, sender, content, timestamp) VALUES (?, ?, ?, ?)',
+                    (session_id, sender, f'메시지 {index}', timestamp)
+                )
+            ids.append(cursor.lastrowid)
+        return ids
+    return pool.run_in_transaction(insert)
+
+
+PET_DATA = {'name': '초코', 'species': '강아지', 'personality': '활발함', 'speaking_style': '애교있게',
+            'user_call': '누나'}
+
+
+@pytest.fixture
+def client(db, app_module):
+    """회원가입으로 로그인한 Flask 테스트 클라이언트"""
+    client = app_module.app.test_client()
+    response = client.post('/api/auth/signup', json={
+        'username': 'tester', 'email': 'tester@example.com', 'password': 'password123'
+    })
+    assert response.status_code == 201
+    return client
@@ -0,0 +1,89 @@
+"""Flask API 흐름: 반려동물 등록, 메시지 전송(더미 응답), 기록 / 세션 목록 / 대량 가져오기·내보내기"""
+import csv
+import io
+import json
+
+from tests.conftest import PET_DATA
+
+
+def create_pet(client, **overrides):
+    response = client.post('/api/pets', json=dict(PET_DATA, **overrides))
+    assert response.status_code == 200
+    return response.get_json()['pet_id']
+
+
+def test_send_stores_both_turns_and_updates_sessions(client):
+    pet_id = create_pet(client)
+    for message in ('안녕', '산책 갈까?'):
+        response = client.post('/api/chat/send', json={'pet_id': pet_id, 'message': message})
+        assert response.status_code == 200
+        assert response.get_json()['content']
+
+    history = client.get(f'/api/chat/history/{pet_id}').get_json()
+    assert [message['sender'] for message in history['messages']] == ['user', 'bot', 'user', 'bot']
+    assert history['messages'][2]['content'] == '산책 갈까?'
+
+    sessions = client.get('/api/chat/sessions').get_json()['sessions']
+    assert sessions[0]['pet_id'] == pet_id
+    assert sessions[0]['last_message'] == history['messages'][-1]['content']
+
+
+def test_send_to_other_users_pet_is_404(client, app_module):
+    pet_id = create_pet(client)
+    other = app_module.app.test_client()
+    other.post('/api/auth/signup', json={'username': 'other', 'email': 'other@example.com', 'password': 'password123'})
+    response = other.post('/api/chat/send', json={'pet_id': pet_id, 'message': '안녕'})
+    assert response.status_code == 404
+
+
+def test_send_validation(client):
+    assert client.post('/api/chat/send', json={'pet_id': 1, 'message': ''}).status_code == 400
+    assert client.post('/api/chat/send', json={'pet_id': 'x', 'message': 'hi'}).status_code == 400
+    assert client.post('/api/chat/send', json={'pet_id': 1, 'message': 'a' * 501}).status_code == 400
+
+
+def test_history_rejects_bad_params(client):
+    assert client.get('/api/chat/history/1?limit=0').status_code == 400
+
+
+def test_profile_update_invalidates_persona(client, app_module):
+    pet_id = create_pet(client)
+    client.post('/api/chat/send', json={'pet_id': pet_id, 'message': '안녕'})
+    response = client.put(f'/api/pets/{pet_id}', json=dict(PET_DATA, name='바둑이'))
+    assert response.status_code == 200
+    client.post('/api/chat/send', json={'pet_id': pet_id, 'message': '너 이름이 뭐야?'})
+    pet_info, _ = app_module.persona_cache.get_or_load(pet_id, 2, lambda: (None, None))
+    assert pet_info['name'] == '바둑이'
+
+
+def test_bulk_import_reports_row_errors(client):
+    body = '\n'.join([
+        json.dumps(dict(PET_DATA, name='하나'), ensure_ascii=False),
+        '{not json',
+        json.dumps({'name': '둘'}, ensure_ascii=False),
+        json.dumps(dict(PET_DATA, name='셋'), ensure_ascii=False),
+    ]).encode('utf-8')
+    response = client.post('/api/pets/import', data=body, content_type='application/x-ndjson')
+    result = response.get_json()
+    assert result['imported'] == 2
+    assert [error['line'] for error in result['errors']] == [2, 3]
+    names = [pet['name'] for pet in client.get('/api/pets').get_json()['pets']]
+    assert sorted(names) == ['셋', '하나']
+
+
+def test_csv_export_round_trips_through_import(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, 'PET_EXPORT_BATCH_SIZE', 2)
+    for index in range(5):
+        create_pet(client, name=f'펫{index}', likes='공, "간식"')
+    exported = client.get('/api/pets/export?format=csv').get_data(as_text=True)
+    rows = list(csv.DictReader(io.StringIO(exported)))
+    assert [row['name'] for row in rows] == [f'펫{index}' for index in range(5)]
+    assert rows[0]['likes'] == '공, "간식"'
+
+    response = client.post('/api/pets/import', data=exported.encode('utf-8'), content_type='text/csv')
+    assert response.get_json()['imported'] == 5
+    assert len(client.get('/api/pets').get_json()['pets']) == 10
+
+
+def test_unsupported_import_format(client):
+    assert client.post('/api/pets/import', data=b'x', content_type='text/plain').status_code == 415
@@ -0,0 +1,140 @@
+"""대화 기록 키셋 페이지네이션 경계와 보관(cold) 메시지 이어 읽기"""
+import pytest
+
+from chat_archive import ChatArchiver, archive_session, load_archived_messages
+from tests.conftest import add_messages
+
+OLD_TIMESTAMP = '2000-01-01 00:00:00'
+
+
+def page_ids(page):
+    return [message['id'] for message in page['messages']]
+
+
+def walk_history(app_module, pool, limit, **kwargs):
+    """next_before_id 를 따라 끝까지 읽은 id 목록 (오래된 순)"""
+    pages = []
+    before_id = None
+    with pool.connection() as conn:
+        while True:
+            page = app_module.fetch_chat_history(conn, 1, 1, before_id, limit, **kwargs)
+            pages.append(page)
+            if not page['has_more']:
+                break
+            before_id = page['next_before_id']
+    ids = []
+    for page in reversed(pages):
+        ids += page_ids(page)
+    return ids, pages
+
+
+def test_no_session_returns_empty_page(db, app_module):
+    with db.connection() as conn:
+        page = app_module.fetch_chat_history(conn, 1, 1)
+    assert page == {'messages': [], 'has_more': False, 'next_before_id': None}
+
+
+def test_page_of_exactly_limit_has_no_more(db, app_module, chat_session):
+    ids = add_messages(db, chat_session, 5)
+    with db.connection() as conn:
+        page = app_module.fetch_chat_history(conn, 1, 1, limit=5)
+    assert page_ids(page) == ids
+    assert page['has_more'] is False and page['next_before_id'] is None
+
+
+def test_one_more_than_limit_pages_once(db, app_module, chat_session):
+    ids = add_messages(db, chat_session, 6)
+    with db.connection() as conn:
+        first = app_module.fetch_chat_history(conn, 1, 1, limit=5)
+        assert page_ids(first) == ids[1:]
+        assert first['has_more'] is True and first['next_before_id'] == ids[1]
+        second = app_module.fetch_chat_history(conn, 1, 1, first['next_before_id'], 5)
+    assert page_ids(second) == ids[:1]
+    assert second['has_more'] is False
+
+
+@pytest.mark.parametrize('limit', [1, 3, 7, 50])
+def test_walking_pages_returns_every_message_once(db, app_module, chat_session, limit):
+    ids = add_messages(db, chat_session, 21)
+    walked, pages = walk_history(app_module, db, limit)
+    assert walked == ids
+    assert all(len(page['messages']) <= limit for page in pages)
+
+
+def test_before_oldest_id_is_empty(db, app_module, chat_session):
+    ids = add_messages(db, chat_session, 3)
+    with db.connection() as conn:
+        page = app_module.fetch_chat_history(conn, 1, 1, ids[0], 10)
+    assert page['messages'] == [] and page['has_more'] is False
+
+
+def test_compact_page_uses_field_order(db, app_module, chat_session):
+    add_messages(db, chat_session, 2)
+    with db.connection() as conn:
+        page = app_module.fetch_chat_history(conn, 1, 1, compact=True)
+    assert page['fields'] == app_module.HISTORY_FIELDS
+    assert [row[:3] for row in page['messages']] == [(1, 'user', '메시지 0'), (2, 'bot', '메시지 1')]
+
+
+def test_parse_history_params(app_module):
+    assert app_module.parse_history_params({}) == (None, app_module.HISTORY_PAGE_DEFAULT, False)
+    assert app_module.parse_history_params({'before_id': '10', 'limit': '100000', 'compact': 'true'}) == (
+        10, app_module.HISTORY_PAGE_MAX, True
+    )
+    for bad in ({'limit': '0'}, {'before_id': '0'}, {'limit': 'abc'}):
+        with pytest.raises(ValueError):
+            app_module.parse_history_params(bad)
+
+
+def archive_all(pool, session_id, keep_recent, chunk_size=4):
+    """보관 대상이 없을 때까지 archive_session 반복 (옮긴 메시지 수)"""
+    moved = 0
+    while True:
+        result = pool.run_in_transaction(archive_session, session_id, '2100-01-01 00:00:00', keep_recent, False,
+                                         chunk_size)
+        if result is None:
+            return moved
+        moved += result['messages']
+
+
+def test_archive_round_trip_through_fetch_chat_history(db, app_module, chat_session):
+    ids = add_messages(db, chat_session, 23, timestamp=OLD_TIMESTAMP)
+    before, _ = walk_history(app_module, db, 5)
+    with db.connection() as conn:
+        expected = [dict(row) for row in conn.execute(
+            'SELECT id, sender, content, timestamp FROM chat_messages ORDER BY id'
+        )]
+
+    assert archive_all(db, chat_session, keep_recent=6) == 17
+    with db.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM chat_messages').fetchone()[0] == 6
+        assert conn.execute('SELECT archived_until_id FROM chat_sessions').fetchone()[0] == ids[16]
+
+    # hot/cold 경계를 여러 위치에서 지나도록 여러 페이지 크기로 읽음
+    for limit in (1, 4, 5, 6, 7, 50):
+        walked, _ = walk_history(app_module, db, limit)
+        assert walked == before == ids
+    with db.connection() as conn:
+        page = app_module.fetch_chat_history(conn, 1, 1, limit=50)
+    assert page['messages'] == expected
+
+
+def test_archive_respects_keep_recent_and_summary(db, chat_session):
+    add_messages(db, chat_session, 10, timestamp=OLD_TIMESTAMP)
+    # 요약에 반영되지 않은 메시지는 보관하지 않음
+    assert db.run_in_transaction(archive_session, chat_session, '2100-01-01 00:00:00', 2, True, 100) is None
+    db.run_in_transaction(lambda conn: conn.execute('UPDATE chat_sessions SET summary_until_id = 4'))
+    result = db.run_in_transaction(archive_session, chat_session, '2100-01-01 00:00:00', 2, True, 100)
+    assert result['messages'] == 4
+    with db.connection() as conn:
+        assert [row['id'] for row in load_archived_messages(conn, chat_session, 100, 10)] == [4, 3, 2, 1]
+
+
+def test_archiver_run_once_skips_recent_messages(db, app_module, chat_session):
+    add_messages(db, chat_session, 8, timestamp=OLD_TIMESTAMP)
+    add_messages(db, chat_session, 2)
+    archiver = ChatArchiver(db, after_days=30, keep_recent=2, require_summary=False, chunk_size=3, pause=0)
+    report = archiver.run_once()
+    assert report['archived_messages'] == 8
+    walked, _ = walk_history(app_module, db, 3)
+    assert walked == list(range(1, 11))
@@ -0,0 +1,56 @@
+"""토큰 예산 대화 창과 누적 요약"""
+from conversation_memory import ConversationMemory, fit_history, message_tokens
+
+from tests.conftest import add_messages
+
+
+def test_fit_history_keeps_most_recent_within_budget():
+    messages = [{'content': f'메시지 {index}'} for index in range(10)]
+    budget = sum(message_tokens(message['content']) for message in messages[-3:])
+    assert fit_history(messages, budget) == messages[-3:]
+    assert fit_history(messages, 0) == []
+
+
+def summarizer(calls):
+    def summarize(summary, messages, pet_info):
+        calls.append([message['id'] for message in messages])
+        return f'{summary or ""}+{len(messages)}'
+    return summarize
+
+
+def test_load_context_reports_overflow(db, chat_session):
+    ids = add_messages(db, chat_session, 10)
+    budget = sum(message_tokens(f'메시지 {index}') for index in range(7, 10))
+    memory = ConversationMemory(db, summarizer([]), budget_tokens=budget, trigger_tokens=1)
+    with db.connection() as conn:
+        summary, history, overflow = memory.load_context(conn, chat_session)
+    assert summary is None and overflow
+    assert [message['id'] for message in history] == ids[-3:]
+
+
+def test_update_summary_folds_old_messages(db, chat_session):
+    ids = add_messages(db, chat_session, 10)
+    budget = sum(message_tokens(f'메시지 {index}') for index in range(7, 10))
+    calls = []
+    memory = ConversationMemory(db, summarizer(calls), budget_tokens=budget, trigger_tokens=1)
+    assert memory.update_summary(chat_session, {})
+    assert calls == [ids[:7]]
+    with db.connection() as conn:
+        summary, history, overflow = memory.load_context(conn, chat_session)
+    assert summary == '+7' and not overflow
+    assert [message['id'] for message in history] == ids[-3:]
+    assert memory.stats()['summaries'] == 1
+
+
+def test_overflow_below_trigger_does_not_need_summary(db, chat_session):
+    add_messages(db, chat_session, 10)
+    budget = sum(message_tokens(f'메시지 {index}') for index in range(7, 10))
+    overflow_tokens = sum(message_tokens(f'메시지 {index}') for index in range(7))
+    memory = ConversationMemory(db, summarizer([]), budget_tokens=budget, trigger_tokens=overflow_tokens + 1)
+    with db.connection() as conn:
+        assert not memory.load_context(conn, chat_session)[2]
+    assert not memory.update_summary(chat_session, {})
+
+    add_messages(db, chat_session, 1)
+    with db.connection() as conn:
+        assert memory.load_context(conn, chat_session)[2]
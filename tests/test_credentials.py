@@ -0,0 +1,62 @@
+"""비밀번호 해시 형식, 이전 형식 검증과 재해시, 해시 대기열 한도"""
+import hashlib
+import secrets
+
+import pytest
+
+import credentials
+from credentials import (
+    CredentialHasher, CredentialHasherBusy, hash_password, needs_rehash, verify_and_upgrade, verify_password
+)
+
+
+def legacy_hash(password):
+    salt = secrets.token_hex(16)
+    digest = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt.encode('utf-8'), credentials.LEGACY_ITERATIONS)
+    return salt + digest.hex()
+
+
+def test_hash_and_verify():
+    hashed = hash_password('correct horse')
+    algorithm, iterations, _, _ = hashed.split('$')
+    assert algorithm == credentials.PASSWORD_HASH_ALGORITHM
+    assert int(iterations) == credentials.PASSWORD_HASH_ITERATIONS
+    assert verify_password('correct horse', hashed)
+    assert not verify_password('wrong horse', hashed)
+    assert not verify_password('correct horse', 'garbage$x')
+
+
+def test_legacy_hash_is_verified_and_upgraded():
+    hashed = legacy_hash('old password')
+    assert needs_rehash(hashed)
+    ok, new_hash = verify_and_upgrade('old password', hashed)
+    assert ok and new_hash.startswith(credentials.PASSWORD_HASH_ALGORITHM + '$')
+    assert verify_password('old password', new_hash)
+    assert verify_and_upgrade('wrong', hashed) == (False, None)
+
+
+def test_weaker_iterations_are_upgraded():
+    hashed = hash_password('pw', iterations=credentials.PASSWORD_HASH_ITERATIONS - 1)
+    assert needs_rehash(hashed)
+    assert not needs_rehash(hash_password('pw'))
+
+
+def test_hasher_rejects_when_queue_is_full():
+    hasher = CredentialHasher(workers=0, max_queue=1, wait_timeout=0.01)
+    assert verify_password('pw', hasher.hash('pw'))
+    hasher._acquire_slot()  # 진행 중인 작업 하나가 자리를 차지한 상태
+    with pytest.raises(CredentialHasherBusy):
+        hasher.hash('pw')
+    assert hasher.stats()['rejected'] == 1
+
+
+def test_hasher_worker_process_round_trip():
+    hasher = CredentialHasher(workers=1, max_queue=2)
+    try:
+        hashed = hasher.hash('pw')
+        assert verify_password('pw', hashed)
+        assert hasher.verify('pw', hashed) == (True, None)
+        assert hasher.verify('wrong', hashed) == (False, None)
+        assert hasher.stats()['completed'] == 3
+    finally:
+        hasher.shutdown()
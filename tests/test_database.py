@@ -0,0 +1,98 @@
+"""WAL 연결 풀과 쓰기 트랜잭션 재시도"""
+import sqlite3
+import threading
+
+import pytest
+
+from database import ConnectionPool, PoolTimeoutError, is_busy_error
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), pool_size=2, timeout=0.05, max_retries=2)
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT)')
+        conn.commit()
+    yield pool
+    pool.close_all()
+
+
+def test_connections_are_reused_and_use_wal(pool):
+    for _ in range(3):
+        with pool.connection() as conn:
+            assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+            assert conn.execute('PRAGMA foreign_keys').fetchone()[0] == 1
+    stats = pool.stats()
+    assert stats['created'] == 1 and stats['in_use'] == 0 and stats['idle'] == 1
+
+
+def test_pool_timeout_when_exhausted(pool):
+    held = [pool.acquire(), pool.acquire()]
+    with pytest.raises(PoolTimeoutError):
+        pool.acquire()
+    for conn in held:
+        conn.close()
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_released_connection_rolls_back_open_transaction(pool):
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items (value) VALUES ('uncommitted')")
+    conn.close()
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+
+
+def test_run_in_transaction_commits_and_rolls_back(pool):
+    pool.run_in_transaction(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('a')"))
+
+    def fail(conn):
+        conn.execute("INSERT INTO items (value) VALUES ('b')")
+        raise ValueError('boom')
+
+    with pytest.raises(ValueError):
+        pool.run_in_transaction(fail)
+    with pool.connection() as conn:
+        assert [row['value'] for row in conn.execute('SELECT value FROM items')] == ['a']
+
+
+def test_run_in_transaction_retries_busy_errors(pool):
+    attempts = []
+
+    def flaky(conn):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        conn.execute("INSERT INTO items (value) VALUES ('retried')")
+        return len(attempts)
+
+    assert pool.run_in_transaction(flaky) == 2
+    assert pool.stats()['retries'] == 1
+
+
+def test_non_busy_errors_are_not_retried(pool):
+    with pytest.raises(sqlite3.OperationalError):
+        pool.run_in_transaction(lambda conn: conn.execute('SELECT * FROM missing'))
+    assert pool.stats()['retries'] == 0
+    assert is_busy_error(sqlite3.OperationalError('database is locked'))
+    assert not is_busy_error(PoolTimeoutError('timeout'))
+
+
+def test_concurrent_writers_all_commit(pool):
+    errors = []
+
+    def writer(index):
+        try:
+            for n in range(10):
+                pool.run_in_transaction(lambda conn: conn.execute('INSERT INTO items (value) VALUES (?)', (f'{index}-{n}',)))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 40
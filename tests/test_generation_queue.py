@@ -0,0 +1,38 @@
+"""chat 앱의 응답 생성 워커 풀 (generation_queue.py)"""
+import threading
+import time
+
+from generation_queue import GenerationScheduler
+
+
+def recording_job(events, name, done, delay=0.05):
+    def run(job):
+        events.append(('start', name))
+        time.sleep(delay)
+        events.append(('end', name))
+        done.release()
+    return run
+
+
+def test_same_user_jobs_run_one_at_a_time_in_order():
+    scheduler = GenerationScheduler(workers=2, max_queue=10, max_per_user=2)
+    events = []
+    done = threading.Semaphore(0)
+    scheduler.submit('user-a', recording_job(events, 'first', done))
+    scheduler.submit('user-a', recording_job(events, 'second', done))
+    assert done.acquire(timeout=2) and done.acquire(timeout=2)
+    assert events == [('start', 'first'), ('end', 'first'), ('start', 'second'), ('end', 'second')]
+
+
+def test_other_users_run_while_one_user_is_busy():
+    scheduler = GenerationScheduler(workers=2, max_queue=10, max_per_user=2)
+    events = []
+    done = threading.Semaphore(0)
+    scheduler.submit('user-a', recording_job(events, 'a1', done, delay=0.2))
+    scheduler.submit('user-a', recording_job(events, 'a2', done))
+    scheduler.submit('user-b', recording_job(events, 'b1', done))
+    for _ in range(3):
+        assert done.acquire(timeout=2)
+    # b1 은 a1 이 끝나기 전에 다른 워커에서 실행되고, a2 는 a1 이 끝난 뒤에 시작
+    assert events.index(('end', 'b1')) < events.index(('end', 'a1'))
+    assert events.index(('end', 'a1')) < events.index(('start', 'a2'))
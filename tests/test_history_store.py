@@ -0,0 +1,74 @@
+"""chat 앱의 서버 측 대화 저장소 (history_store.py)"""
+import sqlite3
+import threading
+import time
+
+import pytest
+from history_store import ChatHistoryStore
+
+
+def test_turns_are_appended_and_read_from_the_end(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / 'chat.db'))
+    chat_id = store.create_chat({'name': '초코'})
+    assert store.get_pet_info(chat_id) == {'name': '초코'}
+    assert store.get_pet_info('missing') is None and store.get_pet_info(None) is None
+
+    for index in range(5):
+        store.append_turn(chat_id, f'질문 {index}', f'답 {index}')
+    assert store.recent_turns(chat_id, limit=2) == [{'user': '질문 3', 'bot': '답 3'}, {'user': '질문 4', 'bot': '답 4'}]
+
+    store.reset(chat_id)
+    assert store.recent_turns(chat_id) == []
+    assert store.get_pet_info(chat_id) == {'name': '초코'}
+
+
+def test_purge_inactive_removes_old_chats(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / 'chat.db'))
+    old_id = store.create_chat({'name': '옛날'})
+    new_id = store.create_chat({'name': '최근'})
+    store.append_turn(old_id, 'a', 'b')
+    age_chat(store, old_id)
+    store.purge_inactive(days=30)
+    assert store.get_pet_info(old_id) is None
+    assert store.get_pet_info(new_id) == {'name': '최근'}
+
+
+def age_chat(store, chat_id, days=40):
+    with store._connection() as conn, conn:
+        conn.execute("UPDATE chats SET updated_at = datetime('now', ?) WHERE chat_id = ?", (f'-{days} days', chat_id))
+
+
+def test_connections_are_bounded_and_reused(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / 'chat.db'), pool_size=2, timeout=0.05)
+    chat_id = store.create_chat({'name': '초코'})
+    threads = [threading.Thread(target=store.recent_turns, args=(chat_id,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert store.stats()['open'] <= 2
+
+    with store._connection(), store._connection():
+        with pytest.raises(sqlite3.OperationalError):
+            store.get_pet_info(chat_id)
+    assert store.stats()['timeouts'] == 1
+
+    store.close()
+    assert store.stats()['open'] == 0
+
+
+def test_purge_runs_periodically(tmp_path):
+    store = ChatHistoryStore(str(tmp_path / 'chat.db'))
+    store.start_purge(interval=0.02, days=30)
+    try:
+        chat_id = store.create_chat({'name': '옛날'})
+        age_chat(store, chat_id)
+        deadline = time.monotonic() + 2
+        # 시작할 때 한 번 실행한 뒤에도 반복되는지 확인
+        while (store.get_pet_info(chat_id) is not None or store.stats()['purges'] < 2) \
+                and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert store.get_pet_info(chat_id) is None
+        assert store.stats()['purges'] >= 2
+    finally:
+        store.close()
@@ -0,0 +1,199 @@
+"""LLM 호출 게이트웨이 (shared/llm_gateway.py)"""
+import asyncio
+import threading
+import time
+
+import pytest
+from llm_gateway import CircuitBreaker, CircuitOpenError, LLMGateway
+
+
+def half_open_gateway(**kwargs):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    return LLMGateway('test', breaker=breaker, max_retries=0, **kwargs)
+
+
+def test_breaker_opens_and_recovers():
+    gateway = LLMGateway('test', breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60), max_retries=0)
+
+    def fail(timeout):
+        raise ConnectionError('down')
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            gateway.call(fail)
+    with pytest.raises(CircuitOpenError):
+        gateway.call(lambda timeout: 'ok')
+    assert gateway.stats()['short_circuited'] == 1
+
+
+class BadRequest(Exception):
+    status_code = 400
+
+
+def test_non_retryable_error_in_half_open_releases_trial():
+    gateway = half_open_gateway()
+
+    def bad_request(timeout):
+        raise BadRequest('invalid prompt')
+
+    with pytest.raises(BadRequest):
+        gateway.call(bad_request)
+    # 요청 오류는 업스트림이 회복됐다는 근거가 아니므로 닫지 않고, 다음 시험 호출은 허용
+    assert gateway.breaker.stats()['state'] == 'half_open'
+    assert gateway.call(lambda timeout: 'ok') == 'ok'
+    assert gateway.breaker.stats()['state'] == 'closed'
+
+
+def test_non_retryable_error_keeps_failure_count():
+    gateway = LLMGateway('test', breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60), max_retries=0)
+
+    def fail(timeout):
+        raise ConnectionError('down')
+
+    def bad_request(timeout):
+        raise BadRequest('invalid prompt')
+
+    for error_call in (fail, bad_request, fail):
+        with pytest.raises(Exception):
+            gateway.call(error_call)
+    assert gateway.breaker.stats()['state'] == 'open'
+
+
+def test_early_closed_half_open_stream_closes_breaker():
+    gateway = half_open_gateway()
+    stream = gateway.stream(lambda timeout: iter(['a', 'b', 'c']))
+    assert next(stream) == 'a'
+    stream.close()
+    assert gateway.breaker.stats()['state'] == 'closed'
+    assert list(gateway.stream(lambda timeout: iter(['x']))) == ['x']
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_early_closed_half_open_async_stream_releases_trial():
+    gateway = half_open_gateway()
+
+    async def chunks():
+        for chunk in 'abc':
+            yield chunk
+
+    async def open_stream(timeout):
+        return chunks()
+
+    async def scenario():
+        stream = gateway.stream_async(open_stream)
+        assert await stream.__anext__() == 'a'
+        await stream.aclose()
+        return [chunk async for chunk in gateway.stream_async(open_stream)]
+
+    assert asyncio.run(scenario()) == ['a', 'b', 'c']
+
+
+def test_cancelled_half_open_stream_before_first_chunk_releases_trial():
+    gateway = half_open_gateway()
+
+    async def stalled():
+        await asyncio.sleep(10)
+        yield 'late'
+
+    async def open_stalled(timeout):
+        return stalled()
+
+    async def open_stream(timeout):
+        async def chunks():
+            yield 'ok'
+        return chunks()
+
+    async def consume(stream):
+        return [chunk async for chunk in stream]
+
+    async def scenario():
+        task = asyncio.ensure_future(consume(gateway.stream_async(open_stalled)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # 실패로 세지 않으므로 브레이커는 그대로 half_open, 다음 시험 호출을 보낼 수 있음
+        assert gateway.breaker.stats()['state'] == 'half_open'
+        return await consume(gateway.stream_async(open_stream))
+
+    assert asyncio.run(scenario()) == ['ok']
+
+
+def test_cancelled_half_open_call_releases_trial():
+    gateway = half_open_gateway()
+
+    async def slow(timeout):
+        await asyncio.sleep(10)
+
+    async def quick(timeout):
+        return 'ok'
+
+    async def scenario():
+        task = asyncio.ensure_future(gateway.call_async(slow))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await gateway.call_async(quick)
+
+    assert asyncio.run(scenario()) == 'ok'
+
+
+def test_hedge_loser_keeps_slot_until_it_finishes():
+    gateway = LLMGateway('test', max_retries=0, max_concurrency=2, queue_timeout=0.01,
+                         hedge_percentile=50, hedge_min_samples=1)
+    gateway._latencies.append(0.01)
+    release_primary = threading.Event()
+    calls = []
+
+    def func(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            release_primary.wait(5)
+            return 'slow'
+        return 'fast'
+
+    assert gateway.call(func) == 'fast'
+    assert gateway.stats()['hedge_wins'] == 1
+    # 먼저 보낸 요청이 아직 실행 중이므로 슬롯 하나를 계속 차지
+    deadline = time.monotonic() + 5
+    while gateway.stats()['in_flight'] > 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert gateway.stats()['in_flight'] == 1
+    assert gateway._limiter.acquire(blocking=False)
+    assert not gateway._limiter.acquire(blocking=False)
+    gateway._limiter.release()
+
+    release_primary.set()
+    deadline = time.monotonic() + 5
+    while gateway.stats()['in_flight'] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert gateway.stats()['in_flight'] == 0
+
+
+def test_async_hedge_cancels_loser_and_releases_slots():
+    gateway = LLMGateway('test', max_retries=0, max_concurrency=2,
+                         hedge_percentile=50, hedge_min_samples=1)
+    gateway._latencies.append(0.01)
+    cancelled = []
+
+    async def func(timeout):
+        if not cancelled:
+            cancelled.append(False)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled[0] = True
+                raise
+        return 'fast'
+
+    async def scenario():
+        result = await gateway.call_async(func)
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == 'fast'
+    assert cancelled == [True]
+    assert gateway.stats()['in_flight'] == 0
@@ -0,0 +1,147 @@
+"""FTS5 trigram 검색 색인 트리거와 검색 범위"""
+import pytest
+from chat_archive import archive_session, index_unregistered_chunks
+from message_search import backfill_batch, make_snippet, parse_search_params, search_messages
+
+from tests.conftest import add_messages
+
+
+def add_message(pool, session_id, content, sender='user'):
+    return pool.run_in_transaction(
+        lambda conn: conn.execute('INSERT INTO chat_messages (session_id, sender, content) VALUES (?, ?, ?)',
+                                  (session_id, sender, content)).lastrowid
+    )
+
+
+def result_ids(pool, query, user_id=1, **kwargs):
+    with pool.connection() as conn:
+        return [result['id'] for result in search_messages(conn, user_id, query, **kwargs)['results']]
+
+
+def test_new_messages_are_indexed_by_trigger(db, chat_session):
+    message_id = add_message(db, chat_session, '오늘 공원에서 산책했어')
+    add_message(db, chat_session, '간식 먹고 싶어')
+    assert result_ids(db, '공원에서') == [message_id]
+
+
+def test_update_and_delete_keep_index_in_sync(db, chat_session):
+    message_id = add_message(db, chat_session, '고양이 장난감')
+    db.run_in_transaction(lambda conn: conn.execute(
+        "UPDATE chat_messages SET content = '강아지 장난감' WHERE id = ?", (message_id,)))
+    assert result_ids(db, '고양이') == []
+    assert result_ids(db, '강아지') == [message_id]
+    db.run_in_transaction(lambda conn: conn.execute('DELETE FROM chat_messages WHERE id = ?', (message_id,)))
+    assert result_ids(db, '강아지') == []
+
+
+def test_short_terms_fall_back_to_like_scan(db, chat_session):
+    ids = add_messages(db, chat_session, 3)
+    with db.connection() as conn:
+        page = search_messages(conn, 1, '지 1')
+    assert page['ranking'] == 'recent'
+    assert [result['id'] for result in page['results']] == [ids[1]]
+
+
+def test_search_is_scoped_to_user_and_pet(db, chat_session):
+    add_message(db, chat_session, '우리집 강아지 최고')
+
+    def other_user(conn):
+        conn.execute("INSERT INTO users (id, username, email, password_hash) VALUES (2, 'u2', 'u2@example.com', 'x')")
+        conn.execute("INSERT INTO pets (id, user_id, name, species) VALUES (2, 2, '보리', '강아지')")
+        session_id = conn.execute('INSERT INTO chat_sessions (user_id, pet_id) VALUES (2, 2)').lastrowid
+        return conn.execute("INSERT INTO chat_messages (session_id, sender, content) VALUES (?, 'user', '우리집 강아지')",
+                            (session_id,)).lastrowid
+
+    other_id = db.run_in_transaction(other_user)
+    assert result_ids(db, '우리집', user_id=2) == [other_id]
+    assert result_ids(db, '우리집', pet_id=2) == []
+
+
+def test_fts_syntax_characters_are_literal(db, chat_session):
+    message_id = add_message(db, chat_session, 'AND "OR" NEAR( 산책*')
+    assert result_ids(db, '"OR" NEAR( 산책*') == [message_id]
+
+
+def test_parse_search_params_and_snippet():
+    assert parse_search_params({'q': ' 산책 ', 'limit': '1000'})[0] == '산책'
+    for bad in ({'q': ''}, {'q': '산책', 'offset': '-1'}, {'q': '산책', 'pet_id': 'x'}):
+        with pytest.raises(ValueError):
+            parse_search_params(bad)
+    snippet, highlights = make_snippet('오늘은 공원에서 산책', ['산책'])
+    assert [snippet[start:stop] for start, stop in highlights] == ['산책']
+
+
+def archive_all(pool, session_id):
+    return pool.run_in_transaction(archive_session, session_id, '2100-01-01 00:00:00', 1, False, 100)
+
+
+def test_archived_messages_stay_searchable(db, chat_session):
+    archived_id = add_message(db, chat_session, '작년 여름 바닷가 산책')
+    recent_id = add_message(db, chat_session, '오늘도 바닷가 가자', sender='bot')
+    assert archive_all(db, chat_session)['messages'] == 1
+
+    with db.connection() as conn:
+        page = search_messages(conn, 1, '바닷가')
+        assert search_messages(conn, 2, '바닷가')['results'] == []
+    results = {result['id']: result for result in page['results']}
+    assert set(results) == {archived_id, recent_id}
+    assert results[archived_id]['archived'] and not results[recent_id]['archived']
+    assert results[archived_id]['snippet'] == '작년 여름 바닷가 산책'
+    assert results[archived_id]['sender'] == 'user'
+    assert results[archived_id]['session_id'] == chat_session
+
+
+def test_messages_archived_before_backfill_are_indexed(db, chat_session):
+    message_id = add_message(db, chat_session, '백필 전에 보관된 메시지')
+    add_message(db, chat_session, '최근 메시지')
+
+    def unindex(conn):
+        conn.execute("INSERT INTO chat_messages_fts (chat_messages_fts) VALUES ('delete-all')")
+        conn.execute('UPDATE chat_search_backfill SET until_id = ?, indexed_upto = 0', (message_id + 1,))
+
+    db.run_in_transaction(unindex)
+    archive_all(db, chat_session)
+    assert result_ids(db, '보관된') == [message_id]
+    while db.run_in_transaction(backfill_batch):
+        pass
+    assert result_ids(db, '최근 메시지') == [message_id + 1]
+
+
+def test_chunks_archived_before_migration_are_reindexed(db, chat_session):
+    message_id = add_message(db, chat_session, '마이그레이션 전에 보관')
+    add_message(db, chat_session, '남은 메시지')
+    archive_all(db, chat_session)
+
+    def forget(conn):
+        # 마이그레이션 8 이전처럼 색인과 등록 정보가 없는 보관 묶음
+        conn.execute("INSERT INTO chat_messages_fts (chat_messages_fts, rowid, content) "
+                     "VALUES ('delete', ?, '마이그레이션 전에 보관')", (message_id,))
+        conn.execute('DELETE FROM chat_archived_messages')
+
+    db.run_in_transaction(forget)
+    assert result_ids(db, '마이그레이션') == []
+    assert db.run_in_transaction(index_unregistered_chunks) == 1
+    assert db.run_in_transaction(index_unregistered_chunks) == 0
+    assert result_ids(db, '마이그레이션') == [message_id]
+
+
+def test_mixed_query_filters_archived_messages_by_short_term(db, chat_session):
+    archived_hit = add_message(db, chat_session, '바닷가에서 밥 먹었어')
+    add_message(db, chat_session, '바닷가에서 놀았어')
+    archive_all(db, chat_session)
+    live_hit = add_message(db, chat_session, '바닷가 가서 밥 줘', sender='bot')
+    add_message(db, chat_session, '바닷가 또 가자')
+
+    with db.connection() as conn:
+        page = search_messages(conn, 1, '바닷가 밥')
+        second = search_messages(conn, 1, '바닷가 밥', limit=1, offset=1)
+    assert {result['id'] for result in page['results']} == {archived_hit, live_hit}
+    assert not page['has_more']
+    assert len(second['results']) == 1 and second['has_more'] is False
+
+
+def test_archived_ties_are_ordered_newest_first(db, chat_session):
+    ids = [add_message(db, chat_session, '같은 내용의 산책 기록') for _ in range(3)]
+    archive_all(db, chat_session)
+    assert result_ids(db, '내용의') == ids[::-1]
+    assert result_ids(db, '내용의', limit=2, offset=1) == ids[1::-1]
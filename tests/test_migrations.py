@@ -0,0 +1,137 @@
+"""마이그레이션 이전 스키마(user_version 0)의 DB 를 init_db() 로 올리는 경로"""
+import sqlite3
+
+from database import ConnectionPool
+
+# 마이그레이션 도입 전 init_db() 가 만들던 스키마
+LEGACY_SCHEMA = '''
+CREATE TABLE users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT UNIQUE NOT NULL,
+    email TEXT UNIQUE NOT NULL,
+    password_hash TEXT NOT NULL,
+    nickname TEXT,
+    profile_image TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE pets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    species TEXT NOT NULL,
+    breed TEXT,
+    personality TEXT,
+    speaking_style TEXT,
+    user_call TEXT,
+    likes TEXT,
+    dislikes TEXT,
+    etc_info TEXT,
+    profile_image TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id)
+);
+CREATE TABLE chat_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    pet_id INTEGER NOT NULL,
+    session_name TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_message_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users (id),
+    FOREIGN KEY (pet_id) REFERENCES pets (id)
+);
+CREATE TABLE chat_messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    sender TEXT NOT NULL CHECK (sender IN ('user', 'bot')),
+    content TEXT NOT NULL,
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES chat_sessions (id)
+);
+INSERT INTO users (id, username, email, password_hash) VALUES (1, 'legacy', 'legacy@example.com', 'x');
+INSERT INTO pets (id, user_id, name, species) VALUES (1, 1, '나비', '고양이');
+INSERT INTO chat_sessions (id, user_id, pet_id) VALUES (1, 1, 1), (2, 1, 1);
+INSERT INTO chat_messages (session_id, sender, content) VALUES
+    (1, 'user', '안녕 나비야'), (1, 'bot', '야옹 반가워'), (1, 'user', '츄르 먹을래?');
+'''
+
+
+def legacy_pool(tmp_path, monkeypatch, app_module):
+    path = str(tmp_path / 'legacy.db')
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    conn.close()
+    pool = ConnectionPool(path)
+    monkeypatch.setattr(app_module, 'pool', pool)
+    return pool
+
+
+def test_legacy_db_is_migrated_to_latest(tmp_path, monkeypatch, app_module):
+    pool = legacy_pool(tmp_path, monkeypatch, app_module)
+    app_module.init_db()
+
+    with pool.connection() as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(app_module.MIGRATIONS)
+        pet = conn.execute('SELECT profile_version FROM pets WHERE id = 1').fetchone()
+        assert pet['profile_version'] == 1
+
+        # 세션 목록용 마지막 메시지가 기존 메시지로 채워짐 (메시지 없는 세션은 NULL)
+        sessions = {row['id']: row for row in conn.execute(
+            'SELECT id, last_message_id, last_message, summary_until_id, archived_until_id FROM chat_sessions'
+        )}
+        assert sessions[1]['last_message'] == '츄르 먹을래?'
+        assert sessions[1]['last_message_id'] == 3
+        assert sessions[2]['last_message_id'] is None
+        assert sessions[1]['summary_until_id'] == 0 and sessions[1]['archived_until_id'] == 0
+
+        # 기존 메시지는 백필 대상으로 남고 새 메시지부터 트리거로 색인됨
+        backfill = conn.execute('SELECT until_id, indexed_upto FROM chat_search_backfill').fetchone()
+        assert (backfill['until_id'], backfill['indexed_upto']) == (3, 0)
+
+        names = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('index', 'table')")}
+    assert {'idx_chat_messages_session_id', 'idx_chat_sessions_user_time', 'idx_chat_sessions_user_pet_time',
+            'idx_pets_user_id', 'chat_messages_fts', 'chat_message_archive', 'user_sessions'} <= names
+    pool.close_all()
+
+
+def test_migrations_are_idempotent(tmp_path, monkeypatch, app_module):
+    pool = legacy_pool(tmp_path, monkeypatch, app_module)
+    app_module.init_db()
+    app_module.init_db()
+    with pool.connection() as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == len(app_module.MIGRATIONS)
+        assert conn.execute('SELECT COUNT(*) FROM chat_messages').fetchone()[0] == 3
+    pool.close_all()
+
+
+def test_legacy_messages_searchable_after_backfill(tmp_path, monkeypatch, app_module):
+    from message_search import backfill_batch, search_messages
+    pool = legacy_pool(tmp_path, monkeypatch, app_module)
+    app_module.init_db()
+
+    with pool.connection() as conn:
+        assert search_messages(conn, 1, '먹을래')['results'] == []
+    while pool.run_in_transaction(backfill_batch, 2):
+        pass
+    with pool.connection() as conn:
+        page = search_messages(conn, 1, '먹을래')
+    assert [result['id'] for result in page['results']] == [3]
+    assert page['index_complete']
+    pool.close_all()
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch, app_module):
+    pool = legacy_pool(tmp_path, monkeypatch, app_module)
+    broken = app_module.MIGRATIONS[:1] + [['ALTER TABLE pets ADD COLUMN extra TEXT', 'SELECT * FROM missing_table']]
+    monkeypatch.setattr(app_module, 'MIGRATIONS', broken)
+    with pool.connection() as conn:
+        try:
+            app_module.migrate_db(conn)
+        except sqlite3.OperationalError:
+            pass
+        else:
+            raise AssertionError('마이그레이션 오류가 전파되어야 함')
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 1
+        columns = [row['name'] for row in conn.execute('PRAGMA table_info(pets)')]
+    assert 'profile_version' in columns and 'extra' not in columns
+    pool.close_all()
@@ -0,0 +1,38 @@
+"""조회 경로가 인덱스를 타는지 EXPLAIN QUERY PLAN 으로 확인
+
+정렬용 임시 B-tree 나 인덱스 없는 전체 스캔이 보이면 기록 길이에 비례해 느려진다.
+"""
+
+
+def query_plan(conn, sql, params):
+    return [row['detail'] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params).fetchall()]
+
+
+def assert_index_only_order(plan, index):
+    assert any(index in detail for detail in plan), plan
+    assert not any('TEMP B-TREE' in detail for detail in plan), plan
+    assert not any(detail.startswith('SCAN') and 'USING' not in detail for detail in plan), plan
+
+
+def test_sessions_listing_uses_user_time_index(db, app_module):
+    with db.connection() as conn:
+        plan = query_plan(conn, app_module.SESSIONS_LIST_SQL, (1,))
+    assert_index_only_order(plan, 'idx_chat_sessions_user_time')
+
+
+def test_history_session_lookup_uses_user_pet_time_index(db, app_module):
+    with db.connection() as conn:
+        plan = query_plan(conn, app_module.HISTORY_SESSION_SQL, (1, 1))
+    assert_index_only_order(plan, 'idx_chat_sessions_user_pet_time')
+
+
+def test_history_page_uses_session_id_index(db, app_module):
+    with db.connection() as conn:
+        plan = query_plan(conn, app_module.HISTORY_PAGE_SQL, (1, 2 ** 63 - 1, 51))
+    assert_index_only_order(plan, 'idx_chat_messages_session_id')
+
+
+def test_pet_export_batch_uses_user_id_index(db, app_module):
+    with db.connection() as conn:
+        plan = query_plan(conn, app_module.PET_EXPORT_SQL, (1, 0, 100))
+    assert_index_only_order(plan, 'idx_pets_user_id')
@@ -0,0 +1,66 @@
+"""토큰 버킷 요청 한도 (shared/rate_limit.py)"""
+import sqlite3
+
+import pytest
+from rate_limit import (MemoryBucketStore, RateLimiter, RateLimitExceeded, SQLiteBucketStore,
+                        parse_limit, take_tokens)
+
+
+def test_parse_limit():
+    assert parse_limit('20/60') == (20.0, 20 / 60)
+    assert parse_limit('5') == (5.0, 5.0)
+    assert parse_limit('0') is None and parse_limit('') is None
+    for bad in ('0.5/1', '1/0', 'x/1'):
+        with pytest.raises(ValueError):
+            parse_limit(bad)
+
+
+def test_take_tokens_is_all_or_nothing():
+    entries = [('user', 'u', 2, 1.0), ('ip', 'i', 10, 1.0)]
+    updated, retry_after, scope = take_tokens(entries, {'u': (0.5, 100.0)}, 100.0, 1)
+    assert updated is None and scope == 'user' and retry_after == pytest.approx(0.5)
+    # 시간이 지나면 충전량만큼 채워짐 (버킷 크기를 넘지 않음)
+    updated, retry_after, scope = take_tokens(entries, {'u': (0.5, 100.0)}, 200.0, 1)
+    assert scope is None and updated == {'u': (1.0, 200.0), 'i': (9, 200.0)}
+
+
+def test_memory_limiter_isolates_users():
+    limiter = RateLimiter('test', limits={('api', 'user'): (2, 0.1)}, backend='memory', enabled=True)
+    limiter.acquire('api', user=1)
+    limiter.acquire('api', user=1)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        limiter.acquire('api', user=1)
+    assert excinfo.value.scope == 'user' and excinfo.value.retry_after == 10
+    limiter.acquire('api', user=2)
+    assert limiter.stats()['limited'] == 1
+
+
+def test_sqlite_stores_share_buckets(tmp_path):
+    path = str(tmp_path / 'buckets.db')
+    entries = [('user', 'k', 1, 0.001)]
+    first, second = SQLiteBucketStore(path), SQLiteBucketStore(path)
+    assert first.acquire(entries, 1)[1] is None
+    assert second.acquire(entries, 1)[1] == 'user'
+    assert MemoryBucketStore().acquire(entries, 1)[1] is None
+
+
+def test_store_errors_fail_open(monkeypatch):
+    limiter = RateLimiter('test', limits={('api', 'user'): (1, 0.1)}, backend='memory', enabled=True)
+
+    def broken(entries, cost):
+        raise sqlite3.OperationalError('database is locked')
+
+    monkeypatch.setattr(limiter._store, 'acquire', broken)
+    limiter.acquire('api', user=1)
+    assert limiter.stats()['errors'] == 1
+
+
+def test_flask_returns_429_with_retry_after(app_module, client, monkeypatch):
+    limiter = RateLimiter('chatbot_api', limits={('api', 'user'): (1, 0.01)}, backend='memory', enabled=True)
+    monkeypatch.setattr(app_module, 'rate_limiter', limiter)
+    assert client.get('/api/chat/sessions').status_code == 200
+    response = client.get('/api/chat/sessions')
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '100'
+    assert response.get_json()['retry_after'] == 100
+    assert client.get('/').status_code != 429
@@ -0,0 +1,35 @@
+"""짧은 메시지 응답 캐시 (shared/response_cache.py) 의 조회 키"""
+from response_cache import ResponseCache
+
+PERSONA = '너는 강아지 초코야'
+
+
+def make_cache(**kwargs):
+    return ResponseCache(enabled=True, variants=1, **kwargs)
+
+
+def test_negated_message_is_not_served_from_cache():
+    cache = make_cache()
+    cache.put(PERSONA, '밥 먹었어', '응! 맛있게 먹었어')
+    cache.put(PERSONA, '밥 먹었어요', '응! 배불러')  # '밥 안 먹었어요' 와 유사도 0.8 이상
+    assert cache.get(PERSONA, '밥 안 먹었어') is None
+    assert cache.get(PERSONA, '밥 안 먹었어요') is None
+    assert cache.get(PERSONA, '밥 먹었어?!') == '응! 맛있게 먹었어'  # 정규화 후 같은 메시지
+    assert cache.stats()['similar_hits'] == 0
+
+
+def test_similar_messages_only_match_when_enabled():
+    cache = make_cache(similarity=0.8)
+    cache.put(PERSONA, '사랑해', '나도 사랑해!')
+    assert cache.get(PERSONA, '사랑해요') == '나도 사랑해!'
+    assert cache.stats()['similar_hits'] == 1
+    assert make_cache().get(PERSONA, '사랑해요') is None
+
+
+def test_last_turn_is_part_of_the_key():
+    cache = make_cache()
+    walk = ['산책 갈까?', '좋아 좋아!']
+    cache.put(PERSONA, '진짜?', '응 빨리 가자!', walk)
+    assert cache.get(PERSONA, '진짜?', ['오늘 일찍 잔다', '잘 자!']) is None
+    assert cache.get(PERSONA, '진짜?', ['어제 얘기'] + walk) == '응 빨리 가자!'
+    assert cache.get(PERSONA, '진짜?') is None  # 대화 시작
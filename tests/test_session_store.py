@@ -0,0 +1,83 @@
+"""서버 측 로그인 세션 (session_store.py) 과 login_required"""
+import time
+
+from session_store import SessionStore, delete_session, hash_token, insert_session
+
+
+def test_logout_revokes_copied_cookie(app_module, client):
+    copied = app_module.app.test_client()
+    with client.session_transaction() as flask_session:
+        sid = flask_session['sid']
+    with copied.session_transaction() as flask_session:
+        flask_session['sid'] = sid
+    assert copied.get('/api/chat/sessions').status_code == 200
+
+    assert client.post('/api/auth/logout').status_code == 200
+    assert client.get('/api/chat/sessions').status_code == 401
+    assert copied.get('/api/chat/sessions').status_code == 401
+
+
+def test_login_creates_new_session(client):
+    client.post('/api/auth/logout')
+    response = client.post('/api/auth/login', json={'username': 'tester', 'password': 'password123'})
+    assert response.status_code == 200
+    assert client.get('/api/chat/sessions').status_code == 200
+
+
+def test_expired_session_is_rejected(db):
+    store = SessionStore(ttl=60)
+    with db.connection() as conn:
+        conn.execute("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'u', 'u@example.com', 'x')")
+        conn.commit()
+    token, token_hash, expires_at = store.new_session(1)
+    db.run_in_transaction(insert_session, token_hash, 1, time.time() - 1)
+    with db.connection() as conn:
+        assert store.load_user(conn, token) is None
+    assert store.cached_user(token) is None
+
+    token, token_hash, expires_at = store.new_session(1)
+    db.run_in_transaction(insert_session, token_hash, 1, expires_at)
+    with db.connection() as conn:
+        assert store.load_user(conn, token) == 1
+    assert store.cached_user(token) == 1
+    assert db.run_in_transaction(store.purge_expired) == 1
+
+
+def test_unknown_user_session_is_not_created(db):
+    assert db.run_in_transaction(insert_session, hash_token('x'), 999, time.time() + 60) is None
+
+
+def test_legacy_user_id_cookie_requires_login(app_module, client):
+    legacy = app_module.app.test_client()
+    with legacy.session_transaction() as flask_session:
+        flask_session['user_id'] = 1
+    assert legacy.get('/api/chat/sessions').status_code == 401
+    with legacy.session_transaction() as flask_session:
+        assert 'user_id' not in flask_session and 'sid' not in flask_session
+
+
+def test_logout_in_other_process_is_seen_after_revocation_check(db):
+    with db.connection() as conn:
+        conn.execute("INSERT INTO users (id, username, email, password_hash) VALUES (1, 'u', 'u@example.com', 'x')")
+        conn.commit()
+    # 같은 DB 를 쓰는 두 프로세스의 캐시
+    this_process, other_process = SessionStore(revocation_interval=60), SessionStore()
+    token, token_hash, expires_at = this_process.new_session(1)
+    db.run_in_transaction(insert_session, token_hash, 1, expires_at)
+    assert this_process.revocation_check_due()
+    with db.connection() as conn:
+        this_process.check_revocations(conn)
+        assert this_process.load_user(conn, token) == 1
+
+    other_process.forget_session(token)
+    db.run_in_transaction(delete_session, token_hash)
+    assert this_process.cached_user(token) == 1
+    assert not this_process.revocation_check_due()
+
+    this_process._next_revocation_check = 0.0
+    assert this_process.revocation_check_due()
+    with db.connection() as conn:
+        this_process.check_revocations(conn)
+        assert this_process.cached_user(token) is None
+        assert this_process.load_user(conn, token) is None
+    assert this_process.stats()['revocation_flushes'] == 2